@@ -0,0 +1,507 @@
+"""
+Cold-data tier for `daily_analysis` and `forecast_history`.
+
+An archival run moves rows older than a horizon out of the hot collections
+into an archive store:
+
+    collection  `<source>_archive` collections in the same database (default)
+    parquet     zstd-compressed Parquet files under a directory, one file per
+                batch (requires pyarrow)
+
+What is moved:
+
+- daily_analysis: rows whose analysis_datetime is before the cutoff, except
+  the latest row of each instrument, which the dashboards read.
+- forecast_history: completed (success/failed) forecasts whose result_date
+  (parsed, since it is entered by hand) is before the cutoff. Pending
+  forecasts, and results whose date doesn't parse, stay hot.
+
+Every archived daily_analysis row leaves a tombstone in `archived_keys`
+(market, instrument_code, analysis_datetime). The sheet sync and file
+imports skip rows with a tombstone, so a sheet that still holds the history
+doesn't bring archived rows back into the hot collection.
+
+Rollups stay whole. `archive_rollups` holds per-instrument totals of the
+archived forecasts; the summary, performance and cumulative endpoints add
+them to what they compute from the hot collection. Market/instrument
+dimensions keep counting archived rows, and the time-series copy
+(`daily_analysis_series`) is never archived.
+
+Row-level reads (lists, cumulative curve, analytics) only see the hot tier
+unless asked for `include_archive`, which runs the same query against the
+archive and merges the results, de-duplicated on the natural key.
+"""
+
+import asyncio
+import glob
+import os
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from pymongo import ReplaceOne, UpdateOne
+
+from forecast_resolution import parse_datetime
+
+SOURCES = ("daily_analysis", "forecast_history")
+ROLLUPS_COLLECTION = "archive_rollups"
+RUNS_COLLECTION = "archive_runs"
+TOMBSTONES_COLLECTION = "archived_keys"
+COMPLETED = ["success", "failed"]
+BATCH_SIZE = 1000
+
+# The fields identifying a row across tiers; daily_analysis rows are upserted on theirs
+NATURAL_KEYS = {
+    "daily_analysis": ("market", "instrument_code", "analysis_datetime"),
+    "forecast_history": ("record_id",),
+}
+# Fields whose min/max the parquet archive keeps per file to skip files a query can't match
+PARQUET_STATS_FIELDS = {
+    "daily_analysis": ("market", "instrument_code", "analysis_datetime"),
+    "forecast_history": ("market", "instrument_code", "forecast_date", "result_date"),
+}
+
+def natural_key(source: str, row: dict) -> tuple:
+    return tuple(row.get(field) for field in NATURAL_KEYS[source])
+
+def archive_collection_name(source: str) -> str:
+    return f"{source}_archive"
+
+def _older_than(field: str, cutoff: datetime) -> dict:
+    """Match `field` before `cutoff`, whether stored as an ISO string or a BSON date."""
+    naive_utc = cutoff.astimezone(timezone.utc).replace(tzinfo=None)
+    return {"$or": [
+        {field: {"$lt": cutoff.isoformat(), "$type": "string"}},
+        {field: {"$lt": naive_utc, "$type": "date"}}
+    ]}
+
+def candidate_query(source: str, cutoff: datetime) -> dict:
+    if source == "daily_analysis":
+        # analysis_datetime is normalized to ISO by the ingest, so it compares as text
+        return _older_than("analysis_datetime", cutoff)
+    if source == "forecast_history":
+        # result_date is free-form; archive_source compares the parsed dates
+        return {"status": {"$in": COMPLETED}}
+    raise ValueError(f"Invalid archive source: {source}. Expected one of {', '.join(SOURCES)}")
+
+def is_candidate(source: str, row: dict, cutoff: datetime) -> bool:
+    if source == "forecast_history":
+        result_date = parse_datetime(row.get("result_date"))
+        return result_date is not None and result_date < cutoff
+    return True
+
+def _sort_value(value):
+    # None sorts before everything, like MongoDB. Datetimes and ISO strings (the tiers may store either, with any
+    # offset) compare as UTC instants; text that isn't a date sorts after them, as text
+    if value is None:
+        return (0, "")
+    dt = parse_datetime(value)
+    if dt is not None:
+        return (1, dt.astimezone(timezone.utc))
+    return (2, str(value))
+
+def merge_rows(hot: List[dict], archived: List[dict], sort_field: str, descending: bool = False,
+               limit: Optional[int] = None, source: Optional[str] = None) -> List[dict]:
+    """
+    Federate one query's results from both tiers, in the query's order. With
+    `source`, an archived row whose natural key is also hot is dropped.
+    """
+    if source is not None:
+        hot_keys = {natural_key(source, row) for row in hot}
+        archived = [row for row in archived if natural_key(source, row) not in hot_keys]
+    rows = sorted(hot + archived, key=lambda row: _sort_value(row.get(sort_field)), reverse=descending)
+    return rows[:limit] if limit is not None else rows
+
+def matches(document: dict, query: dict) -> bool:
+    """The subset of MongoDB query semantics the archive queries use, for stores without a query engine."""
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+            continue
+        value = document.get(field)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for operator, operand in condition.items():
+            if operator == "$in" and value not in operand:
+                return False
+            if operator == "$nin" and value in operand:
+                return False
+            if operator == "$ne" and value == operand:
+                return False
+            if operator == "$type":
+                expected = str if operand == "string" else datetime
+                if not isinstance(value, expected):
+                    return False
+            if operator in ("$lt", "$lte", "$gt", "$gte"):
+                if value is None or type(value) is not type(operand):
+                    return False
+                if (operator == "$lt" and not value < operand) or (operator == "$lte" and not value <= operand) or \
+                        (operator == "$gt" and not value > operand) or (operator == "$gte" and not value >= operand):
+                    return False
+    return True
+
+def _key(row: dict):
+    return row.get("record_id") or str(row.get("_id"))
+
+class CollectionArchive:
+    kind = "collection"
+
+    def __init__(self, db):
+        self.db = db
+
+    async def ensure_indexes(self):
+        for source, sort_field in (("daily_analysis", "analysis_datetime"), ("forecast_history", "forecast_date")):
+            collection = self.db[archive_collection_name(source)]
+            await collection.create_index("record_id")
+            await collection.create_index([("market", 1), (sort_field, -1)])
+        await self.db[archive_collection_name("daily_analysis")].create_index(
+            [(field, 1) for field in NATURAL_KEYS["daily_analysis"]]
+        )
+
+    async def write(self, source: str, rows: List[dict]):
+        # Upserts by natural key, so re-running a batch that was interrupted before the hot delete is harmless
+        operations = []
+        for row in rows:
+            row = {**row, "record_id": _key(row)}
+            operations.append(ReplaceOne(dict(zip(NATURAL_KEYS[source], natural_key(source, row))), row, upsert=True))
+        await self.db[archive_collection_name(source)].bulk_write(operations, ordered=False)
+
+    async def find(self, source: str, query: dict, sort: Optional[Tuple[str, int]] = None,
+                   limit: Optional[int] = None) -> List[dict]:
+        cursor = self.db[archive_collection_name(source)].find(query, {"_id": 0})
+        if sort:
+            cursor = cursor.sort(*sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(limit)
+
+    async def completed_forecasts(self) -> List[dict]:
+        return await self.db[archive_collection_name("forecast_history")].find(
+            {"status": {"$in": COMPLETED}},
+            {"_id": 0, "market": 1, "instrument_code": 1, "status": 1, "calculated_pl_percent": 1, "result_date": 1}
+        ).to_list(None)
+
+    async def count(self, source: str) -> int:
+        return await self.db[archive_collection_name(source)].count_documents({})
+
+    async def keys(self, source: str) -> AsyncIterator[tuple]:
+        projection = {"_id": 0, **{field: 1 for field in NATURAL_KEYS[source]}}
+        async for row in self.db[archive_collection_name(source)].find({}, projection):
+            yield natural_key(source, row)
+
+class ParquetArchive:
+    """
+    Archive batches as Parquet files: <directory>/<source>/<timestamp>-<id>.parquet.
+
+    Files are immutable once written, so each file's row keys and the min/max
+    of PARQUET_STATS_FIELDS are read once and cached. find() only opens files
+    whose ranges can match the query, and count() only re-reads key columns
+    when the set of files changes.
+    """
+    kind = "parquet"
+
+    def __init__(self, directory: str, compression: str = "zstd"):
+        self.directory = directory
+        self.compression = compression
+        self._meta: Dict[str, dict] = {}  # path -> {"keys": [...], "stats": {field: (min, max)}}
+        self._counts: Dict[str, Tuple[Tuple[str, ...], int]] = {}  # source -> (files, distinct rows)
+
+    async def ensure_indexes(self):
+        _pyarrow()
+        for source in SOURCES:
+            os.makedirs(os.path.join(self.directory, source), exist_ok=True)
+
+    def _files(self, source: str) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, source, "*.parquet")))
+
+    def _write(self, source: str, rows: List[dict]):
+        pa, pq = _pyarrow()
+        os.makedirs(os.path.join(self.directory, source), exist_ok=True)
+        name = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}.parquet"
+        path = os.path.join(self.directory, source, name)
+        table = pa.Table.from_pylist([{**row, "record_id": _key(row)} for row in rows])
+        # Written under a temporary name so readers never see a partial file
+        pq.write_table(table, path + ".tmp", compression=self.compression)
+        os.replace(path + ".tmp", path)
+
+    def _file_meta(self, source: str, path: str) -> dict:
+        meta = self._meta.get(path)
+        if meta is None:
+            _, pq = _pyarrow()
+            names = set(pq.read_schema(path).names)
+            fields = [f for f in dict.fromkeys(NATURAL_KEYS[source] + PARQUET_STATS_FIELDS[source]) if f in names]
+            columns = pq.read_table(path, columns=fields).to_pydict()
+            rows = len(next(iter(columns.values()), []))
+            stats = {}
+            for field in PARQUET_STATS_FIELDS[source]:
+                values = [v for v in columns.get(field, [None] * rows) if v is not None]
+                # Only comparable (single-typed) columns can rule a file out
+                stats[field] = (min(values), max(values)) if len({type(v) for v in values}) == 1 else None
+            meta = self._meta[path] = {
+                "keys": list(zip(*(columns.get(f, [None] * rows) for f in NATURAL_KEYS[source]))),
+                "stats": stats,
+            }
+        return meta
+
+    def _metas(self, source: str) -> List[Tuple[str, dict]]:
+        files = self._files(source)
+        live = set(files)
+        for path in [p for p in self._meta if os.path.dirname(p) == os.path.join(self.directory, source)]:
+            if path not in live:
+                del self._meta[path]
+        return [(path, self._file_meta(source, path)) for path in files]
+
+    def _read(self, source: str, query: dict) -> List[dict]:
+        _, pq = _pyarrow()
+        rows: Dict[tuple, dict] = {}
+        for path, meta in self._metas(source):
+            if not _may_match(meta["stats"], query):
+                continue
+            for row in pq.read_table(path).to_pylist():
+                # A batch re-archived after an interrupted run replaces its earlier copy
+                key = natural_key(source, row)
+                rows.pop(key, None)
+                if matches(row, query):
+                    rows[key] = row
+        return list(rows.values())
+
+    def _count(self, source: str) -> int:
+        metas = self._metas(source)
+        files = tuple(path for path, _ in metas)
+        cached = self._counts.get(source)
+        if cached is None or cached[0] != files:
+            keys = set()
+            for _, meta in metas:
+                keys.update(meta["keys"])
+            cached = self._counts[source] = (files, len(keys))
+        return cached[1]
+
+    async def write(self, source: str, rows: List[dict]):
+        await asyncio.to_thread(self._write, source, rows)
+
+    async def find(self, source: str, query: dict, sort: Optional[Tuple[str, int]] = None,
+                   limit: Optional[int] = None) -> List[dict]:
+        rows = await asyncio.to_thread(self._read, source, query)
+        if sort:
+            rows = merge_rows(rows, [], sort[0], descending=sort[1] < 0)
+        return rows[:limit] if limit else rows
+
+    async def completed_forecasts(self) -> List[dict]:
+        return await self.find("forecast_history", {"status": {"$in": COMPLETED}})
+
+    async def count(self, source: str) -> int:
+        return await asyncio.to_thread(self._count, source)
+
+    async def keys(self, source: str) -> AsyncIterator[tuple]:
+        for _, meta in await asyncio.to_thread(self._metas, source):
+            for key in meta["keys"]:
+                yield key
+
+def _in_range(value, bounds) -> bool:
+    low, high = bounds
+    if type(value) is not type(low):
+        return True  # not comparable: can't rule the file out
+    return low <= value <= high
+
+def _may_match(stats: Dict[str, Optional[tuple]], query: dict) -> bool:
+    """False only if a file's min/max prove no row can match `query`'s top-level conditions."""
+    for field, condition in query.items():
+        bounds = stats.get(field)
+        if bounds is None:
+            continue
+        low, high = bounds
+        if not isinstance(condition, dict):
+            if condition is not None and not _in_range(condition, bounds):
+                return False
+            continue
+        if "$in" in condition and not any(v is None or _in_range(v, bounds) for v in condition["$in"]):
+            return False
+        for operator, operand in condition.items():
+            if type(operand) is not type(low):
+                continue
+            if (operator == "$lt" and not low < operand) or (operator == "$lte" and not low <= operand) or \
+                    (operator == "$gt" and not high > operand) or (operator == "$gte" and not high >= operand):
+                return False
+    return True
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("The parquet archive requires the pyarrow package: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+def create_archive_store(target: str, db, directory: Optional[str] = None):
+    if target == "collection":
+        return CollectionArchive(db)
+    if target == "parquet":
+        return ParquetArchive(directory or "archive")
+    raise ValueError(f"Invalid ARCHIVE_TARGET: {target}. Expected 'collection' or 'parquet'")
+
+async def archive_source(db, store, source: str, cutoff: datetime, batch_size: int = BATCH_SIZE,
+                         dry_run: bool = False) -> dict:
+    """Move the rows of `source` older than `cutoff` into `store`."""
+    collection = db[source]
+    keep = set()
+    if source == "daily_analysis":
+        latest = await collection.aggregate([{"$group": {
+            "_id": {"market": "$market", "instrument_code": "$instrument_code"},
+            "latest": {"$max": "$analysis_datetime"}
+        }}]).to_list(None)
+        keep = {(doc["_id"].get("market"), doc["_id"].get("instrument_code"), doc["latest"]) for doc in latest}
+
+    archived = kept = 0
+    batch: List[dict] = []
+
+    async def flush():
+        nonlocal archived, batch
+        if not dry_run:
+            await store.write(source, [{k: v for k, v in row.items() if k != "_id"} for row in batch])
+            if source == "daily_analysis":
+                # Before the hot delete, so an ingest running meanwhile can't re-add the rows
+                await write_tombstones(db, batch)
+            await collection.delete_many({"_id": {"$in": [row["_id"] for row in batch]}})
+        archived += len(batch)
+        batch = []
+
+    async for row in collection.find(candidate_query(source, cutoff), batch_size=batch_size).sort("_id", 1):
+        if not is_candidate(source, row, cutoff):
+            continue
+        if keep and (row.get("market"), row.get("instrument_code"), row.get("analysis_datetime")) in keep:
+            kept += 1
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    return {"archived": archived, "kept_latest": kept}
+
+async def ensure_tombstone_index(db):
+    await db[TOMBSTONES_COLLECTION].create_index(
+        [(field, 1) for field in NATURAL_KEYS["daily_analysis"]], unique=True
+    )
+
+async def write_tombstones(db, rows: List[dict]):
+    """Record the natural keys of archived daily_analysis rows."""
+    fields = NATURAL_KEYS["daily_analysis"]
+    operations = []
+    for row in rows:
+        key = dict(zip(fields, natural_key("daily_analysis", row)))
+        operations.append(UpdateOne(key, {"$setOnInsert": key}, upsert=True))
+    if operations:
+        await db[TOMBSTONES_COLLECTION].bulk_write(operations, ordered=False)
+
+async def archived_keys(db, keys: List[tuple]) -> set:
+    """The (market, instrument_code, analysis_datetime) keys among `keys` that have been archived."""
+    if not keys:
+        return set()
+    market, instrument, analysis_datetime = (list({key[i] for key in keys}) for i in range(3))
+    found = db[TOMBSTONES_COLLECTION].find(
+        {"market": {"$in": market}, "instrument_code": {"$in": instrument},
+         "analysis_datetime": {"$in": analysis_datetime}},
+        {"_id": 0}
+    )
+    wanted = set(keys)
+    found_keys = set()
+    async for doc in found:
+        key = natural_key("daily_analysis", doc)
+        if key in wanted:
+            found_keys.add(key)
+    return found_keys
+
+async def backfill_tombstones(db, store, batch_size: int = BATCH_SIZE) -> int:
+    """Tombstones for rows archived before they were recorded; returns the number of archived rows seen."""
+    fields = NATURAL_KEYS["daily_analysis"]
+    seen = 0
+    batch: List[dict] = []
+    async for key in store.keys("daily_analysis"):
+        batch.append(dict(zip(fields, key)))
+        if len(batch) >= batch_size:
+            await write_tombstones(db, batch)
+            seen, batch = seen + len(batch), []
+    if batch:
+        await write_tombstones(db, batch)
+    return seen + len(batch)
+
+def _rollup_rows(forecasts: List[dict]) -> List[dict]:
+    groups: Dict[Tuple[str, str], dict] = {}
+    for forecast in forecasts:
+        key = (forecast.get("market"), forecast.get("instrument_code"))
+        pl = forecast.get("calculated_pl_percent") or 0
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                "source": "forecast_history", "market": key[0], "instrument_code": key[1],
+                "completed": 0, "successful": 0, "pl_sum": 0.0, "pl_max": pl, "pl_min": pl,
+                "last_result_date": None,
+            }
+        group["completed"] += 1
+        group["successful"] += forecast.get("status") == "success"
+        group["pl_sum"] += pl
+        group["pl_max"] = max(group["pl_max"], pl)
+        group["pl_min"] = min(group["pl_min"], pl)
+        result_date = forecast.get("result_date")
+        if isinstance(result_date, datetime):
+            result_date = result_date.isoformat()
+        if result_date and (group["last_result_date"] is None or result_date > group["last_result_date"]):
+            group["last_result_date"] = result_date
+    return list(groups.values())
+
+async def rebuild_rollups(db, store) -> int:
+    """Recompute the archived-forecast rollups from the archive; returns the number of instruments."""
+    rollups = _rollup_rows(await store.completed_forecasts())
+    await db[ROLLUPS_COLLECTION].delete_many({"source": "forecast_history"})
+    if rollups:
+        await db[ROLLUPS_COLLECTION].insert_many(rollups, ordered=False)
+    return len(rollups)
+
+async def run_archive(db, store, horizon_days: float, sources=SOURCES, batch_size: int = BATCH_SIZE,
+                      dry_run: bool = False, now: Optional[datetime] = None) -> dict:
+    """Archive every source and record the run. Rollups are rebuilt afterwards, so a re-run repairs them."""
+    started = time.perf_counter()
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=horizon_days)
+    report = {
+        "run_id": f"archive_{uuid.uuid4().hex[:12]}",
+        "created_at": now.isoformat(),
+        "cutoff": cutoff.isoformat(),
+        "target": store.kind,
+        "dry_run": dry_run,
+        "sources": {},
+    }
+    if not dry_run and "daily_analysis" in sources:
+        # Archives written before tombstones existed need a backfill, once: later runs write their own, and
+        # counting a parquet archive reads every file
+        if await db[RUNS_COLLECTION].find_one({"tombstones_complete": True}, {"_id": 1}) is None:
+            if await db[TOMBSTONES_COLLECTION].estimated_document_count() < await store.count("daily_analysis"):
+                report["tombstones_backfilled"] = await backfill_tombstones(db, store, batch_size)
+        report["tombstones_complete"] = True
+    for source in sources:
+        report["sources"][source] = await archive_source(db, store, source, cutoff, batch_size, dry_run)
+    if not dry_run and "forecast_history" in sources:
+        report["rollup_instruments"] = await rebuild_rollups(db, store)
+    report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    if not dry_run:
+        await db[RUNS_COLLECTION].insert_one(dict(report))
+    return report
+
+async def archived_forecast_rollups(collection) -> List[dict]:
+    return await collection.find({"source": "forecast_history"}, {"_id": 0}).to_list(None)
+
+def rollup_totals(rollups: List[dict]) -> Optional[dict]:
+    """Totals over all archived forecasts, or None if nothing is archived."""
+    if not rollups:
+        return None
+    return {
+        "completed": sum(r["completed"] for r in rollups),
+        "successful": sum(r["successful"] for r in rollups),
+        "pl_sum": sum(r["pl_sum"] for r in rollups),
+        "pl_max": max(r["pl_max"] for r in rollups),
+        "pl_min": min(r["pl_min"] for r in rollups),
+    }
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tahlil One - Columnar export benchmark
+======================================
+Encodes N synthetic daily_analysis documents (shaped like the sheet sync's
+rows: ISO date strings, prices as entered) as JSON the way the paginated
+endpoints return them, then as Arrow IPC and Parquet with stream_export,
+and compares time and size. MongoDB is not involved; requires pyarrow.
+Run it from the backend directory:
+
+    python -m benchmarks.columnar_export --rows 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+
+from columnar_export import stream_export
+
+def make_documents(count, instruments, now):
+    start = now - timedelta(days=730)
+    for i in range(count):
+        price = random.uniform(5, 500)
+        ts = (start + timedelta(seconds=random.uniform(0, 730 * 86400))).isoformat()
+        yield {
+            "record_id": f"da_{i:09d}",
+            "market": f"M{i % 7}",
+            "instrument_code": f"INS{i % instruments:04d}",
+            "insight_type": random.choice(["Bullish", "Bearish", "Neutral"]),
+            "analysis_datetime": ts,
+            "analysis_price": f"{price:,.2f}",
+            "target_price": f"{price * 1.05:,.2f}",
+            "critical_level": f"{price * 0.97:,.2f}",
+            "source": "google_sheets",
+            "created_at": ts,
+            "updated_at": ts,
+        }
+
+class ListCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def __aiter__(self):
+        for document in self.documents:
+            yield document
+
+async def encode(documents, fmt, batch_size):
+    size = 0
+    async for chunk in stream_export(ListCursor(documents), "daily_analysis", fmt, batch_size=batch_size):
+        size += len(chunk)
+    return size
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON against Arrow/Parquet export encoding')
+    parser.add_argument('--rows', type=int, default=1000000, help='daily_analysis rows (default: 1000000)')
+    parser.add_argument('--instruments', type=int, default=500, help='Distinct instruments (default: 500)')
+    parser.add_argument('--batch-size', type=int, default=50000, help='Rows per record batch (default: 50000)')
+    args = parser.parse_args()
+
+    documents = list(make_documents(args.rows, args.instruments, datetime.now(timezone.utc)))
+    print(f"\n📦 {len(documents):,} documents\n")
+    print(f"  {'format':<10} {'seconds':>10} {'MB':>10}")
+
+    started = time.perf_counter()
+    json_size = len(json.dumps(documents).encode("utf-8"))
+    print(f"  {'json':<10} {time.perf_counter() - started:>10.2f} {json_size / 1e6:>10.1f}")
+
+    for fmt in ("arrow", "parquet"):
+        started = time.perf_counter()
+        size = asyncio.run(encode(documents, fmt, args.batch_size))
+        print(f"  {fmt:<10} {time.perf_counter() - started:>10.2f} {size / 1e6:>10.1f}  "
+              f"({size / json_size:.0%} of json)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tahlil One - daily_analysis range scan benchmark
+================================================
+Compares range-query latency on the document layout (ISO-string
+`analysis_datetime`, string prices, bucketing done in Python) against the
+`daily_analysis_series` time-series layout (BSON dates, numeric prices,
+bucketing with $dateTrunc). Seeds a scratch database; run it from the
+backend directory:
+
+    python -m benchmarks.daily_series_range --mongo-url mongodb://localhost:27017
+    python -m benchmarks.daily_series_range --instruments 200 --points 5000 --window-days 90 --bucket 1d
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from daily_series import SERIES_COLLECTION, ensure_series_collection, parse_bucket, parse_price, series_pipeline, write_series_points
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+def make_records(instruments, points, interval_minutes):
+    for i in range(instruments):
+        price = random.uniform(10, 500)
+        for p in range(points):
+            price *= 1 + random.gauss(0, 0.01)
+            yield {
+                "record_id": f"daily_{i}_{p}",
+                "market": f"M{i % 5}",
+                "instrument_code": f"INS{i:04d}",
+                "insight_type": random.choice(["Bullish Strong", "Bullish Weak", "Bearish Strong", "Bearish Weak"]),
+                "analysis_datetime": (START + timedelta(minutes=p * interval_minutes)).isoformat(),
+                "analysis_price": f"{price:,.2f}",
+                "target_price": f"{price * 1.05:,.2f}",
+                "critical_level": f"{price * 0.97:,.2f}",
+                "source": "benchmark"
+            }
+
+async def seed(db, instruments, points, interval_minutes):
+    await db.drop_collection("daily_analysis")
+    await db.drop_collection(SERIES_COLLECTION)
+    storage = await ensure_series_collection(db)
+    await db.daily_analysis.create_index([("instrument_code", 1), ("analysis_datetime", 1)])
+
+    batch = []
+    for record in make_records(instruments, points, interval_minutes):
+        batch.append(record)
+        if len(batch) >= 5000:
+            await db.daily_analysis.insert_many([dict(r) for r in batch], ordered=False)
+            await write_series_points(db, batch, 5000, replace_existing=False)
+            batch = []
+    if batch:
+        await db.daily_analysis.insert_many([dict(r) for r in batch], ordered=False)
+        await write_series_points(db, batch, 5000, replace_existing=False)
+    return storage
+
+async def document_layout_query(db, instrument, start, end, bucket_seconds):
+    cursor = db.daily_analysis.find(
+        {"instrument_code": instrument, "analysis_datetime": {"$gte": start.isoformat(), "$lt": end.isoformat()}},
+        {"_id": 0, "analysis_datetime": 1, "analysis_price": 1}
+    ).sort("analysis_datetime", 1)
+    buckets = {}
+    async for row in cursor:
+        ts = datetime.fromisoformat(row["analysis_datetime"]).timestamp()
+        price = parse_price(row["analysis_price"])
+        key = int(ts // bucket_seconds)
+        bucket = buckets.setdefault(key, [price, price, price, price, 0])
+        bucket[1] = max(bucket[1], price)
+        bucket[2] = min(bucket[2], price)
+        bucket[3] = price
+        bucket[4] += 1
+    return len(buckets)
+
+async def series_layout_query(db, instrument, start, end, bucket):
+    points = await db[SERIES_COLLECTION].aggregate(series_pipeline(instrument, start, end, bucket)).to_list(None)
+    return len(points)
+
+async def timed(runs, make_call):
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await make_call()
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+async def run(args):
+    client = AsyncIOMotorClient(args.mongo_url)
+    db = client[args.db_name]
+    try:
+        print(f"\n🌱 Seeding {args.instruments} instruments x {args.points} points into {args.db_name} ...")
+        started = time.perf_counter()
+        storage = await seed(db, args.instruments, args.points, args.interval_minutes)
+        print(f"   done in {time.perf_counter() - started:.1f}s ({SERIES_COLLECTION}: {storage})\n")
+
+        _, _, bucket_seconds = parse_bucket(args.bucket)
+        span = timedelta(minutes=args.points * args.interval_minutes)
+        window = timedelta(days=args.window_days)
+
+        def random_window():
+            instrument = f"INS{random.randrange(args.instruments):04d}"
+            offset = random.uniform(0, max((span - window).total_seconds(), 0))
+            start = START + timedelta(seconds=offset)
+            return instrument, start, start + window
+
+        before = await timed(args.runs, lambda: document_layout_query(db, *random_window(), bucket_seconds))
+        after = await timed(args.runs, lambda: series_layout_query(db, *random_window(), args.bucket))
+
+        print(f"  {'layout':<28} {'p50 ms':>8} {'p95 ms':>8}")
+        print(f"  {'daily_analysis (strings)':<28} {before[0]:>8.2f} {before[1]:>8.2f}")
+        print(f"  {'daily_analysis_series':<28} {after[0]:>8.2f} {after[1]:>8.2f}")
+        print(f"\n  speedup at p50: {before[0] / max(after[0], 1e-9):.2f}x")
+    finally:
+        if not args.keep:
+            await client.drop_database(args.db_name)
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark daily_analysis range scans before and after the time-series migration')
+    parser.add_argument('--mongo-url', default='mongodb://localhost:27017', help='MongoDB connection URL')
+    parser.add_argument('--db-name', default='tahlil_bench', help='Scratch database (dropped afterwards unless --keep)')
+    parser.add_argument('--instruments', type=int, default=50, help='Number of instruments (default: 50)')
+    parser.add_argument('--points', type=int, default=2000, help='Points per instrument (default: 2000)')
+    parser.add_argument('--interval-minutes', type=int, default=60, help='Minutes between points (default: 60)')
+    parser.add_argument('--window-days', type=int, default=30, help='Range queried per request (default: 30)')
+    parser.add_argument('--bucket', default='1d', help='Bucket size (default: 1d)')
+    parser.add_argument('--runs', type=int, default=200, help='Queries per layout (default: 200)')
+    parser.add_argument('--keep', action='store_true', help='Keep the scratch database')
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
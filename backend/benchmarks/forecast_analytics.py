@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tahlil One - Forecast analytics benchmark
+=========================================
+Times the risk/return analytics engine on N synthetic completed forecasts:
+converting the loaded documents into arrays, then computing the global,
+per-market and per-instrument metrics. Documents are shaped like the output
+of ANALYTICS_PIPELINE (result dates already converted to epoch milliseconds);
+MongoDB is not involved. Run it from the backend directory:
+
+    python -m benchmarks.forecast_analytics --forecasts 1000000
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+
+from forecast_analytics import ForecastSeries, compute_analytics
+
+def make_documents(count, instruments, now):
+    start = now - timedelta(days=730)
+    for i in range(count):
+        pl = random.gauss(0.5, 4.0)
+        yield {
+            "market": f"M{i % 7}",
+            "instrument_code": f"INS{i % instruments:04d}",
+            "calculated_pl_percent": round(pl, 2),
+            "status": "success" if pl > 0 else "failed",
+            "result_ts": int((start + timedelta(seconds=random.uniform(0, 730 * 86400))).timestamp() * 1000)
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark forecast risk/return analytics')
+    parser.add_argument('--forecasts', type=int, default=1000000, help='Completed forecasts (default: 1000000)')
+    parser.add_argument('--instruments', type=int, default=500, help='Distinct instruments (default: 500)')
+    parser.add_argument('--runs', type=int, default=5, help='Timed analytics passes (default: 5)')
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    documents = list(make_documents(args.forecasts, args.instruments, now))
+
+    started = time.perf_counter()
+    series = ForecastSeries.from_documents(documents)
+    load_elapsed = time.perf_counter() - started
+
+    timings = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        result = compute_analytics(series, include_instruments=True, as_of=now)
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+
+    print(f"\n📦 Built arrays for {len(series):,} forecasts in {load_elapsed:.2f}s "
+          f"({len(series) / load_elapsed:,.0f} documents/s)")
+    print(f"📊 Analytics for {len(result['markets'])} markets and {len(result['instruments'])} instruments "
+          f"in {best * 1000:.1f}ms (best of {args.runs}, {len(series) / best:,.0f} forecasts/s)")
+    print(f"   global: win rate {result['global']['win_rate']}%, "
+          f"max drawdown {result['global']['max_drawdown_percent']}%, "
+          f"sharpe {result['global']['sharpe_ratio']}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tahlil One - Forecast resolution benchmark
+==========================================
+Times the resolution engine's CPU work (price matching, the vectorized P/L
+pass and building the bulk write) for N pending forecasts, with MongoDB
+replaced by an in-memory stand-in so only the engine itself is measured.
+Run it from the backend directory:
+
+    python -m benchmarks.forecast_resolution --forecasts 100000
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+
+from forecast_resolution import resolve_pending_forecasts
+
+class _Cursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def to_list(self, length):
+        return self.rows
+
+class _BulkResult:
+    def __init__(self, count):
+        self.modified_count = count
+
+class _Collection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.written = 0
+
+    def find(self, query, projection):
+        return _Cursor(self.rows)
+
+    async def bulk_write(self, requests, ordered):
+        self.written = len(requests)
+        return _BulkResult(len(requests))
+
+class _Database:
+    def __init__(self, rows):
+        self.forecast_history = _Collection(rows)
+
+def make_forecasts(count, instruments, now):
+    rows = []
+    for i in range(count):
+        entry = random.uniform(10, 500)
+        bullish = random.random() < 0.5
+        rows.append({
+            "record_id": f"forecast_{i:012x}",
+            "market": f"M{i % 7}",
+            "instrument_code": f"INS{i % instruments:04d}",
+            "forecast_date": (now - timedelta(days=random.uniform(1, 60))).isoformat(),
+            "forecast_direction": "Bullish" if bullish else "Bearish",
+            "entry_price": entry,
+            "forecast_target_price": entry * (1.05 if bullish else 0.95)
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bulk forecast resolution')
+    parser.add_argument('--forecasts', type=int, default=100000, help='Pending forecasts (default: 100000)')
+    parser.add_argument('--instruments', type=int, default=500, help='Distinct instruments (default: 500)')
+    parser.add_argument('--horizon-days', type=float, default=30, help='Close forecasts older than this (default: 30)')
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    rows = make_forecasts(args.forecasts, args.instruments, now)
+    prices = {
+        (f"M{m}", f"INS{i:04d}"): (random.uniform(10, 500), now.isoformat())
+        for m in range(7) for i in range(args.instruments)
+    }
+    db = _Database(rows)
+
+    started = time.perf_counter()
+    report = asyncio.run(resolve_pending_forecasts(db, prices, horizon_days=args.horizon_days, now=now))
+    elapsed = time.perf_counter() - started
+
+    print(f"\n⚙️  Resolved {report['resolved']:,} of {report['pending']:,} pending forecasts "
+          f"({report['success']:,} success, {report['failed']:,} failed) in {elapsed:.2f}s "
+          f"({report['pending'] / elapsed:,.0f} forecasts/s)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
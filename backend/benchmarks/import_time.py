@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tahlil One - Import Time Benchmark
+==================================
+Measures how long a fresh worker process takes to import the backend
+(`python -X importtime -c "import server"`) and lists the most expensive
+modules. Run it from the backend directory:
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 5 --top 15 --max-ms 800
+
+With --max-ms the script exits non-zero when the median cold import exceeds
+the budget, so it can guard worker cold-start time in CI.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+def measure_import(module):
+    """Import `module` in a fresh interpreter and return {package: (self_us, cumulative_us)}."""
+    env = dict(os.environ)
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            timings[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure backend cold import time')
+    parser.add_argument('--module', default='server', help='Module to import (default: server)')
+    parser.add_argument('--runs', type=int, default=3, help='Number of fresh interpreter runs (default: 3)')
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest top-level packages to list (default: 10)')
+    parser.add_argument('--max-ms', type=float, default=None, help='Fail if the median import time exceeds this budget')
+    args = parser.parse_args()
+
+    totals_ms = []
+    last_run = {}
+    for _ in range(args.runs):
+        last_run = measure_import(args.module)
+        totals_ms.append(last_run[args.module][1] / 1000)
+
+    median_ms = statistics.median(totals_ms)
+    print(f"\n⏱️  import {args.module}: median {median_ms:.1f} ms over {args.runs} runs "
+          f"(min {min(totals_ms):.1f} ms, max {max(totals_ms):.1f} ms)\n")
+
+    # Only top-level packages carry a meaningful cumulative figure
+    top_level = [
+        (name, cumulative) for name, (_, cumulative) in last_run.items()
+        if "." not in name and name != args.module
+    ]
+    top_level.sort(key=lambda item: item[1], reverse=True)
+    for name, cumulative in top_level[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    heavy = [name for name in ("google.auth",) if name in last_run]
+    if heavy:
+        print(f"\n⚠️  Loaded at import time: {', '.join(heavy)}")
+
+    if args.max_ms is not None and median_ms > args.max_ms:
+        print(f"\n❌ Median import time {median_ms:.1f} ms exceeds budget of {args.max_ms:.1f} ms")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
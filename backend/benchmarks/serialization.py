@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tahlil One - response serialization benchmark
+=============================================
+Encodes N synthetic documents of each hot read path (users, markets,
+assets, forecasts, daily analysis) the way FastAPI does for a returned
+Pydantic model or list (validation, jsonable_encoder, json.dumps), then
+with the fast path from serialization.py, and prints microseconds per row.
+MongoDB is not involved. Run it from the backend directory:
+
+    python -m benchmarks.serialization --rows 10000
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+import server
+from serialization import dumps, orjson, record_type
+
+def make_user(i, now):
+    return {
+        "user_id": f"user_{i:06d}",
+        "google_user_id": f"google_{i}",
+        "email": f"user{i}@example.com",
+        "name": f"User {i}",
+        "picture": "",
+        "access_level": "Limited",
+        "subscription_type": random.choice(["Beginner", "Advanced", "Premium"]),
+        "subscription_status": "active",
+        "subscription_start_date": now.isoformat(),
+        "subscription_end_date": (now + timedelta(days=30)).isoformat(),
+        "created_at": now.isoformat(),
+    }
+
+def make_market(i, now):
+    return {"market_id": f"market_{i}", "name_ar": f"سوق {i}", "name_en": f"Market {i}", "region": "GCC",
+            "created_at": now.isoformat()}
+
+def make_asset(i, now):
+    return {"asset_id": f"asset_{i}", "market_id": f"market_{i % 7}", "name_ar": f"أصل {i}",
+            "name_en": f"Asset {i}", "type": "stock", "created_at": now.isoformat()}
+
+def make_forecast(i, now):
+    price = random.uniform(5, 500)
+    ts = (now - timedelta(days=random.uniform(0, 730))).isoformat()
+    return {
+        "record_id": f"forecast_{i:09d}",
+        "market": f"M{i % 7}",
+        "instrument_code": f"INS{i % 500:04d}",
+        "forecast_date": ts,
+        "forecast_direction": random.choice(["Bullish", "Bearish"]),
+        "entry_price": price,
+        "forecast_target_price": price * 1.05,
+        "actual_result_price": price * random.uniform(0.9, 1.1),
+        "result_date": ts,
+        "calculated_pl_percent": random.uniform(-10, 10),
+        "status": random.choice(["success", "failed", "pending"]),
+        "notes": None,
+        "created_at": ts,
+        "updated_at": ts,
+    }
+
+def make_daily_analysis(i, now):
+    price = random.uniform(5, 500)
+    ts = (now - timedelta(days=random.uniform(0, 730))).isoformat()
+    return {
+        "record_id": f"daily_{i:09d}",
+        "market": f"M{i % 7}",
+        "instrument_code": f"INS{i % 500:04d}",
+        "insight_type": random.choice(["Bullish", "Bearish", "Neutral"]),
+        "analysis_datetime": ts,
+        "analysis_price": f"{price:,.2f}",
+        "target_price": f"{price * 1.05:,.2f}",
+        "critical_level": f"{price * 0.97:,.2f}",
+        "source": "google_sheets",
+        "created_at": ts,
+        "updated_at": ts,
+    }
+
+PATHS = [
+    ("users", server.User, make_user),
+    ("markets", server.Market, make_market),
+    ("assets", server.Asset, make_asset),
+    ("forecasts", server.ForecastHistory, make_forecast),
+    ("daily_analysis", server.DailyAnalysis, make_daily_analysis),
+]
+
+def pydantic_path(model, documents):
+    items = [model(**document) for document in documents]
+    return json.dumps(jsonable_encoder(items), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def fast_path(record, documents):
+    return dumps([record.from_doc(document).model_dump() for document in documents])
+
+def timed(fn, runs):
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Pydantic response encoding against the fast path')
+    parser.add_argument('--rows', type=int, default=10000, help='Documents per path (default: 10000)')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per measurement, best is kept (default: 5)')
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    print(f"\n📦 {args.rows:,} documents per path, encoder: {'orjson' if orjson else 'json'}\n")
+    print(f"  {'path':<16} {'pydantic µs/row':>16} {'fast µs/row':>12} {'speedup':>8}")
+    for name, model, make in PATHS:
+        documents = [make(i, now) for i in range(args.rows)]
+        record = record_type(model)
+        slow = timed(lambda: pydantic_path(model, documents), args.runs)
+        fast = timed(lambda: fast_path(record, documents), args.runs)
+        print(f"  {name:<16} {slow / args.rows * 1e6:>16.2f} {fast / args.rows * 1e6:>12.2f} "
+              f"{slow / fast:>7.1f}x")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
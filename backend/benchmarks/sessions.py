@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tahlil One - session resolution benchmark
+=========================================
+Compares resolving a request's session the database way (user_sessions
+lookup, then the user) with verifying a signed session token against the
+in-memory revocation list. Seeds a scratch database; run it from the
+backend directory:
+
+    python -m benchmarks.sessions --mongo-url mongodb://localhost:27017
+    python -m benchmarks.sessions --users 50000 --revoked 5000 --runs 5000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import secrets
+import statistics
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from sessions import RevocationList, SessionSigner, user_fields
+
+def make_user(i, now):
+    return {
+        "user_id": f"user_{i:06d}",
+        "google_user_id": f"google_{i}",
+        "email": f"user{i}@example.com",
+        "name": f"User {i}",
+        "picture": "",
+        "access_level": "Limited",
+        "subscription_type": random.choice(["Beginner", "Advanced", "Premium"]),
+        "subscription_status": "active",
+        "subscription_start_date": now.isoformat(),
+        "subscription_end_date": (now + timedelta(days=30)).isoformat(),
+        "created_at": now.isoformat(),
+    }
+
+async def seed(db, users):
+    now = datetime.now(timezone.utc)
+    await db.users.drop()
+    await db.user_sessions.drop()
+    await db.users.create_index("user_id", unique=True)
+    await db.user_sessions.create_index("session_token", unique=True)
+
+    docs = [make_user(i, now) for i in range(users)]
+    sessions = [
+        {"user_id": doc["user_id"], "session_token": secrets.token_urlsafe(32),
+         "expires_at": now + timedelta(days=7), "created_at": now}
+        for doc in docs
+    ]
+    for start in range(0, users, 5000):
+        await db.users.insert_many(docs[start:start + 5000], ordered=False)
+        await db.user_sessions.insert_many([dict(s) for s in sessions[start:start + 5000]], ordered=False)
+    return docs, [s["session_token"] for s in sessions]
+
+async def database_session(db, token):
+    session_doc = await db.user_sessions.find_one({"session_token": token}, {"_id": 0})
+    return await db.users.find_one({"user_id": session_doc["user_id"]}, {"_id": 0})
+
+def signed_session(signer, revocations, token):
+    claims = signer.verify(token)
+    if revocations.is_revoked(claims):
+        raise RuntimeError("revoked")
+    return user_fields(claims)
+
+async def timed(runs, make_call):
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await make_call()
+        latencies.append((time.perf_counter() - started) * 1e6)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+async def run(args):
+    client = AsyncIOMotorClient(args.mongo_url)
+    db = client[args.db_name]
+    try:
+        print(f"\n🌱 Seeding {args.users} users and sessions into {args.db_name} ...")
+        docs, db_tokens = await seed(db, args.users)
+
+        signer = SessionSigner([("bench", os.urandom(32))])
+        signed_tokens = [signer.issue(doc)[0] for doc in docs]
+        revocations = RevocationList()
+        for i in range(args.revoked):
+            revocations._apply({"kind": "session", "sid": secrets.token_hex(16), "user_id": f"gone_{i}",
+                                "at": time.time(), "expires_at": time.time() + 86400})
+        print(f"   {len(revocations)} revocation entries, token size {len(signed_tokens[0])} bytes\n")
+
+        before = await timed(args.runs, lambda: database_session(db, random.choice(db_tokens)))
+
+        async def verify():
+            return signed_session(signer, revocations, random.choice(signed_tokens))
+        after = await timed(args.runs, verify)
+
+        print(f"  {'sessions':<24} {'p50 µs':>10} {'p95 µs':>10}")
+        print(f"  {'database (2 lookups)':<24} {before[0]:>10.1f} {before[1]:>10.1f}")
+        print(f"  {'signed token':<24} {after[0]:>10.1f} {after[1]:>10.1f}")
+        print(f"\n  speedup at p50: {before[0] / max(after[0], 1e-9):.0f}x")
+    finally:
+        if not args.keep:
+            await client.drop_database(args.db_name)
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark database-backed sessions against signed session tokens')
+    parser.add_argument('--mongo-url', default='mongodb://localhost:27017', help='MongoDB connection URL')
+    parser.add_argument('--db-name', default='tahlil_bench', help='Scratch database (dropped afterwards unless --keep)')
+    parser.add_argument('--users', type=int, default=10000, help='Users with a live session (default: 10000)')
+    parser.add_argument('--revoked', type=int, default=1000, help='Entries in the revocation list (default: 1000)')
+    parser.add_argument('--runs', type=int, default=2000, help='Resolutions per mode (default: 2000)')
+    parser.add_argument('--keep', action='store_true', help='Keep the scratch database')
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
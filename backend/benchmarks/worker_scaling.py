@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tahlil One - Worker Scaling Benchmark
+=====================================
+Starts the backend with 1, 2, 4 and 8 uvicorn workers and measures request
+throughput against one or more endpoints. Run it from the backend directory
+with MONGO_URL/DB_NAME pointing at a seeded database:
+
+    python benchmarks/worker_scaling.py --session-token <token>
+    python benchmarks/worker_scaling.py --workers 1 2 4 --path /api/history/summary --duration 20
+
+Use CACHE_BUS=mongo in the environment to benchmark the multi-worker mode
+with cross-process cache invalidation.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+def wait_until_ready(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{base_url}/api/markets", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start within {timeout}s")
+
+async def _load(base_url, paths, headers, concurrency, duration):
+    latencies = []
+    failures = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=10) as client:
+        async def worker(offset):
+            nonlocal failures
+            i = offset
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(paths[i % len(paths)])
+                    if response.status_code >= 400:
+                        failures += 1
+                except httpx.HTTPError:
+                    failures += 1
+                latencies.append(time.perf_counter() - started)
+                i += 1
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return latencies, failures
+
+def _load_process(args):
+    return asyncio.run(_load(*args))
+
+def run_load(base_url, paths, headers, clients, concurrency, duration):
+    """Drive load from several processes so the client is not the bottleneck."""
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.map(_load_process, [(base_url, paths, headers, concurrency, duration)] * clients)
+    latencies = [latency for result in results for latency in result[0]]
+    failures = sum(result[1] for result in results)
+    return latencies, failures
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure throughput scaling across uvicorn workers')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help='Worker counts to test')
+    parser.add_argument('--path', action='append', help='Endpoint(s) to request (default: /api/markets)')
+    parser.add_argument('--session-token', help='Session token for authenticated endpoints')
+    parser.add_argument('--port', type=int, default=8765, help='Port to bind the server to')
+    parser.add_argument('--clients', type=int, default=4, help='Load generator processes (default: 4)')
+    parser.add_argument('--concurrency', type=int, default=32, help='Concurrent requests per client process (default: 32)')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds of load per worker count (default: 10)')
+    parser.add_argument('--warmup', type=float, default=2, help='Seconds of warm-up load before measuring (default: 2)')
+    args = parser.parse_args()
+
+    paths = args.path or ['/api/markets']
+    headers = {'Authorization': f'Bearer {args.session_token}'} if args.session_token else {}
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    print(f"\n🚀 Worker scaling benchmark: {', '.join(paths)}")
+    print(f"   {args.clients} client processes x {args.concurrency} concurrent requests, {args.duration}s per run\n")
+    print(f"  {'workers':>7}  {'req/s':>9}  {'speedup':>7}  {'p50 ms':>7}  {'p99 ms':>7}  {'errors':>6}")
+
+    baseline = None
+    for workers in args.workers:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1",
+             "--port", str(args.port), "--workers", str(workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+        )
+        try:
+            wait_until_ready(base_url)
+            if args.warmup:
+                run_load(base_url, paths, headers, args.clients, args.concurrency, args.warmup)
+            latencies, failures = run_load(base_url, paths, headers, args.clients, args.concurrency, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+
+        if not latencies:
+            print(f"  {workers:>7}  no completed requests")
+            continue
+        throughput = len(latencies) / args.duration
+        baseline = baseline or throughput
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+        print(f"  {workers:>7}  {throughput:>9.1f}  {throughput / baseline:>6.2f}x  {p50:>7.1f}  {p99:>7.1f}  {failures:>6}")
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
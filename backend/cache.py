@@ -0,0 +1,256 @@
+"""
+Per-process response caching with cross-process invalidation.
+
+Every uvicorn worker keeps its own ProcessCache. When a worker changes data
+(sheet sync, forecast writes) it publishes the affected topic on the
+invalidation bus, and every worker - including itself - drops the cached
+entries for that topic.
+
+Bus backends (CACHE_BUS):
+    local   In-process pub/sub. Correct for a single worker and for tests.
+    mongo   Events are inserted into the `cache_invalidations` collection and
+            delivered to the other workers through a change stream. On a
+            standalone server (no change streams) the collection is polled.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timezone, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+INVALIDATIONS_COLLECTION = "cache_invalidations"
+# 40573/40324: change streams are only supported on replica sets
+CHANGE_STREAMS_UNSUPPORTED = (40573, 40324)
+# Longest wait between restarts of a failing invalidation listener
+MAX_RETRY_SECONDS = 60.0
+
+Handler = Callable[[str, dict], None]
+
+class ProcessCache:
+    """
+    TTL cache grouped by topic, holding at most `max_entries` (least recently
+    used first out). A per-topic generation counter makes sure a load that
+    started before an invalidation never stores its stale result.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get_or_load(self, topic: str, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                          ttl_seconds: Optional[float] = None) -> Any:
+        entry = self._entries.get((topic, key))
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self.hits += 1
+                self._entries.move_to_end((topic, key))
+                return entry[1]
+            del self._entries[(topic, key)]
+
+        self.misses += 1
+        generation = self._generations.get(topic, 0)
+        value = await loader()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl > 0 and self._generations.get(topic, 0) == generation:
+            self._store((topic, key), time.monotonic() + ttl, value)
+        return value
+
+    def _store(self, entry_key: Tuple[str, Hashable], expires_at: float, value: Any):
+        self._entries.pop(entry_key, None)
+        now = time.monotonic()
+        # Expired entries go first; the least recently used ones are the likeliest to be expired
+        while self._entries:
+            oldest_key, (oldest_expiry, _) = next(iter(self._entries.items()))
+            if oldest_expiry > now and len(self._entries) < self.max_entries:
+                break
+            del self._entries[oldest_key]
+            if oldest_expiry > now:
+                self.evictions += 1
+        self._entries[entry_key] = (expires_at, value)
+
+    def generation(self, topic: str) -> int:
+        """Number of invalidations seen for `topic`; changes whenever its data does."""
+        return self._generations.get(topic, 0)
+
+    def invalidate(self, topic: str, payload: Optional[dict] = None):
+        self._generations[topic] = self._generations.get(topic, 0) + 1
+        for entry_key in [k for k in self._entries if k[0] == topic]:
+            del self._entries[entry_key]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "generations": dict(self._generations),
+        }
+
+class InvalidationBus:
+    """In-process pub/sub. Subclasses additionally forward events to other workers."""
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self._handlers: Dict[str, List[Handler]] = {}
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, topic: str, handler: Handler):
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def dispatch(self, topic: str, payload: dict):
+        for handler in self._handlers.get(topic, []):
+            try:
+                handler(topic, payload)
+            except Exception as e:
+                logger.error(f"Invalidation handler for {topic} failed: {str(e)}")
+
+    async def publish(self, topic: str, **payload):
+        self.published += 1
+        self.dispatch(topic, payload)
+        await self._send(topic, payload)
+
+    async def _send(self, topic: str, payload: dict):
+        pass
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "origin": self.origin,
+            "published": self.published,
+            "received": self.received,
+        }
+
+class LocalInvalidationBus(InvalidationBus):
+    pass
+
+class MongoInvalidationBus(InvalidationBus):
+    def __init__(self, db, poll_interval: float = 1.0, retention_seconds: int = 3600):
+        super().__init__()
+        self.collection = db[INVALIDATIONS_COLLECTION]
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.mode = None
+        self.listener_failures = 0
+        self._connected = False
+        self._task: Optional[asyncio.Task] = None
+        self._seen = deque(maxlen=10000)
+        self._seen_ids = set()
+
+    async def _send(self, topic: str, payload: dict):
+        try:
+            await self.collection.insert_one({
+                "topic": topic,
+                "origin": self.origin,
+                "payload": payload,
+                "created_at": datetime.now(timezone.utc)
+            })
+        except Exception as e:
+            # Other workers fall back to their cache TTL
+            logger.error(f"Failed to publish invalidation for {topic}: {str(e)}")
+
+    async def start(self):
+        await self.collection.create_index("created_at", expireAfterSeconds=self.retention_seconds)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _receive(self, event: dict):
+        event_id = event.get("_id")
+        if event_id in self._seen_ids:
+            return
+        if len(self._seen) == self._seen.maxlen:
+            self._seen_ids.discard(self._seen[0])
+        self._seen.append(event_id)
+        self._seen_ids.add(event_id)
+
+        if event.get("origin") == self.origin:
+            return
+        self.received += 1
+        self.dispatch(event["topic"], event.get("payload") or {})
+
+    async def _run(self):
+        """
+        Watch (or poll) until cancelled. A failure is logged and the listener
+        restarts after a backoff that doubles up to MAX_RETRY_SECONDS, and
+        starts over once it has connected again.
+        """
+        delay = self.poll_interval
+        while True:
+            try:
+                if self.mode == "polling":
+                    await self._poll()
+                else:
+                    await self._watch()
+                continue
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED and self.mode != "polling":
+                    logger.info("Change streams unavailable, polling cache invalidations")
+                    self.mode = "polling"
+                    continue
+                logger.error(f"Invalidation listener failed, retrying in {delay:g}s: {str(e)}")
+            except Exception as e:
+                logger.error(f"Invalidation listener failed, retrying in {delay:g}s: {str(e)}")
+            self.listener_failures += 1
+            if self._connected:
+                self._connected = False
+                delay = self.poll_interval
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_SECONDS)
+
+    async def _watch(self):
+        pipeline = [{"$match": {"operationType": "insert"}}]
+        async with self.collection.watch(pipeline) as stream:
+            self.mode = "change_stream"
+            self._connected = True
+            async for change in stream:
+                self._receive(change["fullDocument"])
+
+    async def _poll(self):
+        since = datetime.now(timezone.utc)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            # Overlap the window so events inserted out of order are not missed;
+            # already seen ids are skipped and invalidations are idempotent.
+            window_start = since - timedelta(seconds=max(5 * self.poll_interval, 5))
+            since = datetime.now(timezone.utc)
+            async for event in self.collection.find({"created_at": {"$gte": window_start}}).sort("created_at", 1):
+                self._receive(event)
+            self._connected = True
+
+    def stats(self) -> dict:
+        return {**super().stats(), "mode": self.mode, "listener_failures": self.listener_failures}
+
+def create_bus(backend: str, db) -> InvalidationBus:
+    if backend == "local":
+        return LocalInvalidationBus()
+    if backend == "mongo":
+        return MongoInvalidationBus(db)
+    raise ValueError(f"Invalid CACHE_BUS: {backend}. Expected 'local' or 'mongo'")
@@ -0,0 +1,129 @@
+"""
+In-process snapshot of the market/asset catalog.
+
+Markets and assets only change when an admin creates one, so every worker
+serves them from an immutable CatalogSnapshot: the validated documents, an
+assets-by-market index and the JSON bodies already encoded. Reads cost no
+I/O and no per-request model validation.
+
+The catalog version is a counter in MongoDB (`catalog_version`) that the
+create endpoints increment. The worker that made the change rebuilds its
+snapshot immediately (copy-on-write: a new snapshot replaces the reference,
+readers never see a half-built one) and publishes "catalog" on the
+invalidation bus; other workers re-check the version on their next read.
+Without a cross-process bus they still re-check it every `refresh_seconds`.
+The version doubles as the ETag, so unchanged catalogs revalidate with 304.
+"""
+
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from pymongo import ReturnDocument
+
+VERSION_COLLECTION = "catalog_version"
+VERSION_ID = "catalog"
+
+def _encode(documents) -> bytes:
+    return json.dumps(documents, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class CatalogSnapshot:
+    """Immutable view of the catalog at one version."""
+
+    def __init__(self, version: int, markets: List[dict], assets: List[dict]):
+        self.version = version
+        self.etag = f'"catalog-{version}"'
+        self.markets: Tuple[dict, ...] = tuple(markets)
+        self.assets: Tuple[dict, ...] = tuple(assets)
+
+        by_market: Dict[str, List[dict]] = {}
+        for asset in assets:
+            by_market.setdefault(asset.get("market_id"), []).append(asset)
+        self.assets_by_market: Dict[str, Tuple[dict, ...]] = {k: tuple(v) for k, v in by_market.items()}
+
+        self.markets_json = _encode(markets)
+        self.assets_json = _encode(assets)
+        self._assets_by_market_json = {market_id: _encode(list(items)) for market_id, items in by_market.items()}
+
+    def assets_json_for(self, market_id: Optional[str]) -> bytes:
+        if market_id is None:
+            return self.assets_json
+        return self._assets_by_market_json.get(market_id, b"[]")
+
+class CatalogCache:
+    def __init__(self, market_model: Optional[Type[BaseModel]] = None, asset_model: Optional[Type[BaseModel]] = None,
+                 refresh_seconds: float = 30.0):
+        self.market_model = market_model
+        self.asset_model = asset_model
+        self.refresh_seconds = refresh_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = 0.0
+        self._stale = False
+        self._lock = asyncio.Lock()
+        self.rebuilds = 0
+
+    async def get(self, db) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and not self._stale and time.monotonic() - self._checked_at < self.refresh_seconds:
+            return snapshot
+
+        async with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and not self._stale and time.monotonic() - self._checked_at < self.refresh_seconds:
+                return snapshot
+            self._stale = False
+            version = await current_version(db)
+            if snapshot is None or snapshot.version != version:
+                snapshot = await self._build(db, version)
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    async def bump(self, db) -> CatalogSnapshot:
+        """Call after changing markets or assets: advances the version and rebuilds."""
+        async with self._lock:
+            version = await increment_version(db)
+            snapshot = await self._build(db, version)
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def invalidate(self, topic: str, payload: Optional[dict] = None):
+        """Invalidation bus handler: re-check the version on the next read."""
+        self._stale = True
+
+    async def _build(self, db, version: int) -> CatalogSnapshot:
+        markets, assets = await asyncio.gather(
+            db.markets.find({}, {"_id": 0}).to_list(None),
+            db.assets.find({}, {"_id": 0}).to_list(None)
+        )
+        if self.market_model is not None:
+            markets = [self.market_model(**doc).model_dump() for doc in markets]
+        if self.asset_model is not None:
+            assets = [self.asset_model(**doc).model_dump() for doc in assets]
+
+        snapshot = CatalogSnapshot(version, markets, assets)
+        # A concurrent reader may have built a newer one already
+        if self._snapshot is None or self._snapshot.version <= version:
+            self._snapshot = snapshot
+        self.rebuilds += 1
+        return snapshot
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "markets": len(snapshot.markets) if snapshot else 0,
+            "assets": len(snapshot.assets) if snapshot else 0,
+            "rebuilds": self.rebuilds,
+        }
+
+async def current_version(db) -> int:
+    doc = await db[VERSION_COLLECTION].find_one({"_id": VERSION_ID})
+    return doc["version"] if doc else 0
+
+async def increment_version(db) -> int:
+    doc = await db[VERSION_COLLECTION].find_one_and_update(
+        {"_id": VERSION_ID}, {"$inc": {"version": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
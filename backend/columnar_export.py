@@ -0,0 +1,190 @@
+"""
+Columnar bulk export of the fact collections.
+
+Streams a filtered `daily_analysis` or `forecast_history` extract as Arrow
+IPC (stream format) or Parquet, built batch by batch from the Motor cursor,
+so memory stays bounded by one batch whatever the size of the extract.
+
+Columns are typed: prices are float64 (the sheet's strings are parsed like
+the time-series copy does), dates are UTC timestamps and everything else is
+a string. Values that don't parse become nulls rather than failing the
+export. Converting and encoding a batch is CPU-bound, so it runs in the
+threadpool rather than on the event loop. pyarrow is imported lazily; the
+endpoint answers 503 without it.
+"""
+
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from daily_series import parse_price
+
+FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+BATCH_SIZE = 50000
+
+# source -> [(field, type)], type one of "string", "float", "timestamp"
+SCHEMAS: Dict[str, List[Tuple[str, str]]] = {
+    "daily_analysis": [
+        ("record_id", "string"),
+        ("market", "string"),
+        ("instrument_code", "string"),
+        ("insight_type", "string"),
+        ("analysis_datetime", "timestamp"),
+        ("analysis_price", "float"),
+        ("target_price", "float"),
+        ("critical_level", "float"),
+        ("source", "string"),
+        ("created_at", "timestamp"),
+        ("updated_at", "timestamp"),
+    ],
+    "forecast_history": [
+        ("record_id", "string"),
+        ("market", "string"),
+        ("instrument_code", "string"),
+        ("forecast_date", "timestamp"),
+        ("forecast_direction", "string"),
+        ("entry_price", "float"),
+        ("forecast_target_price", "float"),
+        ("actual_result_price", "float"),
+        ("result_date", "timestamp"),
+        ("calculated_pl_percent", "float"),
+        ("status", "string"),
+        ("notes", "string"),
+        ("created_at", "timestamp"),
+        ("updated_at", "timestamp"),
+    ],
+}
+# The field a source's start/end range applies to
+DATE_FIELDS = {"daily_analysis": "analysis_datetime", "forecast_history": "forecast_date"}
+
+def parse_timestamp(value) -> Optional[datetime]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        ts = value
+    else:
+        try:
+            ts = datetime.fromisoformat(str(value).strip())
+        except ValueError:
+            return None
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+def _string(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+CONVERTERS = {"string": _string, "float": parse_price, "timestamp": parse_timestamp}
+
+def export_query(source: str, market: Optional[str] = None, instrument: Optional[str] = None,
+                 start: Optional[str] = None, end: Optional[str] = None, status: Optional[str] = None) -> dict:
+    """
+    Filter for an export. start/end are ISO dates or datetimes (end
+    exclusive) and are compared with the stored ISO strings.
+    """
+    if source not in SCHEMAS:
+        raise ValueError(f"Invalid export source: {source}. Expected one of {', '.join(SCHEMAS)}")
+    query = {}
+    if market:
+        query["market"] = market
+    if instrument:
+        query["instrument_code"] = instrument
+    if status:
+        if source != "forecast_history":
+            raise ValueError("status only applies to forecast_history")
+        query["status"] = {"$in": [s.strip() for s in status.split(",") if s.strip()]}
+    bounds = {}
+    for operator, value in (("$gte", start), ("$lt", end)):
+        if value:
+            if parse_timestamp(value) is None:
+                raise ValueError(f"Invalid date: {value}. Expected an ISO date such as 2026-01-31")
+            bounds[operator] = value.strip()
+    if bounds:
+        query[DATE_FIELDS[source]] = bounds
+    return query
+
+def projection(source: str) -> dict:
+    return {"_id": 0, **{field: 1 for field, _ in SCHEMAS[source]}}
+
+def to_columns(source: str, rows: List[dict]) -> Dict[str, list]:
+    """Typed column values for one batch of documents."""
+    return {
+        field: [CONVERTERS[kind](row.get(field)) for row in rows]
+        for field, kind in SCHEMAS[source]
+    }
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Columnar export requires the pyarrow package: pip install pyarrow")
+    return pyarrow
+
+def arrow_schema(source: str):
+    pa = _pyarrow()
+    types = {"string": pa.string(), "float": pa.float64(), "timestamp": pa.timestamp("us", tz="UTC")}
+    return pa.schema([(field, types[kind]) for field, kind in SCHEMAS[source]])
+
+class _Chunks:
+    """Write-only file object collecting what the Arrow writers produce between batches."""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+async def stream_export(cursor, source: str, fmt: str, batch_size: int = BATCH_SIZE,
+                        compression: str = "zstd") -> AsyncIterator[bytes]:
+    """
+    Yield the encoded export of `cursor`'s documents, one record batch (Arrow)
+    or row group (Parquet) at a time.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Invalid export format: {fmt}. Expected one of {', '.join(FORMATS)}")
+    pa = _pyarrow()
+    schema = arrow_schema(source)
+    chunks = _Chunks()
+    sink = pa.PythonFile(chunks, mode="w")
+    if fmt == "arrow":
+        writer = pa.ipc.new_stream(sink, schema, options=pa.ipc.IpcWriteOptions(compression=compression))
+    else:
+        writer = pa.parquet.ParquetWriter(sink, schema, compression=compression)
+
+    def write(rows):
+        batch = pa.RecordBatch.from_pydict(to_columns(source, rows), schema=schema)
+        if fmt == "arrow":
+            writer.write_batch(batch)
+        else:
+            writer.write_table(pa.Table.from_batches([batch]))
+
+    rows: List[dict] = []
+    try:
+        async for row in cursor:
+            rows.append(row)
+            if len(rows) >= batch_size:
+                await run_in_threadpool(write, rows)
+                rows = []
+                yield chunks.take()
+        if rows:
+            await run_in_threadpool(write, rows)
+    finally:
+        # Always closes the stream/footer, so even an empty extract is a valid file
+        writer.close()
+    yield chunks.take()
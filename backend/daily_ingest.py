@@ -0,0 +1,347 @@
+"""
+Ingestion of daily analysis rows.
+
+The Google Sheets sync and file imports (CSV/XLSX uploads and
+`python -m migrations.import_daily_analysis`) go through the same stages:
+
+1. parse_row validates one 7-column row (Market, Stock Code, Insight Type,
+   Date & Time, Analysis Price, Target Price, Critical Level)
+2. DailyAnalysisIngest batches valid rows, drops those that have been
+   archived (see archive.py) and upserts the rest into `daily_analysis`
+   with one bulk write keyed by (market, instrument_code,
+   analysis_datetime), then writes the batch's time-series points
+3. finish() writes the accumulated dimension updates
+
+Rows are consumed one at a time, so memory is bounded by one batch plus the
+first MAX_ERRORS error messages, whatever the size of the file. Files are
+parsed a batch at a time in a worker thread, so a large import does not stall
+other requests.
+"""
+
+import asyncio
+import csv
+import io
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import AsyncIterable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+import tracing
+from archive import archived_keys
+from daily_series import write_series_points
+from dimensions import DimensionUpdates
+from forecast_resolution import iterate_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+ROW_COLUMNS = 7
+BATCH_SIZE = 1000
+MAX_ERRORS = 1000
+FILE_FORMATS = ("csv", "xlsx")
+JOBS_COLLECTION = "daily_analysis_imports"
+
+_running_jobs = set()
+
+def parse_datetime_string(date_str: str) -> str:
+    try:
+        parts = date_str.strip().replace('[', '').replace(']', '').split()
+        if len(parts) >= 2:
+            date_part = parts[0]
+            time_part = parts[1] if len(parts) > 1 else "00:00:00"
+        else:
+            date_part = parts[0]
+            time_part = "00:00:00"
+
+        day, month, year = date_part.split('.')
+        dt = datetime.strptime(f"{year}-{month}-{day} {time_part}", "%Y-%m-%d %H:%M:%S")
+        dt = dt.replace(tzinfo=timezone.utc)
+        return dt.isoformat()
+    except Exception as e:
+        raise ValueError(f"Invalid datetime format: {date_str}. Expected DD.MM.YYYY [HH:MM:SS]")
+
+def parse_row(row: List[str]) -> dict:
+    """Validate one sheet/file row; returns its daily_analysis fields or raises ValueError."""
+    if len(row) < ROW_COLUMNS:
+        raise ValueError(f"Insufficient columns (expected {ROW_COLUMNS}, got {len(row)})")
+    market, instrument_code, insight_type, date_time_str, analysis_price, target_price, critical_level = \
+        (str(cell).strip() for cell in row[:ROW_COLUMNS])
+    if not all([market, instrument_code, insight_type, date_time_str]):
+        raise ValueError("Missing required fields")
+    return {
+        "market": market,
+        "instrument_code": instrument_code,
+        "insight_type": insight_type,
+        "analysis_datetime": parse_datetime_string(date_time_str),
+        "analysis_price": analysis_price,
+        "target_price": target_price,
+        "critical_level": critical_level
+    }
+
+class DailyAnalysisIngest:
+    """Validates, batches and upserts rows from one sync or import."""
+
+    def __init__(self, db, source: str = "google_sheets", batch_size: int = BATCH_SIZE,
+                 max_errors: int = MAX_ERRORS, progress=None):
+        self.db = db
+        self.source = source
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.progress = progress
+        self.total_rows = self.inserted = self.updated = self.skipped = self.archived = 0
+        self.errors: List[str] = []
+        self.error_count = 0
+        # Rows (or whole stages) whose database write failed, as opposed to invalid rows
+        self.write_failures = 0
+        self.dimensions = DimensionUpdates()
+        self._batch = {}  # (market, instrument_code, analysis_datetime) -> fields
+
+    def error(self, message: str):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(message)
+
+    async def add_row(self, idx: int, row: List[str]):
+        self.total_rows += 1
+        try:
+            fields = parse_row(row)
+        except ValueError as e:
+            self.skipped += 1
+            self.error(f"Row {idx}: {str(e)}")
+            return
+        key = (fields["market"], fields["instrument_code"], fields["analysis_datetime"])
+        if key in self._batch:
+            # A later row for the same analysis replaces the earlier one, as in the row-by-row sync
+            self.updated += 1
+        self._batch[key] = fields
+        if len(self._batch) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, {}
+        with tracing.span("ingest.batch", {"ingest.rows": len(batch), "ingest.source": self.source}):
+            try:
+                archived = await archived_keys(self.db, list(batch))
+            except Exception as e:
+                self.skipped += len(batch)
+                self.write_failures += len(batch)
+                self.error(f"Batch of {len(batch)} rows: Unexpected error - {str(e)}")
+                archived = set(batch)
+            else:
+                # Archived rows stay in the cold tier; re-adding them would duplicate them
+                self.archived += len(archived)
+            records = [fields for key, fields in batch.items() if key not in archived]
+            if records:
+                await self._write(records)
+        if self.progress is not None:
+            await self.progress(self.result())
+
+    async def _write(self, records: List[dict]):
+        now = datetime.now(timezone.utc).isoformat()
+        operations = [
+            UpdateOne(
+                {"market": r["market"], "instrument_code": r["instrument_code"],
+                 "analysis_datetime": r["analysis_datetime"]},
+                {"$set": {**r, "source": self.source, "updated_at": now},
+                 "$setOnInsert": {"record_id": f"daily_{uuid.uuid4().hex[:12]}", "created_at": now}},
+                upsert=True
+            )
+            for r in records
+        ]
+
+        failed = set()
+        try:
+            result = await self.db.daily_analysis.bulk_write(operations, ordered=False)
+            upserted = set(result.upserted_ids)
+        except BulkWriteError as e:
+            upserted = {doc["index"] for doc in e.details.get("upserted", [])}
+            for write_error in e.details.get("writeErrors", []):
+                r = records[write_error["index"]]
+                failed.add(write_error["index"])
+                self.error(f"{r['market']} {r['instrument_code']} {r['analysis_datetime']}: "
+                           f"Unexpected error - {write_error.get('errmsg')}")
+        except Exception as e:
+            self.skipped += len(records)
+            self.write_failures += len(records)
+            self.error(f"Batch of {len(records)} rows: Unexpected error - {str(e)}")
+            return
+        self.skipped += len(failed)
+        self.write_failures += len(failed)
+
+        written = []
+        for index, r in enumerate(records):
+            if index in failed:
+                continue
+            if index in upserted:
+                self.inserted += 1
+                self.dimensions.seen(r["market"], r["instrument_code"], added=1)
+            else:
+                self.updated += 1
+                self.dimensions.seen(r["market"], r["instrument_code"])
+            written.append(r)
+
+        if written:
+            try:
+                await write_series_points(self.db, written)
+            except Exception as e:
+                self.write_failures += len(written)
+                self.error(f"Time-series write failed: {str(e)}")
+
+    async def finish(self) -> dict:
+        await self.flush()
+        try:
+            with tracing.span("ingest.dimensions"):
+                await self.dimensions.write(self.db, "daily_analysis")
+        except Exception as e:
+            self.write_failures += 1
+            self.error(f"Dimension update failed: {str(e)}")
+        return self.result()
+
+    def result(self) -> dict:
+        errors = list(self.errors)
+        if self.error_count > len(errors):
+            errors.append(f"... and {self.error_count - len(errors)} more errors")
+        return {
+            "total_rows": self.total_rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "archived": self.archived,
+            "write_failures": self.write_failures,
+            "errors": errors
+        }
+
+async def ingest_rows(db, rows: Union[Iterable[Tuple[int, List[str]]], AsyncIterable[Tuple[int, List[str]]]],
+                      source: str, batch_size: int = BATCH_SIZE, progress=None) -> dict:
+    """
+    Run numbered rows through the ingestion stages; returns the sync result
+    counts. Files should come in through ingest_file_rows, which parses them in
+    a worker thread.
+    """
+    ingest = DailyAnalysisIngest(db, source, batch_size=batch_size, progress=progress)
+    if hasattr(rows, "__aiter__"):
+        async for idx, row in rows:
+            await ingest.add_row(idx, row)
+        return await ingest.finish()
+    for idx, row in rows:
+        await ingest.add_row(idx, row)
+        if ingest.total_rows % batch_size == 0:
+            # Let other requests run between batches of an in-memory sheet
+            await asyncio.sleep(0)
+    return await ingest.finish()
+
+async def ingest_file_rows(db, file, fmt: str, source: Optional[str] = None, batch_size: int = BATCH_SIZE,
+                           progress=None) -> dict:
+    """
+    Import an open CSV/XLSX file. csv.reader and openpyxl are synchronous, so
+    rows are parsed `batch_size` at a time in a worker thread (see
+    iterate_in_threadpool) and the event loop keeps serving requests.
+    """
+    rows = iterate_in_threadpool(iter_file_rows(file, fmt), batch_size)
+    return await ingest_rows(db, rows, source or f"{fmt}_import", batch_size=batch_size, progress=progress)
+
+def _is_header(row: List[str]) -> bool:
+    return bool(row) and str(row[0]).strip().lower() == "market"
+
+def iter_csv_rows(binary_file) -> Iterator[Tuple[int, List[str]]]:
+    """Numbered rows of a UTF-8 CSV stream (line 1 first), skipping a header and blank rows."""
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    try:
+        for idx, row in enumerate(csv.reader(text), start=1):
+            if (idx == 1 and _is_header(row)) or not any(cell.strip() for cell in row):
+                continue
+            yield idx, row
+    finally:
+        # Leave the caller's file open
+        text.detach()
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%d.%m.%Y %H:%M:%S")
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def iter_xlsx_rows(file, sheet: Optional[str] = None) -> Iterator[Tuple[int, List[str]]]:
+    """Numbered rows of an XLSX workbook's first (or named) sheet, read in streaming mode."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("XLSX import requires the openpyxl package: pip install openpyxl")
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        for idx, values in enumerate(worksheet.iter_rows(values_only=True), start=1):
+            row = [_cell_text(value) for value in values]
+            # Like the Sheets API, trailing empty cells are not part of the row
+            while row and not row[-1].strip():
+                row.pop()
+            if (idx == 1 and _is_header(row)) or not row:
+                continue
+            yield idx, row
+    finally:
+        workbook.close()
+
+def detect_format(filename: Optional[str], fmt: Optional[str] = None) -> str:
+    fmt = (fmt or os.path.splitext(filename or "")[1].lstrip(".")).lower()
+    if fmt not in FILE_FORMATS:
+        raise ValueError(f"Invalid file format: {fmt or filename}. Expected one of {', '.join(FILE_FORMATS)}")
+    return fmt
+
+def iter_file_rows(file, fmt: str) -> Iterator[Tuple[int, List[str]]]:
+    return iter_csv_rows(file) if fmt == "csv" else iter_xlsx_rows(file)
+
+async def start_import_job(db, path: str, fmt: str, filename: str, created_by: str, on_done=None,
+                           remove_file: bool = True) -> dict:
+    """Record a job and import the file at `path` in the background. Returns the job document."""
+    job = {
+        "job_id": f"dailyimport_{uuid.uuid4().hex[:12]}",
+        "status": "running",
+        "filename": filename,
+        "format": fmt,
+        "processed": 0,
+        "created_by": created_by,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "finished_at": None,
+        "result": None,
+        "error": None,
+    }
+    await db[JOBS_COLLECTION].insert_one(dict(job))
+
+    async def progress(counts):
+        await db[JOBS_COLLECTION].update_one(
+            {"job_id": job["job_id"]},
+            {"$set": {"processed": counts["total_rows"], "inserted": counts["inserted"],
+                      "updated": counts["updated"], "skipped": counts["skipped"]}}
+        )
+
+    async def run():
+        try:
+            with open(path, "rb") as file:
+                result = await ingest_file_rows(db, file, fmt, progress=progress)
+            update = {"status": "completed", "processed": result["total_rows"], "result": result}
+            if on_done is not None and (result["inserted"] or result["updated"]):
+                await on_done()
+        except Exception as e:
+            logger.error(f"Daily analysis import {job['job_id']} failed: {str(e)}")
+            update = {"status": "failed", "error": str(e)}
+        finally:
+            if remove_file:
+                os.unlink(path)
+        update["finished_at"] = datetime.now(timezone.utc).isoformat()
+        await db[JOBS_COLLECTION].update_one({"job_id": job["job_id"]}, {"$set": update})
+
+    task = asyncio.create_task(run())
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
+    return job
+
+async def get_import_job(db, job_id: str) -> Optional[dict]:
+    return await db[JOBS_COLLECTION].find_one({"job_id": job_id}, {"_id": 0})
@@ -0,0 +1,210 @@
+"""
+Time-series storage for daily analysis prices.
+
+`daily_analysis` stays the document store written by the sheet sync and read
+by the existing endpoints (ISO strings, prices as entered). Every synced row
+is also written as a measurement to the `daily_analysis_series` time-series
+collection: a real BSON date in `ts`, market and instrument in the `meta`
+field and prices as doubles. Range and bucketed queries are served from it.
+"""
+
+import logging
+import re
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+SERIES_COLLECTION = "daily_analysis_series"
+MAX_BUCKETS = 5000
+# write_series_points deletes replaced points by `ts`, which time-series collections only allow from 7.0
+TIMESERIES_DELETE_VERSION = (7, 0)
+
+BUCKET_UNITS = {"m": "minute", "h": "hour", "d": "day", "w": "week"}
+BUCKET_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+_BUCKET_PATTERN = re.compile(r"^(\d+)([mhdw])$")
+
+def parse_price(value) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(",", "").strip())
+    except ValueError:
+        return None
+
+def parse_bucket(bucket: str):
+    """Parse a bucket size such as "15m", "4h", "1d" or "1w" into (binSize, unit, seconds)."""
+    match = _BUCKET_PATTERN.match(bucket.strip())
+    if not match or int(match.group(1)) < 1:
+        raise ValueError(f"Invalid bucket: {bucket}. Expected e.g. 15m, 4h, 1d or 1w")
+    size, unit = int(match.group(1)), match.group(2)
+    return size, BUCKET_UNITS[unit], size * BUCKET_SECONDS[unit]
+
+def to_series_doc(record: dict) -> dict:
+    ts = datetime.fromisoformat(record["analysis_datetime"])
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return {
+        "ts": ts,
+        "meta": {
+            "market": record["market"],
+            "instrument_code": record["instrument_code"]
+        },
+        "insight_type": record.get("insight_type"),
+        "analysis_price": parse_price(record.get("analysis_price")),
+        "target_price": parse_price(record.get("target_price")),
+        "critical_level": parse_price(record.get("critical_level"))
+    }
+
+async def server_version(db) -> tuple:
+    info = await db.command("buildInfo")
+    return tuple(info.get("versionArray", [0])[:2])
+
+def _check_storage(storage: str, version: tuple) -> str:
+    if storage == "timeseries" and version < TIMESERIES_DELETE_VERSION:
+        raise RuntimeError(
+            f"{SERIES_COLLECTION} is a time-series collection, but MongoDB {'.'.join(map(str, version))} "
+            f"cannot delete from it by time, which re-syncing needs (MongoDB 7.0+). Upgrade MongoDB, or run "
+            f"`python -m migrations.daily_analysis_series --rebuild` to recreate it as a regular collection"
+        )
+    return storage
+
+async def ensure_series_collection(db) -> str:
+    """
+    Create the time-series collection if it doesn't exist. Servers that
+    cannot delete from time-series collections by time (MongoDB < 7.0) get a
+    regular collection with an equivalent index, so queries behave the same;
+    an existing time-series collection on such a server raises RuntimeError.
+    Returns the storage type.
+    """
+    version = await server_version(db)
+    existing = await db.list_collections(filter={"name": SERIES_COLLECTION}).to_list(1)
+    if existing:
+        return _check_storage(existing[0].get("type", "collection"), version)
+
+    try:
+        if version >= TIMESERIES_DELETE_VERSION:
+            await db.create_collection(
+                SERIES_COLLECTION,
+                timeseries={"timeField": "ts", "metaField": "meta", "granularity": "hours"}
+            )
+            storage = "timeseries"
+        else:
+            logger.warning(f"MongoDB {'.'.join(map(str, version))} cannot delete time-series points by time, "
+                           f"using a regular collection")
+            await db.create_collection(SERIES_COLLECTION)
+            storage = "collection"
+    except CollectionInvalid:
+        # Created concurrently by another worker
+        existing = await db.list_collections(filter={"name": SERIES_COLLECTION}).to_list(1)
+        return _check_storage(existing[0].get("type", "collection"), version) if existing else "collection"
+    except OperationFailure as e:
+        logger.warning(f"Time-series collections unavailable, using a regular collection: {str(e)}")
+        await db.create_collection(SERIES_COLLECTION)
+        storage = "collection"
+
+    await db[SERIES_COLLECTION].create_index([("meta.instrument_code", 1), ("meta.market", 1), ("ts", 1)])
+    return storage
+
+async def write_series_points(db, records: List[dict], batch_size: int = 500, replace_existing: bool = True):
+    """
+    Write synced rows as measurements. A point already stored for the same
+    market, instrument and time is replaced, so re-syncing a corrected row
+    never duplicates it (deleting by time needs MongoDB 7.0 on time-series
+    collections, which ensure_series_collection checks). Returns the number
+    of points written.
+    """
+    collection = db[SERIES_COLLECTION]
+    written = 0
+    for start in range(0, len(records), batch_size):
+        docs = [to_series_doc(record) for record in records[start:start + batch_size]]
+        if replace_existing:
+            await collection.delete_many({"$or": [
+                {"meta.market": doc["meta"]["market"], "meta.instrument_code": doc["meta"]["instrument_code"], "ts": doc["ts"]}
+                for doc in docs
+            ]})
+        await collection.insert_many(docs, ordered=False)
+        written += len(docs)
+    return written
+
+async def backfill_series(db, batch_size: int = 1000, replace_existing: bool = True) -> Tuple[int, int]:
+    """
+    Write every `daily_analysis` row to the series. Returns (points written,
+    rows skipped for lacking a market, instrument or datetime).
+    """
+    written = 0
+    skipped = 0
+    batch = []
+    async for record in db.daily_analysis.find({}, {"_id": 0}, batch_size=batch_size):
+        if not record.get("analysis_datetime") or not record.get("market") or not record.get("instrument_code"):
+            skipped += 1
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            written += await write_series_points(db, batch, batch_size, replace_existing)
+            batch = []
+    if batch:
+        written += await write_series_points(db, batch, batch_size, replace_existing)
+    return written, skipped
+
+async def ensure_series_backfilled(db, batch_size: int = 1000) -> int:
+    """
+    Backfill the series if it holds fewer points than `daily_analysis` has
+    rows (it never loses points, since archiving leaves it alone, so fewer
+    means rows synced before it existed). Returns the points written.
+    """
+    writable = {field: {"$nin": [None, ""]} for field in ("market", "instrument_code", "analysis_datetime")}
+    if await db[SERIES_COLLECTION].count_documents({}) >= await db.daily_analysis.count_documents(writable):
+        return 0
+    written, skipped = await backfill_series(db, batch_size)
+    logger.info(f"Backfilled {written} points into {SERIES_COLLECTION} ({skipped} rows skipped)")
+    return written
+
+def series_pipeline(instrument: str, start: datetime, end: datetime, bucket: str, market: Optional[str] = None) -> list:
+    bin_size, unit, _ = parse_bucket(bucket)
+    match = {"meta.instrument_code": instrument, "ts": {"$gte": start, "$lt": end}}
+    if market:
+        match["meta.market"] = market
+
+    return [
+        {"$match": match},
+        {"$sort": {"ts": 1}},
+        {
+            "$group": {
+                "_id": {
+                    "market": "$meta.market",
+                    "bucket": {"$dateTrunc": {"date": "$ts", "unit": unit, "binSize": bin_size}}
+                },
+                "open": {"$first": "$analysis_price"},
+                "high": {"$max": "$analysis_price"},
+                "low": {"$min": "$analysis_price"},
+                "close": {"$last": "$analysis_price"},
+                "avg": {"$avg": "$analysis_price"},
+                "target_price": {"$last": "$target_price"},
+                "critical_level": {"$last": "$critical_level"},
+                "insight_type": {"$last": "$insight_type"},
+                "count": {"$sum": 1}
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "market": "$_id.market",
+                "bucket_start": "$_id.bucket",
+                "open": 1,
+                "high": 1,
+                "low": 1,
+                "close": 1,
+                "avg": {"$round": ["$avg", 4]},
+                "target_price": 1,
+                "critical_level": 1,
+                "insight_type": 1,
+                "count": 1
+            }
+        },
+        {"$sort": {"market": 1, "bucket_start": 1}}
+    ]
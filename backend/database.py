@@ -0,0 +1,234 @@
+"""
+MongoDB client configuration for the Tahlil One backend.
+
+Connection pool sizing, timeouts, wire compression and read preferences are
+read from the environment so they can be tuned per deployment without code
+changes:
+
+    MONGO_MAX_POOL_SIZE              maxPoolSize per server (default 100)
+    MONGO_MIN_POOL_SIZE              minPoolSize per server (default 0)
+    MONGO_MAX_IDLE_TIME_MS           maxIdleTimeMS (default: driver default)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS      waitQueueTimeoutMS (default: wait forever)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS  serverSelectionTimeoutMS (default 30000)
+    MONGO_COMPRESSORS                e.g. "zstd,snappy,zlib" (zstd needs `zstandard`,
+                                     snappy needs `python-snappy`)
+    MONGO_ANALYTICS_READ_PREFERENCE  read preference for dashboard/analytics reads
+                                     (default "primary")
+    MONGO_READ_PREFERENCES           per-collection overrides for analytics reads,
+                                     e.g. "forecast_history=secondaryPreferred,daily_analysis=nearest"
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import BaseModel
+from pymongo import monitoring
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
+
+READ_PREFERENCE_MODES = ["primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"]
+
+# Upper bounds (ms) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000]
+
+def _int_env(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+def _list_env(name: str) -> List[str]:
+    return [item.strip() for item in os.environ.get(name, "").split(",") if item.strip()]
+
+class DatabaseSettings(BaseModel):
+    mongo_url: str
+    db_name: str
+    max_pool_size: int = 100
+    min_pool_size: int = 0
+    max_idle_time_ms: Optional[int] = None
+    wait_queue_timeout_ms: Optional[int] = None
+    server_selection_timeout_ms: int = 30000
+    compressors: List[str] = []
+    analytics_read_preference: str = "primary"
+    read_preferences: Dict[str, str] = {}
+
+    @classmethod
+    def from_env(cls) -> "DatabaseSettings":
+        read_preferences = {}
+        for item in _list_env("MONGO_READ_PREFERENCES"):
+            if "=" not in item:
+                raise ValueError(f"Invalid MONGO_READ_PREFERENCES entry: {item}. Expected collection=mode")
+            collection, mode = item.split("=", 1)
+            read_preferences[collection.strip()] = mode.strip()
+
+        settings = cls(
+            mongo_url=os.environ['MONGO_URL'],
+            db_name=os.environ['DB_NAME'],
+            max_pool_size=_int_env("MONGO_MAX_POOL_SIZE", 100),
+            min_pool_size=_int_env("MONGO_MIN_POOL_SIZE", 0),
+            max_idle_time_ms=_int_env("MONGO_MAX_IDLE_TIME_MS", None),
+            wait_queue_timeout_ms=_int_env("MONGO_WAIT_QUEUE_TIMEOUT_MS", None),
+            server_selection_timeout_ms=_int_env("MONGO_SERVER_SELECTION_TIMEOUT_MS", 30000),
+            compressors=_list_env("MONGO_COMPRESSORS"),
+            analytics_read_preference=os.environ.get("MONGO_ANALYTICS_READ_PREFERENCE", "primary"),
+            read_preferences=read_preferences,
+        )
+        settings.validate_read_preferences()
+        return settings
+
+    def validate_read_preferences(self):
+        for mode in [self.analytics_read_preference, *self.read_preferences.values()]:
+            if mode not in READ_PREFERENCE_MODES:
+                raise ValueError(f"Invalid read preference: {mode}. Expected one of {READ_PREFERENCE_MODES}")
+
+    def client_options(self) -> dict:
+        options = {
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+        }
+        if self.max_idle_time_ms is not None:
+            options["maxIdleTimeMS"] = self.max_idle_time_ms
+        if self.wait_queue_timeout_ms is not None:
+            options["waitQueueTimeoutMS"] = self.wait_queue_timeout_ms
+        if self.compressors:
+            options["compressors"] = ",".join(self.compressors)
+        return options
+
+    def analytics_read_preference_for(self, collection_name: str):
+        mode = self.read_preferences.get(collection_name, self.analytics_read_preference)
+        return make_read_preference(read_pref_mode_from_name(mode), None)
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Collects connection pool checkout latency and saturation from PyMongo's
+    pool events. Events are published from the driver's worker threads, so
+    all state is guarded by a lock.
+    """
+
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._servers: Dict[str, dict] = {}
+
+    def _server(self, address) -> dict:
+        key = f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+        server = self._servers.get(key)
+        if server is None:
+            server = {
+                "connections_open": 0,
+                "checked_out": 0,
+                "max_checked_out": 0,
+                "waiting": 0,
+                "max_waiting": 0,
+                "checkouts": 0,
+                "checkout_failures": 0,
+                "checkout_timeouts": 0,
+                "pool_cleared": 0,
+                "wait_ms_total": 0.0,
+                "wait_ms_max": 0.0,
+                "wait_ms_buckets": [0] * (len(WAIT_BUCKETS_MS) + 1),
+            }
+            self._servers[key] = server
+        return server
+
+    def _start_times(self) -> dict:
+        starts = getattr(self._local, "starts", None)
+        if starts is None:
+            starts = self._local.starts = {}
+        return starts
+
+    def _record_wait(self, server: dict, address):
+        started = self._start_times().pop(address, None)
+        server["waiting"] = max(0, server["waiting"] - 1)
+        if started is None:
+            return None
+        return (time.perf_counter() - started) * 1000
+
+    def connection_check_out_started(self, event):
+        self._start_times()[event.address] = time.perf_counter()
+        with self._lock:
+            server = self._server(event.address)
+            server["waiting"] += 1
+            server["max_waiting"] = max(server["max_waiting"], server["waiting"])
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            wait_ms = self._record_wait(server, event.address)
+            server["checkouts"] += 1
+            server["checked_out"] += 1
+            server["max_checked_out"] = max(server["max_checked_out"], server["checked_out"])
+            if wait_ms is not None:
+                server["wait_ms_total"] += wait_ms
+                server["wait_ms_max"] = max(server["wait_ms_max"], wait_ms)
+                bucket = next(
+                    (i for i, bound in enumerate(WAIT_BUCKETS_MS) if wait_ms <= bound),
+                    len(WAIT_BUCKETS_MS)
+                )
+                server["wait_ms_buckets"][bucket] += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            self._record_wait(server, event.address)
+            server["checkout_failures"] += 1
+            if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+                server["checkout_timeouts"] += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            server["checked_out"] = max(0, server["checked_out"] - 1)
+
+    def connection_created(self, event):
+        with self._lock:
+            self._server(event.address)["connections_open"] += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            server["connections_open"] = max(0, server["connections_open"] - 1)
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._server(event.address)["pool_cleared"] += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def snapshot(self) -> dict:
+        """Point-in-time copy of the metrics, with derived averages and saturation."""
+        with self._lock:
+            servers = {}
+            for key, server in self._servers.items():
+                data = dict(server)
+                data["wait_ms_buckets"] = {
+                    **{f"le_{bound}": count for bound, count in zip(WAIT_BUCKETS_MS, server["wait_ms_buckets"])},
+                    "inf": server["wait_ms_buckets"][-1],
+                }
+                data["wait_ms_avg"] = round(server["wait_ms_total"] / server["checkouts"], 3) if server["checkouts"] else 0
+                data["wait_ms_total"] = round(server["wait_ms_total"], 3)
+                data["wait_ms_max"] = round(server["wait_ms_max"], 3)
+                data["saturation"] = round(server["checked_out"] / self.max_pool_size, 4) if self.max_pool_size else 0
+                data["peak_saturation"] = round(server["max_checked_out"] / self.max_pool_size, 4) if self.max_pool_size else 0
+                servers[key] = data
+        return {"max_pool_size": self.max_pool_size, "servers": servers}
+
+def create_client(settings: DatabaseSettings, pool_metrics: Optional[PoolMetrics] = None,
+                  listeners: Sequence = ()) -> AsyncIOMotorClient:
+    """Motor client for `settings`; `listeners` are extra pymongo event listeners (e.g. tracing)."""
+    listeners = ([pool_metrics] if pool_metrics is not None else []) + list(listeners)
+    return AsyncIOMotorClient(settings.mongo_url, event_listeners=listeners, **settings.client_options())
@@ -0,0 +1,177 @@
+"""
+Market and instrument dimensions of the fact collections.
+
+`market_dimensions` and `instrument_dimensions` hold one document per
+(source, market) and (source, market, instrument_code), where source is the
+fact collection ("daily_analysis" or "forecast_history"), with first/last
+seen timestamps and a row count. Writers upsert them incrementally
+(DimensionUpdates), so "which markets exist" is answered from a handful of
+documents instead of a distinct() over every row.
+
+They are backfilled from the fact collections on startup while empty, and
+`python -m migrations.dimensions` rebuilds them after bulk-loading data
+outside the API (e.g. with database_export). Rows moved to the archive
+collections (`<source>_archive`, see archive.py) keep being counted.
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from archive import archive_collection_name
+
+MARKETS_COLLECTION = "market_dimensions"
+INSTRUMENTS_COLLECTION = "instrument_dimensions"
+SOURCES = ("daily_analysis", "forecast_history")
+
+class DimensionUpdates:
+    """Accumulates per-instrument changes from one write path, then writes them in one bulk per collection."""
+
+    def __init__(self):
+        # (market, instrument_code) -> [row_count delta, seen]
+        self._instruments: Dict[Tuple[str, str], list] = {}
+
+    def __bool__(self):
+        return bool(self._instruments)
+
+    def seen(self, market: str, instrument_code: str, added: int = 0):
+        """A row for this instrument was written; `added` new rows were created."""
+        entry = self._instruments.setdefault((market, instrument_code), [0, False])
+        entry[0] += added
+        entry[1] = True
+
+    def removed(self, market: str, instrument_code: str, count: int = 1):
+        entry = self._instruments.setdefault((market, instrument_code), [0, False])
+        entry[0] -= count
+
+    def _markets(self) -> Dict[str, list]:
+        markets: Dict[str, list] = {}
+        for (market, _), (delta, seen) in self._instruments.items():
+            entry = markets.setdefault(market, [0, False])
+            entry[0] += delta
+            entry[1] = entry[1] or seen
+        return markets
+
+    async def write(self, db, source: str, now: Optional[str] = None):
+        if not self._instruments:
+            return
+        now = now or datetime.now(timezone.utc).isoformat()
+
+        def operation(key: dict, delta: int, seen: bool) -> UpdateOne:
+            update = {"$inc": {"row_count": delta}}
+            if seen:
+                update["$min"] = {"first_seen": now}
+                update["$max"] = {"last_seen": now}
+            # Removals never create a dimension
+            return UpdateOne({"source": source, **key}, update, upsert=seen)
+
+        await db[INSTRUMENTS_COLLECTION].bulk_write([
+            operation({"market": market, "instrument_code": instrument_code}, delta, seen)
+            for (market, instrument_code), (delta, seen) in self._instruments.items()
+        ], ordered=False)
+        await db[MARKETS_COLLECTION].bulk_write([
+            operation({"market": market}, delta, seen)
+            for market, (delta, seen) in self._markets().items()
+        ], ordered=False)
+
+async def ensure_dimension_indexes(db):
+    await db[MARKETS_COLLECTION].create_index([("source", 1), ("market", 1)], unique=True)
+    await db[INSTRUMENTS_COLLECTION].create_index([("source", 1), ("market", 1), ("instrument_code", 1)], unique=True)
+
+async def list_markets(collection, source: str) -> List[str]:
+    """Markets of `source` that still have rows."""
+    docs = await collection.find(
+        {"source": source, "row_count": {"$gt": 0}}, {"_id": 0, "market": 1}
+    ).sort("market", 1).to_list(None)
+    return [doc["market"] for doc in docs]
+
+async def list_instruments(collection, source: str, market: Optional[str] = None) -> List[dict]:
+    query = {"source": source, "row_count": {"$gt": 0}}
+    if market:
+        query["market"] = market
+    return await collection.find(query, {"_id": 0, "source": 0}).sort([("market", 1), ("instrument_code", 1)]).to_list(None)
+
+def markets_from_instruments(instruments: List[dict]) -> List[dict]:
+    """Roll instrument dimensions up to market dimensions."""
+    markets: Dict[Tuple[str, str], dict] = {}
+    for doc in instruments:
+        key = (doc["source"], doc["market"])
+        market = markets.get(key)
+        if market is None:
+            markets[key] = {k: doc.get(k) for k in ("source", "market", "row_count", "first_seen", "last_seen")}
+            continue
+        market["row_count"] += doc["row_count"]
+        if doc.get("first_seen") and (not market["first_seen"] or doc["first_seen"] < market["first_seen"]):
+            market["first_seen"] = doc["first_seen"]
+        if doc.get("last_seen") and (not market["last_seen"] or doc["last_seen"] > market["last_seen"]):
+            market["last_seen"] = doc["last_seen"]
+    return list(markets.values())
+
+def merge_instruments(*scans: List[dict]) -> List[dict]:
+    """Combine instrument dimensions of the same source scanned from several collections."""
+    instruments: Dict[Tuple[str, str], dict] = {}
+    for doc in (doc for scan in scans for doc in scan):
+        key = (doc["market"], doc["instrument_code"])
+        instrument = instruments.get(key)
+        if instrument is None:
+            instruments[key] = dict(doc)
+            continue
+        instrument["row_count"] += doc["row_count"]
+        if doc.get("first_seen") and (not instrument["first_seen"] or doc["first_seen"] < instrument["first_seen"]):
+            instrument["first_seen"] = doc["first_seen"]
+        if doc.get("last_seen") and (not instrument["last_seen"] or doc["last_seen"] > instrument["last_seen"]):
+            instrument["last_seen"] = doc["last_seen"]
+    return list(instruments.values())
+
+def rebuild_pipeline(source: str) -> list:
+    """Aggregation over a fact collection producing its instrument dimensions (used by the backfill)."""
+    return [
+        {"$match": {"market": {"$nin": [None, ""]}, "instrument_code": {"$nin": [None, ""]}}},
+        {
+            "$group": {
+                "_id": {"market": "$market", "instrument_code": "$instrument_code"},
+                "row_count": {"$sum": 1},
+                "first_seen": {"$min": "$created_at"},
+                "last_seen": {"$max": {"$ifNull": ["$updated_at", "$created_at"]}}
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "source": {"$literal": source},
+                "market": "$_id.market",
+                "instrument_code": "$_id.instrument_code",
+                "row_count": 1,
+                "first_seen": 1,
+                "last_seen": 1
+            }
+        }
+    ]
+
+async def rebuild_dimensions(db, sources=SOURCES) -> Dict[str, dict]:
+    """Replace the dimensions of each source with a fresh scan of its fact collection."""
+    await ensure_dimension_indexes(db)
+    report = {}
+    for source in sources:
+        instruments = await db[source].aggregate(rebuild_pipeline(source), allowDiskUse=True).to_list(None)
+        archived = await db[archive_collection_name(source)].aggregate(
+            rebuild_pipeline(source), allowDiskUse=True
+        ).to_list(None)
+        if archived:
+            instruments = merge_instruments(instruments, archived)
+        markets = markets_from_instruments(instruments)
+
+        await db[INSTRUMENTS_COLLECTION].delete_many({"source": source})
+        await db[MARKETS_COLLECTION].delete_many({"source": source})
+        if instruments:
+            await db[INSTRUMENTS_COLLECTION].insert_many(instruments, ordered=False)
+        if markets:
+            await db[MARKETS_COLLECTION].insert_many(markets, ordered=False)
+
+        report[source] = {
+            "markets": len(markets),
+            "instruments": len(instruments),
+            "rows": sum(doc["row_count"] for doc in instruments),
+        }
+    return report
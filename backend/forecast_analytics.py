@@ -0,0 +1,197 @@
+"""
+Risk/return analytics over completed forecasts.
+
+Completed forecasts (success/failed with a result date) are loaded once into
+contiguous NumPy arrays ordered by result date, and every metric is a
+vectorized pass over those arrays - for the whole history, per market and
+per instrument:
+
+    win rate, total/average/best/worst return, max drawdown of the
+    cumulative P/L curve, a Sharpe-like ratio (mean / standard deviation of
+    per-trade P/L), profit factor, longest win and loss streaks, and win
+    rates over the trailing 30 and 90 days.
+
+P/L values are per-trade percentages and are summed, the same way
+/history/cumulative builds its curve.
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from forecast_resolution import parse_datetime
+
+ROLLING_WINDOWS_DAYS = (30, 90)
+
+# Narrow projection; the server converts ISO result dates to epoch milliseconds
+# so the per-document work left in Python is just copying scalars
+ANALYTICS_PIPELINE = [
+    {"$match": {"status": {"$in": ["success", "failed"]}, "result_date": {"$ne": None}}},
+    {
+        "$project": {
+            "_id": 0,
+            "record_id": 1,
+            "market": 1,
+            "instrument_code": 1,
+            "status": 1,
+            "calculated_pl_percent": 1,
+            "result_ts": {
+                "$convert": {"input": {"$convert": {"input": "$result_date", "to": "date", "onError": None}},
+                             "to": "long", "onError": None}
+            }
+        }
+    }
+]
+
+class ForecastSeries:
+    """Completed forecasts as parallel arrays sorted by result date."""
+
+    def __init__(self, pl, success, result_dates, market_codes, market_names, instrument_codes, instrument_names):
+        import numpy as np
+
+        order = np.argsort(result_dates, kind="stable")
+        self.pl = np.ascontiguousarray(pl[order], dtype=np.float64)
+        self.success = np.ascontiguousarray(success[order], dtype=bool)
+        self.result_dates = np.ascontiguousarray(result_dates[order], dtype="datetime64[s]")
+        self.market_codes = np.ascontiguousarray(market_codes[order], dtype=np.int32)
+        self.market_names = list(market_names)
+        self.instrument_codes = np.ascontiguousarray(instrument_codes[order], dtype=np.int32)
+        self.instrument_names = list(instrument_names)
+
+    def __len__(self):
+        return len(self.pl)
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[dict]) -> "ForecastSeries":
+        """
+        Build from forecast_history documents. `result_ts` (epoch milliseconds,
+        as produced by ANALYTICS_PIPELINE) is used when present, otherwise
+        `result_date` is parsed. Rows without a usable result date are skipped.
+        """
+        import numpy as np
+
+        pl, success, result_dates, market_codes, instrument_codes = [], [], [], [], []
+        # Group codes are assigned while scanning; far cheaper than np.unique over object arrays
+        markets: Dict[str, int] = {}
+        instruments: Dict[Tuple[str, str], int] = {}
+        for doc in documents:
+            timestamp = doc.get("result_ts")
+            if timestamp is None:
+                result_date = parse_datetime(doc.get("result_date"))
+                if result_date is None:
+                    continue
+                timestamp = result_date.timestamp() * 1000
+            market = doc.get("market") or ""
+            instrument = (market, doc.get("instrument_code") or "")
+            pl.append(doc.get("calculated_pl_percent") or 0.0)
+            success.append(doc.get("status") == "success")
+            result_dates.append(int(timestamp) // 1000)
+            market_codes.append(markets.setdefault(market, len(markets)))
+            instrument_codes.append(instruments.setdefault(instrument, len(instruments)))
+
+        return cls(
+            np.array(pl, dtype=np.float64),
+            np.array(success, dtype=bool),
+            np.array(result_dates, dtype=np.int64).astype("datetime64[s]"),
+            np.array(market_codes, dtype=np.int32),
+            list(markets),
+            np.array(instrument_codes, dtype=np.int32),
+            list(instruments),
+        )
+
+def _longest_run(flags) -> int:
+    """Length of the longest run of True values."""
+    import numpy as np
+
+    if not flags.any():
+        return 0
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], flags.view(np.int8), [0]))))
+    return int((edges[1::2] - edges[::2]).max())
+
+def compute_metrics(pl, success, result_dates, as_of) -> dict:
+    """Metrics for one group. The arrays must be sorted by result date."""
+    import numpy as np
+
+    count = len(pl)
+    wins = int(success.sum())
+    cumulative = np.cumsum(pl)
+    # Peak of the equity curve including the flat start, so an opening loss counts as drawdown
+    peaks = np.maximum(np.maximum.accumulate(cumulative), 0.0)
+    gains = pl[pl > 0].sum()
+    losses = -pl[pl < 0].sum()
+    std = pl.std(ddof=1) if count > 1 else 0.0
+
+    metrics = {
+        "completed_forecasts": count,
+        "successful_forecasts": wins,
+        "win_rate": round(wins / count * 100, 2),
+        "total_return_percent": round(float(cumulative[-1]), 2),
+        "avg_return_percent": round(float(pl.mean()), 2),
+        "best_trade_percent": round(float(pl.max()), 2),
+        "worst_trade_percent": round(float(pl.min()), 2),
+        "max_drawdown_percent": round(float((peaks - cumulative).max()), 2),
+        "sharpe_ratio": round(float(pl.mean() / std), 4) if std > 0 else None,
+        "profit_factor": round(float(gains / losses), 4) if losses > 0 else None,
+        "longest_win_streak": _longest_run(success),
+        "longest_loss_streak": _longest_run(~success),
+    }
+
+    end = np.searchsorted(result_dates, as_of, side="right")
+    for days in ROLLING_WINDOWS_DAYS:
+        start = np.searchsorted(result_dates, as_of - np.timedelta64(days, "D"), side="right")
+        window = int(end - start)
+        metrics[f"win_rate_{days}d"] = round(float(success[start:end].sum()) / window * 100, 2) if window else None
+        metrics[f"completed_{days}d"] = window
+    return metrics
+
+def _grouped_metrics(series: ForecastSeries, codes, names, as_of) -> dict:
+    import numpy as np
+
+    # Stable sort keeps each group's rows in result-date order
+    order = np.argsort(codes, kind="stable")
+    boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+    groups = {}
+    for rows in np.split(order, boundaries):
+        groups[names[codes[rows[0]]]] = compute_metrics(
+            series.pl[rows], series.success[rows], series.result_dates[rows], as_of
+        )
+    return groups
+
+def compute_analytics(series: ForecastSeries, include_instruments: bool = True,
+                      as_of: Optional[datetime] = None) -> dict:
+    """
+    Global, per-market and (optionally) per-instrument metrics. Rolling win
+    rates cover the days up to `as_of` (default: now).
+    """
+    import numpy as np
+
+    as_of = as_of or datetime.now(timezone.utc)
+    as_of64 = np.datetime64(int(as_of.timestamp()), "s")
+
+    result = {
+        "as_of": as_of.isoformat(),
+        "global": None,
+        "markets": {},
+    }
+    if include_instruments:
+        result["instruments"] = []
+    if not len(series):
+        return result
+
+    result["global"] = compute_metrics(series.pl, series.success, series.result_dates, as_of64)
+    result["markets"] = _grouped_metrics(series, series.market_codes, series.market_names, as_of64)
+    if include_instruments:
+        grouped = _grouped_metrics(series, series.instrument_codes, series.instrument_names, as_of64)
+        for (market, instrument_code), metrics in grouped.items():
+            result["instruments"].append({"market": market, "instrument_code": instrument_code, **metrics})
+    return result
+
+async def load_forecast_series(collection, batch_size: int = 10000,
+                               archived: Optional[List[dict]] = None) -> ForecastSeries:
+    """Load every completed forecast from `collection`, plus `archived` ones (from the archive tier)."""
+    cursor = collection.aggregate(ANALYTICS_PIPELINE, batchSize=batch_size)
+    documents = await cursor.to_list(None)
+    if archived:
+        # A forecast present in both tiers counts once
+        hot = {doc.get("record_id") for doc in documents}
+        documents += [doc for doc in archived if doc.get("record_id") not in hot]
+    return ForecastSeries.from_documents(documents)
@@ -0,0 +1,365 @@
+"""
+Forecast P/L evaluation and bulk resolution of pending forecasts.
+
+`compute_forecast_result` is the single definition of how a forecast is
+scored; the create/update handlers use it for one row and
+`compute_forecast_results` applies the same rules to whole NumPy arrays.
+
+The resolution engine loads every pending forecast, matches it to the
+latest observed price for its market and instrument (from `daily_analysis`
+or an uploaded price file), scores all of them in one vectorized pass and
+writes the resolved ones with a single unordered bulk write.
+
+`apply_forecast_results` does the same for admin-supplied results uploaded
+as CSV or NDJSON (record_id, actual_result_price, result_date, notes).
+"""
+
+import csv
+import io
+import itertools
+import json
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+
+from fastapi.concurrency import run_in_threadpool
+from pymongo import UpdateOne
+
+from daily_series import parse_price
+
+PriceMap = Dict[Tuple[str, str], Tuple[float, str]]
+
+SAMPLE_SIZE = 50
+RESULTS_BATCH_SIZE = 5000
+
+def compute_forecast_result(direction: str, entry_price: float, target_price: float, actual_price: float):
+    """Return (calculated_pl_percent, status) for one forecast."""
+    if direction == "Bullish":
+        calculated_pl = ((actual_price - entry_price) / entry_price) * 100
+        status = "success" if actual_price >= target_price else "failed"
+    else:  # Bearish
+        calculated_pl = ((entry_price - actual_price) / entry_price) * 100
+        status = "success" if actual_price <= target_price else "failed"
+    return round(calculated_pl, 2), status
+
+def compute_forecast_results(is_bullish, entry_price, target_price, actual_price):
+    """Vectorized compute_forecast_result. Returns (calculated_pl_percent, success) arrays."""
+    import numpy as np
+
+    change = (actual_price - entry_price) / entry_price * 100
+    calculated_pl = np.round(np.where(is_bullish, change, -change), 2)
+    success = np.where(is_bullish, actual_price >= target_price, actual_price <= target_price)
+    return calculated_pl, success
+
+def parse_datetime(value) -> Optional[datetime]:
+    """A stored or user-entered ISO date/datetime as an aware datetime (UTC if naive); None if unparseable."""
+    if isinstance(value, datetime):
+        dt = value
+    elif value:
+        try:
+            dt = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+async def latest_prices_from_daily_analysis(db) -> PriceMap:
+    """Latest analysis price per (market, instrument) from daily_analysis."""
+    pipeline = [
+        {"$sort": {"analysis_datetime": -1}},
+        {
+            "$group": {
+                "_id": {"market": "$market", "instrument": "$instrument_code"},
+                "price": {"$first": "$analysis_price"},
+                "price_date": {"$first": "$analysis_datetime"}
+            }
+        }
+    ]
+    prices = {}
+    async for row in db.daily_analysis.aggregate(pipeline):
+        price = parse_price(row.get("price"))
+        if price is not None:
+            prices[(row["_id"]["market"], row["_id"]["instrument"])] = (price, row["price_date"])
+    return prices
+
+def parse_price_file(content: bytes) -> PriceMap:
+    """
+    Parse an uploaded CSV with columns market, instrument_code, price and an
+    optional price_date. The latest row per market and instrument wins.
+    """
+    reader = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+    required = {"market", "instrument_code", "price"}
+    if not reader.fieldnames or not required.issubset({name.strip() for name in reader.fieldnames}):
+        raise ValueError("Price file must have market, instrument_code and price columns")
+
+    now = datetime.now(timezone.utc).isoformat()
+    prices = {}
+    for line, row in enumerate(reader, start=2):
+        row = {k.strip(): (v or "").strip() for k, v in row.items() if k}
+        price = parse_price(row["price"])
+        if price is None:
+            raise ValueError(f"Row {line}: invalid price {row['price']!r}")
+        price_date = row.get("price_date") or now
+        parsed_date = parse_datetime(price_date)
+        if parsed_date is None:
+            raise ValueError(f"Row {line}: invalid price_date {price_date!r}")
+        key = (row["market"], row["instrument_code"])
+        if key not in prices or parse_datetime(prices[key][1]) <= parsed_date:
+            prices[key] = (price, parsed_date.isoformat())
+    return prices
+
+async def resolve_pending_forecasts(
+    db,
+    prices: PriceMap,
+    horizon_days: Optional[float] = None,
+    dry_run: bool = False,
+    now: Optional[datetime] = None
+) -> dict:
+    """
+    Resolve pending forecasts against `prices`.
+
+    A forecast is matched when a price for its market and instrument was
+    observed after the forecast date. Matched forecasts that reached their
+    target are resolved as success; with `horizon_days`, forecasts older than
+    the horizon are closed at the latest price even if the target was missed.
+    """
+    import numpy as np
+
+    started = time.perf_counter()
+    now = now or datetime.now(timezone.utc)
+
+    projection = {
+        "_id": 0, "record_id": 1, "market": 1, "instrument_code": 1, "forecast_date": 1,
+        "forecast_direction": 1, "entry_price": 1, "forecast_target_price": 1
+    }
+    pending = await db.forecast_history.find({"status": "pending"}, projection).to_list(None)
+
+    matched = []
+    actual = []
+    result_dates = []
+    age_days = []
+    for forecast in pending:
+        observation = prices.get((forecast.get("market"), forecast.get("instrument_code")))
+        if observation is None:
+            continue
+        forecast_date = parse_datetime(forecast.get("forecast_date"))
+        price_date = parse_datetime(observation[1])
+        if forecast_date is None or price_date is None or price_date <= forecast_date:
+            continue
+        if not forecast.get("entry_price"):
+            continue
+        matched.append(forecast)
+        actual.append(observation[0])
+        result_dates.append(price_date.isoformat())
+        age_days.append((now - forecast_date).total_seconds() / 86400)
+
+    report = {
+        "dry_run": dry_run,
+        "pending": len(pending),
+        "matched": len(matched),
+        "unmatched": len(pending) - len(matched),
+        "resolved": 0,
+        "success": 0,
+        "failed": 0,
+        "still_pending": len(pending),
+        "by_market": {},
+        "sample": []
+    }
+
+    if matched:
+        is_bullish = np.fromiter((f["forecast_direction"] == "Bullish" for f in matched), dtype=bool, count=len(matched))
+        entry = np.fromiter((f["entry_price"] for f in matched), dtype=np.float64, count=len(matched))
+        target = np.fromiter((f["forecast_target_price"] for f in matched), dtype=np.float64, count=len(matched))
+        actual_prices = np.asarray(actual, dtype=np.float64)
+
+        calculated_pl, success = compute_forecast_results(is_bullish, entry, target, actual_prices)
+        resolve = success.copy()
+        if horizon_days is not None:
+            resolve |= np.asarray(age_days) >= horizon_days
+
+        updated_at = now.isoformat()
+        requests = []
+        for i in np.flatnonzero(resolve):
+            forecast = matched[i]
+            status = "success" if success[i] else "failed"
+            update = {
+                "actual_result_price": float(actual_prices[i]),
+                "result_date": result_dates[i],
+                "calculated_pl_percent": float(calculated_pl[i]),
+                "status": status,
+                "updated_at": updated_at
+            }
+            requests.append(UpdateOne({"record_id": forecast["record_id"], "status": "pending"}, {"$set": update}))
+
+            market = report["by_market"].setdefault(forecast["market"], {"success": 0, "failed": 0})
+            market[status] += 1
+            report[status] += 1
+            if len(report["sample"]) < SAMPLE_SIZE:
+                report["sample"].append({
+                    "record_id": forecast["record_id"],
+                    "market": forecast["market"],
+                    "instrument_code": forecast["instrument_code"],
+                    **update
+                })
+
+        report["resolved"] = len(requests)
+        report["still_pending"] = len(pending) - len(requests)
+
+        if requests and not dry_run:
+            result = await db.forecast_history.bulk_write(requests, ordered=False)
+            report["modified"] = result.modified_count
+
+    report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return report
+
+def iter_result_rows(stream, fmt: str) -> Iterable[Tuple[int, dict]]:
+    """
+    Stream (line_number, row) pairs from an uploaded CSV or NDJSON file.
+    `stream` is a binary file object; it is decoded incrementally.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        missing = {"record_id", "actual_result_price", "result_date"} - {name.strip() for name in reader.fieldnames or []}
+        if missing:
+            raise ValueError(f"CSV is missing columns: {', '.join(sorted(missing))}")
+        for line, row in enumerate(reader, start=2):
+            yield line, {k.strip(): v for k, v in row.items() if k}
+    elif fmt == "ndjson":
+        for line, raw in enumerate(text, start=1):
+            if not raw.strip():
+                continue
+            try:
+                row = json.loads(raw)
+            except json.JSONDecodeError as e:
+                yield line, {"_error": f"Invalid JSON: {e.msg}"}
+                continue
+            yield line, row if isinstance(row, dict) else {"_error": "Expected a JSON object"}
+    else:
+        raise ValueError(f"Unsupported format: {fmt}. Expected csv or ndjson")
+
+def validate_result_row(row: dict) -> Tuple[Optional[dict], Optional[str]]:
+    if "_error" in row:
+        return None, row["_error"]
+    record_id = str(row.get("record_id") or "").strip()
+    if not record_id:
+        return None, "Missing record_id"
+    actual_price = parse_price(row.get("actual_result_price"))
+    if actual_price is None:
+        return None, f"Invalid actual_result_price: {row.get('actual_result_price')!r}"
+    result_date = str(row.get("result_date") or "").strip()
+    if not result_date:
+        return None, "Missing result_date"
+    notes = row.get("notes")
+    notes = str(notes).strip() if notes is not None else None
+    return {
+        "record_id": record_id,
+        "actual_result_price": actual_price,
+        "result_date": result_date,
+        "notes": notes or None
+    }, None
+
+async def _apply_results_batch(db, batch: List[Tuple[int, dict]], now: str, report: dict):
+    import numpy as np
+
+    record_ids = [row["record_id"] for _, row in batch]
+    projection = {"_id": 0, "record_id": 1, "forecast_direction": 1, "entry_price": 1, "forecast_target_price": 1}
+    existing = {
+        doc["record_id"]: doc
+        async for doc in db.forecast_history.find({"record_id": {"$in": record_ids}}, projection)
+    }
+
+    found = []
+    for line, row in batch:
+        forecast = existing.get(row["record_id"])
+        if forecast is None:
+            report["errors"].append({"row": line, "record_id": row["record_id"], "error": "Forecast not found"})
+        elif not forecast.get("entry_price"):
+            report["errors"].append({"row": line, "record_id": row["record_id"], "error": "Forecast has no entry price"})
+        else:
+            found.append((row, forecast))
+    if not found:
+        return
+
+    count = len(found)
+    calculated_pl, success = compute_forecast_results(
+        np.fromiter((f["forecast_direction"] == "Bullish" for _, f in found), dtype=bool, count=count),
+        np.fromiter((f["entry_price"] for _, f in found), dtype=np.float64, count=count),
+        np.fromiter((f["forecast_target_price"] for _, f in found), dtype=np.float64, count=count),
+        np.fromiter((row["actual_result_price"] for row, _ in found), dtype=np.float64, count=count)
+    )
+
+    requests = []
+    for i, (row, _) in enumerate(found):
+        status = "success" if success[i] else "failed"
+        update = {
+            "actual_result_price": row["actual_result_price"],
+            "result_date": row["result_date"],
+            "calculated_pl_percent": float(calculated_pl[i]),
+            "status": status,
+            "updated_at": now
+        }
+        if row["notes"]:
+            update["notes"] = row["notes"]
+        requests.append(UpdateOne({"record_id": row["record_id"]}, {"$set": update}))
+        report[status] += 1
+
+    await db.forecast_history.bulk_write(requests, ordered=False)
+    report["updated"] += len(requests)
+
+async def iterate_in_threadpool(rows: Iterable, chunk_size: int = RESULTS_BATCH_SIZE) -> AsyncIterator:
+    """
+    The items of a blocking iterator (e.g. an upload being parsed), pulled
+    `chunk_size` at a time in a worker thread so the event loop keeps serving
+    requests.
+    """
+    iterator = iter(rows)
+    while True:
+        chunk = await run_in_threadpool(lambda: list(itertools.islice(iterator, chunk_size)))
+        if not chunk:
+            return
+        for item in chunk:
+            yield item
+
+async def apply_forecast_results(db, rows: Union[Iterable[Tuple[int, dict]], AsyncIterable[Tuple[int, dict]]],
+                                 batch_size: int = RESULTS_BATCH_SIZE) -> dict:
+    """
+    Apply uploaded forecast results. Each batch is fetched with one `$in`
+    query, scored in one vectorized pass and written with one unordered bulk
+    write. Invalid rows are reported per row and never abort the import.
+    Plain iterables are read in a worker thread (see iterate_in_threadpool).
+    """
+    if not hasattr(rows, "__aiter__"):
+        rows = iterate_in_threadpool(rows, batch_size)
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc).isoformat()
+    report = {"total_rows": 0, "updated": 0, "success": 0, "failed": 0, "errors": []}
+    seen = {}
+    batch = []
+
+    async for line, raw in rows:
+        report["total_rows"] += 1
+        row, error = validate_result_row(raw)
+        if error:
+            report["errors"].append({"row": line, "record_id": raw.get("record_id"), "error": error})
+            continue
+        if row["record_id"] in seen:
+            report["errors"].append({
+                "row": line,
+                "record_id": row["record_id"],
+                "error": f"Duplicate record_id (first seen on row {seen[row['record_id']]})"
+            })
+            continue
+        seen[row["record_id"]] = line
+        batch.append((line, row))
+        if len(batch) >= batch_size:
+            await _apply_results_batch(db, batch, now, report)
+            batch = []
+
+    if batch:
+        await _apply_results_batch(db, batch, now, report)
+
+    report["errors"].sort(key=lambda error: error["row"])
+    report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return report
@@ -0,0 +1,232 @@
+"""
+Google OAuth sign-in: code exchange and local ID-token verification.
+
+The callback used to open a new HTTP client per login (a fresh TLS handshake
+to Google every time) and fetch the profile from the userinfo endpoint after
+exchanging the code. Now one pooled client lives for the whole process, and
+the `id_token` returned with the access token is verified locally: its RS256
+signature against Google's JWKS (cached for the max-age Google sends,
+refetched early when an unknown key id appears) and its issuer, audience and
+expiry. The userinfo call is only a fallback for token responses without an
+ID token. Either way the email address must be verified: accounts are keyed
+by the Google user id, but the email is stored on the user and admins find
+users and apply subscription changes by it.
+
+Endpoints are configurable so tests and local setups can point the flow at a
+fake OAuth server.
+"""
+
+import asyncio
+import base64
+import importlib.util
+import json
+import logging
+import re
+import time
+from typing import Dict, Optional
+
+import httpx
+
+import tracing
+from tracing import TracingTransport
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
+GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
+GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v2/userinfo"
+GOOGLE_JWKS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ISSUERS = ("https://accounts.google.com", "accounts.google.com")
+
+DEFAULT_JWKS_TTL_SECONDS = 3600
+# An unknown key id triggers at most one early refetch per this interval
+JWKS_MIN_REFRESH_SECONDS = 60
+CLOCK_SKEW_SECONDS = 60
+
+class OAuthError(Exception):
+    """The provider rejected the exchange or returned something unusable."""
+
+class IdTokenError(OAuthError):
+    """The ID token failed verification."""
+
+def create_http_client(timeout: float = 10.0, max_connections: int = 20) -> httpx.AsyncClient:
+    """Shared keep-alive client for calls to Google; HTTP/2 when the h2 package is installed."""
+    transport = httpx.AsyncHTTPTransport(
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                            keepalive_expiry=60.0),
+    )
+    # Requests are traced (and carry traceparent) while tracing is on
+    return httpx.AsyncClient(timeout=httpx.Timeout(timeout), transport=TracingTransport(transport))
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def _max_age(cache_control: Optional[str]) -> Optional[int]:
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return int(match.group(1)) if match else None
+
+class JWKSCache:
+    """RSA public keys by key id, fetched from a JWKS URL and refreshed when they expire."""
+
+    def __init__(self, http_client: httpx.AsyncClient, url: str = GOOGLE_JWKS_URL,
+                 default_ttl_seconds: float = DEFAULT_JWKS_TTL_SECONDS):
+        self.http_client = http_client
+        self.url = url
+        self.default_ttl_seconds = default_ttl_seconds
+        self._keys: Dict[str, object] = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self.fetches = 0
+
+    async def get_key(self, kid: str):
+        now = time.monotonic()
+        key = self._keys.get(kid)
+        if key is not None and now < self._expires_at:
+            return key
+
+        async with self._lock:
+            now = time.monotonic()
+            expired = now >= self._expires_at
+            # Keys rotate: an unknown kid may be newer than our copy
+            unknown = kid not in self._keys and now - self._fetched_at >= JWKS_MIN_REFRESH_SECONDS
+            if expired or unknown:
+                await self._refresh()
+        key = self._keys.get(kid)
+        if key is None:
+            raise IdTokenError(f"Unknown signing key: {kid}")
+        return key
+
+    async def _refresh(self):
+        try:
+            response = await self.http_client.get(self.url)
+            response.raise_for_status()
+            jwks = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            if self._keys:
+                # Keep verifying with the keys we have; retry after the minimum interval
+                logger.warning(f"JWKS refresh failed, keeping cached keys: {str(e)}")
+                self._fetched_at = time.monotonic()
+                self._expires_at = self._fetched_at + JWKS_MIN_REFRESH_SECONDS
+                return
+            raise OAuthError(f"Could not fetch signing keys: {str(e)}")
+
+        keys = {}
+        for jwk in jwks.get("keys", []):
+            if jwk.get("kty") == "RSA" and jwk.get("kid"):
+                try:
+                    keys[jwk["kid"]] = _rsa_public_key(jwk)
+                except (KeyError, TypeError, ValueError) as e:
+                    # Tokens signed with it fail as "Unknown signing key"
+                    logger.warning(f"Ignoring malformed signing key {jwk['kid']}: {str(e)}")
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+        ttl = _max_age(response.headers.get("cache-control"))
+        self._expires_at = self._fetched_at + (ttl if ttl is not None else self.default_ttl_seconds)
+        self.fetches += 1
+
+def _rsa_public_key(jwk: dict):
+    from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicNumbers
+
+    n = int.from_bytes(_b64decode(jwk["n"]), "big")
+    e = int.from_bytes(_b64decode(jwk["e"]), "big")
+    return RSAPublicNumbers(e, n).public_key()
+
+async def verify_id_token(id_token: str, keys: JWKSCache, audience: str, issuers=GOOGLE_ISSUERS,
+                          now: Optional[float] = None) -> dict:
+    """Check an RS256 ID token's signature, issuer, audience and expiry; returns its claims."""
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+
+    try:
+        header_b64, payload_b64, signature_b64 = id_token.split(".")
+        header = json.loads(_b64decode(header_b64))
+        claims = json.loads(_b64decode(payload_b64))
+        signature = _b64decode(signature_b64)
+    except ValueError as e:
+        raise IdTokenError(f"Malformed ID token: {str(e)}")
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        raise IdTokenError("Malformed ID token: header and claims must be JSON objects")
+
+    if header.get("alg") != "RS256":
+        raise IdTokenError(f"Unsupported algorithm: {header.get('alg')}")
+    key = await keys.get_key(header.get("kid"))
+    try:
+        key.verify(signature, f"{header_b64}.{payload_b64}".encode("ascii"), padding.PKCS1v15(), hashes.SHA256())
+    except InvalidSignature:
+        raise IdTokenError("Invalid ID token signature")
+
+    now = time.time() if now is None else now
+    if claims.get("iss") not in issuers:
+        raise IdTokenError(f"Unexpected issuer: {claims.get('iss')}")
+    audiences = claims.get("aud")
+    if audience not in (audiences if isinstance(audiences, list) else [audiences]):
+        raise IdTokenError("ID token was issued for another client")
+    if not isinstance(claims.get("exp"), (int, float)) or claims["exp"] + CLOCK_SKEW_SECONDS < now:
+        raise IdTokenError("ID token has expired")
+    if isinstance(claims.get("iat"), (int, float)) and claims["iat"] - CLOCK_SKEW_SECONDS > now:
+        raise IdTokenError("ID token was issued in the future")
+    return claims
+
+class GoogleOAuth:
+    def __init__(self, http_client: httpx.AsyncClient, client_id: str, client_secret: str, redirect_uri: str,
+                 token_url: str = GOOGLE_TOKEN_URL, userinfo_url: str = GOOGLE_USERINFO_URL,
+                 jwks_url: str = GOOGLE_JWKS_URL, issuers=GOOGLE_ISSUERS):
+        self.http_client = http_client
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.redirect_uri = redirect_uri
+        self.token_url = token_url
+        self.userinfo_url = userinfo_url
+        self.issuers = issuers
+        self.jwks = JWKSCache(http_client, jwks_url)
+
+    async def exchange_code(self, code: str) -> dict:
+        response = await self.http_client.post(self.token_url, data={
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+            'code': code,
+            'grant_type': 'authorization_code',
+            'redirect_uri': self.redirect_uri
+        })
+        if response.status_code != 200:
+            raise OAuthError("Failed to get access token")
+        return response.json()
+
+    async def user_info(self, tokens: dict) -> dict:
+        """
+        Profile as {id, email, name, picture}: from the verified ID token, else
+        from userinfo. The email must be verified, since admins act on users by
+        it; a missing name defaults to the email's local part.
+        """
+        id_token = tokens.get('id_token')
+        if id_token:
+            claims = await verify_id_token(id_token, self.jwks, self.client_id, self.issuers)
+            # Older tokens carry the flag as a string
+            if claims.get("email_verified") not in (True, "true"):
+                raise IdTokenError("Email address is not verified")
+            info = {
+                "id": claims.get("sub"),
+                "email": claims.get("email"),
+                "name": claims.get("name"),
+                "picture": claims.get("picture", ""),
+            }
+        else:
+            response = await self.http_client.get(
+                self.userinfo_url, headers={"Authorization": f"Bearer {tokens.get('access_token')}"}
+            )
+            if response.status_code != 200:
+                raise OAuthError("Failed to get user info")
+            info = response.json()
+            if info.get("verified_email") is not True:
+                raise OAuthError("Email address is not verified")
+        # Google omits the name for accounts without a profile name
+        if not info.get("name"):
+            info["name"] = (info.get("email") or "").split("@")[0]
+        return info
+
+    async def sign_in(self, code: str) -> dict:
+        with tracing.span("oauth.sign_in"):
+            return await self.user_info(await self.exchange_code(code))
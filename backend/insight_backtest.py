@@ -0,0 +1,272 @@
+"""
+Backtesting of daily analysis insights.
+
+Each insight in `daily_analysis_series` carries an analysis price, a target
+price and a critical level. Replaying an instrument's time-ordered series
+decides, for every insight, which level the subsequent analysis prices
+reached first:
+
+    Bullish insights hit the target when a later price is >= target_price
+    and the critical level when it is <= critical_level; Bearish insights
+    are the mirror image. If both happen on the same later point, the
+    critical level is counted (the conservative reading). Insights that
+    reach neither before the data (or the optional horizon) runs out stay
+    "open".
+
+The direction comes from the insight type's prefix: types starting with
+"Bullish" or "Bearish" are scored, any other type (e.g. "Neutral") and
+insights missing a price or level are counted as "unscored" for their
+market and type instead.
+
+The series is backfilled from `daily_analysis` first when it is missing
+points (rows synced before the series existed), so a run always covers every
+insight.
+
+Instruments are independent, so they are grouped into shards and replayed
+in a process pool: the server's shared one (sized per web worker, see
+`default_workers`), or one created for the run. Hit rates are aggregated by
+market and insight type and persisted, so the dashboard reads the latest run
+without recomputing it.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from daily_series import SERIES_COLLECTION, ensure_series_backfilled
+
+RUNS_COLLECTION = "insight_backtests"
+INSTRUMENTS_COLLECTION = "insight_backtest_instruments"
+
+OPEN, TARGET, CRITICAL = 0, 1, 2
+SHARD_SIZE = 50
+BATCH_SIZE = 10000
+
+GroupKey = Tuple[str, str]  # (market, insight_type)
+
+def default_workers(web_workers: int = 1) -> int:
+    """Backtest processes per web worker: the cores shared between the web workers, at least one."""
+    return max(1, (os.cpu_count() or 1) // max(1, web_workers))
+
+def replay_instrument(timestamps, prices, targets, criticals, bullish, horizon_seconds: Optional[float] = None):
+    """
+    Replay one instrument's insights, ordered by time. Returns
+    (outcome, resolved_index) arrays: outcome is OPEN/TARGET/CRITICAL and
+    resolved_index the position of the point that decided it (-1 if open).
+
+    Every unresolved insight is compared with the point k steps ahead in one
+    vectorized pass per k, and drops out as soon as it resolves, so the work
+    follows how long insights stay open rather than n^2.
+    """
+    import numpy as np
+
+    n = len(prices)
+    outcome = np.full(n, OPEN, dtype=np.int8)
+    resolved_index = np.full(n, -1, dtype=np.int64)
+    active = np.flatnonzero(~(np.isnan(prices) | np.isnan(targets) | np.isnan(criticals)))
+
+    step = 1
+    while active.size:
+        ahead = active + step
+        in_range = ahead < n
+        if horizon_seconds is not None:
+            in_range[in_range] &= (timestamps[ahead[in_range]] - timestamps[active[in_range]]) <= horizon_seconds
+        active, ahead = active[in_range], ahead[in_range]
+        if not active.size:
+            break
+
+        later = prices[ahead]
+        is_bullish = bullish[active]
+        hit_target = np.where(is_bullish, later >= targets[active], later <= targets[active])
+        hit_critical = np.where(is_bullish, later <= criticals[active], later >= criticals[active])
+        done = hit_target | hit_critical
+
+        outcome[active[hit_critical]] = CRITICAL
+        outcome[active[hit_target & ~hit_critical]] = TARGET
+        resolved_index[active[done]] = ahead[done]
+        active = active[~done]
+        step += 1
+
+    return outcome, resolved_index
+
+def _empty_stats() -> dict:
+    return {"insights": 0, "target_hits": 0, "critical_hits": 0, "open": 0, "unscored": 0,
+            "target_days_total": 0.0, "critical_days_total": 0.0}
+
+def backtest_instrument(rows: dict, horizon_seconds: Optional[float] = None) -> Dict[str, dict]:
+    """Stats per insight type for one instrument. `rows` holds parallel lists keyed by field."""
+    import numpy as np
+
+    timestamps = np.asarray(rows["ts"], dtype=np.float64)
+    prices = np.asarray(rows["analysis_price"], dtype=np.float64)
+    targets = np.asarray(rows["target_price"], dtype=np.float64)
+    criticals = np.asarray(rows["critical_level"], dtype=np.float64)
+    insight_types = np.asarray(rows["insight_type"], dtype=object)
+    bullish = np.array([str(t).startswith("Bullish") for t in insight_types], dtype=bool)
+    bearish = np.array([str(t).startswith("Bearish") for t in insight_types], dtype=bool)
+    # Insights without a direction can't be scored
+    targets[~(bullish | bearish)] = np.nan
+
+    outcome, resolved_index = replay_instrument(timestamps, prices, targets, criticals, bullish, horizon_seconds)
+    scored = ~np.isnan(targets) & ~np.isnan(criticals) & ~np.isnan(prices)
+    days = np.where(resolved_index >= 0, (timestamps[resolved_index] - timestamps) / 86400, 0.0)
+
+    stats = {}
+    for insight_type in np.unique(insight_types):
+        of_type = insight_types == insight_type
+        rows_of_type = scored & of_type
+        hits = rows_of_type & (outcome == TARGET)
+        stops = rows_of_type & (outcome == CRITICAL)
+        stats[insight_type] = {
+            "insights": int(rows_of_type.sum()),
+            "target_hits": int(hits.sum()),
+            "critical_hits": int(stops.sum()),
+            "open": int((rows_of_type & (outcome == OPEN)).sum()),
+            "unscored": int((of_type & ~scored).sum()),
+            "target_days_total": float(days[hits].sum()),
+            "critical_days_total": float(days[stops].sum()),
+        }
+    return stats
+
+def backtest_shard(shard: List[tuple], horizon_seconds: Optional[float] = None) -> List[tuple]:
+    """Process-pool entry point: [(market, instrument_code, rows)] -> [(market, instrument_code, stats)]."""
+    return [
+        (market, instrument_code, backtest_instrument(rows, horizon_seconds))
+        for market, instrument_code, rows in shard
+    ]
+
+def summarize(stats: dict) -> dict:
+    resolved = stats["target_hits"] + stats["critical_hits"]
+    return {
+        "insights": stats["insights"],
+        "target_hits": stats["target_hits"],
+        "critical_hits": stats["critical_hits"],
+        "open": stats["open"],
+        "unscored": stats["unscored"],
+        "hit_rate": round(stats["target_hits"] / resolved * 100, 2) if resolved else None,
+        "avg_days_to_target": round(stats["target_days_total"] / stats["target_hits"], 2) if stats["target_hits"] else None,
+        "avg_days_to_critical": round(stats["critical_days_total"] / stats["critical_hits"], 2) if stats["critical_hits"] else None,
+    }
+
+def _merge(into: dict, stats: dict):
+    for field, value in stats.items():
+        into[field] += value
+
+async def iter_instrument_series(db, batch_size: int = BATCH_SIZE):
+    """Yield (market, instrument_code, rows) for each instrument, reading the series in index order."""
+    cursor = db[SERIES_COLLECTION].find(
+        {},
+        {"_id": 0, "ts": 1, "meta": 1, "insight_type": 1, "analysis_price": 1, "target_price": 1, "critical_level": 1},
+        batch_size=batch_size
+    ).sort([("meta.instrument_code", 1), ("meta.market", 1), ("ts", 1)])
+
+    current = None
+    rows = None
+    async for point in cursor:
+        meta = point.get("meta") or {}
+        key = (meta.get("market") or "", meta.get("instrument_code") or "")
+        if key != current:
+            if current is not None:
+                yield current[0], current[1], rows
+            current = key
+            rows = {"ts": [], "insight_type": [], "analysis_price": [], "target_price": [], "critical_level": []}
+        ts = point["ts"]
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        rows["ts"].append(ts.timestamp())
+        rows["insight_type"].append(point.get("insight_type") or "")
+        for field in ("analysis_price", "target_price", "critical_level"):
+            value = point.get(field)
+            rows[field].append(float("nan") if value is None else value)
+    if current is not None:
+        yield current[0], current[1], rows
+
+async def run_backtest(db, horizon_days: Optional[float] = None, workers: Optional[int] = None,
+                       shard_size: int = SHARD_SIZE, persist: bool = True, pool: Optional[Executor] = None) -> dict:
+    """
+    Backtest every instrument in the series collection and (optionally)
+    persist the run. Returns the run document. With `pool`, shards run there
+    and `workers` only bounds how many are in flight; without it, a pool of
+    `workers` processes is created for the run.
+    """
+    started = time.perf_counter()
+    horizon_seconds = horizon_days * 86400 if horizon_days else None
+    loop = asyncio.get_running_loop()
+    workers = workers or default_workers()
+    backfilled = await ensure_series_backfilled(db)
+
+    by_group: Dict[GroupKey, dict] = {}
+    by_type: Dict[str, dict] = {}
+    instrument_rows = []
+
+    def collect(results):
+        for market, instrument_code, stats in results:
+            for insight_type, values in stats.items():
+                _merge(by_group.setdefault((market, insight_type), _empty_stats()), values)
+                _merge(by_type.setdefault(insight_type, _empty_stats()), values)
+                instrument_rows.append({"market": market, "instrument_code": instrument_code,
+                                        "insight_type": insight_type, **summarize(values)})
+
+    with nullcontext(pool) if pool is not None else ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        shard = []
+        # Bounded in-flight shards keep memory flat while the cursor is read
+        max_in_flight = workers * 2
+
+        async def submit(shard):
+            nonlocal pending
+            pending.add(loop.run_in_executor(pool, backtest_shard, shard, horizon_seconds))
+            if len(pending) >= max_in_flight:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    collect(future.result())
+
+        async for item in iter_instrument_series(db):
+            shard.append(item)
+            if len(shard) >= shard_size:
+                await submit(shard)
+                shard = []
+        if shard:
+            await submit(shard)
+        for result in await asyncio.gather(*pending):
+            collect(result)
+
+    run = {
+        "run_id": f"backtest_{uuid.uuid4().hex[:12]}",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "horizon_days": horizon_days,
+        "workers": workers,
+        "series_backfilled": backfilled,
+        "instruments": len({(r["market"], r["instrument_code"]) for r in instrument_rows}),
+        "insights": sum(stats["insights"] for stats in by_type.values()),
+        "unscored": sum(stats["unscored"] for stats in by_type.values()),
+        "by_market": [
+            {"market": market, "insight_type": insight_type, **summarize(stats)}
+            for (market, insight_type), stats in sorted(by_group.items())
+        ],
+        "by_insight_type": [
+            {"insight_type": insight_type, **summarize(stats)}
+            for insight_type, stats in sorted(by_type.items())
+        ],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+    if persist:
+        await save_run(db, run, instrument_rows)
+    return run
+
+async def save_run(db, run: dict, instrument_rows: List[dict]):
+    """Store the run and replace the per-instrument rows with this run's."""
+    await db[RUNS_COLLECTION].insert_one(dict(run))
+    instruments = db[INSTRUMENTS_COLLECTION]
+    if instrument_rows:
+        await instruments.insert_many([{"run_id": run["run_id"], **row} for row in instrument_rows], ordered=False)
+    await instruments.delete_many({"run_id": {"$ne": run["run_id"]}})
+
+async def latest_run(db) -> Optional[dict]:
+    return await db[RUNS_COLLECTION].find_one({}, {"_id": 0}, sort=[("created_at", -1)])
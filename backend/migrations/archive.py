@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tahlil One - cold-data archival
+===============================
+Moves `daily_analysis` rows and completed `forecast_history` rows older
+than the horizon to the archive tier (see archive.py) and rebuilds the
+archived-forecast rollups. Safe to re-run: archived rows are upserted by
+record_id before they are deleted from the hot collection. Run it from the
+backend directory (uses backend/.env), e.g. nightly from cron:
+
+    python -m migrations.archive
+    python -m migrations.archive --horizon-days 180 --dry-run
+    python -m migrations.archive --target parquet --dir /var/lib/tahlil/archive
+    python -m migrations.archive --rebuild-rollups
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from archive import BATCH_SIZE, SOURCES, create_archive_store, rebuild_rollups, run_archive
+from database import DatabaseSettings, create_client
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+async def migrate(args):
+    settings = DatabaseSettings.from_env()
+    client = create_client(settings)
+    db = client[settings.db_name]
+
+    try:
+        await client.admin.command('ping')
+        print(f"✅ Connected to {settings.db_name}\n")
+
+        store = create_archive_store(args.target, db, args.dir)
+        await store.ensure_indexes()
+        if args.rebuild_rollups:
+            instruments = await rebuild_rollups(db, store)
+            print(f"📊 Rebuilt archive rollups for {instruments} instruments")
+            return
+
+        report = await run_archive(db, store, args.horizon_days, sources=args.source or SOURCES,
+                                   batch_size=args.batch_size, dry_run=args.dry_run)
+        verb = "Would archive" if args.dry_run else "Archived"
+        for source, counts in report["sources"].items():
+            print(f"🗄️  {source}: {verb.lower()} {counts['archived']} rows before {report['cutoff']} "
+                  f"(kept {counts['kept_latest']} latest rows)")
+        print(f"\n🎉 {verb} to the {store.kind} tier in {report['elapsed_ms'] / 1000:.2f}s")
+    finally:
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive old daily analysis and forecast history rows')
+    parser.add_argument('--horizon-days', type=float, default=float(os.environ.get('ARCHIVE_HORIZON_DAYS', '365')),
+                        help='Archive rows older than this many days (default: ARCHIVE_HORIZON_DAYS or 365)')
+    parser.add_argument('--target', choices=['collection', 'parquet'], default=None,
+                        help='Archive store (default: ARCHIVE_TARGET or collection)')
+    parser.add_argument('--dir', default=None, help='Directory of the parquet archive (default: ARCHIVE_DIR or archive)')
+    parser.add_argument('--source', choices=SOURCES, action='append', help='Only archive this source (repeatable)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f'Rows per batch (default: {BATCH_SIZE})')
+    parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be archived')
+    parser.add_argument('--rebuild-rollups', action='store_true', help='Only recompute the archived-forecast rollups')
+    args = parser.parse_args()
+
+    load_dotenv(ROOT_DIR / '.env')
+    args.target = args.target or os.environ.get('ARCHIVE_TARGET', 'collection')
+    args.dir = args.dir or os.environ.get('ARCHIVE_DIR')
+    asyncio.run(migrate(args))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tahlil One - daily_analysis time-series migration
+=================================================
+Backfills the `daily_analysis_series` time-series collection from the
+existing `daily_analysis` documents and adds the indexes the sheet sync and
+range queries rely on. Run it from the backend directory (uses backend/.env):
+
+    python -m migrations.daily_analysis_series
+    python -m migrations.daily_analysis_series --rebuild    # drop and recreate the series
+
+The migration is idempotent: without --rebuild, points that already exist
+are replaced rather than duplicated.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from database import DatabaseSettings, create_client
+from daily_series import SERIES_COLLECTION, backfill_series, ensure_series_collection
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+async def migrate(rebuild: bool, batch_size: int):
+    settings = DatabaseSettings.from_env()
+    client = create_client(settings)
+    db = client[settings.db_name]
+
+    try:
+        await client.admin.command('ping')
+        print(f"✅ Connected to {settings.db_name}\n")
+
+        if rebuild:
+            await db.drop_collection(SERIES_COLLECTION)
+            print(f"🗑️  Dropped {SERIES_COLLECTION}")
+
+        storage = await ensure_series_collection(db)
+        print(f"📦 {SERIES_COLLECTION} storage: {storage}")
+
+        await db.daily_analysis.create_index(
+            [("market", 1), ("instrument_code", 1), ("analysis_datetime", 1)],
+            name="market_instrument_datetime"
+        )
+        await db.daily_analysis.create_index([("updated_at", -1)], name="updated_at_desc")
+        print("📇 daily_analysis indexes ensured")
+
+        started = time.perf_counter()
+        total, skipped = await backfill_series(db, batch_size, replace_existing=not rebuild)
+
+        elapsed = time.perf_counter() - started
+        stored = await db[SERIES_COLLECTION].count_documents({})
+        print(f"\n🎉 Migrated {total} points in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} points/s), "
+              f"{skipped} rows skipped, {stored} points stored")
+    finally:
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill the daily_analysis time-series collection')
+    parser.add_argument('--rebuild', action='store_true', help='Drop and recreate the series collection first')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Points per bulk write (default: 1000)')
+    args = parser.parse_args()
+
+    load_dotenv(ROOT_DIR / '.env')
+    asyncio.run(migrate(args.rebuild, args.batch_size))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
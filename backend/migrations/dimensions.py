@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tahlil One - market/instrument dimensions rebuild
+=================================================
+Rebuilds `market_dimensions` and `instrument_dimensions` from the
+`daily_analysis` and `forecast_history` collections. The API keeps them up
+to date and backfills them on startup while they are empty; run this after
+loading data outside the API. Run it from the backend directory (uses
+backend/.env):
+
+    python -m migrations.dimensions
+    python -m migrations.dimensions --source forecast_history
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from database import DatabaseSettings, create_client
+from dimensions import SOURCES, rebuild_dimensions
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+async def migrate(sources):
+    settings = DatabaseSettings.from_env()
+    client = create_client(settings)
+    db = client[settings.db_name]
+
+    try:
+        await client.admin.command('ping')
+        print(f"✅ Connected to {settings.db_name}\n")
+
+        started = time.perf_counter()
+        report = await rebuild_dimensions(db, sources)
+        for source, counts in report.items():
+            print(f"📇 {source}: {counts['markets']} markets, {counts['instruments']} instruments "
+                  f"from {counts['rows']} rows")
+        print(f"\n🎉 Dimensions rebuilt in {time.perf_counter() - started:.2f}s")
+    finally:
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild market and instrument dimensions')
+    parser.add_argument('--source', choices=SOURCES, action='append', help='Only rebuild this source (repeatable)')
+    args = parser.parse_args()
+
+    load_dotenv(ROOT_DIR / '.env')
+    asyncio.run(migrate(args.source or list(SOURCES)))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tahlil One - daily analysis file import
+=======================================
+Loads CSV or XLSX files with the analysis sheet's 7-column layout (Market,
+Stock Code, Insight Type, Date & Time, Analysis Price, Target Price,
+Critical Level) into `daily_analysis`, with the same validation and upserts
+as the Google Sheets sync. Files are streamed, so multi-million-row
+backfills run in bounded memory. Run it from the backend directory (uses
+backend/.env):
+
+    python -m migrations.import_daily_analysis history_2024.csv history_2025.xlsx
+    python -m migrations.import_daily_analysis --format csv --batch-size 5000 export.txt
+
+The API's caches expire within their TTL; restart the workers (or use the
+upload endpoint) to see the rows at once.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from daily_ingest import BATCH_SIZE, detect_format, ingest_file_rows
+from database import DatabaseSettings, create_client
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+async def migrate(paths, fmt, batch_size):
+    settings = DatabaseSettings.from_env()
+    client = create_client(settings)
+    db = client[settings.db_name]
+
+    try:
+        await client.admin.command('ping')
+        print(f"✅ Connected to {settings.db_name}\n")
+
+        for path in paths:
+            file_format = detect_format(path, fmt)
+            started = time.perf_counter()
+
+            async def progress(counts):
+                elapsed = time.perf_counter() - started
+                print(f"   {counts['total_rows']:,} rows ({counts['total_rows'] / max(elapsed, 1e-9):,.0f}/s): "
+                      f"{counts['inserted']:,} inserted, {counts['updated']:,} updated, "
+                      f"{counts['skipped']:,} skipped", end="\r")
+
+            print(f"📥 {path} ({file_format})")
+            with open(path, "rb") as file:
+                result = await ingest_file_rows(db, file, file_format, batch_size=batch_size, progress=progress)
+            print(f"\n   Done in {time.perf_counter() - started:.1f}s: {result['inserted']:,} inserted, "
+                  f"{result['updated']:,} updated, {result['skipped']:,} skipped")
+            for error in result["errors"][:20]:
+                print(f"   ⚠️  {error}")
+            if len(result["errors"]) > 20:
+                print(f"   ... {len(result['errors']) - 20} more")
+        print("\n🎉 Import complete")
+    finally:
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Import daily analysis rows from CSV or XLSX files')
+    parser.add_argument('paths', nargs='+', help='CSV or XLSX files')
+    parser.add_argument('--format', choices=['csv', 'xlsx'], help='File format (default: from the extension)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f'Rows per bulk write (default: {BATCH_SIZE})')
+    args = parser.parse_args()
+
+    load_dotenv(ROOT_DIR / '.env')
+    try:
+        asyncio.run(migrate(args.paths, args.format, args.batch_size))
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ {str(e)}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
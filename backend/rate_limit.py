@@ -0,0 +1,349 @@
+"""
+Per-client rate limiting and admission control.
+
+Every /api request is put in a route class: admin, auth (sign-in and
+subscription self-service), poll (background refreshes), aggregate
+(expensive history/chart aggregations) or default. Each class has:
+
+- a token bucket per client: `rate` requests per second with bursts up to
+  `burst`
+- optionally a cap on concurrent requests per worker (`max_concurrent`)
+
+A client is its session only once get_current_user has verified that session
+on this worker (`VerifiedSessions`); until then, and for any token that was
+never verified, it is the client IP, so made-up tokens do not get fresh
+buckets.
+
+On top of that, admission control sheds load by priority when the worker is
+busy: background requests (the poll class, or any request sent with
+`X-Request-Priority: background`) are refused once in-flight requests reach
+half of `max_in_flight`, normal ones at `max_in_flight`, and requests from
+verified admin sessions are never shed. Refusals are 429 with a Retry-After
+header.
+
+Buckets live in memory per worker. With a shared store (RATE_LIMIT_STORE=
+mongo) the same token buckets are kept in MongoDB, so the limits hold across
+workers at the cost of one round trip.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+STORE_COLLECTION = "rate_limits"
+HIGH, NORMAL, LOW = 0, 1, 2
+# The least recently used buckets are dropped once there are more than this many
+MAX_BUCKETS = 100000
+# How long a session verified by get_current_user keys the rate limits (and sets the priority)
+VERIFIED_SESSION_SECONDS = 60
+
+@dataclass(frozen=True)
+class RouteClass:
+    name: str
+    rate: float
+    burst: float
+    priority: int = NORMAL
+    max_concurrent: Optional[int] = None
+
+DEFAULT_CLASSES = {
+    "admin": RouteClass("admin", rate=20, burst=100),
+    "auth": RouteClass("auth", rate=2, burst=20),
+    "poll": RouteClass("poll", rate=0.5, burst=10, priority=LOW),
+    "aggregate": RouteClass("aggregate", rate=2, burst=20, max_concurrent=8),
+    "default": RouteClass("default", rate=10, burst=50),
+}
+
+POLL_PATHS = ("/api/daily-analysis/last-sync",)
+AGGREGATE_PREFIXES = (
+    "/api/history/analytics", "/api/history/performance", "/api/history/cumulative", "/api/history/summary",
+    "/api/daily-analysis/series", "/api/daily-analysis/chart-data", "/api/daily-analysis/line-chart-data",
+    "/api/daily-analysis/backtest", "/api/catalog",
+)
+
+def classify(path: str) -> str:
+    if path.startswith("/api/admin/"):
+        return "admin"
+    if path.startswith(("/api/auth/", "/api/subscriptions/")):
+        return "auth"
+    if path in POLL_PATHS:
+        return "poll"
+    if path.startswith(AGGREGATE_PREFIXES):
+        return "aggregate"
+    return "default"
+
+def parse_classes(spec: Optional[str]) -> Dict[str, RouteClass]:
+    """RATE_LIMITS="poll=0.5/10,aggregate=2/20:8" -> rate/burst[:max_concurrent] overrides per class."""
+    classes = dict(DEFAULT_CLASSES)
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        try:
+            name, value = item.strip().split("=", 1)
+            limits, _, concurrency = value.partition(":")
+            rate, burst = limits.split("/", 1)
+            base = classes[name]
+            classes[name] = RouteClass(name, float(rate), float(burst), base.priority,
+                                       int(concurrency) if concurrency else base.max_concurrent)
+        except (KeyError, ValueError):
+            raise ValueError(f"Invalid RATE_LIMITS entry: {item}. Expected class=rate/burst[:max_concurrent] "
+                             f"with class one of {', '.join(DEFAULT_CLASSES)}")
+    return classes
+
+def token_digest(token: bytes) -> str:
+    return hashlib.blake2b(token, digest_size=12).hexdigest()
+
+class TokenBuckets:
+    """In-memory token buckets keyed by (client, class), least recently used first."""
+
+    def __init__(self, max_buckets: int = MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()  # -> [tokens, updated_at]
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def take(self, key: Tuple[str, str], rate: float, burst: float, now: Optional[float] = None) -> float:
+        """Takes a token; returns 0 if allowed, else the seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                self._buckets.popitem(last=False)
+            bucket = self._buckets[key] = [burst, now]
+        else:
+            self._buckets.move_to_end(key)
+        tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / rate if rate > 0 else 60.0
+
+class VerifiedSessions:
+    """
+    Sessions get_current_user verified recently, by token digest, with the
+    user's access level. Bounded and least recently used first, like the
+    buckets; entries expire after `ttl_seconds` so a revoked session or a
+    changed role stops counting soon after.
+    """
+
+    def __init__(self, ttl_seconds: float = VERIFIED_SESSION_SECONDS, max_entries: int = MAX_BUCKETS):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._sessions: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # -> (access_level, expires_at)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def remember(self, token: str, access_level: str, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        digest = token_digest(token.encode("utf-8"))
+        self._sessions.pop(digest, None)
+        if len(self._sessions) >= self.max_entries:
+            self._sessions.popitem(last=False)
+        self._sessions[digest] = (access_level, now + self.ttl_seconds)
+
+    def forget(self, token: str):
+        self._sessions.pop(token_digest(token.encode("utf-8")), None)
+
+    def access_level(self, digest: str, now: Optional[float] = None) -> Optional[str]:
+        """The access level of a verified, unexpired session, else None."""
+        entry = self._sessions.get(digest)
+        if entry is None:
+            return None
+        if entry[1] <= (time.monotonic() if now is None else now):
+            del self._sessions[digest]
+            return None
+        self._sessions.move_to_end(digest)
+        return entry[0]
+
+class MongoRateLimitStore:
+    """
+    Shared token buckets: one document per (client, class) holding its tokens
+    and last refill time, refilled and taken from in one atomic update, and
+    expired by a TTL index once it would be full again.
+    """
+
+    def __init__(self, db):
+        self.collection = db[STORE_COLLECTION]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def take(self, key: Tuple[str, str], rate: float, burst: float, now: Optional[float] = None) -> float:
+        """Takes a token; returns 0 if allowed, else the seconds until one is available."""
+        now = time.time() if now is None else now
+        # Workers' clocks may disagree slightly; time never runs backwards for a bucket
+        elapsed = {"$max": [0, {"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}]}
+        refilled = {"$min": [burst, {"$add": [{"$ifNull": ["$tokens", burst]}, {"$multiply": [elapsed, rate]}]}]}
+        # A missing bucket is a full one, so the document can go once it would have refilled
+        full_after = burst / rate if rate > 0 else 3600
+        doc = await self.collection.find_one_and_update(
+            {"_id": f"{key[0]}:{key[1]}"},
+            [
+                {"$set": {"tokens": refilled, "updated_at": {"$max": [now, {"$ifNull": ["$updated_at", now]}]}}},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {
+                    "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expires_at": datetime.fromtimestamp(now + full_after + 60, timezone.utc),
+                }},
+            ],
+            upsert=True, return_document=ReturnDocument.AFTER
+        )
+        if doc["allowed"]:
+            return 0.0
+        return (1 - doc["tokens"]) / rate if rate > 0 else 60.0
+
+class RateLimiter:
+    def __init__(self, classes: Optional[Dict[str, RouteClass]] = None, max_in_flight: int = 200,
+                 enabled: bool = True):
+        self.classes = classes or dict(DEFAULT_CLASSES)
+        self.max_in_flight = max_in_flight
+        self.enabled = enabled
+        self.buckets = TokenBuckets()
+        self.sessions = VerifiedSessions()
+        self.store: Optional[MongoRateLimitStore] = None
+        self.in_flight = 0
+        self._class_in_flight: Dict[str, int] = {name: 0 for name in self.classes}
+        self.rejected = {"rate_limited": 0, "concurrency": 0, "overloaded": 0}
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        return cls(
+            classes=parse_classes(os.environ.get("RATE_LIMITS")),
+            max_in_flight=int(os.environ.get("RATE_LIMIT_MAX_IN_FLIGHT", "200")),
+            enabled=os.environ.get("RATE_LIMIT_ENABLED", "true").lower() not in ("0", "false", "no"),
+        )
+
+    async def admit(self, client_key: str, class_name: str, background: bool = False,
+                    access_level: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """
+        Decide on one request. `access_level` is that of the verified session,
+        if any; admins are never shed. Returns None when admitted (the caller
+        must call release() when it finishes) or (reason, retry_after_seconds).
+        """
+        route_class = self.classes[class_name]
+        if access_level == "admin":
+            priority = HIGH
+        else:
+            priority = LOW if background else route_class.priority
+
+        if priority == LOW and self.in_flight >= self.max_in_flight // 2:
+            self.rejected["overloaded"] += 1
+            return "overloaded", 1.0
+        if priority == NORMAL and self.in_flight >= self.max_in_flight:
+            self.rejected["overloaded"] += 1
+            return "overloaded", 1.0
+        if route_class.max_concurrent is not None and priority != HIGH and \
+                self._class_in_flight[class_name] >= route_class.max_concurrent:
+            self.rejected["concurrency"] += 1
+            return "concurrency", 1.0
+
+        key = (client_key, class_name)
+        retry_after = None
+        if self.store is not None:
+            try:
+                retry_after = await self.store.take(key, route_class.rate, route_class.burst)
+            except Exception as e:
+                # The shared store is an optimisation; fall back to this worker's buckets
+                logger.warning(f"Rate limit store failed, using in-memory buckets: {str(e)}")
+        if retry_after is None:
+            retry_after = self.buckets.take(key, route_class.rate, route_class.burst)
+        if retry_after > 0:
+            self.rejected["rate_limited"] += 1
+            return "rate_limited", retry_after
+
+        self.in_flight += 1
+        self._class_in_flight[class_name] += 1
+        return None
+
+    def release(self, class_name: str):
+        self.in_flight -= 1
+        self._class_in_flight[class_name] -= 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "store": "mongo" if self.store is not None else "memory",
+            "in_flight": self.in_flight,
+            "in_flight_by_class": dict(self._class_in_flight),
+            "clients_tracked": len(self.buckets),
+            "verified_sessions": len(self.sessions),
+            "rejected": dict(self.rejected),
+        }
+
+def client_key(scope, sessions: Optional[VerifiedSessions] = None) -> Tuple[str, Optional[str]]:
+    """
+    (key, access level): the session (hashed) if the request carries one
+    that `sessions` has verified, else the client IP and no access level.
+    """
+    token = None
+    for name, value in scope.get("headers", []):
+        if name == b"authorization" and value.startswith(b"Bearer "):
+            token = value[7:]
+        elif name == b"cookie" and token is None:
+            for part in value.split(b";"):
+                key, _, cookie_value = part.strip().partition(b"=")
+                if key == b"session_token" and cookie_value:
+                    token = cookie_value
+    if token and sessions is not None:
+        digest = token_digest(token)
+        access_level = sessions.access_level(digest)
+        if access_level is not None:
+            return "s:" + digest, access_level
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown"), None
+
+class AdmissionControlMiddleware:
+    """Applies a RateLimiter to /api requests."""
+
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not self.limiter.enabled or not path.startswith("/api/") or \
+                scope.get("method") == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        class_name = classify(path)
+        background = any(name == b"x-request-priority" and value.lower() == b"background"
+                         for name, value in scope.get("headers", []))
+        key, access_level = client_key(scope, self.limiter.sessions)
+        refusal = await self.limiter.admit(key, class_name, background, access_level)
+        if refusal is not None:
+            reason, retry_after = refusal
+            await _too_many_requests(send, reason, retry_after)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(class_name)
+
+async def _too_many_requests(send, reason: str, retry_after: float):
+    detail = "Too many requests" if reason == "rate_limited" else "Server busy, retry shortly"
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
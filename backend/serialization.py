@@ -0,0 +1,103 @@
+"""
+Fast-path serialization for read-only responses.
+
+Data read straight from MongoDB with a known projection needs neither
+Pydantic validation nor FastAPI's jsonable_encoder walk, which together
+cost more than the query for endpoints returning hundreds of rows. Two
+tools replace them on the hot read paths:
+
+- `dumps` encodes plain documents in one call, with orjson when it is
+  installed and the json module otherwise. `json_response` wraps the bytes
+  in a Response, which FastAPI sends as is. The cached endpoints store these
+  bytes, so a cache hit does no encoding at all.
+- `record_type(Model)` builds a `__slots__` class with the model's fields
+  and defaults. `Record.from_doc` fills one from a trusted document without
+  validation. `get_current_user` uses it for the user read on every request.
+
+Pydantic models stay in use for request bodies and for write paths.
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Tuple, Type
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "item"):
+        # numpy scalars
+        return value.item()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)  # ObjectId and other BSON scalars
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def json_response(content: Any = None, body: bytes = None, status_code: int = 200, headers=None) -> Response:
+    """A JSON response from `content`, or from `body` when it is already encoded."""
+    return Response(content=dumps(content) if body is None else body, status_code=status_code,
+                    media_type="application/json", headers=headers)
+
+class Record:
+    """Read-only view of a document with fixed fields; see record_type."""
+
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+    _defaults: Dict[str, Any] = {}
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "Record":
+        record = cls.__new__(cls)
+        defaults = cls._defaults
+        for field in cls._fields:
+            setattr(record, field, doc.get(field, defaults.get(field)))
+        return record
+
+    def model_dump(self) -> dict:
+        return {field: getattr(self, field) for field in self._fields}
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self.model_dump() == other.model_dump()
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+def record_type(model) -> Type[Record]:
+    """A slotted Record class with the fields and defaults of the Pydantic `model`."""
+    fields = tuple(model.model_fields)
+    defaults = {
+        name: info.default for name, info in model.model_fields.items()
+        if not info.is_required() and info.default_factory is None
+    }
+    return type(f"{model.__name__}Record", (Record,), {
+        "__slots__": fields,
+        "_fields": fields,
+        "_defaults": defaults,
+        "__doc__": f"Unvalidated {model.__name__} read from the database.",
+    })
+
+def project(model, doc: dict) -> dict:
+    """`doc` reduced to the fields of `model` (defaults filled in), as model_dump() would return it."""
+    return record_type_for(model).from_doc(doc).model_dump()
+
+_record_types: Dict[type, Type[Record]] = {}
+
+def record_type_for(model) -> Type[Record]:
+    record = _record_types.get(model)
+    if record is None:
+        record = _record_types[model] = record_type(model)
+    return record
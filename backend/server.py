@@ -1,30 +1,276 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Request, Response
-from fastapi.responses import RedirectResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import csv
+import shutil
+import tempfile
+import asyncio
 import logging
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional
 import uuid
 import secrets
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone, timedelta
 import httpx
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+from pymongo import ReturnDocument
 from urllib.parse import urlencode
+from database import DatabaseSettings, PoolMetrics, create_client
+from cache import InvalidationBus, ProcessCache, create_bus
+from catalog import CatalogCache
+from columnar_export import (
+    FORMATS as EXPORT_FORMATS, arrow_schema, export_query, projection as export_projection, stream_export
+)
+from archive import (
+    ROLLUPS_COLLECTION as ARCHIVE_ROLLUPS_COLLECTION, RUNS_COLLECTION as ARCHIVE_RUNS_COLLECTION, SOURCES as ARCHIVE_SOURCES,
+    archived_forecast_rollups, create_archive_store, ensure_tombstone_index, merge_rows, rollup_totals, run_archive
+)
+from rate_limit import AdmissionControlMiddleware, MongoRateLimitStore, RateLimiter
+from sessions import (
+    SESSION_TTL, RevocationList, SessionError, SessionExpired, SessionSigner, ensure_revocation_indexes,
+    is_signed_token, user_fields
+)
+from google_oauth import (
+    GOOGLE_AUTH_URL, GOOGLE_JWKS_URL, GOOGLE_TOKEN_URL, GOOGLE_USERINFO_URL, GoogleOAuth, IdTokenError, OAuthError,
+    create_http_client
+)
+from user_directory import build_filter, count_users, ensure_user_directory, list_users, search_fields
+import tracing
+from tracing import MongoCommandTracer, TracingMiddleware, TracingSettings
+from serialization import dumps, json_response, project, record_type
+from sheets_client import (
+    DRIVE_API_URL, SHEETS_API_URL, CircuitBreaker, QuotaBudget, ServiceAccountTokens, SheetsClient, SheetsError,
+    SheetsUnavailable
+)
+from sync_state import (
+    STATE_COLLECTION as SYNC_STATE_COLLECTION, drive_fingerprint, get_state as get_sync_state,
+    is_unchanged, record_skip, record_sync, sheets_source_key
+)
+from subscriptions import (
+    JOBS_COLLECTION as SUBSCRIPTION_JOBS_COLLECTION, MAX_BULK_EMAILS, apply_bulk, get_job as get_subscription_job,
+    parse_email_file, start_bulk_job, subscription_changes, validate_request
+)
+from dimensions import (
+    INSTRUMENTS_COLLECTION as INSTRUMENT_DIMENSIONS, MARKETS_COLLECTION as MARKET_DIMENSIONS, DimensionUpdates,
+    ensure_dimension_indexes, list_instruments, list_markets, rebuild_dimensions
+)
+from forecast_resolution import (
+    apply_forecast_results, compute_forecast_result, iter_result_rows, iterate_in_threadpool,
+    latest_prices_from_daily_analysis, parse_price_file, resolve_pending_forecasts
+)
+from forecast_analytics import compute_analytics, load_forecast_series
+from insight_backtest import (
+    INSTRUMENTS_COLLECTION as BACKTEST_INSTRUMENTS_COLLECTION, default_workers as default_backtest_workers, latest_run,
+    run_backtest
+)
+from daily_ingest import (
+    JOBS_COLLECTION as DAILY_IMPORT_JOBS_COLLECTION, detect_format, get_import_job, ingest_file_rows, ingest_rows,
+    start_import_job
+)
+from daily_series import (
+    MAX_BUCKETS, SERIES_COLLECTION, ensure_series_collection, parse_bucket, series_pipeline
+)
 
 ROOT_DIR = Path(__file__).parent
+# Only reads a small file; CORS origins and OAuth settings below need it
+# before the app object is built.
 load_dotenv(ROOT_DIR / '.env')
 
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+logger = logging.getLogger(__name__)
+
+# Created by the lifespan handler so importing this module has no I/O side effects
+client: Optional[AsyncIOMotorClient] = None
+db = None
+db_settings: Optional[DatabaseSettings] = None
+pool_metrics: Optional[PoolMetrics] = None
+_analytics_collections = {}
+# Pooled keep-alive client for outbound calls (Google OAuth), owned by the lifespan
+http_client: Optional[httpx.AsyncClient] = None
+# Sheets API reads for the sync (retries, quota budget, circuit breaker), created by the lifespan
+sheets_client: Optional[SheetsClient] = None
+SHEETS_CHUNK_ROWS = int(os.environ.get('SHEETS_CHUNK_ROWS', '10000'))
+google_oauth: Optional[GoogleOAuth] = None
+
+# "database": sessions are looked up in user_sessions; "signed": self-contained signed tokens (see sessions.py)
+SESSION_MODE = os.environ.get('SESSION_MODE', 'database')
+session_signer: Optional[SessionSigner] = None
+# Per-client token buckets and load shedding for /api requests (see rate_limit.py)
+rate_limiter = RateLimiter.from_env()
+session_revocations = RevocationList(sync_seconds=float(os.environ.get('SESSION_REVOCATION_SYNC_SECONDS', '5')))
+
+# Per-worker cache of dashboard reads, dropped on writes from any worker
+CACHE_TOPICS = ["daily_analysis", "forecast_history", "insight_backtests"]
+response_cache = ProcessCache(
+    ttl_seconds=float(os.environ.get('CACHE_TTL_SECONDS', '30')),
+    max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', '10000'))
+)
+invalidation_bus: Optional[InvalidationBus] = None
+# Risk/return analytics scan all completed forecasts, so they are kept until the
+# next forecast_history invalidation rather than for the short default TTL
+ANALYTICS_CACHE_TTL_SECONDS = float(os.environ.get('ANALYTICS_CACHE_TTL_SECONDS', '300'))
+
+# Insight backtest processes per web worker (default: the cores divided between the WEB_CONCURRENCY workers)
+BACKTEST_WORKERS = int(os.environ.get('BACKTEST_WORKERS') or default_backtest_workers(int(os.environ.get('WEB_CONCURRENCY', '1'))))
+_backtest_lock = asyncio.Lock()
+# Created by the lifespan and shut down with it
+backtest_pool: Optional[ProcessPoolExecutor] = None
+
+# Cold tier for old daily_analysis/forecast_history rows (see archive.py), created by the lifespan
+archive_store = None
+ARCHIVE_HORIZON_DAYS = float(os.environ.get('ARCHIVE_HORIZON_DAYS', '365'))
+_archive_lock = asyncio.Lock()
+
+# Uploads larger than this are imported by a background job
+DAILY_IMPORT_INLINE_MAX_BYTES = int(os.environ.get('DAILY_IMPORT_INLINE_MAX_BYTES', str(2 * 1024 * 1024)))
+
+# Rows per record batch / row group of the columnar export
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '50000'))
+
+# Bulk subscription batches larger than this run as a background job
+BULK_SUBSCRIPTION_INLINE_LIMIT = int(os.environ.get('BULK_SUBSCRIPTION_INLINE_LIMIT', '1000'))
+
+def analytics(collection_name: str):
+    """
+    Collection handle for read-only dashboard queries (history, charts).
+    Uses the configured analytics read preference, so these reads can be
+    served by secondaries. Never use it for read-after-write.
+    """
+    collection = _analytics_collections.get(collection_name)
+    if collection is None:
+        collection = db.get_collection(
+            collection_name,
+            read_preference=db_settings.analytics_read_preference_for(collection_name)
+        )
+        _analytics_collections[collection_name] = collection
+    return collection
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global client, db, db_settings, pool_metrics, invalidation_bus, http_client, google_oauth, session_signer
+    global archive_store, sheets_client, backtest_pool
+    db_settings = DatabaseSettings.from_env()
+    tracing_settings = TracingSettings.from_env()
+    tracing.configure(tracing_settings)
+    if SESSION_MODE == "signed":
+        session_signer = SessionSigner.from_env()
+    elif SESSION_MODE != "database":
+        raise ValueError(f"Invalid SESSION_MODE: {SESSION_MODE}. Expected 'database' or 'signed'")
+    pool_metrics = PoolMetrics(db_settings.max_pool_size)
+    client = create_client(db_settings, pool_metrics,
+                           listeners=[MongoCommandTracer()] if tracing_settings.enabled else [])
+    db = client[db_settings.db_name]
+    _analytics_collections.clear()
+    http_client = create_http_client()
+    google_oauth = GoogleOAuth(
+        http_client, GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, GOOGLE_REDIRECT_URI,
+        token_url=os.environ.get('GOOGLE_TOKEN_URL', GOOGLE_TOKEN_URL),
+        userinfo_url=os.environ.get('GOOGLE_USERINFO_URL', GOOGLE_USERINFO_URL),
+        jwks_url=os.environ.get('GOOGLE_JWKS_URL', GOOGLE_JWKS_URL)
+    )
+    
+    sheets_client = SheetsClient(
+        http_client,
+        ServiceAccountTokens(http_client, os.environ.get('GOOGLE_SHEETS_CREDENTIALS'),
+                             token_url=os.environ.get('SHEETS_TOKEN_URL')),
+        api_url=os.environ.get('SHEETS_API_URL', SHEETS_API_URL),
+        drive_url=os.environ.get('DRIVE_API_URL', DRIVE_API_URL),
+        quota=QuotaBudget(int(os.environ.get('SHEETS_QUOTA_PER_MINUTE', '60'))),
+        breaker=CircuitBreaker(int(os.environ.get('SHEETS_BREAKER_FAILURES', '5')),
+                               float(os.environ.get('SHEETS_BREAKER_RESET_SECONDS', '60')))
+    )
+    
+    # Warm up the pool so the first request doesn't pay for server selection
+    try:
+        await client.admin.command('ping')
+        logger.info("MongoDB connection established")
+    except Exception as e:
+        logger.warning(f"MongoDB warm-up ping failed: {str(e)}")
+    
+    try:
+        # Batch analysis lookups ($in on asset_id) and the catalog $lookup
+        await db.analyses.create_index("asset_id")
+        await db.assets.create_index("market_id")
+    except Exception as e:
+        logger.warning(f"Could not ensure catalog indexes: {str(e)}")
+    
+    try:
+        # The upsert key of the sheet sync and file imports
+        await db.daily_analysis.create_index(
+            [("market", 1), ("instrument_code", 1), ("analysis_datetime", 1)], name="market_instrument_datetime"
+        )
+        await db[DAILY_IMPORT_JOBS_COLLECTION].create_index("job_id", unique=True)
+        await db[SYNC_STATE_COLLECTION].create_index("source", unique=True)
+    except Exception as e:
+        logger.warning(f"Could not ensure daily analysis indexes: {str(e)}")
+    
+    try:
+        await ensure_user_directory(db)
+        await db[SUBSCRIPTION_JOBS_COLLECTION].create_index("job_id", unique=True)
+        if session_signer is not None:
+            await ensure_revocation_indexes(db)
+    except Exception as e:
+        logger.warning(f"Could not prepare the user directory: {str(e)}")
+    
+    try:
+        await ensure_dimension_indexes(db)
+        if await db[MARKET_DIMENSIONS].estimated_document_count() == 0:
+            report = await rebuild_dimensions(db)
+            logger.info(f"Backfilled market/instrument dimensions: {report}")
+    except Exception as e:
+        logger.warning(f"Could not prepare market/instrument dimensions: {str(e)}")
+    
+    try:
+        storage = await ensure_series_collection(db)
+        logger.info(f"{SERIES_COLLECTION} storage: {storage}")
+    except RuntimeError:
+        # The series cannot be kept in sync on this server; refuse to start rather than duplicate points
+        raise
+    except Exception as e:
+        logger.warning(f"Could not prepare {SERIES_COLLECTION}: {str(e)}")
+    
+    archive_store = create_archive_store(os.environ.get('ARCHIVE_TARGET', 'collection'), db, os.environ.get('ARCHIVE_DIR'))
+    try:
+        await archive_store.ensure_indexes()
+        await ensure_tombstone_index(db)
+    except Exception as e:
+        logger.warning(f"Could not prepare the {archive_store.kind} archive: {str(e)}")
+    
+    rate_limit_store = os.environ.get('RATE_LIMIT_STORE', 'memory')
+    if rate_limit_store == "mongo":
+        rate_limiter.store = MongoRateLimitStore(db)
+        try:
+            await rate_limiter.store.ensure_indexes()
+        except Exception as e:
+            logger.warning(f"Could not ensure rate limit indexes: {str(e)}")
+    elif rate_limit_store != "memory":
+        raise ValueError(f"Invalid RATE_LIMIT_STORE: {rate_limit_store}. Expected 'memory' or 'mongo'")
+    
+    invalidation_bus = create_bus(os.environ.get('CACHE_BUS', 'local'), db)
+    for topic in CACHE_TOPICS:
+        invalidation_bus.subscribe(topic, response_cache.invalidate)
+    invalidation_bus.subscribe("catalog", catalog_cache.invalidate)
+    invalidation_bus.subscribe("sessions", session_revocations.invalidate)
+    await invalidation_bus.start()
+    # Processes start on the first backtest
+    backtest_pool = ProcessPoolExecutor(max_workers=BACKTEST_WORKERS)
+    
+    try:
+        yield
+    finally:
+        backtest_pool.shutdown(wait=False, cancel_futures=True)
+        await invalidation_bus.stop()
+        await http_client.aclose()
+        client.close()
+        tracing.shutdown()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
 
 class User(BaseModel):
@@ -41,6 +287,9 @@ class User(BaseModel):
     subscription_end_date: Optional[str] = None
     created_at: str
 
+# get_current_user's fast path: the stored user without re-validation
+UserRecord = record_type(User)
+
 class SessionData(BaseModel):
     id: str
     email: str
@@ -116,13 +365,18 @@ class DailyAnalysis(BaseModel):
 class GoogleSheetsConfig(BaseModel):
     spreadsheet_id: str
     range_name: str = "Sheet1!A2:G"
+    force: bool = False  # sync even if the sheet is unchanged since the last sync
 
 class SyncResult(BaseModel):
     total_rows: int
     inserted: int
     updated: int
     skipped: int
+    archived: int = 0  # rows already moved to the archive tier, which are not re-added
+    write_failures: int = 0  # rows (or stages) whose database write failed; such a sync isn't recorded
     errors: List[str]
+    unchanged: bool = False  # the sheet was unchanged, so nothing was fetched
+    skipped_syncs: int = 0  # syncs of this sheet skipped as unchanged so far
 
 # History of Success Models
 class ForecastHistory(BaseModel):
@@ -158,16 +412,29 @@ class ForecastUpdate(BaseModel):
     result_date: str
     notes: Optional[str] = None
 
-async def get_current_user(request: Request) -> Optional[User]:
+async def get_current_user(request: Request) -> Optional[UserRecord]:
+    with tracing.span("get_current_user"):
+        session_token = request_session_token(request)
+        user = await resolve_current_user(request, session_token)
+    # Later requests with this session are rate limited per session, at the user's priority
+    rate_limiter.sessions.remember(session_token, user.access_level)
+    return user
+
+def request_session_token(request: Request) -> Optional[str]:
     session_token = request.cookies.get("session_token")
     if not session_token:
         auth_header = request.headers.get("Authorization")
         if auth_header and auth_header.startswith("Bearer "):
             session_token = auth_header.split(" ")[1]
-    
+    return session_token
+
+async def resolve_current_user(request: Request, session_token: Optional[str]) -> Optional[UserRecord]:
     if not session_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
+    if session_signer is not None and is_signed_token(session_token):
+        return await get_signed_session_user(request, session_token)
+    
     session_doc = await db.user_sessions.find_one({"session_token": session_token}, {"_id": 0})
     if not session_doc:
         raise HTTPException(status_code=401, detail="Invalid session")
@@ -184,8 +451,9 @@ async def get_current_user(request: Request) -> Optional[User]:
     if not user_doc:
         raise HTTPException(status_code=401, detail="User not found")
     
-    user = User(**user_doc)
-    
+    return await expire_ended_subscription(UserRecord.from_doc(user_doc))
+
+async def expire_ended_subscription(user: UserRecord) -> UserRecord:
     if user.subscription_end_date:
         end_date = datetime.fromisoformat(user.subscription_end_date)
         if end_date.tzinfo is None:
@@ -201,7 +469,66 @@ async def get_current_user(request: Request) -> Optional[User]:
     
     return user
 
-def check_subscription_access(user: User, required_access: str = "any") -> bool:
+async def get_signed_session_user(request: Request, session_token: str) -> UserRecord:
+    """
+    Signed mode: the user comes from the token's claims, without a database
+    read, unless the claims are stale (subscription changed or ended since
+    the token was issued) or grant admin access. Then the user is re-read,
+    and a fresh token is sent back with the response if the claims changed.
+    Admin tokens are always re-checked because roles are changed in the
+    database directly, which puts nothing on the revocation list.
+    """
+    try:
+        claims = session_signer.verify(session_token)
+    except SessionExpired:
+        raise HTTPException(status_code=401, detail="Session expired")
+    except SessionError:
+        raise HTTPException(status_code=401, detail="Invalid session")
+    
+    try:
+        await session_revocations.maybe_sync(db)
+    except Exception as e:
+        logger.warning(f"Session revocation sync failed, using the cached list: {str(e)}")
+    if session_revocations.is_revoked(claims):
+        raise HTTPException(status_code=401, detail="Session revoked")
+    
+    ended = claims["sst"] == "active" and claims["sed"] is not None and claims["sed"] < time.time()
+    stale = ended or session_revocations.needs_refresh(claims)
+    if not stale and claims["lvl"] != "admin":
+        request.state.session_claims = claims
+        # Profile fields are not in the token; /auth/me reads them from the database
+        return UserRecord.from_doc(
+            {"google_user_id": "", "email": "", "name": "", "picture": "", "created_at": "", **user_fields(claims)}
+        )
+    
+    user_doc = await db.users.find_one({"user_id": claims["uid"]}, {"_id": 0})
+    if not user_doc:
+        raise HTTPException(status_code=401, detail="User not found")
+    user = await expire_ended_subscription(UserRecord.from_doc(user_doc))
+    if stale or user.access_level != claims["lvl"]:
+        session_token, _ = session_signer.issue(user.model_dump(), claims["sid"], claims["exp"])
+        request.state.session_cookie = (session_token, int(claims["exp"] - time.time()))
+    return user
+
+async def refresh_sessions(user_ids: List[str]):
+    """Signed mode: make existing tokens of these users re-read their claims after a subscription change."""
+    if session_signer is None or not user_ids:
+        return
+    await session_revocations.add_many(db, "refresh", user_ids)
+    await invalidation_bus.publish("sessions")
+
+def set_session_cookie(response: Response, session_token: str, max_age: int = int(SESSION_TTL.total_seconds())):
+    response.set_cookie(
+        key="session_token",
+        value=session_token,
+        httponly=True,
+        secure=False,  # Set to False for localhost
+        samesite="lax",
+        path="/",
+        max_age=max_age
+    )
+
+def check_subscription_access(user: UserRecord, required_access: str = "any") -> bool:
     if user.access_level == "admin":
         return True
     
@@ -224,37 +551,6 @@ def check_subscription_access(user: User, required_access: str = "any") -> bool:
     
     return user_level >= required_level
 
-def parse_datetime_string(date_str: str) -> str:
-    try:
-        parts = date_str.strip().replace('[', '').replace(']', '').split()
-        if len(parts) >= 2:
-            date_part = parts[0]
-            time_part = parts[1] if len(parts) > 1 else "00:00:00"
-        else:
-            date_part = parts[0]
-            time_part = "00:00:00"
-        
-        day, month, year = date_part.split('.')
-        dt = datetime.strptime(f"{year}-{month}-{day} {time_part}", "%Y-%m-%d %H:%M:%S")
-        dt = dt.replace(tzinfo=timezone.utc)
-        return dt.isoformat()
-    except Exception as e:
-        raise ValueError(f"Invalid datetime format: {date_str}. Expected DD.MM.YYYY [HH:MM:SS]")
-
-def get_sheets_service():
-    credentials_json = os.environ.get('GOOGLE_SHEETS_CREDENTIALS')
-    if not credentials_json:
-        raise ValueError("GOOGLE_SHEETS_CREDENTIALS environment variable not set")
-    
-    import json
-    credentials_dict = json.loads(credentials_json)
-    credentials = service_account.Credentials.from_service_account_info(
-        credentials_dict,
-        scopes=['https://www.googleapis.com/auth/spreadsheets.readonly']
-    )
-    
-    return build('sheets', 'v4', credentials=credentials)
-
 # Google OAuth Configuration
 GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID')
 GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET')
@@ -272,40 +568,20 @@ async def google_login():
         'access_type': 'offline',
         'prompt': 'consent'
     }
-    google_auth_url = f"https://accounts.google.com/o/oauth2/v2/auth?{urlencode(params)}"
+    google_auth_url = f"{os.environ.get('GOOGLE_AUTH_URL', GOOGLE_AUTH_URL)}?{urlencode(params)}"
     return RedirectResponse(url=google_auth_url)
 
 @api_router.get("/auth/google/callback")
 async def google_callback(code: str, response: Response):
     """Handle Google OAuth callback"""
-    # Exchange code for tokens
-    token_url = "https://oauth2.googleapis.com/token"
-    token_data = {
-        'client_id': GOOGLE_CLIENT_ID,
-        'client_secret': GOOGLE_CLIENT_SECRET,
-        'code': code,
-        'grant_type': 'authorization_code',
-        'redirect_uri': GOOGLE_REDIRECT_URI
-    }
-    
-    async with httpx.AsyncClient() as client:
-        token_response = await client.post(token_url, data=token_data)
-        if token_response.status_code != 200:
-            raise HTTPException(status_code=400, detail="Failed to get access token")
-        
-        tokens = token_response.json()
-        access_token = tokens.get('access_token')
-        
-        # Get user info from Google
-        userinfo_response = await client.get(
-            "https://www.googleapis.com/oauth2/v2/userinfo",
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
-        
-        if userinfo_response.status_code != 200:
-            raise HTTPException(status_code=400, detail="Failed to get user info")
-        
-        user_info = userinfo_response.json()
+    try:
+        user_info = await google_oauth.sign_in(code)
+    except IdTokenError as e:
+        logger.warning(f"Google sign-in failed: {str(e)}")
+        raise HTTPException(status_code=401, detail=str(e))
+    except OAuthError as e:
+        logger.warning(f"Google sign-in failed: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
     
     google_user_id = user_info.get('id')
     email = user_info.get('email')
@@ -322,7 +598,8 @@ async def google_callback(code: str, response: Response):
             {"$set": {
                 "email": email,
                 "name": name,
-                "picture": picture
+                "picture": picture,
+                **search_fields(email, name)
             }}
         )
     else:
@@ -338,31 +615,28 @@ async def google_callback(code: str, response: Response):
             "subscription_status": "none",
             "subscription_start_date": None,
             "subscription_end_date": None,
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            **search_fields(email, name)
         })
     
     # Create session
-    session_token = secrets.token_urlsafe(32)
-    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
-    
-    await db.user_sessions.insert_one({
-        "user_id": user_id,
-        "session_token": session_token,
-        "expires_at": expires_at,
-        "created_at": datetime.now(timezone.utc)
-    })
+    if session_signer is not None:
+        session_user = existing_user or await db.users.find_one({"user_id": user_id}, {"_id": 0})
+        session_token, _ = session_signer.issue(session_user)
+    else:
+        session_token = secrets.token_urlsafe(32)
+        expires_at = datetime.now(timezone.utc) + SESSION_TTL
+        
+        await db.user_sessions.insert_one({
+            "user_id": user_id,
+            "session_token": session_token,
+            "expires_at": expires_at,
+            "created_at": datetime.now(timezone.utc)
+        })
     
     # Create redirect response with cookie
     redirect_response = RedirectResponse(url=f"{FRONTEND_URL}/dashboard", status_code=302)
-    redirect_response.set_cookie(
-        key="session_token",
-        value=session_token,
-        httponly=True,
-        secure=False,  # Set to False for localhost
-        samesite="lax",
-        path="/",
-        max_age=7*24*60*60
-    )
+    set_session_cookie(redirect_response, session_token)
     
     return redirect_response
 
@@ -382,12 +656,26 @@ async def create_session(request: Request, response: Response):
 @api_router.get("/auth/me")
 async def get_me(request: Request):
     user = await get_current_user(request)
-    return user
+    if getattr(request.state, "session_claims", None):
+        user_doc = await db.users.find_one({"user_id": user.user_id}, {"_id": 0})
+        if not user_doc:
+            raise HTTPException(status_code=401, detail="User not found")
+        user = UserRecord.from_doc(user_doc)
+    return json_response(user.model_dump())
 
 @api_router.post("/auth/logout")
 async def logout(request: Request, response: Response):
     session_token = request.cookies.get("session_token")
     if session_token:
+        rate_limiter.sessions.forget(session_token)
+    if session_token and session_signer is not None and is_signed_token(session_token):
+        try:
+            claims = session_signer.verify(session_token)
+            await session_revocations.add(db, "session", claims["uid"], claims["sid"], expires_at=claims["exp"])
+            await invalidation_bus.publish("sessions")
+        except SessionError:
+            pass
+    elif session_token:
         await db.user_sessions.delete_one({"session_token": session_token})
     response.delete_cookie(key="session_token", path="/")
     return {"message": "Logged out"}
@@ -417,6 +705,7 @@ async def activate_subscription(subscription: SubscriptionUpdate, request: Reque
     )
     
     updated_user = await db.users.find_one({"user_id": user.user_id}, {"_id": 0})
+    await refresh_sessions([user.user_id])
     return User(**updated_user)
 
 @api_router.get("/subscriptions/status")
@@ -452,8 +741,44 @@ async def get_all_users(request: Request):
     if user.access_level != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    users = await db.users.find({}, {"_id": 0}).to_list(1000)
-    return users
+    users = await db.users.find({}, {"_id": 0, "search_email": 0, "search_name": 0}).to_list(1000)
+    return json_response(users)
+
+@api_router.get("/admin/users/directory")
+async def get_user_directory(
+    request: Request,
+    q: Optional[str] = None,
+    subscription_type: Optional[str] = None,
+    subscription_status: Optional[str] = None,
+    access_level: Optional[str] = None,
+    expires_after: Optional[str] = None,
+    expires_before: Optional[str] = None,
+    expires_within_days: Optional[int] = None,
+    sort: str = "created_at",
+    order: str = "desc",
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    include_counts: bool = True
+):
+    """
+    Admin: Search and filter users with cursor pagination. `q` is a prefix
+    of the email or name; comma-separated filter values match any of them.
+    Counts per status and tier (for the same filters) come with the first page.
+    """
+    user = await get_current_user(request)
+    if user.access_level != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        query = build_filter(q, subscription_type, subscription_status, access_level,
+                             expires_after, expires_before, expires_within_days)
+        page = await list_users(db.users, query, sort, order, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if include_counts and not cursor:
+        page["counts"] = await count_users(db.users, query)
+    return page
 
 @api_router.post("/admin/users/subscription")
 async def admin_manage_subscription(control: AdminSubscriptionControl, request: Request):
@@ -464,77 +789,130 @@ async def admin_manage_subscription(control: AdminSubscriptionControl, request:
     if control.subscription_type not in ["Beginner", "Advanced", "Premium"]:
         raise HTTPException(status_code=400, detail="Invalid subscription type")
     
-    target_user = await db.users.find_one({"email": control.user_email}, {"_id": 0})
+    target_user = await db.users.find_one({"email": control.user_email}, {"_id": 0, "user_id": 1, "subscription_end_date": 1})
     if not target_user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    now = datetime.now(timezone.utc)
-    
-    if control.action == "activate":
-        end_date = now + timedelta(days=control.duration_days)
-        await db.users.update_one(
-            {"email": control.user_email},
-            {"$set": {
-                "subscription_type": control.subscription_type,
-                "subscription_status": "active",
-                "subscription_start_date": now.isoformat(),
-                "subscription_end_date": end_date.isoformat()
-            }}
-        )
+    try:
+        changes = subscription_changes(control.action, control.subscription_type, control.duration_days,
+                                       target_user.get("subscription_end_date"), datetime.now(timezone.utc))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    updated_user = await db.users.find_one_and_update(
+        {"email": control.user_email}, {"$set": changes},
+        projection={"_id": 0}, return_document=ReturnDocument.AFTER
+    )
+    await refresh_sessions([updated_user["user_id"]])
+    return User(**updated_user)
+
+class AdminBulkSubscriptionControl(BaseModel):
+    user_emails: List[str]
+    subscription_type: str = ""
+    duration_days: int = 0
+    action: str
+
+async def run_bulk_subscription(emails: List[str], action: str, subscription_type: str, duration_days: int, admin):
+    if len(emails) > MAX_BULK_EMAILS:
+        raise HTTPException(status_code=400, detail=f"Too many emails: at most {MAX_BULK_EMAILS} per request")
+    try:
+        validate_request(action, subscription_type, duration_days)
+        if len(emails) > BULK_SUBSCRIPTION_INLINE_LIMIT:
+            job = await start_bulk_job(db, emails, action, subscription_type, duration_days, admin.user_id,
+                                       on_updated=refresh_sessions)
+            return JSONResponse(status_code=202, content=job)
+        return await apply_bulk(db, emails, action, subscription_type, duration_days, on_updated=refresh_sessions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@api_router.post("/admin/users/subscription/bulk")
+async def admin_bulk_subscription(control: AdminBulkSubscriptionControl, request: Request):
+    """
+    Admin: Apply one subscription action to a list of emails. Returns the
+    per-email outcomes, or 202 with a job to poll for large batches.
+    """
+    user = await get_current_user(request)
+    if user.access_level != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    elif control.action == "extend":
-        current_end = target_user.get("subscription_end_date")
-        if current_end:
-            current_end_date = datetime.fromisoformat(current_end)
-            if current_end_date.tzinfo is None:
-                current_end_date = current_end_date.replace(tzinfo=timezone.utc)
-            if current_end_date < now:
-                new_end_date = now + timedelta(days=control.duration_days)
-            else:
-                new_end_date = current_end_date + timedelta(days=control.duration_days)
-        else:
-            new_end_date = now + timedelta(days=control.duration_days)
-        
-        await db.users.update_one(
-            {"email": control.user_email},
-            {"$set": {
-                "subscription_type": control.subscription_type,
-                "subscription_status": "active",
-                "subscription_end_date": new_end_date.isoformat()
-            }}
-        )
+    return await run_bulk_subscription(control.user_emails, control.action, control.subscription_type,
+                                       control.duration_days, user)
+
+@api_router.post("/admin/users/subscription/bulk/upload")
+async def admin_bulk_subscription_upload(
+    request: Request,
+    action: str,
+    subscription_type: str = "",
+    duration_days: int = 0,
+    file: UploadFile = File(...)
+):
+    """
+    Admin: Same as /admin/users/subscription/bulk, with the emails in an
+    uploaded file (one per line, or a CSV with an "email" column).
+    """
+    user = await get_current_user(request)
+    if user.access_level != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    elif control.action == "deactivate":
-        await db.users.update_one(
-            {"email": control.user_email},
-            {"$set": {
-                "subscription_status": "expired",
-                "subscription_end_date": now.isoformat()
-            }}
-        )
+    try:
+        emails = parse_email_file(await file.read())
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 text")
+    return await run_bulk_subscription(emails, action, subscription_type, duration_days, user)
+
+@api_router.post("/admin/users/{user_id}/sessions/revoke")
+async def admin_revoke_sessions(user_id: str, request: Request):
+    """
+    Admin: Sign a user out everywhere
+    """
+    user = await get_current_user(request)
+    if user.access_level != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    elif control.action == "gift":
-        end_date = now + timedelta(days=control.duration_days)
-        await db.users.update_one(
-            {"email": control.user_email},
-            {"$set": {
-                "subscription_type": control.subscription_type,
-                "subscription_status": "active",
-                "subscription_start_date": now.isoformat(),
-                "subscription_end_date": end_date.isoformat()
-            }}
-        )
+    result = await db.user_sessions.delete_many({"user_id": user_id})
+    if session_signer is not None:
+        await session_revocations.add(db, "revoke", user_id)
+        await invalidation_bus.publish("sessions")
+    return {"user_id": user_id, "deleted_sessions": result.deleted_count, "signed_sessions_revoked": session_signer is not None}
+
+@api_router.get("/admin/users/subscription/bulk/{job_id}")
+async def admin_bulk_subscription_job(job_id: str, request: Request):
+    """
+    Admin: Status and, once completed, the result of a bulk subscription job
+    """
+    user = await get_current_user(request)
+    if user.access_level != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    else:
-        raise HTTPException(status_code=400, detail="Invalid action")
+    job = await get_subscription_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# Markets and assets, served from memory; rebuilt when an admin creates one
+catalog_cache = CatalogCache(Market, Asset, refresh_seconds=float(os.environ.get('CATALOG_REFRESH_SECONDS', '30')))
+
+async def cached_json(topic: str, key, load, ttl_seconds: Optional[float] = None) -> Response:
+    """
+    response_cache.get_or_load for a read endpoint, caching the encoded body:
+    hits are served without re-encoding.
+    """
+    async def encode():
+        return dumps(await load())
     
-    updated_user = await db.users.find_one({"email": control.user_email}, {"_id": 0})
-    return User(**updated_user)
+    body = await response_cache.get_or_load(topic, key, encode, ttl_seconds=ttl_seconds)
+    return json_response(body=body)
+
+def catalog_response(request: Request, snapshot, body: bytes) -> Response:
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == snapshot.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @api_router.get("/markets", response_model=List[Market])
-async def get_markets():
-    markets = await db.markets.find({}, {"_id": 0}).to_list(100)
-    return markets
+async def get_markets(request: Request):
+    snapshot = await catalog_cache.get(db)
+    return catalog_response(request, snapshot, snapshot.markets_json)
 
 @api_router.post("/markets", response_model=Market)
 async def create_market(market: MarketCreate, request: Request):
@@ -551,13 +929,14 @@ async def create_market(market: MarketCreate, request: Request):
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.markets.insert_one(market_doc)
+    await catalog_cache.bump(db)
+    await invalidation_bus.publish("catalog")
     return Market(**market_doc)
 
 @api_router.get("/assets", response_model=List[Asset])
-async def get_assets(market_id: Optional[str] = None):
-    query = {"market_id": market_id} if market_id else {}
-    assets = await db.assets.find(query, {"_id": 0}).to_list(100)
-    return assets
+async def get_assets(request: Request, market_id: Optional[str] = None):
+    snapshot = await catalog_cache.get(db)
+    return catalog_response(request, snapshot, snapshot.assets_json_for(market_id))
 
 @api_router.post("/assets", response_model=Asset)
 async def create_asset(asset: AssetCreate, request: Request):
@@ -575,8 +954,74 @@ async def create_asset(asset: AssetCreate, request: Request):
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.assets.insert_one(asset_doc)
+    await catalog_cache.bump(db)
+    await invalidation_bus.publish("catalog")
     return Asset(**asset_doc)
 
+MAX_BATCH_ANALYSES = 500
+
+@api_router.get("/analysis")
+async def get_analyses(request: Request, asset_ids: Optional[str] = None, market_id: Optional[str] = None):
+    """
+    Batch lookup: analyses for a comma-separated list of asset ids or for
+    every asset of a market, keyed by asset_id, in one query.
+    """
+    user = await get_current_user(request)
+    
+    if not check_subscription_access(user):
+        raise HTTPException(
+            status_code=403, 
+            detail="Active subscription required to view analysis"
+        )
+    
+    ids = [asset_id.strip() for asset_id in (asset_ids or "").split(",") if asset_id.strip()]
+    if not ids and not market_id:
+        raise HTTPException(status_code=400, detail="asset_ids or market_id is required")
+    if len(ids) > MAX_BATCH_ANALYSES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ANALYSES} asset ids per request")
+    
+    query = {}
+    if ids:
+        query["asset_id"] = {"$in": ids}
+    if market_id:
+        query["market_id"] = market_id
+    
+    analyses = await db.analyses.find(query, {"_id": 0}).to_list(None)
+    return {"analyses": {analysis["asset_id"]: analysis for analysis in analyses}}
+
+@api_router.get("/catalog")
+async def get_catalog(request: Request):
+    """
+    Markets with their assets and each asset's analysis, for loading the
+    dashboard in one request. Analyses are only included with an active
+    subscription (analysis_access tells the client which case applies).
+    """
+    user = await get_current_user(request)
+    analysis_access = check_subscription_access(user)
+    
+    pipeline = [{"$project": {"_id": 0}}]
+    if analysis_access:
+        pipeline += [
+            {"$lookup": {"from": "analyses", "localField": "asset_id", "foreignField": "asset_id", "as": "analysis"}},
+            {"$unwind": {"path": "$analysis", "preserveNullAndEmptyArrays": True}},
+            {"$project": {"analysis._id": 0}}
+        ]
+    
+    markets, assets = await asyncio.gather(
+        db.markets.find({}, {"_id": 0}).to_list(None),
+        db.assets.aggregate(pipeline).to_list(None)
+    )
+    
+    assets_by_market = {}
+    for asset in assets:
+        if analysis_access:
+            asset.setdefault("analysis", None)
+        assets_by_market.setdefault(asset.get("market_id"), []).append(asset)
+    for market in markets:
+        market["assets"] = assets_by_market.get(market["market_id"], [])
+    
+    return {"analysis_access": analysis_access, "markets": markets}
+
 @api_router.get("/analysis/{asset_id}")
 async def get_analysis(asset_id: str, request: Request):
     user = await get_current_user(request)
@@ -632,13 +1077,20 @@ async def sync_from_google_sheets(config: GoogleSheetsConfig, request: Request):
         raise HTTPException(status_code=403, detail="Admin access required")
     
     try:
-        service = get_sheets_service()
-        sheet = service.spreadsheets()
-        result = sheet.values().get(
-            spreadsheetId=config.spreadsheet_id,
-            range=config.range_name
-        ).execute()
-        values = result.get('values', [])
+        source = sheets_source_key(config.spreadsheet_id, config.range_name)
+        with tracing.span("sync.probe") as span:
+            state = await get_sync_state(db, source)
+            fingerprint = await drive_fingerprint(sheets_client, config.spreadsheet_id)
+            unchanged = not config.force and is_unchanged(state, fingerprint)
+            span.set_attribute("sync.unchanged", unchanged)
+        if unchanged:
+            state = await record_skip(db, source)
+            return SyncResult(total_rows=0, inserted=0, updated=0, skipped=0, errors=[], unchanged=True,
+                              skipped_syncs=state["skipped_count"])
+        
+        with tracing.span("sync.fetch") as span:
+            values = await sheets_client.fetch_range(config.spreadsheet_id, config.range_name, chunk_rows=SHEETS_CHUNK_ROWS)
+            span.set_attribute("sync.rows", len(values))
         
         if not values:
             return SyncResult(
@@ -649,89 +1101,81 @@ async def sync_from_google_sheets(config: GoogleSheetsConfig, request: Request):
                 errors=["No data found in sheet"]
             )
         
-        total_rows = len(values)
-        inserted = 0
-        updated = 0
-        skipped = 0
-        errors = []
-        
-        for idx, row in enumerate(values, start=2):
-            try:
-                if len(row) < 7:
-                    skipped += 1
-                    errors.append(f"Row {idx}: Insufficient columns (expected 7, got {len(row)})")
-                    continue
-                
-                market = row[0].strip()
-                instrument_code = row[1].strip()
-                insight_type = row[2].strip()
-                date_time_str = row[3].strip()
-                analysis_price = row[4].strip()
-                target_price = row[5].strip()
-                critical_level = row[6].strip()
-                
-                if not all([market, instrument_code, insight_type, date_time_str]):
-                    skipped += 1
-                    errors.append(f"Row {idx}: Missing required fields")
-                    continue
-                
-                analysis_datetime = parse_datetime_string(date_time_str)
-                
-                unique_key = {
-                    "market": market,
-                    "instrument_code": instrument_code,
-                    "analysis_datetime": analysis_datetime
-                }
-                
-                now = datetime.now(timezone.utc).isoformat()
-                record = {
-                    "record_id": f"daily_{uuid.uuid4().hex[:12]}",
-                    "market": market,
-                    "instrument_code": instrument_code,
-                    "insight_type": insight_type,
-                    "analysis_datetime": analysis_datetime,
-                    "analysis_price": analysis_price,
-                    "target_price": target_price,
-                    "critical_level": critical_level,
-                    "source": "google_sheets",
-                    "updated_at": now
-                }
-                
-                existing = await db.daily_analysis.find_one(unique_key, {"_id": 0})
-                
-                if existing:
-                    await db.daily_analysis.update_one(
-                        unique_key,
-                        {"$set": record}
-                    )
-                    updated += 1
-                else:
-                    record["created_at"] = now
-                    await db.daily_analysis.insert_one(record)
-                    inserted += 1
-                
-            except ValueError as e:
-                skipped += 1
-                errors.append(f"Row {idx}: {str(e)}")
-            except Exception as e:
-                skipped += 1
-                errors.append(f"Row {idx}: Unexpected error - {str(e)}")
+        with tracing.span("sync.ingest"):
+            result = await ingest_rows(db, enumerate(values, start=2), "google_sheets")
+        if result["inserted"] or result["updated"]:
+            await invalidation_bus.publish("daily_analysis")
         
-        return SyncResult(
-            total_rows=total_rows,
-            inserted=inserted,
-            updated=updated,
-            skipped=skipped,
-            errors=errors
-        )
+        with tracing.span("sync.record"):
+            if result["write_failures"]:
+                # Keep the old fingerprint, so the next sync retries the rows that didn't land
+                logger.warning(f"Sheet sync of {source} had {result['write_failures']} failed writes; "
+                               f"not recording it as synced")
+                state = await get_sync_state(db, source) or {"skipped_count": 0}
+            else:
+                state = await record_sync(db, source, fingerprint, result)
+        return SyncResult(**result, skipped_syncs=state["skipped_count"])
     
-    except HttpError as e:
+    except SheetsUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))})
+    except SheetsError as e:
         raise HTTPException(status_code=400, detail=f"Google Sheets API error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sync failed: {str(e)}")
 
+@api_router.post("/admin/daily-analysis/import")
+async def import_daily_analysis_file(request: Request, format: Optional[str] = None, file: UploadFile = File(...)):
+    """
+    Admin: Load daily analysis rows from a CSV or XLSX file with the sheet's
+    7-column layout, through the same validation and upserts as the sheet
+    sync. Large files return 202 with a job to poll.
+    """
+    user = await get_current_user(request)
+    if user.access_level != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        fmt = detect_format(file.filename, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def publish():
+        await invalidation_bus.publish("daily_analysis")
+    
+    if file.size is not None and file.size > DAILY_IMPORT_INLINE_MAX_BYTES:
+        # Spool to a file the background job owns; the upload is closed when this request ends
+        with tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False) as spooled:
+            await asyncio.to_thread(shutil.copyfileobj, file.file, spooled, 1024 * 1024)
+        job = await start_import_job(db, spooled.name, fmt, file.filename, user.user_id, on_done=publish)
+        return JSONResponse(status_code=202, content=job)
+    
+    try:
+        result = await ingest_file_rows(db, file.file, fmt)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable {fmt} file: {str(e)}")
+    if result["inserted"] or result["updated"]:
+        await publish()
+    return SyncResult(**result)
+
+@api_router.get("/admin/daily-analysis/import/{job_id}")
+async def get_daily_analysis_import(job_id: str, request: Request):
+    """
+    Admin: Progress and result of a daily analysis file import.
+    """
+    user = await get_current_user(request)
+    if user.access_level != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    job = await get_import_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
 @api_router.get("/daily-analysis")
-async def get_daily_analysis(request: Request, market: Optional[str] = None, limit: int = 100):
+async def get_daily_analysis(request: Request, market: Optional[str] = None, limit: int = 100,
+                             include_archive: bool = False):
     user = await get_current_user(request)
     
     if not check_subscription_access(user):
@@ -740,14 +1184,140 @@ async def get_daily_analysis(request: Request, market: Optional[str] = None, lim
             detail="Active subscription required to view analysis"
         )
     
-    query = {"market": market} if market else {}
-    analyses = await db.daily_analysis.find(query, {"_id": 0}).sort("analysis_datetime", -1).limit(limit).to_list(limit)
-    return analyses
+    async def load():
+        query = {"market": market} if market else {}
+        analyses = await analytics("daily_analysis").find(query, {"_id": 0}).sort("analysis_datetime", -1).limit(limit).to_list(limit)
+        if include_archive:
+            archived = await archive_store.find("daily_analysis", query, ("analysis_datetime", -1), limit)
+            analyses = merge_rows(analyses, archived, "analysis_datetime", descending=True, limit=limit,
+                                  source="daily_analysis")
+        return analyses
+    
+    return await cached_json("daily_analysis", ("list", market, limit, include_archive), load)
 
 @api_router.get("/daily-analysis/markets")
-async def get_daily_analysis_markets():
-    markets = await db.daily_analysis.distinct("market")
-    return {"markets": markets}
+async def get_daily_analysis_markets(request: Request):
+    user = await get_current_user(request)
+    
+    async def load():
+        markets = await list_markets(analytics(MARKET_DIMENSIONS), "daily_analysis")
+        return {"markets": markets}
+    
+    return await cached_json("daily_analysis", "markets", load)
+
+@api_router.get("/daily-analysis/instruments")
+async def get_daily_analysis_instruments(request: Request, market: Optional[str] = None):
+    """
+    Get instruments with daily analysis rows, with first/last seen
+    timestamps and row counts.
+    """
+    user = await get_current_user(request)
+    
+    async def load():
+        instruments = await list_instruments(analytics(INSTRUMENT_DIMENSIONS), "daily_analysis", market)
+        return {"instruments": instruments}
+    
+    return await cached_json("daily_analysis", ("instruments", market), load)
+
+@api_router.get("/daily-analysis/backtest")
+async def get_insight_backtest(request: Request, market: Optional[str] = None):
+    """
+    Get the latest insight backtest: target/critical hit rates by market
+    and insight type. Only types starting with "Bullish" or "Bearish" are
+    scored; other types (e.g. "Neutral") are reported as `unscored`.
+    """
+    user = await get_current_user(request)
+    
+    if not check_subscription_access(user):
+        raise HTTPException(status_code=403, detail="Active subscription required")
+    
+    async def load():
+        return await latest_run(db)
+    
+    run = await response_cache.get_or_load("insight_backtests", "latest", load)
+    if run is None:
+        raise HTTPException(status_code=404, detail="No backtest has been run yet")
+    
+    if market:
+        run = {**run, "by_market": [row for row in run["by_market"] if row["market"] == market]}
+    return run
+
+@api_router.get("/daily-analysis/backtest/instruments")
+async def get_insight_backtest_instruments(request: Request, market: Optional[str] = None, instrument: Optional[str] = None):
+    """
+    Get per-instrument results of the latest insight backtest.
+    """
+    user = await get_current_user(request)
+    
+    if not check_subscription_access(user):
+        raise HTTPException(status_code=403, detail="Active subscription required")
+    
+    query = {}
+    if market:
+        query["market"] = market
+    if instrument:
+        query["instrument_code"] = instrument
+    
+    async def load():
+        cursor = analytics(BACKTEST_INSTRUMENTS_COLLECTION).find(query, {"_id": 0, "run_id": 0})
+        return await cursor.sort([("market", 1), ("instrument_code", 1), ("insight_type", 1)]).to_list(None)
+    
+    return await cached_json("insight_backtests", ("instruments", market, instrument), load)
+
+@api_router.get("/daily-analysis/series")
+async def get_daily_analysis_series(
+    request: Request,
+    instrument: str,
+    market: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    bucket: str = "1d"
+):
+    """
+    Bucketed analysis prices for one instrument over a time range,
+    served from the daily_analysis_series time-series collection.
+    """
+    user = await get_current_user(request)
+    
+    if not check_subscription_access(user):
+        raise HTTPException(status_code=403, detail="Active subscription required")
+    
+    try:
+        _, _, bucket_seconds = parse_bucket(bucket)
+        if end:
+            end_dt = datetime.fromisoformat(end)
+        else:
+            # Up to the end of the current bucket, so open-ended requests share a cache entry
+            end_dt = datetime.fromtimestamp((int(time.time()) // bucket_seconds + 1) * bucket_seconds, timezone.utc)
+        start_dt = datetime.fromisoformat(start) if start else end_dt - timedelta(days=30)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if end_dt.tzinfo is None:
+        end_dt = end_dt.replace(tzinfo=timezone.utc)
+    if start_dt.tzinfo is None:
+        start_dt = start_dt.replace(tzinfo=timezone.utc)
+    if start_dt >= end_dt:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (end_dt - start_dt).total_seconds() / bucket_seconds > MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Range too large for bucket {bucket} (max {MAX_BUCKETS} buckets)")
+    
+    async def load():
+        pipeline = series_pipeline(instrument, start_dt, end_dt, bucket, market)
+        points = await analytics(SERIES_COLLECTION).aggregate(pipeline).to_list(None)
+        for point in points:
+            point["bucket_start"] = point["bucket_start"].replace(tzinfo=timezone.utc).isoformat()
+        return {
+            "instrument": instrument,
+            "market": market,
+            "start": start_dt.isoformat(),
+            "end": end_dt.isoformat(),
+            "bucket": bucket,
+            "points": points
+        }
+    
+    key = ("series", instrument, market, start_dt.isoformat(), end_dt.isoformat(), bucket)
+    return await cached_json("daily_analysis", key, load)
 
 @api_router.get("/daily-analysis/chart-data")
 async def get_analysis_price_chart_data(request: Request):
@@ -759,41 +1329,44 @@ async def get_analysis_price_chart_data(request: Request):
             detail="Active subscription required"
         )
     
-    pipeline = [
-        {
-            "$group": {
-                "_id": {
-                    "market": "$market",
-                    "instrument": "$instrument_code"
-                },
-                "latest_price": {"$last": "$analysis_price"}
-            }
-        },
-        {
-            "$project": {
-                "_id": 0,
-                "market": "$_id.market",
-                "instrument": "$_id.instrument",
-                "analysis_price": "$latest_price"
+    async def load():
+        pipeline = [
+            {
+                "$group": {
+                    "_id": {
+                        "market": "$market",
+                        "instrument": "$instrument_code"
+                    },
+                    "latest_price": {"$last": "$analysis_price"}
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "market": "$_id.market",
+                    "instrument": "$_id.instrument",
+                    "analysis_price": "$latest_price"
+                }
             }
-        }
-    ]
-    
-    results = await db.daily_analysis.aggregate(pipeline).to_list(1000)
-    
-    chart_data = []
-    for item in results:
-        try:
-            price_value = float(item["analysis_price"].replace(",", ""))
-            chart_data.append({
-                "market": item["market"],
-                "instrument": item["instrument"],
-                "value": price_value
-            })
-        except (ValueError, AttributeError):
-            continue
+        ]
+        
+        results = await analytics("daily_analysis").aggregate(pipeline).to_list(1000)
+        
+        chart_data = []
+        for item in results:
+            try:
+                price_value = float(item["analysis_price"].replace(",", ""))
+                chart_data.append({
+                    "market": item["market"],
+                    "instrument": item["instrument"],
+                    "value": price_value
+                })
+            except (ValueError, AttributeError):
+                continue
+        
+        return chart_data
     
-    return chart_data
+    return await cached_json("daily_analysis", "chart_data", load)
 
 @api_router.get("/daily-analysis/line-chart-data")
 async def get_line_chart_data(request: Request):
@@ -809,52 +1382,55 @@ async def get_line_chart_data(request: Request):
             detail="Active subscription required"
         )
     
-    # Get the latest record for each instrument
-    pipeline = [
-        {"$sort": {"analysis_datetime": -1}},
-        {
-            "$group": {
-                "_id": {
-                    "market": "$market",
-                    "instrument": "$instrument_code"
-                },
-                "analysis_price": {"$first": "$analysis_price"},
-                "target_price": {"$first": "$target_price"},
-                "analysis_datetime": {"$first": "$analysis_datetime"}
-            }
-        },
-        {
-            "$project": {
-                "_id": 0,
-                "market": "$_id.market",
-                "instrument_code": "$_id.instrument",
-                "analysis_price": 1,
-                "target_price": 1,
-                "analysis_datetime": 1
-            }
-        },
-        {"$sort": {"market": 1, "instrument_code": 1}}
-    ]
-    
-    results = await db.daily_analysis.aggregate(pipeline).to_list(1000)
-    
-    chart_data = []
-    for item in results:
-        try:
-            analysis_price = float(item["analysis_price"].replace(",", "")) if item.get("analysis_price") else 0
-            target_price = float(item["target_price"].replace(",", "")) if item.get("target_price") else 0
-            
-            chart_data.append({
-                "market": item["market"],
-                "instrument_code": item["instrument_code"],
-                "analysis_price": analysis_price,
-                "target_price": target_price,
-                "analysis_datetime": item.get("analysis_datetime", "")
-            })
-        except (ValueError, AttributeError) as e:
-            continue
+    async def load():
+        # Get the latest record for each instrument
+        pipeline = [
+            {"$sort": {"analysis_datetime": -1}},
+            {
+                "$group": {
+                    "_id": {
+                        "market": "$market",
+                        "instrument": "$instrument_code"
+                    },
+                    "analysis_price": {"$first": "$analysis_price"},
+                    "target_price": {"$first": "$target_price"},
+                    "analysis_datetime": {"$first": "$analysis_datetime"}
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "market": "$_id.market",
+                    "instrument_code": "$_id.instrument",
+                    "analysis_price": 1,
+                    "target_price": 1,
+                    "analysis_datetime": 1
+                }
+            },
+            {"$sort": {"market": 1, "instrument_code": 1}}
+        ]
+        
+        results = await analytics("daily_analysis").aggregate(pipeline).to_list(1000)
+        
+        chart_data = []
+        for item in results:
+            try:
+                analysis_price = float(item["analysis_price"].replace(",", "")) if item.get("analysis_price") else 0
+                target_price = float(item["target_price"].replace(",", "")) if item.get("target_price") else 0
+        
+                chart_data.append({
+                    "market": item["market"],
+                    "instrument_code": item["instrument_code"],
+                    "analysis_price": analysis_price,
+                    "target_price": target_price,
+                    "analysis_datetime": item.get("analysis_datetime", "")
+                })
+            except (ValueError, AttributeError) as e:
+                continue
+        
+        return chart_data
     
-    return chart_data
+    return await cached_json("daily_analysis", "line_chart_data", load)
 
 @api_router.get("/daily-analysis/last-sync")
 async def get_last_sync_time(request: Request):
@@ -881,28 +1457,37 @@ async def get_forecast_history(
     request: Request, 
     market: Optional[str] = None,
     status: Optional[str] = None,
-    limit: int = 100
+    limit: int = 100,
+    include_archive: bool = False
 ):
     """
     Get all forecast history records. Read-only for credibility display.
+    Archived (old completed) forecasts are included with include_archive.
     """
     user = await get_current_user(request)
     
     if not check_subscription_access(user):
         raise HTTPException(status_code=403, detail="Active subscription required")
     
-    query = {}
-    if market:
-        query["market"] = market
-    if status:
-        query["status"] = status
-    
-    forecasts = await db.forecast_history.find(
-        query, 
-        {"_id": 0}
-    ).sort("forecast_date", -1).limit(limit).to_list(limit)
+    async def load():
+        query = {}
+        if market:
+            query["market"] = market
+        if status:
+            query["status"] = status
+        
+        forecasts = await analytics("forecast_history").find(
+            query, 
+            {"_id": 0}
+        ).sort("forecast_date", -1).limit(limit).to_list(limit)
+        if include_archive:
+            archived = await archive_store.find("forecast_history", query, ("forecast_date", -1), limit)
+            forecasts = merge_rows(forecasts, archived, "forecast_date", descending=True, limit=limit,
+                                   source="forecast_history")
+        
+        return forecasts
     
-    return forecasts
+    return await cached_json("forecast_history", ("list", market, status, limit, include_archive), load)
 
 @api_router.get("/history/performance")
 async def get_performance_data(request: Request):
@@ -915,99 +1500,136 @@ async def get_performance_data(request: Request):
     if not check_subscription_access(user):
         raise HTTPException(status_code=403, detail="Active subscription required")
     
-    # Aggregate performance by instrument
-    pipeline = [
-        {"$match": {"status": {"$in": ["success", "failed"]}}},
-        {
-            "$group": {
-                "_id": {
-                    "market": "$market",
-                    "instrument": "$instrument_code"
-                },
-                "total_forecasts": {"$sum": 1},
-                "successful_forecasts": {
-                    "$sum": {"$cond": [{"$eq": ["$status", "success"]}, 1, 0]}
-                },
-                "total_pl_percent": {"$sum": "$calculated_pl_percent"},
-                "avg_pl_percent": {"$avg": "$calculated_pl_percent"}
-            }
-        },
-        {
-            "$project": {
-                "_id": 0,
-                "market": "$_id.market",
-                "instrument_code": "$_id.instrument",
-                "total_forecasts": 1,
-                "successful_forecasts": 1,
-                "win_rate": {
-                    "$multiply": [
-                        {"$divide": ["$successful_forecasts", "$total_forecasts"]},
-                        100
-                    ]
-                },
-                "total_pl_percent": {"$round": ["$total_pl_percent", 2]},
-                "avg_pl_percent": {"$round": ["$avg_pl_percent", 2]}
-            }
-        },
-        {"$sort": {"total_pl_percent": -1}}
-    ]
-    
-    results = await db.forecast_history.aggregate(pipeline).to_list(1000)
-    return results
+    async def load():
+        # Aggregate performance by instrument
+        pipeline = [
+            {"$match": {"status": {"$in": ["success", "failed"]}}},
+            {
+                "$group": {
+                    "_id": {
+                        "market": "$market",
+                        "instrument": "$instrument_code"
+                    },
+                    "total_forecasts": {"$sum": 1},
+                    "successful_forecasts": {
+                        "$sum": {"$cond": [{"$eq": ["$status", "success"]}, 1, 0]}
+                    },
+                    "total_pl_percent": {"$sum": "$calculated_pl_percent"},
+                    "avg_pl_percent": {"$avg": "$calculated_pl_percent"}
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "market": "$_id.market",
+                    "instrument_code": "$_id.instrument",
+                    "total_forecasts": 1,
+                    "successful_forecasts": 1,
+                    "win_rate": {
+                        "$multiply": [
+                            {"$divide": ["$successful_forecasts", "$total_forecasts"]},
+                            100
+                        ]
+                    },
+                    "total_pl_percent": {"$round": ["$total_pl_percent", 2]},
+                    "avg_pl_percent": {"$round": ["$avg_pl_percent", 2]}
+                }
+            },
+            {"$sort": {"total_pl_percent": -1}}
+        ]
+        
+        results = await analytics("forecast_history").aggregate(pipeline).to_list(1000)
+        
+        # Add the totals of archived forecasts per instrument
+        rollups = await archived_forecast_rollups(analytics(ARCHIVE_ROLLUPS_COLLECTION))
+        if rollups:
+            by_instrument = {(row["market"], row["instrument_code"]): row for row in results}
+            for rollup in rollups:
+                row = by_instrument.setdefault((rollup["market"], rollup["instrument_code"]), {
+                    "market": rollup["market"], "instrument_code": rollup["instrument_code"],
+                    "total_forecasts": 0, "successful_forecasts": 0, "total_pl_percent": 0
+                })
+                row["total_forecasts"] += rollup["completed"]
+                row["successful_forecasts"] += rollup["successful"]
+                row["total_pl_percent"] = round(row["total_pl_percent"] + rollup["pl_sum"], 2)
+                row["win_rate"] = row["successful_forecasts"] / row["total_forecasts"] * 100
+                row["avg_pl_percent"] = round(row["total_pl_percent"] / row["total_forecasts"], 2)
+            results = sorted(by_instrument.values(), key=lambda row: row["total_pl_percent"], reverse=True)
+        return results
+    
+    return await cached_json("forecast_history", "performance", load)
 
 @api_router.get("/history/cumulative")
-async def get_cumulative_performance(request: Request):
+async def get_cumulative_performance(request: Request, include_archive: bool = False):
     """
-    Get cumulative performance over time for line chart.
+    Get cumulative performance over time for line chart. Archived forecasts
+    are listed with include_archive; otherwise the curve starts from their totals.
     """
     user = await get_current_user(request)
     
     if not check_subscription_access(user):
         raise HTTPException(status_code=403, detail="Active subscription required")
     
-    # Get all completed forecasts sorted by date
-    pipeline = [
-        {"$match": {"status": {"$in": ["success", "failed"]}, "result_date": {"$ne": None}}},
-        {"$sort": {"result_date": 1}},
-        {
-            "$project": {
-                "_id": 0,
-                "result_date": 1,
-                "instrument_code": 1,
-                "market": 1,
-                "calculated_pl_percent": 1,
-                "status": 1
+    async def load():
+        # Get all completed forecasts sorted by date
+        pipeline = [
+            {"$match": {"status": {"$in": ["success", "failed"]}, "result_date": {"$ne": None}}},
+            {"$sort": {"result_date": 1}},
+            {
+                "$project": {
+                    "_id": 0,
+                    "record_id": 1,
+                    "result_date": 1,
+                    "instrument_code": 1,
+                    "market": 1,
+                    "calculated_pl_percent": 1,
+                    "status": 1
+                }
             }
-        }
-    ]
-    
-    forecasts = await db.forecast_history.aggregate(pipeline).to_list(1000)
-    
-    # Calculate cumulative return
-    cumulative_data = []
-    cumulative_return = 0
-    total_trades = 0
-    winning_trades = 0
-    
-    for forecast in forecasts:
-        total_trades += 1
-        if forecast.get("status") == "success":
-            winning_trades += 1
+        ]
         
-        pl = forecast.get("calculated_pl_percent", 0) or 0
-        cumulative_return += pl
+        forecasts = await analytics("forecast_history").aggregate(pipeline).to_list(1000)
         
-        cumulative_data.append({
-            "date": forecast.get("result_date", ""),
-            "instrument": forecast.get("instrument_code", ""),
-            "market": forecast.get("market", ""),
-            "pl_percent": round(pl, 2),
-            "cumulative_return": round(cumulative_return, 2),
-            "total_trades": total_trades,
-            "win_rate": round((winning_trades / total_trades) * 100, 2) if total_trades > 0 else 0
-        })
+        # Calculate cumulative return
+        cumulative_data = []
+        cumulative_return = 0
+        total_trades = 0
+        winning_trades = 0
+        
+        if include_archive:
+            archived = await archive_store.find(
+                "forecast_history", {"status": {"$in": ["success", "failed"]}, "result_date": {"$ne": None}},
+                ("result_date", 1)
+            )
+            forecasts = merge_rows(forecasts, archived, "result_date", source="forecast_history")
+        else:
+            totals = rollup_totals(await archived_forecast_rollups(analytics(ARCHIVE_ROLLUPS_COLLECTION)))
+            if totals:
+                cumulative_return = totals["pl_sum"]
+                total_trades = totals["completed"]
+                winning_trades = totals["successful"]
+        
+        for forecast in forecasts:
+            total_trades += 1
+            if forecast.get("status") == "success":
+                winning_trades += 1
+        
+            pl = forecast.get("calculated_pl_percent", 0) or 0
+            cumulative_return += pl
+        
+            cumulative_data.append({
+                "date": forecast.get("result_date", ""),
+                "instrument": forecast.get("instrument_code", ""),
+                "market": forecast.get("market", ""),
+                "pl_percent": round(pl, 2),
+                "cumulative_return": round(cumulative_return, 2),
+                "total_trades": total_trades,
+                "win_rate": round((winning_trades / total_trades) * 100, 2) if total_trades > 0 else 0
+            })
+        
+        return cumulative_data
     
-    return cumulative_data
+    return await cached_json("forecast_history", ("cumulative", include_archive), load)
 
 @api_router.get("/history/summary")
 async def get_history_summary(request: Request):
@@ -1019,41 +1641,87 @@ async def get_history_summary(request: Request):
     if not check_subscription_access(user):
         raise HTTPException(status_code=403, detail="Active subscription required")
     
-    # Get total counts
-    total_forecasts = await db.forecast_history.count_documents({})
-    completed_forecasts = await db.forecast_history.count_documents({"status": {"$in": ["success", "failed"]}})
-    successful_forecasts = await db.forecast_history.count_documents({"status": "success"})
-    pending_forecasts = await db.forecast_history.count_documents({"status": "pending"})
-    
-    # Calculate total and average P/L
-    pipeline = [
-        {"$match": {"status": {"$in": ["success", "failed"]}}},
-        {
-            "$group": {
-                "_id": None,
-                "total_pl": {"$sum": "$calculated_pl_percent"},
-                "avg_pl": {"$avg": "$calculated_pl_percent"},
-                "max_gain": {"$max": "$calculated_pl_percent"},
-                "max_loss": {"$min": "$calculated_pl_percent"}
+    async def load():
+        forecast_history = analytics("forecast_history")
+        
+        # Get total counts
+        total_forecasts = await forecast_history.count_documents({})
+        completed_forecasts = await forecast_history.count_documents({"status": {"$in": ["success", "failed"]}})
+        successful_forecasts = await forecast_history.count_documents({"status": "success"})
+        pending_forecasts = await forecast_history.count_documents({"status": "pending"})
+        
+        # Calculate total and average P/L
+        pipeline = [
+            {"$match": {"status": {"$in": ["success", "failed"]}}},
+            {
+                "$group": {
+                    "_id": None,
+                    "total_pl": {"$sum": "$calculated_pl_percent"},
+                    "avg_pl": {"$avg": "$calculated_pl_percent"},
+                    "max_gain": {"$max": "$calculated_pl_percent"},
+                    "max_loss": {"$min": "$calculated_pl_percent"}
+                }
             }
+        ]
+        
+        stats = await forecast_history.aggregate(pipeline).to_list(1)
+        
+        # Archived forecasts are all completed; add their totals
+        archived = rollup_totals(await archived_forecast_rollups(analytics(ARCHIVE_ROLLUPS_COLLECTION)))
+        if archived:
+            total_forecasts += archived["completed"]
+            completed_forecasts += archived["completed"]
+            successful_forecasts += archived["successful"]
+            hot = stats[0] if stats else {"total_pl": 0, "max_gain": None, "max_loss": None}
+            total_pl = (hot["total_pl"] or 0) + archived["pl_sum"]
+            stats = [{
+                "total_pl": total_pl,
+                "avg_pl": total_pl / completed_forecasts,
+                "max_gain": max(v for v in (hot.get("max_gain"), archived["pl_max"]) if v is not None),
+                "max_loss": min(v for v in (hot.get("max_loss"), archived["pl_min"]) if v is not None)
+            }]
+        
+        summary = {
+            "total_forecasts": total_forecasts,
+            "completed_forecasts": completed_forecasts,
+            "successful_forecasts": successful_forecasts,
+            "pending_forecasts": pending_forecasts,
+            "win_rate": round((successful_forecasts / completed_forecasts) * 100, 2) if completed_forecasts > 0 else 0,
+            "total_return_percent": round(stats[0]["total_pl"], 2) if stats else 0,
+            "avg_return_percent": round(stats[0]["avg_pl"], 2) if stats else 0,
+            "best_trade_percent": round(stats[0]["max_gain"], 2) if stats and stats[0].get("max_gain") else 0,
+            "worst_trade_percent": round(stats[0]["max_loss"], 2) if stats and stats[0].get("max_loss") else 0
         }
-    ]
-    
-    stats = await db.forecast_history.aggregate(pipeline).to_list(1)
-    
-    summary = {
-        "total_forecasts": total_forecasts,
-        "completed_forecasts": completed_forecasts,
-        "successful_forecasts": successful_forecasts,
-        "pending_forecasts": pending_forecasts,
-        "win_rate": round((successful_forecasts / completed_forecasts) * 100, 2) if completed_forecasts > 0 else 0,
-        "total_return_percent": round(stats[0]["total_pl"], 2) if stats else 0,
-        "avg_return_percent": round(stats[0]["avg_pl"], 2) if stats else 0,
-        "best_trade_percent": round(stats[0]["max_gain"], 2) if stats and stats[0].get("max_gain") else 0,
-        "worst_trade_percent": round(stats[0]["max_loss"], 2) if stats and stats[0].get("max_loss") else 0
-    }
+        
+        return summary
     
-    return summary
+    return await cached_json("forecast_history", "summary", load)
+
+@api_router.get("/history/analytics")
+async def get_history_analytics(request: Request, include_instruments: bool = False, include_archive: bool = False):
+    """
+    Get risk/return analytics (drawdown, Sharpe-like ratio, profit factor,
+    streaks, rolling win rates) globally, per market and optionally per instrument.
+    """
+    user = await get_current_user(request)
+    
+    if not check_subscription_access(user):
+        raise HTTPException(status_code=403, detail="Active subscription required")
+    
+    version = response_cache.generation("forecast_history")
+    
+    async def load():
+        archived = await archive_store.find("forecast_history", {"status": {"$in": ["success", "failed"]}}) \
+            if include_archive else None
+        series = await load_forecast_series(analytics("forecast_history"), archived=archived)
+        result = compute_analytics(series, include_instruments=include_instruments)
+        result["version"] = version
+        return result
+    
+    return await cached_json(
+        "forecast_history", ("analytics", version, include_instruments, include_archive), load,
+        ttl_seconds=ANALYTICS_CACHE_TTL_SECONDS
+    )
 
 @api_router.get("/history/markets")
 async def get_history_markets(request: Request):
@@ -1062,8 +1730,11 @@ async def get_history_markets(request: Request):
     """
     user = await get_current_user(request)
     
-    markets = await db.forecast_history.distinct("market")
-    return {"markets": markets}
+    async def load():
+        markets = await list_markets(analytics(MARKET_DIMENSIONS), "forecast_history")
+        return {"markets": markets}
+    
+    return await cached_json("forecast_history", "markets", load)
 
 # Admin endpoints for managing forecast history
 @api_router.post("/admin/history/forecast")
@@ -1082,12 +1753,12 @@ async def create_forecast(forecast: ForecastCreate, request: Request):
     status = "pending"
     
     if forecast.actual_result_price is not None and forecast.result_date:
-        if forecast.forecast_direction == "Bullish":
-            calculated_pl = ((forecast.actual_result_price - forecast.entry_price) / forecast.entry_price) * 100
-            status = "success" if forecast.actual_result_price >= forecast.forecast_target_price else "failed"
-        else:  # Bearish
-            calculated_pl = ((forecast.entry_price - forecast.actual_result_price) / forecast.entry_price) * 100
-            status = "success" if forecast.actual_result_price <= forecast.forecast_target_price else "failed"
+        calculated_pl, status = compute_forecast_result(
+            forecast.forecast_direction,
+            forecast.entry_price,
+            forecast.forecast_target_price,
+            forecast.actual_result_price
+        )
     
     forecast_doc = {
         "record_id": f"forecast_{uuid.uuid4().hex[:12]}",
@@ -1099,7 +1770,7 @@ async def create_forecast(forecast: ForecastCreate, request: Request):
         "forecast_target_price": forecast.forecast_target_price,
         "actual_result_price": forecast.actual_result_price,
         "result_date": forecast.result_date,
-        "calculated_pl_percent": round(calculated_pl, 2) if calculated_pl is not None else None,
+        "calculated_pl_percent": calculated_pl,
         "status": status,
         "notes": forecast.notes,
         "created_at": now,
@@ -1107,7 +1778,13 @@ async def create_forecast(forecast: ForecastCreate, request: Request):
     }
     
     await db.forecast_history.insert_one(forecast_doc)
-    return ForecastHistory(**forecast_doc)
+    
+    dimensions = DimensionUpdates()
+    dimensions.seen(forecast.market, forecast.instrument_code, added=1)
+    await dimensions.write(db, "forecast_history", now)
+    
+    await invalidation_bus.publish("forecast_history")
+    return json_response(project(ForecastHistory, forecast_doc))
 
 @api_router.put("/admin/history/forecast/{record_id}")
 async def update_forecast_result(record_id: str, update: ForecastUpdate, request: Request):
@@ -1123,21 +1800,17 @@ async def update_forecast_result(record_id: str, update: ForecastUpdate, request
         raise HTTPException(status_code=404, detail="Forecast not found")
     
     # Calculate P/L based on direction
-    entry_price = existing["entry_price"]
-    target_price = existing["forecast_target_price"]
-    direction = existing["forecast_direction"]
-    
-    if direction == "Bullish":
-        calculated_pl = ((update.actual_result_price - entry_price) / entry_price) * 100
-        status = "success" if update.actual_result_price >= target_price else "failed"
-    else:  # Bearish
-        calculated_pl = ((entry_price - update.actual_result_price) / entry_price) * 100
-        status = "success" if update.actual_result_price <= target_price else "failed"
+    calculated_pl, status = compute_forecast_result(
+        existing["forecast_direction"],
+        existing["entry_price"],
+        existing["forecast_target_price"],
+        update.actual_result_price
+    )
     
     update_doc = {
         "actual_result_price": update.actual_result_price,
         "result_date": update.result_date,
-        "calculated_pl_percent": round(calculated_pl, 2),
+        "calculated_pl_percent": calculated_pl,
         "status": status,
         "notes": update.notes if update.notes else existing.get("notes"),
         "updated_at": datetime.now(timezone.utc).isoformat()
@@ -1147,9 +1820,101 @@ async def update_forecast_result(record_id: str, update: ForecastUpdate, request
         {"record_id": record_id},
         {"$set": update_doc}
     )
+    await invalidation_bus.publish("forecast_history")
     
     updated = await db.forecast_history.find_one({"record_id": record_id}, {"_id": 0})
-    return ForecastHistory(**updated)
+    return json_response(project(ForecastHistory, updated))
+
+@api_router.post("/admin/history/results/import")
+async def import_forecast_results(
+    request: Request,
+    file: UploadFile = File(...),
+    format: Optional[str] = None
+):
+    """
+    Admin: Apply forecast results in bulk from a CSV or NDJSON upload with
+    record_id, actual_result_price, result_date and optional notes.
+    """
+    user = await get_current_user(request)
+    if user.access_level != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    fmt = format or ("ndjson" if (file.filename or "").lower().endswith((".ndjson", ".jsonl")) else "csv")
+    
+    try:
+        # Parsed in a worker thread, a batch at a time
+        report = await apply_forecast_results(db, iterate_in_threadpool(iter_result_rows(file.file, fmt)))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid results file: {str(e)}")
+    
+    if report["updated"]:
+        await invalidation_bus.publish("forecast_history")
+    
+    return report
+
+@api_router.post("/admin/history/resolve")
+async def resolve_forecasts(
+    request: Request,
+    dry_run: bool = False,
+    horizon_days: Optional[float] = None,
+    price_file: Optional[UploadFile] = File(None)
+):
+    """
+    Admin: Resolve all pending forecasts in bulk against the latest daily
+    analysis prices, or against an uploaded CSV (market, instrument_code,
+    price, price_date). With dry_run nothing is written.
+    """
+    user = await get_current_user(request)
+    if user.access_level != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    if price_file is not None:
+        try:
+            prices = await run_in_threadpool(parse_price_file, await price_file.read())
+        except (ValueError, UnicodeDecodeError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid price file: {str(e)}")
+        source = price_file.filename or "upload"
+    else:
+        prices = await latest_prices_from_daily_analysis(db)
+        source = "daily_analysis"
+    
+    report = await resolve_pending_forecasts(db, prices, horizon_days=horizon_days, dry_run=dry_run)
+    report["price_source"] = source
+    
+    if report["resolved"] and not dry_run:
+        await invalidation_bus.publish("forecast_history")
+    
+    return report
+
+@api_router.post("/admin/daily-analysis/backtest")
+async def run_insight_backtest(request: Request, horizon_days: Optional[float] = None, workers: Optional[int] = None):
+    """
+    Admin: Replay every daily analysis insight against later prices in the
+    backtest process pool (BACKTEST_WORKERS processes; `workers` can only
+    lower that) and store the results as the latest backtest. Insight types
+    without a "Bullish"/"Bearish" prefix are counted as `unscored`.
+    """
+    user = await get_current_user(request)
+    if user.access_level != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    if horizon_days is not None and horizon_days <= 0:
+        raise HTTPException(status_code=400, detail="horizon_days must be positive")
+    if workers is not None and workers < 1:
+        raise HTTPException(status_code=400, detail="workers must be at least 1")
+    if _backtest_lock.locked():
+        raise HTTPException(status_code=409, detail="A backtest is already running")
+    
+    async with _backtest_lock:
+        try:
+            run = await run_backtest(db, horizon_days=horizon_days, workers=min(workers or BACKTEST_WORKERS, BACKTEST_WORKERS),
+                                     pool=backtest_pool)
+        except Exception as e:
+            logger.error(f"Insight backtest failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Backtest failed: {str(e)}")
+    
+    await invalidation_bus.publish("insight_backtests")
+    return run
 
 @api_router.delete("/admin/history/forecast/{record_id}")
 async def delete_forecast(record_id: str, request: Request):
@@ -1160,10 +1925,17 @@ async def delete_forecast(record_id: str, request: Request):
     if user.access_level != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    result = await db.forecast_history.delete_one({"record_id": record_id})
-    if result.deleted_count == 0:
+    deleted = await db.forecast_history.find_one_and_delete(
+        {"record_id": record_id}, {"_id": 0, "market": 1, "instrument_code": 1}
+    )
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Forecast not found")
     
+    dimensions = DimensionUpdates()
+    dimensions.removed(deleted.get("market"), deleted.get("instrument_code"))
+    await dimensions.write(db, "forecast_history")
+    
+    await invalidation_bus.publish("forecast_history")
     return {"message": "Forecast deleted successfully"}
 
 @api_router.get("/admin/history/forecasts")
@@ -1180,10 +1952,162 @@ async def admin_get_all_forecasts(request: Request, limit: int = 500):
         {"_id": 0}
     ).sort("forecast_date", -1).limit(limit).to_list(limit)
     
-    return forecasts
+    return json_response(forecasts)
+
+@api_router.get("/admin/export/{source}")
+async def export_collection(
+    source: str,
+    request: Request,
+    format: str = "parquet",
+    market: Optional[str] = None,
+    instrument: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    status: Optional[str] = None
+):
+    """
+    Admin: Stream daily_analysis or forecast_history as Arrow IPC or Parquet
+    with typed columns, filtered by market, instrument, date range (start
+    inclusive, end exclusive) and, for forecasts, status.
+    """
+    user = await get_current_user(request)
+    if user.access_level != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format: {format}. Expected one of {', '.join(EXPORT_FORMATS)}")
+    try:
+        query = export_query(source, market, instrument, start, end, status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        arrow_schema(source)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    cursor = analytics(source).find(query, export_projection(source), batch_size=EXPORT_BATCH_SIZE)
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_export(cursor, source, format, batch_size=EXPORT_BATCH_SIZE),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{source}.{extension}"'}
+    )
+
+@api_router.post("/admin/archive/run")
+async def run_archive_now(request: Request, horizon_days: Optional[float] = None, dry_run: bool = False,
+                          sources: Optional[str] = None):
+    """
+    Admin: Move daily analysis and completed forecast rows older than the
+    horizon to the archive tier. dry_run only counts them.
+    """
+    user = await get_current_user(request)
+    if user.access_level != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    horizon_days = ARCHIVE_HORIZON_DAYS if horizon_days is None else horizon_days
+    if horizon_days <= 0:
+        raise HTTPException(status_code=400, detail="horizon_days must be positive")
+    selected = tuple(s.strip() for s in sources.split(",") if s.strip()) if sources else ARCHIVE_SOURCES
+    unknown = [s for s in selected if s not in ARCHIVE_SOURCES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sources: {', '.join(unknown)}")
+    if _archive_lock.locked():
+        raise HTTPException(status_code=409, detail="An archive run is already in progress")
+    
+    async with _archive_lock:
+        try:
+            report = await run_archive(db, archive_store, horizon_days, sources=selected, dry_run=dry_run)
+        except Exception as e:
+            logger.error(f"Archive run failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Archive run failed: {str(e)}")
+    
+    if not dry_run:
+        for source in selected:
+            await invalidation_bus.publish(source)
+    return report
+
+@api_router.get("/admin/archive/status")
+async def get_archive_status(request: Request, limit: int = 10):
+    """
+    Admin: Rows in each tier and the most recent archive runs.
+    """
+    user = await get_current_user(request)
+    if user.access_level != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    tiers = {}
+    for source in ARCHIVE_SOURCES:
+        tiers[source] = {
+            "hot": await db[source].estimated_document_count(),
+            "archived": await archive_store.count(source)
+        }
+    runs = await db[ARCHIVE_RUNS_COLLECTION].find({}, {"_id": 0}).sort("created_at", -1).limit(limit).to_list(limit)
+    return {
+        "target": archive_store.kind,
+        "horizon_days": ARCHIVE_HORIZON_DAYS,
+        "tiers": tiers,
+        "runs": runs
+    }
+
+@api_router.get("/admin/db/pool-metrics")
+async def get_db_pool_metrics(request: Request):
+    """
+    Admin: MongoDB connection pool checkout wait times and saturation.
+    """
+    user = await get_current_user(request)
+    if user.access_level != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return pool_metrics.snapshot()
+
+@api_router.get("/admin/cache/stats")
+async def get_cache_stats(request: Request):
+    """
+    Admin: Response cache and invalidation bus counters for this worker.
+    """
+    user = await get_current_user(request)
+    if user.access_level != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return {
+        "worker_pid": os.getpid(),
+        "cache": response_cache.stats(),
+        "catalog": catalog_cache.stats(),
+        "bus": invalidation_bus.stats(),
+        "session_revocations": session_revocations.stats() if session_signer is not None else None,
+        "rate_limits": rate_limiter.stats(),
+        "sheets": sheets_client.stats() if sheets_client is not None else None
+    }
 
 app.include_router(api_router)
 
+class SessionCookieMiddleware:
+    """Sends the session token re-issued during the request (signed mode) as a cookie."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start":
+                session_cookie = scope.get("state", {}).get("session_cookie")
+                if session_cookie:
+                    cookie = Response()
+                    set_session_cookie(cookie, *session_cookie)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        header for header in cookie.raw_headers if header[0] == b"set-cookie"
+                    ]
+            await send(message)
+        
+        await self.app(scope, receive, send_with_cookie)
+
+app.add_middleware(SessionCookieMiddleware)
+app.add_middleware(AdmissionControlMiddleware, limiter=rate_limiter)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -1191,13 +2115,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so rejected and preflight requests are traced too (a no-op unless TRACING_EXPORTER is set)
+app.add_middleware(TracingMiddleware)
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
@@ -0,0 +1,258 @@
+"""
+Stateless signed sessions (opt-in with SESSION_MODE=signed).
+
+By default a session token is a random string looked up in `user_sessions`
+(and the user in `users`) on every request. In signed mode the token itself
+carries what authorization needs: session id, user id, access level,
+subscription tier/status/end date and the session expiry, signed with
+HMAC-SHA256. Verifying it is a hash over ~300 bytes, with no database access.
+
+    v1.<key id>.<base64url payload>.<base64url signature>
+
+Keys come from SESSION_KEYS ("kid:secret,kid:secret"). The first key signs
+and all of them verify, so a key is rotated by putting the new one first and
+removing the old one once its sessions have expired.
+
+A token stays valid until it expires unless it is listed in the revocation
+list (`session_revocations`), which every process mirrors in memory:
+
+    session  one logged-out session id
+    revoke   every session of a user issued before `at` (admin revocation)
+    refresh  sessions of a user issued before `at` carry stale claims (e.g.
+             an admin changed the subscription); they are re-read from the
+             database once and re-issued rather than rejected
+
+Roles are changed in the database directly, so nothing here covers them: the
+server re-reads the user for every token claiming admin access instead.
+
+Entries expire with the longest session lifetime (TTL index), so the list
+only ever holds what could still matter. Processes pull new entries every
+`sync_seconds`, and sooner when the "sessions" topic is published on the
+invalidation bus.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional, Tuple
+
+TOKEN_VERSION = "v1"
+REVOCATIONS_COLLECTION = "session_revocations"
+SESSION_TTL = timedelta(days=7)
+# Entries written around a sync may land with a slightly older `at` on another worker's clock
+SYNC_OVERLAP_SECONDS = 30
+
+class SessionError(Exception):
+    """The token is malformed or badly signed."""
+
+class SessionExpired(SessionError):
+    pass
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def _epoch(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def is_signed_token(token: str) -> bool:
+    return token.startswith(TOKEN_VERSION + ".")
+
+class SessionSigner:
+    def __init__(self, keys: List[Tuple[str, bytes]]):
+        if not keys:
+            raise ValueError("At least one session key is required")
+        for kid, secret in keys:
+            if "." in kid or not kid:
+                raise ValueError(f"Invalid session key id: {kid!r}")
+            if len(secret) < 32:
+                raise ValueError(f"Session key {kid} is too short: use at least 32 bytes")
+        self.active_kid = keys[0][0]
+        self._keys: Dict[str, bytes] = dict(keys)
+
+    @classmethod
+    def from_env(cls) -> "SessionSigner":
+        """SESSION_KEYS="kid:secret,...", secrets base64url-encoded; the first key signs."""
+        keys = []
+        for item in (os.environ.get("SESSION_KEYS") or "").split(","):
+            if not item.strip():
+                continue
+            if ":" not in item:
+                raise ValueError("Invalid SESSION_KEYS entry. Expected kid:secret")
+            kid, secret = item.strip().split(":", 1)
+            keys.append((kid, _b64decode(secret)))
+        return cls(keys)
+
+    def _sign(self, kid: str, signing_input: str) -> bytes:
+        return hmac.new(self._keys[kid], signing_input.encode("ascii"), hashlib.sha256).digest()
+
+    def issue(self, user: dict, session_id: Optional[str] = None, expires_at: Optional[float] = None,
+              now: Optional[float] = None) -> Tuple[str, dict]:
+        """Token for a user document (and the claims in it). Re-issuing keeps session_id/expires_at."""
+        now = time.time() if now is None else now
+        claims = {
+            "sid": session_id or uuid.uuid4().hex,
+            "uid": user["user_id"],
+            "lvl": user.get("access_level") or "Limited",
+            "sty": user.get("subscription_type"),
+            "sst": user.get("subscription_status") or "none",
+            "sed": _epoch(user.get("subscription_end_date")),
+            "iat": now,
+            "exp": expires_at or now + SESSION_TTL.total_seconds(),
+        }
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        signing_input = f"{TOKEN_VERSION}.{self.active_kid}.{payload}"
+        return f"{signing_input}.{_b64encode(self._sign(self.active_kid, signing_input))}", claims
+
+    def verify(self, token: str, now: Optional[float] = None) -> dict:
+        try:
+            version, kid, payload, signature = token.split(".")
+        except ValueError:
+            raise SessionError("Malformed session token")
+        if version != TOKEN_VERSION or kid not in self._keys:
+            raise SessionError("Unknown session key")
+        try:
+            signature_bytes = _b64decode(signature)
+        except ValueError:
+            raise SessionError("Malformed session token")
+        if not hmac.compare_digest(self._sign(kid, f"{version}.{kid}.{payload}"), signature_bytes):
+            raise SessionError("Invalid session signature")
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            raise SessionError("Malformed session token")
+        if claims["exp"] < (time.time() if now is None else now):
+            raise SessionExpired("Session expired")
+        return claims
+
+def user_fields(claims: dict) -> dict:
+    """User fields carried by a token, in the shape of the users collection."""
+    return {
+        "user_id": claims["uid"],
+        "access_level": claims["lvl"],
+        "subscription_type": claims["sty"],
+        "subscription_status": claims["sst"],
+        "subscription_end_date": datetime.fromtimestamp(claims["sed"], timezone.utc).isoformat()
+        if claims["sed"] is not None else None,
+    }
+
+class RevocationList:
+    """In-memory mirror of `session_revocations`."""
+
+    def __init__(self, sync_seconds: float = 5.0):
+        self.sync_seconds = sync_seconds
+        self._sessions: Dict[str, float] = {}  # session id -> entry expiry
+        self._revoked_before: Dict[str, Tuple[float, float]] = {}  # user id -> (at, entry expiry)
+        self._refresh_before: Dict[str, Tuple[float, float]] = {}
+        self._synced_at = 0.0
+        self._last_entry_at = 0.0
+        self._stale = True
+        self._lock = asyncio.Lock()
+        self.syncs = 0
+
+    def __len__(self):
+        return len(self._sessions) + len(self._revoked_before) + len(self._refresh_before)
+
+    def is_revoked(self, claims: dict) -> bool:
+        if claims["sid"] in self._sessions:
+            return True
+        revoked = self._revoked_before.get(claims["uid"])
+        return revoked is not None and claims["iat"] <= revoked[0]
+
+    def needs_refresh(self, claims: dict) -> bool:
+        refresh = self._refresh_before.get(claims["uid"])
+        return refresh is not None and claims["iat"] <= refresh[0]
+
+    def invalidate(self, topic: str, payload: Optional[dict] = None):
+        """Invalidation bus handler: pull new entries on the next check."""
+        self._stale = True
+
+    async def maybe_sync(self, db):
+        if not self._stale and time.monotonic() - self._synced_at < self.sync_seconds:
+            return
+        async with self._lock:
+            if not self._stale and time.monotonic() - self._synced_at < self.sync_seconds:
+                return
+            self._stale = False
+            await self.sync(db)
+
+    async def sync(self, db):
+        since = self._last_entry_at - SYNC_OVERLAP_SECONDS
+        entries = await db[REVOCATIONS_COLLECTION].find({"at": {"$gt": since}}, {"_id": 0}).to_list(None)
+        for entry in entries:
+            self._apply(entry)
+            self._last_entry_at = max(self._last_entry_at, entry["at"])
+        self._prune(time.time())
+        self._synced_at = time.monotonic()
+        self.syncs += 1
+
+    def _apply(self, entry: dict):
+        expires_at = entry["expires_at"]
+        if isinstance(expires_at, datetime):
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            expires_at = expires_at.timestamp()
+        if entry["kind"] == "session":
+            self._sessions[entry["sid"]] = expires_at
+            return
+        target = self._revoked_before if entry["kind"] == "revoke" else self._refresh_before
+        current = target.get(entry["user_id"])
+        if current is None or entry["at"] > current[0]:
+            target[entry["user_id"]] = (entry["at"], expires_at)
+
+    def _prune(self, now: float):
+        self._sessions = {sid: expires for sid, expires in self._sessions.items() if expires > now}
+        for target in (self._revoked_before, self._refresh_before):
+            for user_id in [user_id for user_id, (_, expires) in target.items() if expires <= now]:
+                del target[user_id]
+
+    async def add(self, db, kind: str, user_id: str, session_id: Optional[str] = None,
+                  expires_at: Optional[float] = None, now: Optional[float] = None):
+        await self.add_many(db, kind, [user_id], session_id, expires_at, now)
+
+    async def add_many(self, db, kind: str, user_ids: List[str], session_id: Optional[str] = None,
+                       expires_at: Optional[float] = None, now: Optional[float] = None):
+        """Record entries and apply them locally right away."""
+        from pymongo import UpdateOne
+
+        now = time.time() if now is None else now
+        # User-wide entries only have to outlive the sessions issued before them
+        expires = datetime.fromtimestamp(expires_at or now + SESSION_TTL.total_seconds(), timezone.utc)
+        entries = [
+            {"kind": kind, "user_id": user_id, "sid": session_id, "at": now, "expires_at": expires}
+            for user_id in user_ids
+        ]
+        if not entries:
+            return
+        await db[REVOCATIONS_COLLECTION].bulk_write([
+            UpdateOne({"_id": f"{kind}:{session_id if kind == 'session' else entry['user_id']}"},
+                      {"$set": entry}, upsert=True)
+            for entry in entries
+        ], ordered=False)
+        for entry in entries:
+            self._apply(entry)
+
+    def stats(self) -> dict:
+        return {
+            "revoked_sessions": len(self._sessions),
+            "revoked_users": len(self._revoked_before),
+            "refresh_users": len(self._refresh_before),
+            "syncs": self.syncs,
+        }
+
+async def ensure_revocation_indexes(db):
+    await db[REVOCATIONS_COLLECTION].create_index("at")
+    await db[REVOCATIONS_COLLECTION].create_index("expires_at", expireAfterSeconds=0)
@@ -0,0 +1,339 @@
+"""
+Resilient Google Sheets reads for the daily analysis sync.
+
+The sync used to call the blocking Sheets client once; any HttpError
+aborted it, transient 429/5xx responses were not retried and nothing
+stopped scheduled syncs from hammering an API that was down. Reads now go
+through SheetsClient on the shared httpx client:
+
+- retries of retryable statuses (408, 429, 5xx) and transport errors with
+  jittered exponential backoff ("full jitter"), honouring Retry-After
+- a client-side quota budget: at most `requests_per_minute` Sheets requests
+  in any 60 seconds, waiting for a slot instead of drawing 429s
+- a circuit breaker: after `failure_threshold` consecutive failed attempts
+  requests fail fast for `reset_seconds`, then one trial request decides
+  whether it closes again
+- chunked fetches: a large range is read in blocks of `chunk_rows` rows, and
+  each block is retried on its own
+
+Access tokens come from the service account in GOOGLE_SHEETS_CREDENTIALS: a
+JWT assertion signed with google-auth is exchanged at the token endpoint over
+the shared httpx client, and the token is reused until shortly before it
+expires. Endpoints are configurable so tests
+can point the client at a fault-injecting fake Sheets server.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+from urllib.parse import quote
+
+import httpx
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+SHEETS_API_URL = "https://sheets.googleapis.com/v4"
+DRIVE_API_URL = "https://www.googleapis.com/drive/v3"
+SCOPES = (
+    "https://www.googleapis.com/auth/spreadsheets.readonly",
+    "https://www.googleapis.com/auth/drive.metadata.readonly",
+)
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+# Tokens are refreshed this long before they expire
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+_A1_RANGE = re.compile(r"^(?:(?P<sheet>'[^']+'|[^!]+)!)?(?P<c1>[A-Z]+)(?P<r1>\d*):(?P<c2>[A-Z]+)(?P<r2>\d*)$")
+
+class SheetsError(Exception):
+    """The Sheets API refused the request (not retryable)."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+class SheetsUnavailable(SheetsError):
+    """The Sheets API kept failing, or the circuit breaker is open."""
+
+    def __init__(self, message: str, retry_after: float = 60.0, status: Optional[int] = None):
+        super().__init__(message, status)
+        self.retry_after = retry_after
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 32.0
+
+    def backoff(self, attempt: int, rng: Callable[[], float] = random.random) -> float:
+        """Full jitter: uniform in [0, min(max_delay, base_delay * 2^attempt)]."""
+        return rng() * min(self.max_delay, self.base_delay * (2 ** attempt))
+
+class QuotaBudget:
+    """At most `requests_per_minute` acquisitions in any 60-second window."""
+
+    def __init__(self, requests_per_minute: int = 60, clock: Callable[[], float] = time.monotonic,
+                 sleep=asyncio.sleep):
+        self.requests_per_minute = requests_per_minute
+        self.clock = clock
+        self.sleep = sleep
+        self._sent: List[float] = []
+        self._lock = asyncio.Lock()
+        self.waited_seconds = 0.0
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = self.clock()
+                self._sent = [at for at in self._sent if now - at < 60]
+                if len(self._sent) < self.requests_per_minute:
+                    self._sent.append(now)
+                    return
+                wait = 60 - (now - self._sent[0])
+                self.waited_seconds += wait
+                await self.sleep(wait)
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.clock() - self.opened_at >= self.reset_seconds else "open"
+
+    def allow(self):
+        """Raise SheetsUnavailable while open; in half-open state let a single trial request through."""
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial):
+            retry_after = max(1.0, self.reset_seconds - (self.clock() - self.opened_at))
+            raise SheetsUnavailable("Google Sheets API unavailable (circuit open)", retry_after=retry_after)
+        if state == "half_open":
+            self._trial = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self._trial:
+                logger.warning(f"Google Sheets circuit opened after {self.failures} consecutive failures")
+            self.opened_at = self.clock()
+            self._trial = False
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+class ServiceAccountTokens:
+    """OAuth access tokens for a service account (JWT bearer grant), cached until near expiry."""
+
+    def __init__(self, http_client: httpx.AsyncClient, credentials_json: Optional[str], scopes=SCOPES,
+                 token_url: Optional[str] = None):
+        self.http_client = http_client
+        self.credentials_json = credentials_json
+        self.scopes = scopes
+        self.token_url = token_url
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self._token = None
+
+    def _assertion(self, info: dict, token_url: str) -> str:
+        try:
+            from google.auth import crypt, jwt
+        except ImportError:
+            raise RuntimeError("Sheets sync requires the google-auth package: pip install google-auth")
+
+        # google-auth signs the assertion (and sets `kid` from private_key_id); the exchange stays on httpx
+        signer = crypt.RSASigner.from_service_account_info(info)
+        now = int(time.time())
+        claims = {"iss": info["client_email"], "scope": " ".join(self.scopes), "aud": token_url,
+                  "iat": now, "exp": now + 3600}
+        return jwt.encode(signer, claims).decode("ascii")
+
+    async def token(self) -> str:
+        async with self._lock:
+            if self._token is not None and time.time() < self._expires_at:
+                return self._token
+            if not self.credentials_json:
+                raise ValueError("GOOGLE_SHEETS_CREDENTIALS environment variable not set")
+            info = json.loads(self.credentials_json)
+            token_url = self.token_url or info.get("token_uri") or "https://oauth2.googleapis.com/token"
+            try:
+                response = await self.http_client.post(token_url, data={
+                    "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer",
+                    "assertion": self._assertion(info, token_url),
+                })
+            except httpx.HTTPError as e:
+                raise SheetsUnavailable(f"Token request failed: {str(e)}")
+            if response.status_code != 200:
+                raise SheetsError(f"Service account token request failed: {response.text}", response.status_code)
+            payload = response.json()
+            self._token = payload["access_token"]
+            self._expires_at = time.time() + int(payload.get("expires_in", 3600)) - TOKEN_REFRESH_MARGIN_SECONDS
+            return self._token
+
+def parse_a1_range(range_name: str) -> Optional[dict]:
+    """Split "Sheet1!A2:G" into its parts, or None for ranges that can't be chunked."""
+    match = _A1_RANGE.match(range_name.strip())
+    if not match:
+        return None
+    parts = match.groupdict()
+    return {
+        "sheet": parts["sheet"],
+        "start_col": parts["c1"],
+        "start_row": int(parts["r1"] or 1),
+        "end_col": parts["c2"],
+        "end_row": int(parts["r2"]) if parts["r2"] else None,
+    }
+
+class SheetsClient:
+    def __init__(self, http_client: httpx.AsyncClient, tokens: ServiceAccountTokens,
+                 api_url: str = SHEETS_API_URL, drive_url: str = DRIVE_API_URL,
+                 retry: RetryPolicy = RetryPolicy(), quota: Optional[QuotaBudget] = None,
+                 breaker: Optional[CircuitBreaker] = None, sleep=asyncio.sleep,
+                 rng: Callable[[], float] = random.random):
+        self.http_client = http_client
+        self.tokens = tokens
+        self.api_url = api_url.rstrip("/")
+        self.drive_url = drive_url.rstrip("/")
+        self.retry = retry
+        self.quota = quota or QuotaBudget()
+        self.breaker = breaker or CircuitBreaker()
+        self.sleep = sleep
+        self.rng = rng
+        self.requests = 0
+        self.retries = 0
+
+    async def _get(self, path: str, params: Optional[dict] = None, base_url: Optional[str] = None,
+                   api: str = "Google Sheets") -> dict:
+        """GET a Sheets (or, with `base_url`, Drive) API resource with retries, quota and the circuit breaker."""
+        # One span per read; each attempt's HTTP request is a child span, retries are events
+        with tracing.span("sheets GET", {"sheets.path": path}) as span:
+            return await self._get_with_retries(f"{base_url or self.api_url}{path}", params, span, api)
+
+    async def _get_with_retries(self, url: str, params: Optional[dict], span, api: str) -> dict:
+        last_error = "no attempt made"
+        last_status = None
+        retry_after = 0.0
+        refreshed = False
+        attempt = 0
+        while attempt < self.retry.max_attempts:
+            if not refreshed or attempt > 0:
+                self.breaker.allow()
+            try:
+                await self.quota.acquire()
+                headers = {"Authorization": f"Bearer {await self.tokens.token()}"}
+                self.requests += 1
+                response = await self.http_client.get(url, params=params, headers=headers)
+            except httpx.TransportError as e:
+                last_error, last_status, retry_after = f"{type(e).__name__}: {str(e)}", None, 0.0
+            except BaseException:
+                # The token fetch failed or the call was cancelled. Counting it ends a half-open
+                # trial, which would otherwise keep the circuit open for good.
+                self.breaker.record_failure()
+                raise
+            else:
+                if response.status_code == 200:
+                    self.breaker.record_success()
+                    return response.json()
+                if response.status_code == 401 and not refreshed:
+                    # Expired or revoked token: get a new one once, without counting an attempt
+                    refreshed = True
+                    self.tokens.invalidate()
+                    continue
+                if response.status_code not in RETRYABLE_STATUSES:
+                    # The API answered; the request itself is wrong
+                    self.breaker.record_success()
+                    raise SheetsError(f"{api} API error {response.status_code}: {response.text[:500]}",
+                                      response.status_code)
+                last_error, last_status = f"HTTP {response.status_code}", response.status_code
+                try:
+                    retry_after = float(response.headers.get("retry-after", 0))
+                except ValueError:
+                    retry_after = 0.0
+
+            self.breaker.record_failure()
+            attempt += 1
+            if attempt >= self.retry.max_attempts:
+                break
+            self.retries += 1
+            delay = min(self.retry.max_delay, max(retry_after, self.retry.backoff(attempt - 1, self.rng)))
+            logger.info(f"Sheets request failed ({last_error}), retry {attempt} in {delay:.2f}s")
+            span.add_event("retry", {"attempt": attempt, "error": last_error, "delay_seconds": delay})
+            await self.sleep(delay)
+        raise SheetsUnavailable(
+            f"{api} API unavailable after {self.retry.max_attempts} attempts: {last_error}",
+            retry_after=max(retry_after, 1.0), status=last_status
+        )
+
+    async def get_values(self, spreadsheet_id: str, range_name: str) -> List[list]:
+        result = await self._get(f"/spreadsheets/{quote(spreadsheet_id, safe='')}/values/{quote(range_name, safe='')}")
+        return result.get("values", [])
+
+    async def row_count(self, spreadsheet_id: str, sheet: Optional[str] = None) -> int:
+        result = await self._get(f"/spreadsheets/{quote(spreadsheet_id, safe='')}",
+                                 {"fields": "sheets(properties(title,gridProperties(rowCount)))"})
+        sheets = [s["properties"] for s in result.get("sheets", [])]
+        title = sheet.strip("'") if sheet else None
+        for properties in sheets:
+            if title is None or properties.get("title") == title:
+                return properties.get("gridProperties", {}).get("rowCount", 0)
+        raise SheetsError(f"Sheet not found: {sheet}", 400)
+
+    async def fetch_range(self, spreadsheet_id: str, range_name: str, chunk_rows: Optional[int] = None) -> List[list]:
+        """
+        Read a range, in blocks of `chunk_rows` rows when it is larger. Rows
+        keep their positions (empty rows inside the range come back as []),
+        and trailing empty rows are dropped, as in a single read.
+        """
+        parts = parse_a1_range(range_name) if chunk_rows else None
+        if parts is None:
+            return await self.get_values(spreadsheet_id, range_name)
+
+        end_row = parts["end_row"] or await self.row_count(spreadsheet_id, parts["sheet"])
+        prefix = f"{parts['sheet']}!" if parts["sheet"] else ""
+        rows: List[list] = []
+        for block_start in range(parts["start_row"], end_row + 1, chunk_rows):
+            block_end = min(block_start + chunk_rows - 1, end_row)
+            block = await self.get_values(
+                spreadsheet_id, f"{prefix}{parts['start_col']}{block_start}:{parts['end_col']}{block_end}"
+            )
+            rows.extend(block)
+            rows.extend([] for _ in range(block_end - block_start + 1 - len(block)))
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    async def file_metadata(self, file_id: str) -> dict:
+        """Drive metadata (version, modifiedTime) of a spreadsheet, read like the Sheets resources."""
+        return await self._get(f"/files/{quote(file_id, safe='')}",
+                               {"fields": "version,modifiedTime", "supportsAllDrives": "true"},
+                               base_url=self.drive_url, api="Drive")
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "quota_per_minute": self.quota.requests_per_minute,
+            "quota_waited_seconds": round(self.quota.waited_seconds, 1),
+            "circuit": self.breaker.stats(),
+        }
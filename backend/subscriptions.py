@@ -0,0 +1,207 @@
+"""
+Admin subscription changes for one user or many.
+
+`subscription_changes` is the single definition of what each action does to
+a user's subscription fields. Bulk operations apply it to lists of emails in
+chunks: actions that set the same values for everyone (activate, gift,
+deactivate) are one update_many per chunk, while extend depends on each
+user's current end date and is written as one unordered bulk of per-user
+updates per chunk. Every email gets an outcome: updated, not_found, invalid
+or duplicate.
+
+Large batches run as background jobs tracked in `subscription_jobs`.
+"""
+
+import asyncio
+import csv
+import io
+import logging
+import re
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+from user_directory import backfill_search_fields
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTION_TYPES = ("Beginner", "Advanced", "Premium")
+ACTIONS = ("activate", "extend", "deactivate", "gift")
+JOBS_COLLECTION = "subscription_jobs"
+CHUNK_SIZE = 1000
+MAX_BULK_EMAILS = 50000
+
+_EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+def validate_request(action: str, subscription_type: str, duration_days: int):
+    if action not in ACTIONS:
+        raise ValueError("Invalid action")
+    if action != "deactivate" and subscription_type not in SUBSCRIPTION_TYPES:
+        raise ValueError("Invalid subscription type")
+    if action != "deactivate" and duration_days < 1:
+        raise ValueError("duration_days must be at least 1")
+
+def subscription_changes(action: str, subscription_type: str, duration_days: int,
+                         current_end: Optional[str], now: datetime) -> dict:
+    """Fields to $set on a user for `action`."""
+    if action in ("activate", "gift"):
+        return {
+            "subscription_type": subscription_type,
+            "subscription_status": "active",
+            "subscription_start_date": now.isoformat(),
+            "subscription_end_date": (now + timedelta(days=duration_days)).isoformat()
+        }
+    if action == "extend":
+        # Extends from the current end date, or from now if it already passed
+        start = now
+        if current_end:
+            current_end_date = datetime.fromisoformat(current_end)
+            if current_end_date.tzinfo is None:
+                current_end_date = current_end_date.replace(tzinfo=timezone.utc)
+            start = max(current_end_date, now)
+        return {
+            "subscription_type": subscription_type,
+            "subscription_status": "active",
+            "subscription_end_date": (start + timedelta(days=duration_days)).isoformat()
+        }
+    if action == "deactivate":
+        return {
+            "subscription_status": "expired",
+            "subscription_end_date": now.isoformat()
+        }
+    raise ValueError("Invalid action")
+
+def parse_email_file(content: bytes) -> List[str]:
+    """Emails from an uploaded file: a CSV with an `email` column, or one email per line."""
+    text = content.decode("utf-8-sig")
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    if "email" in header:
+        column = header.index("email")
+        return [row[column] for row in rows[1:] if len(row) > column]
+    return [cell for row in rows for cell in row[:1]]
+
+async def apply_bulk(db, emails: Iterable[str], action: str, subscription_type: str, duration_days: int,
+                     now: Optional[datetime] = None, chunk_size: int = CHUNK_SIZE, progress=None,
+                     on_updated=None) -> dict:
+    """
+    Apply one action to many users, matched case-insensitively by email.
+    Returns counts, per-email outcomes and timing. `progress(processed)` is
+    awaited after each chunk, and `on_updated(user_ids)` with the users the
+    chunk changed.
+    """
+    validate_request(action, subscription_type, duration_days)
+    started = time.perf_counter()
+    now = now or datetime.now(timezone.utc)
+
+    outcomes: List[dict] = []
+    pending: Dict[str, str] = {}  # lowercased -> email as given
+    for raw in emails:
+        email = (raw or "").strip()
+        if not email:
+            continue
+        key = email.lower()
+        if not _EMAIL_PATTERN.match(email):
+            outcomes.append({"email": email, "outcome": "invalid"})
+        elif key in pending:
+            outcomes.append({"email": email, "outcome": "duplicate"})
+        else:
+            pending[key] = email
+
+    keys = list(pending)
+    if keys:
+        # Users are matched on search_email; users inserted since startup without it would be not_found
+        await backfill_search_fields(db)
+    processed = 0
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys[start:start + chunk_size]
+        users = await db.users.find(
+            {"search_email": {"$in": chunk}},
+            {"_id": 0, "user_id": 1, "search_email": 1, "subscription_end_date": 1}
+        ).to_list(None)
+        found = {user["search_email"]: user for user in users}
+
+        if users:
+            if action == "extend":
+                await db.users.bulk_write([
+                    UpdateOne({"user_id": user["user_id"]}, {"$set": subscription_changes(
+                        action, subscription_type, duration_days, user.get("subscription_end_date"), now
+                    )})
+                    for user in users
+                ], ordered=False)
+            else:
+                await db.users.update_many(
+                    {"user_id": {"$in": [user["user_id"] for user in users]}},
+                    {"$set": subscription_changes(action, subscription_type, duration_days, None, now)}
+                )
+            if on_updated is not None:
+                await on_updated([user["user_id"] for user in users])
+
+        for key in chunk:
+            outcomes.append({"email": pending[key], "outcome": "updated" if key in found else "not_found"})
+        processed += len(chunk)
+        if progress is not None:
+            await progress(processed)
+
+    counts = {}
+    for outcome in outcomes:
+        counts[outcome["outcome"]] = counts.get(outcome["outcome"], 0) + 1
+    return {
+        "action": action,
+        "subscription_type": subscription_type if action != "deactivate" else None,
+        "duration_days": duration_days if action != "deactivate" else None,
+        "total": len(outcomes),
+        "counts": counts,
+        "outcomes": outcomes,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+# Strong references to running jobs so they are not garbage-collected mid-run
+_running_jobs = set()
+
+async def start_bulk_job(db, emails: List[str], action: str, subscription_type: str, duration_days: int,
+                         created_by: str, on_updated=None) -> dict:
+    """Record a job and run apply_bulk in the background. Returns the job document."""
+    validate_request(action, subscription_type, duration_days)
+    job = {
+        "job_id": f"subjob_{uuid.uuid4().hex[:12]}",
+        "status": "running",
+        "action": action,
+        "subscription_type": subscription_type,
+        "duration_days": duration_days,
+        "total_emails": len(emails),
+        "processed": 0,
+        "created_by": created_by,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "finished_at": None,
+        "result": None,
+        "error": None,
+    }
+    await db[JOBS_COLLECTION].insert_one(dict(job))
+
+    async def progress(processed):
+        await db[JOBS_COLLECTION].update_one({"job_id": job["job_id"]}, {"$set": {"processed": processed}})
+
+    async def run():
+        try:
+            result = await apply_bulk(db, emails, action, subscription_type, duration_days, progress=progress,
+                                      on_updated=on_updated)
+            update = {"status": "completed", "result": result}
+        except Exception as e:
+            logger.error(f"Bulk subscription job {job['job_id']} failed: {str(e)}")
+            update = {"status": "failed", "error": str(e)}
+        update["finished_at"] = datetime.now(timezone.utc).isoformat()
+        await db[JOBS_COLLECTION].update_one({"job_id": job["job_id"]}, {"$set": update})
+
+    task = asyncio.create_task(run())
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
+    return job
+
+async def get_job(db, job_id: str) -> Optional[dict]:
+    return await db[JOBS_COLLECTION].find_one({"job_id": job_id}, {"_id": 0})
@@ -0,0 +1,71 @@
+"""
+Change fingerprints for scheduled syncs.
+
+Each sync source (a spreadsheet range) has one `sync_state` document with
+the fingerprint of the source as of its last successful sync. Before
+fetching anything, the sync takes a cheap probe of the source. For Google
+Sheets this is the Drive file's `version` and `modifiedTime`, which change
+on every edit. If the probe matches the stored fingerprint, the fetch,
+parse and write are skipped and only a skip counter is bumped.
+
+The probe is taken before the fetch, so an edit made while a sync is
+running changes the version after the stored fingerprint and is picked up
+by the next sync. When the probe is unavailable (for example the Drive API
+is not enabled for the service account), the sync always runs.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+STATE_COLLECTION = "sync_state"
+
+def sheets_source_key(spreadsheet_id: str, range_name: str) -> str:
+    return f"sheets:{spreadsheet_id}:{range_name}"
+
+async def drive_fingerprint(sheets_client, file_id: str) -> Optional[str]:
+    """The file's revision as "version:modifiedTime", or None if Drive can't be asked."""
+    try:
+        meta = await sheets_client.file_metadata(file_id)
+    except Exception as e:
+        logger.warning(f"Drive change probe failed for {file_id}, syncing without it: {str(e)}")
+        return None
+    if not meta.get("version") and not meta.get("modifiedTime"):
+        return None
+    return f"{meta.get('version')}:{meta.get('modifiedTime')}"
+
+async def get_state(db, source: str) -> Optional[dict]:
+    return await db[STATE_COLLECTION].find_one({"source": source}, {"_id": 0})
+
+def is_unchanged(state: Optional[dict], fingerprint: Optional[str]) -> bool:
+    return fingerprint is not None and state is not None and state.get("fingerprint") == fingerprint
+
+async def record_skip(db, source: str) -> dict:
+    """Count a skipped sync; returns the updated state."""
+    return await db[STATE_COLLECTION].find_one_and_update(
+        {"source": source},
+        {"$inc": {"skipped_count": 1}, "$set": {"last_checked_at": datetime.now(timezone.utc).isoformat()}},
+        projection={"_id": 0}, return_document=ReturnDocument.AFTER
+    )
+
+async def record_sync(db, source: str, fingerprint: Optional[str], result: dict) -> dict:
+    """
+    Store the fingerprint the source had when this sync started. Only call it
+    for a sync whose writes all succeeded (invalid rows are fine): a stored
+    fingerprint makes later syncs skip the unchanged sheet.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    return await db[STATE_COLLECTION].find_one_and_update(
+        {"source": source},
+        {"$set": {
+            "fingerprint": fingerprint,
+            "last_synced_at": now,
+            "last_checked_at": now,
+            "last_result": {k: result[k] for k in ("total_rows", "inserted", "updated", "skipped")}
+        }, "$setOnInsert": {"skipped_count": 0}},
+        projection={"_id": 0}, upsert=True, return_document=ReturnDocument.AFTER
+    )
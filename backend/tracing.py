@@ -0,0 +1,293 @@
+"""
+OpenTelemetry tracing for the Tahlil One backend.
+
+Off by default. When TRACING_EXPORTER is set, each request gets a server
+span (continuing the caller's W3C `traceparent`), with child spans for:
+
+- every MongoDB command, from a pymongo command listener (Motor runs
+  commands on its executor with the request's context, so they nest)
+- every outbound httpx request (OAuth, JWKS, Sheets, Drive), which also
+  carries `traceparent` so the callee can join the trace
+- each Sheets API read, around its retries, and each sync/import stage
+- get_current_user
+
+Configuration:
+
+    TRACING_EXPORTER       "none" (default), "otlp", "file" or "console"
+    TRACING_SAMPLE_RATIO   fraction of new traces recorded (default 1.0);
+                           requests arriving with a sampled traceparent are
+                           always recorded
+    TRACING_OTLP_ENDPOINT  OTLP/HTTP traces endpoint
+                           (default http://localhost:4318/v1/traces)
+    TRACING_FILE           file the "file" exporter appends to, one JSON
+                           span per line (default traces.jsonl)
+    TRACING_SERVICE_NAME   service.name resource attribute (default tahlil-backend)
+
+Exporting needs `pip install opentelemetry-sdk`, plus
+`opentelemetry-exporter-otlp-proto-http` for "otlp". Spans are exported in
+batches from a background thread. Command bodies and query strings are not
+recorded, since they can hold user data and tokens.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+import httpx
+from pydantic import BaseModel
+from pymongo import monitoring
+
+EXPORTERS = ["none", "otlp", "file", "console"]
+
+class TracingSettings(BaseModel):
+    exporter: str = "none"
+    sample_ratio: float = 1.0
+    otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    file_path: str = "traces.jsonl"
+    service_name: str = "tahlil-backend"
+
+    @classmethod
+    def from_env(cls) -> "TracingSettings":
+        settings = cls(
+            exporter=os.environ.get("TRACING_EXPORTER", "none"),
+            sample_ratio=float(os.environ.get("TRACING_SAMPLE_RATIO", "1.0")),
+            otlp_endpoint=os.environ.get("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"),
+            file_path=os.environ.get("TRACING_FILE", "traces.jsonl"),
+            service_name=os.environ.get("TRACING_SERVICE_NAME", "tahlil-backend"),
+        )
+        if settings.exporter not in EXPORTERS:
+            raise ValueError(f"Invalid TRACING_EXPORTER: {settings.exporter}. Expected one of {EXPORTERS}")
+        if not 0.0 <= settings.sample_ratio <= 1.0:
+            raise ValueError(f"Invalid TRACING_SAMPLE_RATIO: {settings.sample_ratio}. Expected a number from 0 to 1")
+        return settings
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter != "none"
+
+# Set by configure(); None while tracing is off
+_provider = None
+_tracer = None
+
+def _sdk():
+    try:
+        from opentelemetry.sdk import resources, trace as sdk_trace
+        from opentelemetry.sdk.trace import export, sampling
+    except ImportError:
+        raise RuntimeError("Tracing requires the opentelemetry-sdk package: pip install opentelemetry-sdk")
+    return resources, sdk_trace, export, sampling
+
+def _file_exporter(path: str):
+    _, _, export, _ = _sdk()
+
+    class FileSpanExporter(export.SpanExporter):
+        """Appends finished spans to `path`, one JSON object per line."""
+
+        def __init__(self):
+            self._lock = threading.Lock()
+
+        def export(self, spans):
+            lines = "".join(json.dumps(json.loads(span.to_json(indent=None))) + "\n" for span in spans)
+            with self._lock, open(path, "a", encoding="utf-8") as file:
+                file.write(lines)
+            return export.SpanExportResult.SUCCESS
+
+        def shutdown(self):
+            pass
+
+    return FileSpanExporter()
+
+def create_exporter(settings: TracingSettings):
+    _, _, export, _ = _sdk()
+    if settings.exporter == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            raise RuntimeError(
+                "OTLP tracing requires the opentelemetry-exporter-otlp-proto-http package: "
+                "pip install opentelemetry-exporter-otlp-proto-http"
+            )
+        return OTLPSpanExporter(endpoint=settings.otlp_endpoint)
+    if settings.exporter == "file":
+        return _file_exporter(settings.file_path)
+    if settings.exporter == "console":
+        return export.ConsoleSpanExporter()
+    raise ValueError(f"Invalid TRACING_EXPORTER: {settings.exporter}. Expected one of {EXPORTERS}")
+
+def configure(settings: TracingSettings, exporter=None, batch: bool = True):
+    """
+    Start recording spans with `settings` (or into `exporter`, e.g. an
+    in-memory one in tests). Returns the tracer provider, or None when
+    tracing is off.
+    """
+    global _provider, _tracer
+    shutdown()
+    if not settings.enabled and exporter is None:
+        return None
+    resources, sdk_trace, export, sampling = _sdk()
+    provider = sdk_trace.TracerProvider(
+        resource=resources.Resource.create({"service.name": settings.service_name}),
+        sampler=sampling.ParentBased(sampling.TraceIdRatioBased(settings.sample_ratio)),
+    )
+    exporter = exporter or create_exporter(settings)
+    processor = export.BatchSpanProcessor(exporter) if batch else export.SimpleSpanProcessor(exporter)
+    provider.add_span_processor(processor)
+    _provider, _tracer = provider, provider.get_tracer("tahlil")
+    return provider
+
+def shutdown():
+    """Flush pending spans and stop tracing."""
+    global _provider, _tracer
+    provider, _provider, _tracer = _provider, None, None
+    if provider is not None:
+        provider.shutdown()
+
+def enabled() -> bool:
+    return _tracer is not None
+
+class _NoopSpan:
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def add_event(self, name, attributes=None):
+        pass
+
+    def is_recording(self) -> bool:
+        return False
+
+NOOP_SPAN = _NoopSpan()
+
+def _kind(kind: str):
+    from opentelemetry.trace import SpanKind
+    return getattr(SpanKind, kind.upper())
+
+def _set_error(span, description: str):
+    from opentelemetry.trace import Status, StatusCode
+    span.set_status(Status(StatusCode.ERROR, description))
+
+@contextmanager
+def span(name: str, attributes: Optional[dict] = None, kind: str = "internal", context=None):
+    """
+    A span around the block, child of the current one. Yields a no-op span
+    while tracing is off, so callers can always set attributes on it.
+    """
+    if _tracer is None:
+        yield NOOP_SPAN
+        return
+    with _tracer.start_as_current_span(name, context=context, kind=_kind(kind), attributes=attributes) as current:
+        yield current
+
+def inject(headers) -> None:
+    """Add the current trace context (`traceparent`) to outgoing `headers`."""
+    if _tracer is not None:
+        from opentelemetry import propagate
+        propagate.inject(headers)
+
+class TracingMiddleware:
+    """ASGI middleware opening the server span of each HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _tracer is None:
+            await self.app(scope, receive, send)
+            return
+        from opentelemetry import propagate
+
+        carrier = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        method = scope["method"]
+        attributes = {"http.request.method": method, "url.path": scope["path"], "url.scheme": scope.get("scheme", "http")}
+        status = {}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        with span(f"{method} {scope['path']}", attributes, kind="server", context=propagate.extract(carrier)) as current:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    # Low-cardinality name, e.g. "GET /api/admin/export/{source}"
+                    current.update_name(f"{method} {route}")
+                    current.set_attribute("http.route", route)
+                if "code" in status:
+                    current.set_attribute("http.response.status_code", status["code"])
+                    if status["code"] >= 500:
+                        _set_error(current, f"HTTP {status['code']}")
+
+class MongoCommandTracer(monitoring.CommandListener):
+    """pymongo command listener recording one client span per command."""
+
+    def __init__(self):
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if _tracer is None:
+            return
+        target = event.command.get(event.command_name)
+        attributes = {
+            "db.system": "mongodb",
+            "db.namespace": event.database_name,
+            "db.operation.name": event.command_name,
+            "server.address": event.connection_id[0],
+        }
+        if event.connection_id[1] is not None:
+            attributes["server.port"] = event.connection_id[1]
+        if isinstance(target, str):
+            attributes["db.collection.name"] = target
+        name = f"{event.command_name} {target}" if isinstance(target, str) else event.command_name
+        current = _tracer.start_span(name, kind=_kind("client"), attributes=attributes)
+        with self._lock:
+            self._spans[(event.request_id, event.connection_id)] = current
+
+    def _finish(self, event):
+        with self._lock:
+            return self._spans.pop((event.request_id, event.connection_id), None)
+
+    def succeeded(self, event):
+        current = self._finish(event)
+        if current is not None:
+            current.end()
+
+    def failed(self, event):
+        current = self._finish(event)
+        if current is not None:
+            failure = event.failure if isinstance(event.failure, dict) else {}
+            _set_error(current, str(failure.get("errmsg", event.failure))[:200])
+            current.end()
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """httpx transport recording a client span per request and sending `traceparent`."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if _tracer is None:
+            return await self.transport.handle_async_request(request)
+        attributes = {
+            "http.request.method": request.method,
+            "server.address": request.url.host,
+            # Without the query string, which may carry credentials
+            "url.full": str(request.url.copy_with(query=None)),
+        }
+        with span(request.method, attributes, kind="client") as current:
+            inject(request.headers)
+            response = await self.transport.handle_async_request(request)
+            current.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 400:
+                _set_error(current, f"HTTP {response.status_code}")
+            return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
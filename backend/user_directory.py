@@ -0,0 +1,181 @@
+"""
+Admin user directory: filtered, searchable, cursor-paginated user listing.
+
+Search is a case-insensitive prefix match on email or name. Users carry
+lowercased copies of both (`search_email`, `search_name`) so the match is an
+anchored regex on an indexed field instead of a collection scan; they are
+written with the user, backfilled on startup for older documents and again
+before bulk subscription changes match on them.
+
+Pages are keyset-paginated on (sort field, user_id): the cursor encodes the
+last row's values, so page N costs the same as page 1 and rows inserted
+meanwhile are neither skipped nor repeated.
+"""
+
+import base64
+import json
+import re
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Tuple
+
+SORT_FIELDS = {
+    "created_at": "created_at",
+    "email": "search_email",
+    "name": "search_name",
+    "subscription_end_date": "subscription_end_date",
+}
+MAX_PAGE_SIZE = 200
+
+def search_fields(email: Optional[str], name: Optional[str]) -> dict:
+    return {"search_email": (email or "").lower(), "search_name": (name or "").lower()}
+
+async def ensure_user_directory(db):
+    """Indexes for search, filters and keyset sorting; backfills search fields on older users."""
+    users = db.users
+    await users.create_index([("search_email", 1), ("user_id", 1)])
+    await users.create_index([("search_name", 1), ("user_id", 1)])
+    await users.create_index([("created_at", 1), ("user_id", 1)])
+    await users.create_index([("subscription_end_date", 1), ("user_id", 1)])
+    await users.create_index([("subscription_status", 1), ("subscription_type", 1)])
+    await backfill_search_fields(db)
+
+async def backfill_search_fields(db) -> int:
+    """Write search fields on users that lack them (e.g. written by a restore or by hand); returns how many."""
+    result = await db.users.update_many(
+        {"search_email": {"$exists": False}},
+        [{"$set": {
+            "search_email": {"$toLower": {"$ifNull": ["$email", ""]}},
+            "search_name": {"$toLower": {"$ifNull": ["$name", ""]}}
+        }}]
+    )
+    return result.modified_count
+
+def encode_cursor(value, user_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([value, user_id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[object, str]:
+    try:
+        value, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+    return value, user_id
+
+def build_filter(
+    q: Optional[str] = None,
+    subscription_type: Optional[str] = None,
+    subscription_status: Optional[str] = None,
+    access_level: Optional[str] = None,
+    expires_after: Optional[str] = None,
+    expires_before: Optional[str] = None,
+    expires_within_days: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> dict:
+    """
+    Comma-separated values match any of them. Expiry bounds are ISO
+    timestamps; subscription_end_date is stored as UTC isoformat(), so
+    string comparison orders correctly.
+    """
+    query = {}
+    if q:
+        prefix = "^" + re.escape(q.strip().lower())
+        query["$or"] = [{"search_email": {"$regex": prefix}}, {"search_name": {"$regex": prefix}}]
+    for field, value in (("subscription_type", subscription_type),
+                         ("subscription_status", subscription_status),
+                         ("access_level", access_level)):
+        if value:
+            values = [v.strip() for v in value.split(",") if v.strip()]
+            query[field] = values[0] if len(values) == 1 else {"$in": values}
+
+    expiry = {}
+    if expires_after:
+        expiry["$gte"] = _iso_utc(expires_after)
+    if expires_before:
+        expiry["$lt"] = _iso_utc(expires_before)
+    if expires_within_days is not None:
+        now = now or datetime.now(timezone.utc)
+        expiry["$gte"] = max(expiry.get("$gte", ""), now.isoformat())
+        upper = (now + timedelta(days=expires_within_days)).isoformat()
+        expiry["$lt"] = min(expiry["$lt"], upper) if "$lt" in expiry else upper
+    if expiry:
+        query["subscription_end_date"] = expiry
+    return query
+
+def _iso_utc(value: str) -> str:
+    dt = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat()
+
+def keyset_filter(field: str, descending: bool, value, user_id: str) -> dict:
+    """Rows after (value, user_id) in the sort order. Nulls sort first ascending and last descending."""
+    if descending:
+        if value is None:
+            return {field: None, "user_id": {"$lt": user_id}}
+        return {"$or": [{field: {"$lt": value}}, {field: value, "user_id": {"$lt": user_id}}, {field: None}]}
+    if value is None:
+        return {"$or": [{field: {"$ne": None}}, {field: None, "user_id": {"$gt": user_id}}]}
+    return {"$or": [{field: {"$gt": value}}, {field: value, "user_id": {"$gt": user_id}}]}
+
+async def list_users(collection, query: dict, sort: str = "created_at", order: str = "desc",
+                     limit: int = 50, cursor: Optional[str] = None) -> dict:
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"Invalid sort: {sort}. Expected one of {', '.join(SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise ValueError("Invalid order: expected asc or desc")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    field = SORT_FIELDS[sort]
+    descending = order == "desc"
+
+    page_query = query
+    if cursor:
+        value, user_id = decode_cursor(cursor)
+        page_query = {"$and": [query, keyset_filter(field, descending, value, user_id)]} if query else \
+            keyset_filter(field, descending, value, user_id)
+
+    direction = -1 if descending else 1
+    rows = await collection.find(page_query, {"_id": 0}).sort(
+        [(field, direction), ("user_id", direction)]
+    ).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].get(field), rows[-1]["user_id"])
+    for row in rows:
+        row.pop("search_email", None)
+        row.pop("search_name", None)
+    return {"users": rows, "next_cursor": next_cursor}
+
+async def count_users(collection, query: dict, now: Optional[datetime] = None) -> dict:
+    """Totals per status and tier for the filtered users, in one $facet pass."""
+    now = now or datetime.now(timezone.utc)
+    pipeline = [
+        {"$match": query},
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "by_status": [{"$group": {"_id": "$subscription_status", "count": {"$sum": 1}}}],
+            "by_type": [{"$group": {"_id": "$subscription_type", "count": {"$sum": 1}}}],
+            "expiring_7d": [
+                {"$match": {"subscription_status": "active", "subscription_end_date": {
+                    "$gte": now.isoformat(), "$lt": (now + timedelta(days=7)).isoformat()
+                }}},
+                {"$count": "count"}
+            ]
+        }}
+    ]
+    result = (await collection.aggregate(pipeline).to_list(1))[0]
+
+    def counts(rows):
+        # Missing/None and "none" are the same bucket
+        totals = {}
+        for row in rows:
+            key = row["_id"] or "none"
+            totals[key] = totals.get(key, 0) + row["count"]
+        return totals
+
+    return {
+        "total": result["total"][0]["count"] if result["total"] else 0,
+        "by_status": counts(result["by_status"]),
+        "by_type": counts(result["by_type"]),
+        "expiring_7d": result["expiring_7d"][0]["count"] if result["expiring_7d"] else 0,
+    }
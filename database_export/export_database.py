@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Tahlil One - Database Export Script
+====================================
+This script exports all Tahlil One collections from your MongoDB server into
+files that import_database.py can load.
+
+Usage:
+    python export_database.py --mongo-url "mongodb://your-server:27017" --db-name "tahlil_one" --out-dir ./snapshot
+
+    # Compressed, and only documents changed since a point in time
+    python export_database.py --mongo-url "..." --compression gzip --since 2026-01-01T00:00:00+00:00
+
+Requirements:
+    pip install pymongo
+    pip install zstandard   (only for --compression zstd)
+
+Each collection is streamed from its cursor straight to `<collection>.ndjson`
+(optionally `.ndjson.gz` / `.ndjson.zst`) without holding the collection in
+memory, and collections are exported in parallel. A `manifest.json` with the
+document count and SHA-256 of every file is written last; import_database.py
+verifies it before importing.
+
+Incremental exports (--since) only contain documents whose `updated_at` (or
+`created_at` for collections without one) is at or after the given time.
+Import them with `--mode upsert`.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pymongo import MongoClient
+
+COLLECTIONS = [
+    'users',
+    'user_sessions',
+    'markets',
+    'assets',
+    'analyses',
+    'daily_analysis',
+    'forecast_history'
+]
+
+# Field used by --since; collections without updated_at only ever get created
+SINCE_FIELDS = {
+    'users': 'created_at',
+    'user_sessions': 'created_at',
+    'markets': 'created_at',
+    'assets': 'created_at',
+    'analyses': 'updated_at',
+    'daily_analysis': 'updated_at',
+    'forecast_history': 'updated_at'
+}
+
+COMPRESSION_SUFFIXES = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+MANIFEST_FILE = 'manifest.json'
+WRITE_BATCH = 1000
+
+class HashingWriter:
+    """Binary file wrapper that hashes and counts every byte written."""
+
+    def __init__(self, f):
+        self.f = f
+        self.sha256 = hashlib.sha256()
+        self.bytes = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.bytes += len(data)
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        pass
+
+def open_compressed(raw, compression, level=None):
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=level or 6)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd compression requires the zstandard package: pip install zstandard")
+        return zstandard.ZstdCompressor(level=level or 3).stream_writer(raw, closefd=False)
+    return raw
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def since_query(collection_name, since):
+    """Match documents changed at or after `since`, whether stored as ISO strings or BSON dates."""
+    if since is None:
+        return {}
+    field = SINCE_FIELDS[collection_name]
+    naive_utc = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return {"$or": [
+        {field: {"$gte": since.isoformat()}},
+        {field: {"$gte": naive_utc}}
+    ]}
+
+def export_collection(db, collection_name, out_dir, compression, level, since, batch_size):
+    """Stream one collection to NDJSON and return its manifest entry."""
+    filename = f'{collection_name}.ndjson{COMPRESSION_SUFFIXES[compression]}'
+    path = os.path.join(out_dir, filename)
+    tmp_path = f'{path}.tmp'
+    started = time.perf_counter()
+    count = 0
+
+    cursor = db[collection_name].find(since_query(collection_name, since), {"_id": 0}, batch_size=batch_size)
+    with open(tmp_path, 'wb') as raw_file:
+        hashing = HashingWriter(raw_file)
+        writer = open_compressed(hashing, compression, level)
+        lines = []
+        for document in cursor:
+            lines.append(json.dumps(document, ensure_ascii=False, separators=(',', ':'), default=json_default))
+            count += 1
+            if len(lines) >= WRITE_BATCH:
+                writer.write(('\n'.join(lines) + '\n').encode('utf-8'))
+                lines = []
+        if lines:
+            writer.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        if writer is not hashing:
+            writer.close()
+    os.replace(tmp_path, path)
+
+    return {
+        'file': filename,
+        'count': count,
+        'sha256': hashing.sha256.hexdigest(),
+        'bytes': hashing.bytes,
+        'compression': compression,
+        'since_field': SINCE_FIELDS[collection_name] if since else None,
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Export Tahlil One database')
+    parser.add_argument('--mongo-url', required=True, help='MongoDB connection URL')
+    parser.add_argument('--db-name', default='tahlil_one', help='Database name (default: tahlil_one)')
+    parser.add_argument('--out-dir', default='.', help='Directory to write export files to (default: current directory)')
+    parser.add_argument('--compression', choices=list(COMPRESSION_SUFFIXES), default='none', help='Compress files with gzip or zstd')
+    parser.add_argument('--level', type=int, default=None, help='Compression level (default: 6 for gzip, 3 for zstd)')
+    parser.add_argument('--since', default=None, help='Only export documents changed at or after this ISO timestamp')
+    parser.add_argument('--batch-size', type=int, default=2000, help='Cursor batch size (default: 2000)')
+    parser.add_argument('--workers', type=int, default=4, help='Collections exported in parallel (default: 4)')
+    parser.add_argument('--collections', nargs='+', choices=COLLECTIONS, default=COLLECTIONS, help='Subset of collections to export')
+    args = parser.parse_args()
+
+    since = None
+    if args.since:
+        since = datetime.fromisoformat(args.since)
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+
+    # Connect to MongoDB
+    print(f"\n🔌 Connecting to MongoDB: {args.mongo_url}")
+    client = MongoClient(args.mongo_url, maxPoolSize=max(args.workers * 2, 10))
+    db = client[args.db_name]
+
+    # Test connection
+    try:
+        client.admin.command('ping')
+        print("✅ Connected successfully!\n")
+    except Exception as e:
+        print(f"❌ Connection failed: {e}")
+        return 1
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    scope = f"changed since {since.isoformat()}" if since else "full"
+    print(f"📦 Exporting database: {args.db_name} ({scope}, compression: {args.compression})\n")
+
+    started = time.perf_counter()
+    entries = {}
+    failures = []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(
+                export_collection, db, collection, args.out_dir, args.compression, args.level, since, args.batch_size
+            ): collection
+            for collection in args.collections
+        }
+        for future in as_completed(futures):
+            collection = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                failures.append(collection)
+                print(f"  ❌ {collection}: {e}")
+                continue
+            entries[collection] = entry
+            rate = entry['count'] / max(entry['seconds'], 1e-9)
+            print(f"  ✅ {collection}: {entry['count']} documents, {entry['bytes'] / 1e6:.2f} MB in {entry['seconds']:.2f}s ({rate:,.0f} docs/s)")
+
+    if failures:
+        print(f"\n❌ Export failed for: {', '.join(sorted(failures))}. No manifest was written.")
+        return 1
+
+    manifest = {
+        'db_name': args.db_name,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'since': since.isoformat() if since else None,
+        'collections': {name: entries[name] for name in args.collections}
+    }
+    with open(os.path.join(args.out_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    elapsed = time.perf_counter() - started
+    total = sum(entry['count'] for entry in entries.values())
+    print(f"\n🎉 Export complete! Total: {total} documents in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} docs/s)")
+    print(f"📝 Manifest written to {os.path.join(args.out_dir, MANIFEST_FILE)}")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
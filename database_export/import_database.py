@@ -7,6 +7,12 @@ This script imports all Tahlil One collections into your MongoDB server.
 Usage:
     python import_database.py --mongo-url "mongodb://your-server:27017" --db-name "tahlil_one"
 
+    # Merge into existing data instead of replacing it
+    python import_database.py --mongo-url "..." --mode upsert
+
+    # Continue an interrupted import from its checkpoint
+    python import_database.py --mongo-url "..." --resume
+
 Requirements:
     pip install pymongo
 
@@ -18,78 +24,424 @@ Collections imported:
     - analyses (asset analysis content)
     - daily_analysis (Google Sheets synced data)
     - forecast_history (History of Success records)
+
+Each collection is read from `<collection>.ndjson` (one document per line,
+optionally `.ndjson.gz` / `.ndjson.zst`) or `<collection>.json` (a JSON array).
+Files are stream-parsed, so memory stays bounded by --batch-size regardless of
+the file size, and collections are imported in parallel.
+
+When the directory contains a `manifest.json` written by export_database.py,
+every file's SHA-256 and document count are verified against it; a mismatch
+fails that collection before its data replaces anything.
+
+Modes:
+    replace  (default) Documents are loaded into a staging collection that is
+             renamed over the target only once every batch succeeded, so a
+             failed import never leaves an emptied collection behind. The
+             target's indexes are recreated on the staging collection first.
+             Rows repeating an earlier row's natural key are skipped and
+             counted. Collections are swapped independently: when one
+             fails, the others may already have been replaced, and the
+             summary lists which.
+    upsert   Documents are merged into the existing collection by their
+             natural key (see COLLECTION_KEYS); nothing is deleted.
+
+Progress is checkpointed after every batch. Re-run with --resume to continue
+an interrupted import where it stopped.
 """
 
+import gzip
+import hashlib
+import io
 import json
 import os
+import re
 import argparse
-from pymongo import MongoClient
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pymongo import MongoClient, ReplaceOne
+from pymongo.errors import BulkWriteError
 from pathlib import Path
 
-def import_collection(db, collection_name, json_file):
-    """Import a single collection from JSON file."""
-    if not os.path.exists(json_file):
-        print(f"  ⚠️  File not found: {json_file}")
-        return 0
-    
-    with open(json_file, 'r', encoding='utf-8') as f:
-        documents = json.load(f)
-    
-    if not documents:
-        print(f"  ℹ️  No documents in {collection_name}")
-        return 0
-    
-    # Clear existing data (optional - comment out to append)
-    db[collection_name].delete_many({})
-    
-    # Insert documents
-    result = db[collection_name].insert_many(documents)
-    return len(result.inserted_ids)
+COLLECTIONS = [
+    'users',
+    'user_sessions',
+    'markets',
+    'assets',
+    'analyses',
+    'daily_analysis',
+    'forecast_history'
+]
+
+# Natural keys used to merge documents in upsert mode and to make resumed
+# batches idempotent in replace mode
+COLLECTION_KEYS = {
+    'users': ['user_id'],
+    'user_sessions': ['session_token'],
+    'markets': ['market_id'],
+    'assets': ['asset_id'],
+    'analyses': ['asset_id'],
+    'daily_analysis': ['market', 'instrument_code', 'analysis_datetime'],
+    'forecast_history': ['record_id']
+}
+
+STAGING_SUFFIX = '__import'
+STAGING_INDEX = 'import_natural_key'
+DUPLICATE_KEY_ERROR = 11000
+CHUNK_SIZE = 1 << 16
+MANIFEST_FILE = 'manifest.json'
+EXPORT_SUFFIXES = ('.ndjson', '.ndjson.gz', '.ndjson.zst', '.json')
+_SEPARATORS = re.compile(r'[\s,]*')
+
+def iter_json_array(f, chunk_size=CHUNK_SIZE):
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size).lstrip()
+    if not buffer:
+        return
+    if buffer[0] != '[':
+        raise ValueError("Expected a JSON array")
+
+    pos = 1
+    eof = False
+    while True:
+        pos = _SEPARATORS.match(buffer, pos).end()
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        try:
+            if pos == len(buffer):
+                raise json.JSONDecodeError("Need more data", buffer, pos)
+            document, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError("Unterminated or malformed JSON array")
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield document
+
+def iter_ndjson(f):
+    for line_number, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {line_number}: {e}")
+
+def load_manifest(data_dir):
+    path = os.path.join(data_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def find_export_file(data_dir, collection_name, manifest=None):
+    if manifest and collection_name in manifest.get('collections', {}):
+        path = os.path.join(data_dir, manifest['collections'][collection_name]['file'])
+        return path if os.path.exists(path) else None
+    for suffix in EXPORT_SUFFIXES:
+        path = os.path.join(data_dir, f'{collection_name}{suffix}')
+        if os.path.exists(path):
+            return path
+    return None
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("Reading .zst files requires the zstandard package: pip install zstandard")
+        raw = open(path, 'rb')
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True), encoding='utf-8')
+    return open(path, 'r', encoding='utf-8-sig')
+
+def iter_documents(path):
+    with open_text(path) as f:
+        if '.ndjson' in os.path.basename(path):
+            yield from iter_ndjson(f)
+        else:
+            yield from iter_json_array(f)
+
+def iter_batches(documents, batch_size):
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class Checkpoint:
+    """Per-collection progress, persisted after every batch."""
+
+    def __init__(self, path, mode):
+        self.path = path
+        self.mode = mode
+        self.collections = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, mode):
+        checkpoint = cls(path, mode)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('mode') != mode:
+                raise ValueError(f"Checkpoint was written by a '{data.get('mode')}' import, not '{mode}'")
+            checkpoint.collections = data.get('collections', {})
+        return checkpoint
+
+    def get(self, collection_name):
+        with self._lock:
+            return dict(self.collections.get(collection_name, {'committed': 0, 'done': False}))
+
+    def update(self, collection_name, **fields):
+        with self._lock:
+            self.collections.setdefault(collection_name, {'committed': 0, 'done': False}).update(fields)
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'mode': self.mode, 'collections': self.collections}, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def with_search_fields(user):
+    """The lowercased email/name copies the backend's user search and bulk subscription changes match on."""
+    user['search_email'] = (user.get('email') or '').lower()
+    user['search_name'] = (user.get('name') or '').lower()
+    return user
+
+# Derived fields recomputed for every imported document, so restored rows match like ones the app wrote
+DOCUMENT_TRANSFORMS = {
+    'users': with_search_fields
+}
+
+def key_filter(document, key_fields):
+    return {field: document.get(field) for field in key_fields}
+
+def write_batch(collection, batch, key_fields, mode):
+    """
+    Write one batch unordered. Returns the number of documents written; in
+    replace mode, rows rejected by the staging unique index are not.
+    """
+    if mode == 'upsert':
+        requests = [ReplaceOne(key_filter(doc, key_fields), doc, upsert=True) for doc in batch]
+        result = collection.bulk_write(requests, ordered=False)
+        return result.upserted_count + result.matched_count
+
+    try:
+        result = collection.insert_many(batch, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        # Duplicate rows, and rows already written by an interrupted run, hit the staging unique index
+        errors = e.details.get('writeErrors', [])
+        if any(error.get('code') != DUPLICATE_KEY_ERROR for error in errors):
+            raise
+        return len(batch) - len(errors)
+
+def prepare_staging(db, staging_name, key_fields, resume):
+    if not resume:
+        db.drop_collection(staging_name)
+    db[staging_name].create_index(
+        [(field, 1) for field in key_fields],
+        name=STAGING_INDEX,
+        unique=True,
+        partialFilterExpression={key_fields[0]: {'$exists': True}}
+    )
+
+def copy_indexes(source, target):
+    """Create the indexes of `source` (other than _id) on `target`."""
+    for name, info in source.index_information().items():
+        if name == '_id_':
+            continue
+        options = {key: value for key, value in info.items() if key not in ('key', 'v', 'ns')}
+        target.create_index(info['key'], name=name, **options)
+
+def import_collection(db, collection_name, path, mode, batch_size, checkpoint, resume, expected=None):
+    """
+    Import a single collection from an export file and return its throughput stats.
+    `expected` is the collection's manifest entry, if any.
+    """
+    key_fields = COLLECTION_KEYS[collection_name]
+    if expected and file_sha256(path) != expected['sha256']:
+        raise ValueError(f"Checksum mismatch for {os.path.basename(path)}; the file is corrupt or was modified")
+
+    state = checkpoint.get(collection_name) if resume else {'committed': 0, 'done': False}
+    stats = {
+        'documents': state['committed'], 'bytes': os.path.getsize(path), 'seconds': 0.0,
+        'resumed_from': state['committed'], 'duplicates': state.get('duplicates', 0), 'replaced': False
+    }
+    if state['done']:
+        stats['skipped'] = True
+        return stats
+
+    started = time.perf_counter()
+    if mode == 'replace':
+        target = db[f'{collection_name}{STAGING_SUFFIX}']
+        prepare_staging(db, target.name, key_fields, resume and state['committed'] > 0)
+    else:
+        target = db[collection_name]
+    checkpoint.update(collection_name, committed=state['committed'], done=False)
+
+    documents = iter_documents(path)
+    transform = DOCUMENT_TRANSFORMS.get(collection_name)
+    if transform is not None:
+        documents = map(transform, documents)
+    skip = state['committed']
+    # The first batch after resuming may have been partly written before the interruption, so its
+    # duplicate-key rejections cannot be told apart from duplicates in the file
+    resumed_batch = resume and state['committed'] > 0
+    for batch in iter_batches(documents, batch_size):
+        if skip >= len(batch):
+            skip -= len(batch)
+            continue
+        batch = batch[skip:]
+        skip = 0
+        written = write_batch(target, batch, key_fields, mode)
+        if mode == 'replace' and not resumed_batch:
+            stats['duplicates'] += len(batch) - written
+        resumed_batch = False
+        stats['documents'] += len(batch)
+        progress = {'committed': stats['documents']}
+        if stats['duplicates']:
+            progress['duplicates'] = stats['duplicates']
+        checkpoint.update(collection_name, **progress)
+
+    if expected and stats['documents'] != expected['count']:
+        raise ValueError(f"Read {stats['documents']} documents but the manifest lists {expected['count']}")
+
+    if mode == 'replace':
+        if stats['documents'] == 0:
+            # Empty export: keep the existing collection as it is
+            db.drop_collection(target.name)
+        else:
+            target.drop_index(STAGING_INDEX)
+            copy_indexes(db[collection_name], target)
+            target.rename(collection_name, dropTarget=True)
+            stats['replaced'] = True
+
+    checkpoint.update(collection_name, done=True)
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+def format_rate(stats):
+    seconds = max(stats['seconds'], 1e-9)
+    imported = stats['documents'] - stats['resumed_from']
+    return f"{imported / seconds:,.0f} docs/s, {stats['bytes'] / seconds / 1e6:.1f} MB/s"
 
 def main():
     parser = argparse.ArgumentParser(description='Import Tahlil One database')
     parser.add_argument('--mongo-url', required=True, help='MongoDB connection URL')
     parser.add_argument('--db-name', default='tahlil_one', help='Database name (default: tahlil_one)')
-    parser.add_argument('--data-dir', default='.', help='Directory containing JSON files (default: current directory)')
+    parser.add_argument('--data-dir', default='.', help='Directory containing JSON/NDJSON files (default: current directory)')
+    parser.add_argument('--mode', choices=['replace', 'upsert'], default='replace', help='replace (default) swaps in a fresh copy, upsert merges by natural key')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Documents per unordered bulk write (default: 1000)')
+    parser.add_argument('--workers', type=int, default=4, help='Collections imported in parallel (default: 4)')
+    parser.add_argument('--collections', nargs='+', choices=COLLECTIONS, default=COLLECTIONS, help='Subset of collections to import')
+    parser.add_argument('--checkpoint', default=None, help='Checkpoint file (default: <data-dir>/.import_checkpoint.json)')
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted import from its checkpoint')
+    parser.add_argument('--no-verify', action='store_true', help='Skip manifest checksum and count verification')
     args = parser.parse_args()
-    
+
+    manifest = load_manifest(args.data_dir)
+    if manifest and manifest.get('since') and args.mode == 'replace':
+        print(f"❌ This is an incremental export (changes since {manifest['since']}). Import it with --mode upsert.")
+        return 1
+
     # Connect to MongoDB
     print(f"\n🔌 Connecting to MongoDB: {args.mongo_url}")
-    client = MongoClient(args.mongo_url)
+    client = MongoClient(args.mongo_url, maxPoolSize=max(args.workers * 2, 10))
     db = client[args.db_name]
-    
+
     # Test connection
     try:
         client.admin.command('ping')
         print("✅ Connected successfully!\n")
     except Exception as e:
         print(f"❌ Connection failed: {e}")
-        return
-    
-    # Collections to import
-    collections = [
-        'users',
-        'user_sessions', 
-        'markets',
-        'assets',
-        'analyses',
-        'daily_analysis',
-        'forecast_history'
-    ]
-    
-    print(f"📦 Importing to database: {args.db_name}\n")
-    
-    total_imported = 0
-    for collection in collections:
-        json_file = os.path.join(args.data_dir, f'{collection}.json')
-        count = import_collection(db, collection, json_file)
-        print(f"  ✅ {collection}: {count} documents imported")
-        total_imported += count
-    
-    print(f"\n🎉 Import complete! Total: {total_imported} documents")
+        return 1
+
+    checkpoint_path = args.checkpoint or os.path.join(args.data_dir, '.import_checkpoint.json')
+    checkpoint = Checkpoint.load(checkpoint_path, args.mode) if args.resume else Checkpoint(checkpoint_path, args.mode)
+
+    print(f"📦 Importing to database: {args.db_name} ({args.mode} mode, batches of {args.batch_size})\n")
+
+    started = time.perf_counter()
+    results = {}
+    failures = {}
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {}
+        for collection in args.collections:
+            path = find_export_file(args.data_dir, collection, manifest)
+            if path is None:
+                print(f"  ⚠️  File not found: {collection}.ndjson / {collection}.json")
+                continue
+            expected = None
+            if manifest and not args.no_verify:
+                expected = manifest.get('collections', {}).get(collection)
+            futures[executor.submit(
+                import_collection, db, collection, path, args.mode, args.batch_size, checkpoint, args.resume, expected
+            )] = collection
+
+        for future in as_completed(futures):
+            collection = futures[future]
+            try:
+                stats = future.result()
+            except Exception as e:
+                failures[collection] = str(e)
+                print(f"  ❌ {collection}: {e}")
+                continue
+            results[collection] = stats
+            if stats.get('skipped'):
+                print(f"  ⏭️  {collection}: already imported ({stats['documents']} documents)")
+            else:
+                resumed = f", resumed at {stats['resumed_from']}" if stats['resumed_from'] else ""
+                print(f"  ✅ {collection}: {stats['documents']} documents in {stats['seconds']:.2f}s ({format_rate(stats)}{resumed})")
+            if stats['duplicates']:
+                print(f"  ⚠️  {collection}: {stats['duplicates']} duplicate rows skipped "
+                      f"(same {', '.join(COLLECTION_KEYS[collection])} as an earlier row)")
+
+    elapsed = time.perf_counter() - started
+    total_imported = sum(stats['documents'] for stats in results.values())
+    total_bytes = sum(stats['bytes'] for stats in results.values())
+
+    if failures:
+        print(f"\n❌ Import incomplete: {', '.join(sorted(failures))} failed.")
+        if args.mode == 'replace':
+            print("   The failed collections were not replaced; their existing data was left untouched.")
+            # Imported by an earlier run (skipped) or in this one
+            replaced = sorted(c for c, stats in results.items() if stats['replaced'] or stats.get('skipped'))
+            if replaced:
+                print(f"   Already replaced with the imported data: {', '.join(replaced)}.")
+        else:
+            print("   Batches already merged into the failed collections stay merged.")
+        print("   Re-run with --resume to continue.")
+        return 1
+
+    checkpoint.remove()
+    print(f"\n🎉 Import complete! Total: {total_imported} documents in {elapsed:.2f}s "
+          f"({total_imported / max(elapsed, 1e-9):,.0f} docs/s, {total_bytes / max(elapsed, 1e-9) / 1e6:.1f} MB/s)")
     print(f"\n📝 Update your backend/.env with:")
     print(f'   MONGO_URL="{args.mongo_url}"')
     print(f'   DB_NAME="{args.db_name}"')
+    return 0
 
 if __name__ == '__main__':
-    main()
+    raise SystemExit(main())
@@ -70,7 +70,8 @@ export function AnalysisPriceChart({ autoRefreshInterval = 60000 }) {
   const checkForUpdates = useCallback(async () => {
     try {
       const response = await fetch(`${BACKEND_URL}/api/daily-analysis/last-sync`, {
-        credentials: 'include'
+        credentials: 'include',
+        headers: { 'X-Request-Priority': 'background' }
       });
       
       if (response.ok) {
@@ -92,7 +93,7 @@ export function AnalysisPriceChart({ autoRefreshInterval = 60000 }) {
   // Auto-refresh: poll for updates
   useEffect(() => {
     const interval = setInterval(() => {
-      checkForUpdates();
+      if (!document.hidden) checkForUpdates();
     }, autoRefreshInterval);
 
     return () => clearInterval(interval);
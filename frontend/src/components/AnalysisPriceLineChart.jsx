@@ -51,7 +51,8 @@ export function AnalysisPriceLineChart({ autoRefreshInterval = 60000 }) {
   const checkForUpdates = useCallback(async () => {
     try {
       const response = await fetch(`${BACKEND_URL}/api/daily-analysis/last-sync`, {
-        credentials: 'include'
+        credentials: 'include',
+        headers: { 'X-Request-Priority': 'background' }
       });
       
       if (response.ok) {
@@ -74,7 +75,7 @@ export function AnalysisPriceLineChart({ autoRefreshInterval = 60000 }) {
   // Auto-refresh: poll for updates
   useEffect(() => {
     const interval = setInterval(() => {
-      checkForUpdates();
+      if (!document.hidden) checkForUpdates();
     }, autoRefreshInterval);
 
     return () => clearInterval(interval);
@@ -50,13 +50,17 @@ export function HistoryOfSuccess({ autoRefreshInterval = 60000 }) {
   const [loading, setLoading] = useState(true);
   const [activeTab, setActiveTab] = useState('overview');
 
-  const fetchData = useCallback(async () => {
+  const fetchData = useCallback(async (background = false) => {
+    // Background refreshes are the first requests the server sheds when it is busy
+    const options = background
+      ? { credentials: 'include', headers: { 'X-Request-Priority': 'background' } }
+      : { credentials: 'include' };
     try {
       const [summaryRes, performanceRes, cumulativeRes, forecastsRes] = await Promise.all([
-        fetch(`${BACKEND_URL}/api/history/summary`, { credentials: 'include' }),
-        fetch(`${BACKEND_URL}/api/history/performance`, { credentials: 'include' }),
-        fetch(`${BACKEND_URL}/api/history/cumulative`, { credentials: 'include' }),
-        fetch(`${BACKEND_URL}/api/history/forecasts?limit=50`, { credentials: 'include' })
+        fetch(`${BACKEND_URL}/api/history/summary`, options),
+        fetch(`${BACKEND_URL}/api/history/performance`, options),
+        fetch(`${BACKEND_URL}/api/history/cumulative`, options),
+        fetch(`${BACKEND_URL}/api/history/forecasts?limit=50`, options)
       ]);
 
       if (summaryRes.ok) setSummary(await summaryRes.json());
@@ -72,7 +76,9 @@ export function HistoryOfSuccess({ autoRefreshInterval = 60000 }) {
 
   useEffect(() => {
     fetchData();
-    const interval = setInterval(fetchData, autoRefreshInterval);
+    const interval = setInterval(() => {
+      if (!document.hidden) fetchData(true);
+    }, autoRefreshInterval);
     return () => clearInterval(interval);
   }, [fetchData, autoRefreshInterval]);
 
@@ -23,6 +23,10 @@ export default function AdminDashboard() {
   const [markets, setMarkets] = useState([]);
   const [assets, setAssets] = useState([]);
   const [users, setUsers] = useState([]);
+  const [userSearch, setUserSearch] = useState('');
+  const [userStatusFilter, setUserStatusFilter] = useState('');
+  const [usersCursor, setUsersCursor] = useState(null);
+  const [userCounts, setUserCounts] = useState(null);
   const [selectedUser, setSelectedUser] = useState(null);
   const [syncResults, setSyncResults] = useState(null);
   const [syncing, setSyncing] = useState(false);
@@ -87,18 +91,31 @@ export default function AdminDashboard() {
     }
   };
 
-  const fetchUsers = async () => {
+  // Server-side search/filter with cursor pagination; `cursor` appends the next page
+  const fetchUsers = async (cursor = null) => {
     try {
-      const response = await fetch(`${BACKEND_URL}/api/admin/users`, {
+      const params = new URLSearchParams({ limit: '50' });
+      if (userSearch.trim()) params.set('q', userSearch.trim());
+      if (userStatusFilter) params.set('subscription_status', userStatusFilter);
+      if (cursor) params.set('cursor', cursor);
+      const response = await fetch(`${BACKEND_URL}/api/admin/users/directory?${params}`, {
         credentials: 'include'
       });
       const data = await response.json();
-      setUsers(data);
+      setUsers(prev => (cursor ? [...prev, ...data.users] : data.users));
+      setUsersCursor(data.next_cursor);
+      if (data.counts) setUserCounts(data.counts);
     } catch (error) {
       console.error('Error fetching users:', error);
     }
   };
 
+  useEffect(() => {
+    if (!isAuthenticated) return;
+    const timer = setTimeout(() => fetchUsers(), 300);
+    return () => clearTimeout(timer);
+  }, [userSearch, userStatusFilter]);
+
   const handleLogout = async () => {
     try {
       await fetch(`${BACKEND_URL}/api/auth/logout`, {
@@ -477,6 +494,11 @@ export default function AdminDashboard() {
                         </div>
                       ))
                     )}
+                    {usersCursor && (
+                      <Button variant="outline" className="w-full" onClick={() => fetchUsers(usersCursor)} data-testid="users-load-more">
+                        {language === 'ar' ? 'تحميل المزيد' : 'Load more'}
+                      </Button>
+                    )}
                   </div>
                 </CardContent>
               </Card>
@@ -1088,9 +1110,36 @@ export default function AdminDashboard() {
               <Card>
                 <CardHeader>
                   <CardTitle>{t('allUsers')}</CardTitle>
-                  <CardDescription>{t('usersList')}</CardDescription>
+                  <CardDescription>
+                    {t('usersList')}
+                    {userCounts && (
+                      <span className="block text-xs mt-1" data-testid="users-counts">
+                        {userCounts.total} · {t('active')}: {userCounts.by_status.active || 0} · {t('expired')}: {userCounts.by_status.expired || 0} · {t('none')}: {userCounts.by_status.none || 0}
+                      </span>
+                    )}
+                  </CardDescription>
                 </CardHeader>
                 <CardContent>
+                  <div className="flex gap-2 mb-4">
+                    <Input
+                      value={userSearch}
+                      onChange={(e) => setUserSearch(e.target.value)}
+                      placeholder={language === 'ar' ? 'بحث بالبريد أو الاسم' : 'Search email or name'}
+                      className={language === 'ar' ? 'text-right' : ''}
+                      data-testid="users-search"
+                    />
+                    <select
+                      value={userStatusFilter}
+                      onChange={(e) => setUserStatusFilter(e.target.value)}
+                      className="px-3 py-2 border border-input rounded-md bg-background"
+                      data-testid="users-status-filter"
+                    >
+                      <option value="">{language === 'ar' ? 'الكل' : 'All'}</option>
+                      <option value="active">{t('active')}</option>
+                      <option value="expired">{t('expired')}</option>
+                      <option value="none">{t('none')}</option>
+                    </select>
+                  </div>
                   <div className="space-y-3 max-h-[600px] overflow-y-auto" data-testid="users-list">
                     {users.length === 0 ? (
                       <p className="text-muted-foreground text-center py-8">{language === 'ar' ? 'لا يوجد مستخدمين' : 'No users yet'}</p>
@@ -26,6 +26,8 @@ export default function UserDashboard() {
   const [assets, setAssets] = useState([]);
   const [selectedAsset, setSelectedAsset] = useState(null);
   const [analysis, setAnalysis] = useState(null);
+  const [analyses, setAnalyses] = useState({});
+  const [analysisAccess, setAnalysisAccess] = useState(false);
   const [expandedMarkets, setExpandedMarkets] = useState({});
   const [accessDenied, setAccessDenied] = useState(false);
 
@@ -51,57 +53,32 @@ export default function UserDashboard() {
 
   useEffect(() => {
     if (isAuthenticated) {
-      fetchMarkets();
-      fetchAssets();
+      fetchCatalog();
     }
   }, [isAuthenticated]);
 
-  const fetchMarkets = async () => {
+  // Markets, assets and (with a subscription) every analysis in one request
+  const fetchCatalog = async () => {
     try {
-      const response = await fetch(`${BACKEND_URL}/api/markets`, {
+      const response = await fetch(`${BACKEND_URL}/api/catalog`, {
         credentials: 'include'
       });
+      if (!response.ok) throw new Error('Failed to load catalog');
       const data = await response.json();
-      setMarkets(data);
-    } catch (error) {
-      console.error('Error fetching markets:', error);
-    }
-  };
-
-  const fetchAssets = async () => {
-    try {
-      const response = await fetch(`${BACKEND_URL}/api/assets`, {
-        credentials: 'include'
-      });
-      const data = await response.json();
-      setAssets(data);
-    } catch (error) {
-      console.error('Error fetching assets:', error);
-    }
-  };
-
-  const fetchAnalysis = async (assetId) => {
-    try {
-      const response = await fetch(`${BACKEND_URL}/api/analysis/${assetId}`, {
-        credentials: 'include'
+      const analysisMap = {};
+      const allAssets = [];
+      data.markets.forEach((market) => {
+        market.assets.forEach((asset) => {
+          allAssets.push(asset);
+          if (asset.analysis) analysisMap[asset.asset_id] = asset.analysis;
+        });
       });
-      if (response.status === 403) {
-        setAccessDenied(true);
-        setAnalysis(null);
-        return;
-      }
-      if (response.ok) {
-        const data = await response.json();
-        setAnalysis(data);
-        setAccessDenied(false);
-      } else {
-        setAnalysis(null);
-        setAccessDenied(false);
-      }
+      setMarkets(data.markets);
+      setAssets(allAssets);
+      setAnalyses(analysisMap);
+      setAnalysisAccess(data.analysis_access);
     } catch (error) {
-      console.error('Error fetching analysis:', error);
-      setAnalysis(null);
-      setAccessDenied(false);
+      console.error('Error fetching catalog:', error);
     }
   };
 
@@ -119,7 +96,8 @@ export default function UserDashboard() {
 
   const handleAssetClick = (asset) => {
     setSelectedAsset(asset);
-    fetchAnalysis(asset.asset_id);
+    setAccessDenied(!analysisAccess);
+    setAnalysis(analysisAccess ? analyses[asset.asset_id] || null : null);
   };
 
   const toggleMarket = (marketId) => {
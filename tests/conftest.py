@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+# The backend runs as flat modules from its own directory (`uvicorn server:app`)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+def _add_user(db, user_id, access_level="Limited", subscription_status="none"):
+    """Insert a user with a live session; returns its session token."""
+    now = datetime.now(timezone.utc)
+    token = f"token_{user_id}"
+
+    async def insert():
+        await db.users.insert_one({
+            "user_id": user_id,
+            "google_user_id": f"google_{user_id}",
+            "email": f"{user_id}@example.com",
+            "name": user_id,
+            "picture": "",
+            "access_level": access_level,
+            "subscription_status": subscription_status,
+            "created_at": now.isoformat(),
+        })
+        await db.user_sessions.insert_one({
+            "user_id": user_id,
+            "session_token": token,
+            "expires_at": (now + timedelta(days=1)).isoformat(),
+            "created_at": now.isoformat(),
+        })
+
+    asyncio.run(insert())
+    return token
+
+@pytest.fixture
+def api(monkeypatch):
+    """
+    The FastAPI app backed by an in-memory MongoDB, without running the
+    lifespan. Yields (client, db, server module).
+    """
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from fastapi.testclient import TestClient
+
+    import server
+    from archive import CollectionArchive
+    from cache import LocalInvalidationBus, ProcessCache
+    from catalog import CatalogCache
+
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+    bus = LocalInvalidationBus()
+    cache = ProcessCache(ttl_seconds=30)
+    catalog = CatalogCache(server.Market, server.Asset)
+    for topic in server.CACHE_TOPICS:
+        bus.subscribe(topic, cache.invalidate)
+    bus.subscribe("catalog", catalog.invalidate)
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "response_cache", cache)
+    monkeypatch.setattr(server, "invalidation_bus", bus)
+    monkeypatch.setattr(server, "catalog_cache", catalog)
+    monkeypatch.setattr(server, "_analytics_collections", {})
+    monkeypatch.setattr(server, "analytics", lambda name: db[name])
+    monkeypatch.setattr(server, "archive_store", CollectionArchive(db))
+
+    yield TestClient(server.app), db, server
+
+@pytest.fixture
+def login(api):
+    """login(user_id, ...) -> Authorization headers for a new user with a live session."""
+    _, db, _ = api
+
+    def make(user_id, access_level="Limited", subscription_status="none"):
+        token = _add_user(db, user_id, access_level, subscription_status)
+        return {"Authorization": f"Bearer {token}"}
+
+    return make
@@ -0,0 +1,247 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from archive import (
+    RUNS_COLLECTION, TOMBSTONES_COLLECTION, CollectionArchive, _may_match, archive_collection_name, matches, merge_rows,
+    rebuild_rollups, rollup_totals, run_archive
+)
+
+NOW = datetime(2026, 6, 1, tzinfo=timezone.utc)
+
+def _iso(days_ago):
+    return (NOW - timedelta(days=days_ago)).isoformat()
+
+def _forecast(i, status, pl, days_ago, instrument="AAPL"):
+    return {
+        "record_id": f"fh_{i}", "market": "US", "instrument_code": instrument, "status": status,
+        "calculated_pl_percent": pl, "forecast_date": _iso(days_ago + 5),
+        "result_date": _iso(days_ago) if status != "pending" else None,
+    }
+
+def _analysis(i, instrument, days_ago):
+    return {"record_id": f"da_{i}", "market": "US", "instrument_code": instrument, "analysis_datetime": _iso(days_ago)}
+
+def _seed(db):
+    async def insert():
+        await db.forecast_history.insert_many([
+            _forecast(1, "success", 4.0, 500),
+            _forecast(2, "failed", -2.0, 400, instrument="MSFT"),
+            _forecast(3, "success", 3.0, 10),
+            _forecast(4, "pending", None, 600),
+        ])
+        await db.daily_analysis.insert_many([
+            _analysis(1, "AAPL", 500), _analysis(2, "AAPL", 10),
+            _analysis(3, "MSFT", 700), _analysis(4, "MSFT", 400),
+        ])
+    asyncio.run(insert())
+
+def test_matches_and_merge_rows():
+    row = {"status": "success", "result_date": "2025-01-01", "market": "US"}
+    assert matches(row, {"status": {"$in": ["success"]}, "result_date": {"$lt": "2026-01-01", "$type": "string"}})
+    assert not matches(row, {"$or": [{"market": "GCC"}, {"result_date": {"$gt": "2026-01-01"}}]})
+    assert not matches({"result_date": None}, {"result_date": {"$lt": "2026-01-01"}})
+
+    merged = merge_rows([{"d": "2026-01-03"}, {"d": "2026-01-01"}], [{"d": "2026-01-02"}], "d", descending=True, limit=2)
+    assert [row["d"] for row in merged] == ["2026-01-03", "2026-01-02"]
+
+def test_archive_moves_old_rows_and_keeps_latest_and_pending():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+    _seed(db)
+    store = CollectionArchive(db)
+
+    async def run():
+        dry = await run_archive(db, store, 365, dry_run=True, now=NOW)
+        report = await run_archive(db, store, 365, now=NOW)
+        again = await run_archive(db, store, 365, now=NOW)
+        hot = {
+            "forecast_history": sorted(d["record_id"] for d in await db.forecast_history.find().to_list(None)),
+            "daily_analysis": sorted(d["record_id"] for d in await db.daily_analysis.find().to_list(None)),
+        }
+        rollups = await db.archive_rollups.find({}, {"_id": 0}).to_list(None)
+        return dry, report, again, hot, rollups, await db.archive_runs.count_documents({})
+
+    dry, report, again, hot, rollups, runs = asyncio.run(run())
+    assert dry["sources"]["forecast_history"]["archived"] == 2
+    assert report["sources"]["forecast_history"] == {"archived": 2, "kept_latest": 0}
+    # AAPL da_1 goes; MSFT's latest row (da_4) stays even though it is old
+    assert report["sources"]["daily_analysis"] == {"archived": 2, "kept_latest": 1}
+    assert again["sources"]["daily_analysis"]["archived"] == 0
+    assert hot == {"forecast_history": ["fh_3", "fh_4"], "daily_analysis": ["da_2", "da_4"]}
+    assert runs == 2  # dry runs are not recorded
+
+    totals = rollup_totals(rollups)
+    assert (totals["completed"], totals["successful"], totals["pl_sum"]) == (2, 1, 2.0)
+    assert asyncio.run(rebuild_rollups(db, store)) == 2
+
+def test_history_endpoints_are_unchanged_by_archiving(api, login):
+    client, db, server = api
+    headers = login("member_1", subscription_status="active")
+    _seed(db)
+
+    def read():
+        # (/history/performance uses $round, which mongomock lacks)
+        return (client.get("/api/history/summary", headers=headers).json(),
+                client.get("/api/history/cumulative", headers=headers).json()[-1])
+
+    before = read()
+    admin = login("admin_1", access_level="admin")
+    response = client.post("/api/admin/archive/run", params={"horizon_days": 365}, headers=admin)
+    assert response.status_code == 200
+    assert response.json()["sources"]["forecast_history"]["archived"] == 2
+    assert read() == before
+
+    status = client.get("/api/admin/archive/status", headers=admin).json()
+    assert status["tiers"]["forecast_history"] == {"hot": 2, "archived": 2}
+
+    forecasts = client.get("/api/history/forecasts", headers=headers).json()
+    assert {f["record_id"] for f in forecasts} == {"fh_3", "fh_4"}
+    forecasts = client.get("/api/history/forecasts", params={"include_archive": True}, headers=headers).json()
+    assert {f["record_id"] for f in forecasts} == {"fh_1", "fh_2", "fh_3", "fh_4"}
+
+    analyses = client.get("/api/daily-analysis", params={"include_archive": True, "limit": 3}, headers=headers).json()
+    assert [a["record_id"] for a in analyses] == ["da_2", "da_4", "da_1"]
+
+    curve = client.get("/api/history/cumulative", params={"include_archive": True}, headers=headers).json()
+    assert [point["total_trades"] for point in curve] == [1, 2, 3]
+    assert curve[-1]["cumulative_return"] == before[1]["cumulative_return"]
+
+def test_dimensions_rebuild_counts_archived_rows():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from dimensions import rebuild_dimensions
+
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+    _seed(db)
+
+    async def run():
+        await run_archive(db, CollectionArchive(db), 365, now=NOW)
+        assert await db[archive_collection_name("daily_analysis")].count_documents({}) == 2
+        return await rebuild_dimensions(db)
+
+    report = asyncio.run(run())
+    assert report["daily_analysis"]["rows"] == 4
+    assert report["forecast_history"]["rows"] == 4
+
+def test_parquet_archive_round_trip(tmp_path):
+    pytest.importorskip("pyarrow")
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from archive import ParquetArchive
+
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+    _seed(db)
+    store = ParquetArchive(str(tmp_path))
+
+    async def run():
+        await store.ensure_indexes()
+        await run_archive(db, store, 365, now=NOW)
+        return await store.find("forecast_history", {"status": {"$in": ["success", "failed"]}}, ("result_date", 1))
+
+    rows = asyncio.run(run())
+    assert [row["record_id"] for row in rows] == ["fh_1", "fh_2"]
+
+def test_resynced_rows_are_not_brought_back_from_the_archive():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from daily_ingest import ingest_rows
+
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+    _seed(db)
+    store = CollectionArchive(db)
+    # The sheet still holds AAPL's archived row (da_1) and one new row
+    sheet = [
+        (2, ["US", "AAPL", "Bullish", (NOW - timedelta(days=500)).strftime("%d.%m.%Y %H:%M:%S"), "1", "2", "0.5"]),
+        (3, ["US", "AAPL", "Bullish", "01.06.2026 00:00:00", "1", "2", "0.5"]),
+    ]
+
+    async def run():
+        await run_archive(db, store, 365, now=NOW)
+        result = await ingest_rows(db, sheet, "google_sheets")
+        hot = await db.daily_analysis.count_documents({"instrument_code": "AAPL"})
+        return result, hot, await db[TOMBSTONES_COLLECTION].count_documents({})
+
+    result, hot, tombstones = asyncio.run(run())
+    assert (result["inserted"], result["archived"]) == (1, 1)
+    assert hot == 2 and tombstones == 2
+
+    archived_row = {"market": "US", "instrument_code": "AAPL", "analysis_datetime": _iso(500), "record_id": "x"}
+    merged = merge_rows([dict(archived_row, record_id="y")], [archived_row], "analysis_datetime", source="daily_analysis")
+    assert [row["record_id"] for row in merged] == ["y"]
+
+def test_tombstones_are_backfilled_for_older_archives():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+    _seed(db)
+
+    class UncountedArchive(CollectionArchive):
+        async def count(self, source):
+            raise AssertionError("archive counted after the backfill")
+
+    async def run():
+        await run_archive(db, CollectionArchive(db), 365, now=NOW)
+        # As left by a version without tombstones
+        await db[TOMBSTONES_COLLECTION].delete_many({})
+        await db[RUNS_COLLECTION].delete_many({})
+        report = await run_archive(db, CollectionArchive(db), 365, now=NOW)
+        tombstones = await db[TOMBSTONES_COLLECTION].count_documents({})
+        later = await run_archive(db, UncountedArchive(db), 365, now=NOW)
+        return report, tombstones, later
+
+    report, tombstones, later = asyncio.run(run())
+    assert report["tombstones_backfilled"] == 2 and tombstones == 2
+    assert report["tombstones_complete"] and "tombstones_backfilled" not in later
+
+def test_merged_dates_compare_as_utc_instants():
+    hot = [{"d": "2026-01-01T10:00:00+02:00"}, {"d": "2026-01-01T09:30:00"}, {"d": None}, {"d": "not a date"}]
+    archived = [{"d": datetime(2026, 1, 1, 8, 45, tzinfo=timezone.utc)}]
+
+    merged = merge_rows(hot, archived, "d")
+
+    # 08:00, 08:45 and 09:30 UTC; as strings the 10:00+02:00 row would sort last
+    assert [row["d"] for row in merged] == [
+        None, "2026-01-01T10:00:00+02:00", archived[0]["d"], "2026-01-01T09:30:00", "not a date"
+    ]
+
+def test_forecast_result_dates_are_compared_as_dates():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+    cutoff = NOW - timedelta(days=365)
+
+    async def run():
+        await db.forecast_history.insert_many([
+            # Sorts before the cutoff as text, but is 4 hours after it
+            dict(_forecast(1, "success", 1.0, 0), result_date="2025-05-31T23:00:00-05:00"),
+            dict(_forecast(2, "success", 1.0, 0), result_date=(cutoff - timedelta(days=1)).date().isoformat()),
+            dict(_forecast(3, "failed", 1.0, 0), result_date="31/05/2024"),
+        ])
+        await run_archive(db, CollectionArchive(db), 365, sources=["forecast_history"], now=NOW)
+        return sorted(d["record_id"] for d in await db.forecast_history.find().to_list(None))
+
+    assert asyncio.run(run()) == ["fh_1", "fh_3"]
+
+def test_parquet_archive_skips_files_by_cached_stats(tmp_path):
+    pytest.importorskip("pyarrow")
+    from archive import ParquetArchive
+
+    stats = {"market": ("GCC", "US"), "forecast_date": ("2025-01-01", "2025-02-01"), "result_date": None}
+    assert _may_match(stats, {"market": "US"})
+    assert not _may_match(stats, {"market": "ZZ"})
+    assert not _may_match(stats, {"market": {"$in": ["AA", "ZZ"]}})
+    assert not _may_match(stats, {"forecast_date": {"$gte": "2025-03-01"}})
+    assert _may_match(stats, {"result_date": {"$lt": "2020-01-01"}})
+
+    store = ParquetArchive(str(tmp_path))
+    rows = [{"record_id": f"fh_{i}", "market": "US", "instrument_code": "AAPL", "status": "success",
+             "forecast_date": "2025-01-01", "result_date": "2025-01-02"} for i in range(3)]
+
+    async def run():
+        await store.write("forecast_history", rows)
+        await store.write("forecast_history", rows[:1])  # a re-archived batch
+        first = await store.count("forecast_history")
+        await store.write("forecast_history", [dict(rows[0], record_id="fh_9", market="GCC")])
+        return first, await store.count("forecast_history"), await store.find("forecast_history", {"market": "GCC"})
+
+    first, second, gcc = asyncio.run(run())
+    assert (first, second) == (3, 4)
+    assert [row["record_id"] for row in gcc] == ["fh_9"]
+    assert len(store._meta) == 3
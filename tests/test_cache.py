@@ -0,0 +1,159 @@
+import asyncio
+
+from cache import LocalInvalidationBus, MongoInvalidationBus, ProcessCache
+
+def test_cache_hits_until_topic_is_invalidated():
+    cache = ProcessCache(ttl_seconds=60)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return len(calls)
+
+    async def scenario():
+        assert await cache.get_or_load("forecast_history", "summary", load) == 1
+        assert await cache.get_or_load("forecast_history", "summary", load) == 1
+        cache.invalidate("daily_analysis")
+        assert await cache.get_or_load("forecast_history", "summary", load) == 1
+        cache.invalidate("forecast_history")
+        assert await cache.get_or_load("forecast_history", "summary", load) == 2
+
+    asyncio.run(scenario())
+    assert cache.stats()["hits"] == 2
+
+def test_load_racing_an_invalidation_is_not_stored():
+    cache = ProcessCache(ttl_seconds=60)
+
+    async def scenario():
+        async def stale_load():
+            cache.invalidate("forecast_history")  # a write lands mid-load
+            return "stale"
+
+        assert await cache.get_or_load("forecast_history", "summary", stale_load) == "stale"
+
+        async def fresh_load():
+            return "fresh"
+
+        assert await cache.get_or_load("forecast_history", "summary", fresh_load) == "fresh"
+
+    asyncio.run(scenario())
+
+def test_local_bus_dispatches_to_subscribers():
+    bus = LocalInvalidationBus()
+    cache = ProcessCache(ttl_seconds=60)
+    bus.subscribe("forecast_history", cache.invalidate)
+
+    asyncio.run(bus.publish("forecast_history"))
+
+    assert cache.stats()["generations"] == {"forecast_history": 1}
+
+def test_mongo_bus_ignores_own_and_duplicate_events():
+    bus = MongoInvalidationBus({"cache_invalidations": None})
+    received = []
+    bus.subscribe("daily_analysis", lambda topic, payload: received.append(topic))
+
+    bus._receive({"_id": 1, "topic": "daily_analysis", "origin": bus.origin})
+    bus._receive({"_id": 2, "topic": "daily_analysis", "origin": "other-worker"})
+    bus._receive({"_id": 2, "topic": "daily_analysis", "origin": "other-worker"})
+
+    assert received == ["daily_analysis"]
+    assert bus.received == 1
+
+def test_generation_and_per_call_ttl():
+    cache = ProcessCache(ttl_seconds=0)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        assert await cache.get_or_load("forecast_history", "a", load) == 1
+        assert await cache.get_or_load("forecast_history", "a", load) == 2  # default TTL disables caching
+        assert await cache.get_or_load("forecast_history", "b", load, ttl_seconds=60) == 3
+        assert await cache.get_or_load("forecast_history", "b", load, ttl_seconds=60) == 3
+
+    asyncio.run(run())
+    assert cache.generation("forecast_history") == 0
+    cache.invalidate("forecast_history")
+    assert cache.generation("forecast_history") == 1
+
+def test_cache_is_bounded_and_drops_expired_entries_first(monkeypatch):
+    import cache as cache_module
+
+    now = [0.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = ProcessCache(ttl_seconds=60, max_entries=3)
+
+    async def load():
+        return "value"
+
+    async def scenario():
+        await cache.get_or_load("daily_analysis", "short", load, ttl_seconds=1)
+        for key in ("a", "b"):
+            await cache.get_or_load("daily_analysis", key, load)
+        now[0] = 2.0
+        # The expired entry makes room without evicting a live one
+        await cache.get_or_load("daily_analysis", "c", load)
+        assert cache.stats()["entries"] == 3 and cache.evictions == 0
+        # "a" was used most recently, so "b" is evicted
+        await cache.get_or_load("daily_analysis", "a", load)
+        await cache.get_or_load("daily_analysis", "d", load)
+        hits = cache.hits
+        await cache.get_or_load("daily_analysis", "a", load)
+        await cache.get_or_load("daily_analysis", "b", load)
+        return hits
+
+    hits = asyncio.run(scenario())
+    assert cache.hits == hits + 1
+    assert cache.evictions == 2
+    assert cache.stats()["entries"] == 3
+
+def test_mongo_bus_listener_restarts_after_errors():
+    from pymongo.errors import OperationFailure
+
+    class Stream:
+        def __init__(self, changes):
+            self.changes = changes
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            if self.changes:
+                return {"fullDocument": self.changes.pop(0)}
+            await asyncio.Event().wait()
+
+    class Collection:
+        def __init__(self):
+            self.attempts = 0
+
+        def watch(self, pipeline):
+            self.attempts += 1
+            if self.attempts == 1:
+                raise OperationFailure("not authorized", code=13)
+            if self.attempts == 2:
+                raise ConnectionError("connection reset")
+            return Stream([{"_id": 1, "topic": "daily_analysis", "origin": "other-worker"}])
+
+    bus = MongoInvalidationBus({"cache_invalidations": Collection()}, poll_interval=0.001)
+    received = []
+    bus.subscribe("daily_analysis", lambda topic, payload: received.append(topic))
+
+    async def scenario():
+        task = asyncio.create_task(bus._run())
+        for _ in range(200):
+            if received:
+                break
+            await asyncio.sleep(0.005)
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert received == ["daily_analysis"]
+    assert bus.stats()["listener_failures"] == 2 and bus.mode == "change_stream"
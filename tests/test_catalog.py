@@ -0,0 +1,56 @@
+import asyncio
+
+def _seed(db):
+    async def insert():
+        await db.markets.insert_many([
+            {"market_id": "m1", "name_ar": "س", "name_en": "GCC", "region": "ME", "created_at": "2026-01-01"},
+            {"market_id": "m2", "name_ar": "ع", "name_en": "US", "region": "NA", "created_at": "2026-01-01"},
+        ])
+        await db.assets.insert_many([
+            {"asset_id": "a1", "market_id": "m1", "name_ar": "", "name_en": "Aramco", "type": "stock", "created_at": "2026-01-01"},
+            {"asset_id": "a2", "market_id": "m1", "name_ar": "", "name_en": "SABIC", "type": "stock", "created_at": "2026-01-01"},
+            {"asset_id": "a3", "market_id": "m2", "name_ar": "", "name_en": "SPY", "type": "etf", "created_at": "2026-01-01"},
+        ])
+        await db.analyses.insert_many([
+            {"analysis_id": "x1", "asset_id": "a1", "market_id": "m1", "bias": "Bullish"},
+            {"analysis_id": "x3", "asset_id": "a3", "market_id": "m2", "bias": "Bearish"},
+        ])
+    asyncio.run(insert())
+
+def test_batch_analysis_lookup(api, login):
+    client, db, _ = api
+    _seed(db)
+    headers = login("sub", subscription_status="active")
+
+    response = client.get("/api/analysis", params={"asset_ids": "a1,a2,a3"}, headers=headers)
+    assert response.status_code == 200
+    assert sorted(response.json()["analyses"]) == ["a1", "a3"]
+
+    response = client.get("/api/analysis", params={"market_id": "m2"}, headers=headers)
+    assert list(response.json()["analyses"]) == ["a3"]
+
+    assert client.get("/api/analysis", headers=headers).status_code == 400
+
+def test_batch_analysis_requires_subscription(api, login):
+    client, db, _ = api
+    response = client.get("/api/analysis", params={"asset_ids": "a1"}, headers=login("free"))
+    assert response.status_code == 403
+
+def test_catalog_nests_assets_and_analyses(api, login):
+    client, db, _ = api
+    _seed(db)
+    body = client.get("/api/catalog", headers=login("sub", subscription_status="active")).json()
+    assert body["analysis_access"] is True
+    markets = {m["market_id"]: m for m in body["markets"]}
+    assets = {a["asset_id"]: a for a in markets["m1"]["assets"]}
+    assert assets["a1"]["analysis"]["bias"] == "Bullish"
+    assert "_id" not in assets["a1"]["analysis"]
+    assert assets["a2"]["analysis"] is None
+    assert [a["asset_id"] for a in markets["m2"]["assets"]] == ["a3"]
+
+def test_catalog_without_subscription_omits_analyses(api, login):
+    client, db, _ = api
+    _seed(db)
+    body = client.get("/api/catalog", headers=login("free")).json()
+    assert body["analysis_access"] is False
+    assert all("analysis" not in asset for market in body["markets"] for asset in market["assets"])
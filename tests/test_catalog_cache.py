@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from catalog import CatalogCache, increment_version
+
+def test_markets_and_assets_are_served_from_the_snapshot_with_etag(api, login):
+    client, db, server = api
+    admin = login("admin", access_level="admin")
+
+    response = client.post("/api/markets", json={"name_ar": "س", "name_en": "GCC", "region": "ME"}, headers=admin)
+    market_id = response.json()["market_id"]
+    client.post("/api/assets", json={"market_id": market_id, "name_ar": "", "name_en": "Aramco", "type": "stock"}, headers=admin)
+
+    response = client.get("/api/markets")
+    assert response.status_code == 200
+    assert [m["name_en"] for m in response.json()] == ["GCC"]
+    etag = response.headers["etag"]
+    assert etag == '"catalog-2"'
+
+    assert client.get("/api/markets", headers={"If-None-Match": etag}).status_code == 304
+    assert [a["name_en"] for a in client.get("/api/assets", params={"market_id": market_id}).json()] == ["Aramco"]
+    assert client.get("/api/assets", params={"market_id": "missing"}).json() == []
+
+    # Reads stay in memory: a write behind the cache's back is not visible...
+    asyncio.run(db.markets.insert_one({"market_id": "x", "name_ar": "", "name_en": "Hidden", "region": "", "created_at": ""}))
+    assert len(client.get("/api/markets").json()) == 1
+    # ...until an admin create bumps the version
+    client.post("/api/markets", json={"name_ar": "", "name_en": "US", "region": "NA"}, headers=admin)
+    response = client.get("/api/markets", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"catalog-3"'
+    assert len(response.json()) == 3
+
+def test_other_workers_pick_up_the_new_version():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+    reader = CatalogCache(refresh_seconds=3600)
+
+    async def run():
+        first = await reader.get(db)
+        await db.markets.insert_one({"market_id": "m1"})
+        await increment_version(db)  # another worker's create
+        unchanged = await reader.get(db)
+        reader.invalidate("catalog")  # its bus event arrives
+        refreshed = await reader.get(db)
+        reader.invalidate("catalog")
+        again = await reader.get(db)
+        return first, unchanged, refreshed, again
+
+    first, unchanged, refreshed, again = asyncio.run(run())
+    assert first.version == 0 and unchanged is first
+    assert refreshed.version == 1 and len(refreshed.markets) == 1
+    assert again is refreshed  # same version: no rebuild
+    assert reader.rebuilds == 2
@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from columnar_export import export_query, parse_timestamp, stream_export, to_columns
+
+def test_export_query_filters():
+    query = export_query("forecast_history", market="US", instrument="AAPL", start="2026-01-01",
+                         end="2026-02-01", status="success,failed")
+    assert query == {
+        "market": "US", "instrument_code": "AAPL", "status": {"$in": ["success", "failed"]},
+        "forecast_date": {"$gte": "2026-01-01", "$lt": "2026-02-01"},
+    }
+    assert export_query("daily_analysis") == {}
+    with pytest.raises(ValueError):
+        export_query("users")
+    with pytest.raises(ValueError):
+        export_query("daily_analysis", status="success")
+    with pytest.raises(ValueError):
+        export_query("daily_analysis", start="last week")
+
+def test_columns_are_typed():
+    columns = to_columns("daily_analysis", [
+        {"record_id": "da_1", "analysis_datetime": "2026-01-05T10:00:00+03:00", "analysis_price": "1,234.50",
+         "target_price": 12, "critical_level": "n/a"},
+    ])
+    assert columns["analysis_datetime"] == [datetime(2026, 1, 5, 7, tzinfo=timezone.utc)]
+    assert columns["analysis_price"] == [1234.5]
+    assert columns["target_price"] == [12.0]
+    assert columns["critical_level"] == [None]
+    assert columns["market"] == [None]
+    assert parse_timestamp("2026-01-05") == datetime(2026, 1, 5, tzinfo=timezone.utc)
+
+class ListCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def __aiter__(self):
+        for document in self.documents:
+            yield document
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+def test_stream_export_round_trips(fmt):
+    pa = pytest.importorskip("pyarrow")
+    import io
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    documents = [
+        {"record_id": f"fh_{i}", "market": "US", "instrument_code": "AAPL", "forecast_date": "2026-01-01",
+         "entry_price": 100 + i, "calculated_pl_percent": None, "status": "pending"}
+        for i in range(5)
+    ]
+
+    async def collect():
+        return [chunk async for chunk in stream_export(ListCursor(documents), "forecast_history", fmt, batch_size=2)]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) == 3
+    data = b"".join(chunks)
+    table = pyarrow.ipc.open_stream(data).read_all() if fmt == "arrow" else pyarrow.parquet.read_table(io.BytesIO(data))
+    assert table.num_rows == 5
+    assert table.schema.field("entry_price").type == pa.float64()
+    assert table.column("entry_price").to_pylist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+
+def test_export_endpoint_validates(api, login):
+    client, _, _ = api
+    admin = login("admin_1", access_level="admin")
+    member = login("member_1", subscription_status="active")
+    assert client.get("/api/admin/export/daily_analysis", headers=member).status_code == 403
+    assert client.get("/api/admin/export/users", headers=admin).status_code == 400
+    assert client.get("/api/admin/export/daily_analysis", params={"format": "csv"}, headers=admin).status_code == 400
+
+def test_batches_are_encoded_off_the_event_loop(monkeypatch):
+    pytest.importorskip("pyarrow")
+    import threading
+
+    import columnar_export
+
+    threads = []
+    convert = columnar_export.to_columns
+
+    def recording(source, rows):
+        threads.append(threading.current_thread())
+        return convert(source, rows)
+
+    monkeypatch.setattr(columnar_export, "to_columns", recording)
+    documents = [{"record_id": f"da_{i}", "analysis_price": str(i)} for i in range(3)]
+
+    async def collect():
+        return [chunk async for chunk in stream_export(ListCursor(documents), "daily_analysis", "parquet", batch_size=2)]
+
+    asyncio.run(collect())
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
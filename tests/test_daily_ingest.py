@@ -0,0 +1,158 @@
+import asyncio
+import io
+import threading
+import time
+
+import anyio
+import pytest
+
+import daily_ingest
+from daily_ingest import detect_format, ingest_file_rows, ingest_rows, iter_csv_rows, iter_xlsx_rows, parse_row
+
+ROW = ["GCC", "2222", "Bullish", "05.01.2026 10:30:00", "32.10", "34.00", "31.00"]
+
+def test_parse_row_validates_like_the_sheet_sync():
+    assert parse_row(ROW)["analysis_datetime"] == "2026-01-05T10:30:00+00:00"
+    with pytest.raises(ValueError, match="Insufficient columns"):
+        parse_row(ROW[:5])
+    with pytest.raises(ValueError, match="Missing required fields"):
+        parse_row(["GCC", "", "Bullish", "05.01.2026", "1", "2", "3"])
+    with pytest.raises(ValueError, match="Invalid datetime format"):
+        parse_row(["GCC", "2222", "Bullish", "2026-01-05", "1", "2", "3"])
+
+def test_csv_rows_skip_the_header_and_blank_lines():
+    data = "Market,Stock Code,Insight Type,Date & Time,Analysis,Target,Critical\n" + ",".join(ROW) + "\n,,\n" + \
+        "GCC,1120,Bearish,06.01.2026,\"1,200.5\",1100,1250\n"
+    rows = list(iter_csv_rows(io.BytesIO(data.encode("utf-8-sig"))))
+    assert [idx for idx, _ in rows] == [2, 4]
+    assert rows[1][1][4] == "1,200.5"
+    assert detect_format("history.XLSX") == "xlsx"
+    with pytest.raises(ValueError):
+        detect_format("history.json")
+
+def test_xlsx_rows_format_dates_and_numbers():
+    openpyxl = pytest.importorskip("openpyxl")
+    from datetime import datetime
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Market", "Stock Code", "Insight Type", "Date & Time", "Analysis", "Target", "Critical"])
+    sheet.append(["GCC", 2222, "Bullish", datetime(2026, 1, 5, 10, 30), 32.1, 34.0, 31])
+    sheet.append(["GCC", 1120, "Bearish", "06.01.2026", 10, None, None])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+
+    rows = list(iter_xlsx_rows(buffer))
+    assert rows[0] == (2, ["GCC", "2222", "Bullish", "05.01.2026 10:30:00", "32.1", "34", "31"])
+    # Trailing empty cells are dropped, so the row fails validation like a short sheet row
+    assert rows[1] == (3, ["GCC", "1120", "Bearish", "06.01.2026", "10"])
+
+def test_ingest_upserts_in_batches_and_keeps_record_ids():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+    rows = [(i + 2, ["GCC", f"I{i % 3}", "Bullish", f"{i % 28 + 1:02d}.01.2026", "1", "2", "3"]) for i in range(10)]
+    rows.append((12, ["GCC", "I0"]))
+    progress = []
+
+    async def collect(counts):
+        progress.append(counts["total_rows"])
+
+    async def run():
+        first = await ingest_rows(db, rows, "csv_import", batch_size=4, progress=collect)
+        ids = {d["instrument_code"] + d["analysis_datetime"]: d["record_id"] for d in await db.daily_analysis.find().to_list(None)}
+        corrected = [(2, ["GCC", "I0", "Bearish", "01.01.2026", "9", "9", "9"])]
+        second = await ingest_rows(db, corrected, "csv_import")
+        doc = await db.daily_analysis.find_one({"instrument_code": "I0", "analysis_datetime": "2026-01-01T00:00:00+00:00"})
+        dimensions = await db.instrument_dimensions.find({}, {"_id": 0, "instrument_code": 1, "row_count": 1}).to_list(None)
+        series = await db.daily_analysis_series.count_documents({})
+        return first, second, ids, doc, dimensions, series
+
+    first, second, ids, doc, dimensions, series = asyncio.run(run())
+    assert (first["total_rows"], first["inserted"], first["updated"], first["skipped"]) == (11, 10, 0, 1)
+    assert first["errors"] == ["Row 12: Insufficient columns (expected 7, got 2)"]
+    assert progress == [4, 8, 11]
+    assert (second["inserted"], second["updated"]) == (0, 1)
+    assert doc["insight_type"] == "Bearish" and doc["source"] == "csv_import"
+    assert doc["record_id"] == ids["I02026-01-01T00:00:00+00:00"]
+    assert sorted((d["instrument_code"], d["row_count"]) for d in dimensions) == [("I0", 4), ("I1", 3), ("I2", 3)]
+    assert series == 10
+
+def test_file_imports_keep_the_event_loop_responsive(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+    threads = []
+
+    def slow_rows(file, fmt):
+        for i in range(4):
+            # A blocking parser: a large XLSX or CSV file
+            time.sleep(0.05)
+            threads.append(threading.current_thread())
+            yield i + 2, ["GCC", f"I{i}", "Bullish", "05.01.2026", "1", "2", "3"]
+
+    monkeypatch.setattr(daily_ingest, "iter_file_rows", slow_rows)
+
+    async def run():
+        ticks = 0
+        done = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not done.is_set():
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        task = asyncio.create_task(ticker())
+        result = await ingest_file_rows(db, None, "csv")
+        done.set()
+        await task
+        return result, ticks
+
+    result, ticks = asyncio.run(run())
+    assert result["inserted"] == 4
+    assert threading.main_thread() not in threads
+    # The loop kept running while the rows were parsed
+    assert ticks >= 10
+
+def test_upload_endpoint_imports_csv(api, login):
+    client, db, _ = api
+    admin = login("admin_1", access_level="admin")
+    data = "\n".join(",".join(row) for row in [ROW, ROW, ["GCC", "1120"]])
+
+    response = client.post("/api/admin/daily-analysis/import", headers=admin,
+                           files={"file": ("history.csv", data.encode(), "text/csv")})
+    assert response.status_code == 200
+    assert response.json() == {
+        "total_rows": 3, "inserted": 1, "updated": 1, "skipped": 1, "archived": 0, "write_failures": 0,
+        "errors": ["Row 3: Insufficient columns (expected 7, got 2)"], "unchanged": False, "skipped_syncs": 0
+    }
+    assert asyncio.run(db.daily_analysis.count_documents({})) == 1
+
+    response = client.post("/api/admin/daily-analysis/import", headers=admin,
+                           files={"file": ("history.json", b"{}", "application/json")})
+    assert response.status_code == 400
+
+def test_large_upload_runs_as_a_job(api, login, monkeypatch):
+    client, db, server = api
+    admin = login("admin_1", access_level="admin")
+    monkeypatch.setattr(server, "DAILY_IMPORT_INLINE_MAX_BYTES", 10)
+    data = ",".join(ROW).encode()
+
+    # Keep one event loop across requests (without the lifespan) so the background job keeps running
+    with anyio.from_thread.start_blocking_portal() as portal:
+        client.portal = portal
+        try:
+            response = client.post("/api/admin/daily-analysis/import", headers=admin,
+                                   files={"file": ("history.csv", data, "text/csv")})
+            assert response.status_code == 202
+            job_id = response.json()["job_id"]
+
+            for _ in range(100):
+                job = client.get(f"/api/admin/daily-analysis/import/{job_id}", headers=admin).json()
+                if job["status"] != "running":
+                    break
+                time.sleep(0.01)
+        finally:
+            client.portal = None
+    assert job["status"] == "completed"
+    assert job["result"]["inserted"] == 1
@@ -0,0 +1,100 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from daily_series import parse_bucket, parse_price, series_pipeline, to_series_doc
+
+def test_parse_bucket():
+    assert parse_bucket("15m") == (15, "minute", 900)
+    assert parse_bucket("4h") == (4, "hour", 14400)
+    assert parse_bucket("1w") == (1, "week", 604800)
+    for invalid in ["0d", "1y", "d", "1.5h"]:
+        with pytest.raises(ValueError):
+            parse_bucket(invalid)
+
+def test_parse_price_handles_sheet_formatting():
+    assert parse_price("1,234.50") == 1234.5
+    assert parse_price(12) == 12.0
+    assert parse_price("") is None
+    assert parse_price(None) is None
+
+def test_to_series_doc_uses_real_dates_and_numbers():
+    doc = to_series_doc({
+        "market": "GCC",
+        "instrument_code": "AAPL",
+        "insight_type": "Bullish Strong",
+        "analysis_datetime": "2026-01-07T18:33:32+00:00",
+        "analysis_price": "150.50",
+        "target_price": "175.00",
+        "critical_level": "145.00",
+    })
+    assert doc["ts"] == datetime(2026, 1, 7, 18, 33, 32, tzinfo=timezone.utc)
+    assert doc["meta"] == {"market": "GCC", "instrument_code": "AAPL"}
+    assert (doc["analysis_price"], doc["target_price"], doc["critical_level"]) == (150.5, 175.0, 145.0)
+
+def test_series_pipeline_filters_and_buckets():
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2026, 2, 1, tzinfo=timezone.utc)
+    pipeline = series_pipeline("AAPL", start, end, "4h", market="GCC")
+
+    assert pipeline[0] == {"$match": {"meta.instrument_code": "AAPL", "ts": {"$gte": start, "$lt": end}, "meta.market": "GCC"}}
+    assert pipeline[2]["$group"]["_id"]["bucket"] == {"$dateTrunc": {"date": "$ts", "unit": "hour", "binSize": 4}}
+
+class FakeSeriesDb:
+    """Just enough of a database for ensure_series_collection, on a given server version."""
+
+    def __init__(self, version, collections=()):
+        self.version = version
+        self.collections = list(collections)
+        self.created = []
+
+    async def command(self, name):
+        return {"versionArray": self.version}
+
+    def list_collections(self, filter):
+        db = self
+
+        class Cursor:
+            async def to_list(self, length):
+                return [c for c in db.collections if c["name"] == filter["name"]]
+
+        return Cursor()
+
+    async def create_collection(self, name, **options):
+        self.created.append(options)
+        self.collections.append({"name": name, "type": "timeseries" if "timeseries" in options else "collection"})
+
+    def __getitem__(self, name):
+        class Collection:
+            async def create_index(self, keys):
+                pass
+
+        return Collection()
+
+def test_series_storage_needs_deletes_by_time():
+    import asyncio
+
+    from daily_series import SERIES_COLLECTION, ensure_series_collection
+
+    assert asyncio.run(ensure_series_collection(FakeSeriesDb([7, 0, 2]))) == "timeseries"
+    # Before 7.0 points cannot be deleted by time, which re-syncs rely on
+    old = FakeSeriesDb([6, 0, 12])
+    assert asyncio.run(ensure_series_collection(old)) == "collection"
+    assert old.created == [{}]
+    existing = FakeSeriesDb([6, 0, 12], [{"name": SERIES_COLLECTION, "type": "timeseries"}])
+    with pytest.raises(RuntimeError, match="7.0"):
+        asyncio.run(ensure_series_collection(existing))
+
+def test_open_ended_series_requests_share_a_cache_entry(api, login, monkeypatch):
+    client, _, server = api
+    headers = login("u1", subscription_status="active")
+    pipelines = []
+    # The mock lacks $dateTrunc/$round; only the caching is under test here
+    monkeypatch.setattr(server, "series_pipeline", lambda *args: pipelines.append(args) or [{"$match": {}}])
+
+    first = client.get("/api/daily-analysis/series?instrument=AAPL&bucket=1h", headers=headers)
+    second = client.get("/api/daily-analysis/series?instrument=AAPL&bucket=1h", headers=headers)
+    assert first.status_code == 200 and first.json() == second.json()
+    assert len(pipelines) == 1
+    end = datetime.fromisoformat(first.json()["end"])
+    assert (end.minute, end.second, end.microsecond) == (0, 0, 0)
@@ -0,0 +1,66 @@
+import pytest
+from pymongo import monitoring
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+from database import DatabaseSettings, PoolMetrics, create_client
+
+ADDRESS = ("localhost", 27017)
+
+@pytest.fixture
+def mongo_env(monkeypatch):
+    monkeypatch.setenv("MONGO_URL", "mongodb://localhost:27017")
+    monkeypatch.setenv("DB_NAME", "tahlil_test")
+    return monkeypatch
+
+def test_settings_from_env(mongo_env):
+    mongo_env.setenv("MONGO_MAX_POOL_SIZE", "20")
+    mongo_env.setenv("MONGO_MIN_POOL_SIZE", "2")
+    mongo_env.setenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "500")
+    mongo_env.setenv("MONGO_COMPRESSORS", "zstd, snappy")
+    mongo_env.setenv("MONGO_READ_PREFERENCES", "forecast_history=secondaryPreferred")
+
+    settings = DatabaseSettings.from_env()
+
+    assert settings.client_options() == {
+        "maxPoolSize": 20,
+        "minPoolSize": 2,
+        "serverSelectionTimeoutMS": 30000,
+        "waitQueueTimeoutMS": 500,
+        "compressors": "zstd,snappy",
+    }
+    assert isinstance(settings.analytics_read_preference_for("forecast_history"), SecondaryPreferred)
+    assert isinstance(settings.analytics_read_preference_for("daily_analysis"), Primary)
+
+def test_invalid_read_preference_is_rejected(mongo_env):
+    mongo_env.setenv("MONGO_ANALYTICS_READ_PREFERENCE", "secondaryPrefered")
+    with pytest.raises(ValueError):
+        DatabaseSettings.from_env()
+
+def test_client_uses_pool_options(mongo_env):
+    mongo_env.setenv("MONGO_MAX_POOL_SIZE", "7")
+    client = create_client(DatabaseSettings.from_env(), PoolMetrics(7))
+    try:
+        assert client.delegate.options.pool_options.max_pool_size == 7
+    finally:
+        client.close()
+
+def test_pool_metrics_tracks_wait_and_saturation():
+    metrics = PoolMetrics(max_pool_size=4)
+    metrics.connection_created(monitoring.ConnectionCreatedEvent(ADDRESS, 1))
+    metrics.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(ADDRESS))
+    metrics.connection_checked_out(monitoring.ConnectionCheckedOutEvent(ADDRESS, 1))
+    metrics.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(ADDRESS))
+    metrics.connection_check_out_failed(
+        monitoring.ConnectionCheckOutFailedEvent(ADDRESS, monitoring.ConnectionCheckOutFailedReason.TIMEOUT)
+    )
+
+    server = metrics.snapshot()["servers"]["localhost:27017"]
+    assert server["checkouts"] == 1
+    assert server["checked_out"] == 1
+    assert server["saturation"] == 0.25
+    assert server["checkout_timeouts"] == 1
+    assert server["waiting"] == 0
+    assert sum(server["wait_ms_buckets"].values()) == 1
+
+    metrics.connection_checked_in(monitoring.ConnectionCheckedInEvent(ADDRESS, 1))
+    assert metrics.snapshot()["servers"]["localhost:27017"]["saturation"] == 0
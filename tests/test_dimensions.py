@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from dimensions import INSTRUMENTS_COLLECTION, MARKETS_COLLECTION, DimensionUpdates, list_markets, rebuild_dimensions
+
+FORECAST = {
+    "instrument_code": "AAPL",
+    "market": "US",
+    "forecast_date": "2026-01-01T00:00:00+00:00",
+    "forecast_direction": "Bullish",
+    "entry_price": 100.0,
+    "forecast_target_price": 110.0,
+}
+
+def _db():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    return mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+
+def test_updates_track_counts_and_seen_range():
+    db = _db()
+
+    async def run():
+        first = DimensionUpdates()
+        first.seen("GCC", "2222", added=1)
+        first.seen("GCC", "2222", added=1)
+        first.seen("GCC", "1120")
+        await first.write(db, "daily_analysis", "2026-01-01T00:00:00+00:00")
+
+        second = DimensionUpdates()
+        second.seen("GCC", "2222")
+        second.removed("US", "SPY")  # unknown: must not be created
+        await second.write(db, "daily_analysis", "2026-02-01T00:00:00+00:00")
+        return (await db[MARKETS_COLLECTION].find({}, {"_id": 0}).to_list(None),
+                await db[INSTRUMENTS_COLLECTION].find({}, {"_id": 0}).sort("instrument_code", 1).to_list(None))
+
+    markets, instruments = asyncio.run(run())
+    assert markets == [{"source": "daily_analysis", "market": "GCC", "row_count": 2,
+                        "first_seen": "2026-01-01T00:00:00+00:00", "last_seen": "2026-02-01T00:00:00+00:00"}]
+    assert [(d["instrument_code"], d["row_count"]) for d in instruments] == [("1120", 0), ("2222", 2)]
+
+def test_rebuild_matches_fact_collection():
+    db = _db()
+
+    async def run():
+        await db.forecast_history.insert_many([
+            {"market": "US", "instrument_code": "SPY", "created_at": "2026-01-02"},
+            {"market": "US", "instrument_code": "SPY", "created_at": "2026-01-01", "updated_at": "2026-03-01"},
+            {"market": "GCC", "instrument_code": "2222", "created_at": "2026-02-01"},
+            {"market": "", "instrument_code": "X", "created_at": "2026-02-01"},
+        ])
+        report = await rebuild_dimensions(db, ["forecast_history"])
+        us = await db[MARKETS_COLLECTION].find_one({"market": "US"}, {"_id": 0})
+        return report, us, await list_markets(db[MARKETS_COLLECTION], "forecast_history")
+
+    report, us, markets = asyncio.run(run())
+    assert report == {"forecast_history": {"markets": 2, "instruments": 2, "rows": 3}}
+    assert us["row_count"] == 2
+    assert (us["first_seen"], us["last_seen"]) == ("2026-01-01", "2026-03-01")
+    assert markets == ["GCC", "US"]
+
+def test_markets_endpoints_follow_forecast_writes(api, login):
+    client, db, _ = api
+    admin = login("admin", access_level="admin")
+
+    assert client.get("/api/daily-analysis/markets").status_code == 401
+
+    record_id = client.post("/api/admin/history/forecast", json=FORECAST, headers=admin).json()["record_id"]
+    client.post("/api/admin/history/forecast", json={**FORECAST, "market": "GCC", "instrument_code": "2222"}, headers=admin)
+    assert client.get("/api/history/markets", headers=admin).json() == {"markets": ["GCC", "US"]}
+
+    client.delete(f"/api/admin/history/forecast/{record_id}", headers=admin)
+    assert client.get("/api/history/markets", headers=admin).json() == {"markets": ["GCC"]}
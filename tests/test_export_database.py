@@ -0,0 +1,62 @@
+import importlib.util
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+EXPORT_DIR = Path(__file__).resolve().parent.parent / "database_export"
+
+def load_script(name):
+    spec = importlib.util.spec_from_file_location(name, EXPORT_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+export_database = load_script("export_database")
+import_database = load_script("import_database")
+
+def test_since_query_matches_string_and_date_fields():
+    since = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    query = export_database.since_query("user_sessions", since)
+    assert query == {"$or": [
+        {"created_at": {"$gte": "2026-01-01T00:00:00+00:00"}},
+        {"created_at": {"$gte": datetime(2026, 1, 1)}},
+    ]}
+    assert export_database.since_query("daily_analysis", None) == {}
+
+def test_gzip_export_round_trips_through_verified_import(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    source = mongomock.MongoClient()["source"]
+    documents = [
+        {"record_id": f"f{i}", "market": "GCC", "entry_price": 100.0 + i, "updated_at": datetime(2026, 1, 2)}
+        for i in range(25)
+    ]
+    source.forecast_history.insert_many([dict(doc) for doc in documents])
+
+    entry = export_database.export_collection(source, "forecast_history", str(tmp_path), "gzip", None, None, 10)
+    assert entry["count"] == 25
+    assert entry["file"] == "forecast_history.ndjson.gz"
+    (tmp_path / "manifest.json").write_text(json.dumps({"since": None, "collections": {"forecast_history": entry}}))
+
+    manifest = import_database.load_manifest(str(tmp_path))
+    path = import_database.find_export_file(str(tmp_path), "forecast_history", manifest)
+    target = mongomock.MongoClient()["target"]
+    checkpoint = import_database.Checkpoint(str(tmp_path / "checkpoint.json"), "replace")
+    import_database.import_collection(
+        target, "forecast_history", path, "replace", 7, checkpoint, False, manifest["collections"]["forecast_history"]
+    )
+
+    imported = list(target.forecast_history.find({}, {"_id": 0}).sort("record_id", 1))
+    assert len(imported) == 25
+    assert imported[0]["updated_at"] == "2026-01-02T00:00:00"
+
+def test_corrupted_export_is_rejected_before_import(tmp_path):
+    path = tmp_path / "markets.ndjson"
+    path.write_text('{"market_id": "m1"}\n')
+    checkpoint = import_database.Checkpoint(str(tmp_path / "checkpoint.json"), "replace")
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        import_database.import_collection(
+            None, "markets", str(path), "replace", 10, checkpoint, False, {"sha256": "0" * 64, "count": 1}
+        )
@@ -0,0 +1,85 @@
+from datetime import datetime, timezone, timedelta
+
+import numpy as np
+
+from forecast_analytics import ForecastSeries, compute_analytics, compute_metrics
+
+AS_OF = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+def _doc(market, instrument, pl, days_ago):
+    return {
+        "market": market,
+        "instrument_code": instrument,
+        "calculated_pl_percent": pl,
+        "status": "success" if pl > 0 else "failed",
+        "result_date": (AS_OF - timedelta(days=days_ago)).isoformat(),
+    }
+
+def test_metrics_on_known_series():
+    pl = np.array([5.0, -2.0, -4.0, 3.0, 6.0, -1.0])
+    success = pl > 0
+    dates = (np.datetime64("2026-01-01", "s") + np.arange(6) * np.timedelta64(1, "D")).astype("datetime64[s]")
+    metrics = compute_metrics(pl, success, dates, np.datetime64("2026-01-06", "s"))
+
+    assert metrics["completed_forecasts"] == 6
+    assert metrics["win_rate"] == 50.0
+    assert metrics["total_return_percent"] == 7.0
+    assert metrics["max_drawdown_percent"] == 6.0  # peak 5 -> trough -1
+    assert metrics["profit_factor"] == round(14 / 7, 4)
+    assert metrics["sharpe_ratio"] == round(float(pl.mean() / pl.std(ddof=1)), 4)
+    assert metrics["longest_win_streak"] == 2
+    assert metrics["longest_loss_streak"] == 2
+    assert metrics["completed_30d"] == 6
+
+def test_opening_loss_counts_as_drawdown_and_no_losses_has_no_profit_factor():
+    dates = np.array(["2026-01-01", "2026-01-02"], dtype="datetime64[s]")
+    losing = compute_metrics(np.array([-3.0, -2.0]), np.array([False, False]), dates, dates[-1])
+    assert losing["max_drawdown_percent"] == 5.0
+    assert losing["longest_win_streak"] == 0
+
+    winning = compute_metrics(np.array([1.0, 1.0]), np.array([True, True]), dates, dates[-1])
+    assert winning["profit_factor"] is None
+    assert winning["sharpe_ratio"] is None  # zero variance
+
+def test_grouped_analytics_and_rolling_windows():
+    documents = [
+        _doc("GCC", "AAPL", 4.0, 100),
+        _doc("GCC", "AAPL", -2.0, 60),
+        _doc("GCC", "MSFT", 3.0, 10),
+        _doc("US", "SPY", -1.0, 5),
+        _doc("US", "SPY", 2.0, 1),
+        {"market": "US", "instrument_code": "SPY", "calculated_pl_percent": 9.0, "status": "success", "result_date": "bad"},
+    ]
+    result = compute_analytics(ForecastSeries.from_documents(documents), as_of=AS_OF)
+
+    assert result["global"]["completed_forecasts"] == 5  # unparseable date skipped
+    assert result["global"]["completed_30d"] == 3
+    assert result["global"]["completed_90d"] == 4
+
+    gcc = result["markets"]["GCC"]
+    assert gcc["total_return_percent"] == 5.0
+    assert gcc["win_rate_30d"] == 100.0
+    assert gcc["win_rate_90d"] == 50.0
+    assert result["markets"]["US"]["win_rate_30d"] == 50.0
+
+    by_instrument = {(r["market"], r["instrument_code"]): r for r in result["instruments"]}
+    assert by_instrument[("GCC", "AAPL")]["completed_forecasts"] == 2
+    assert by_instrument[("GCC", "AAPL")]["win_rate_30d"] is None
+    assert by_instrument[("GCC", "AAPL")]["max_drawdown_percent"] == 2.0
+
+def test_epoch_timestamps_match_iso_dates():
+    documents = [_doc("GCC", "AAPL", 1.5, 3), _doc("GCC", "AAPL", -0.5, 2)]
+    projected = [
+        {**doc, "result_ts": int(datetime.fromisoformat(doc.pop("result_date")).timestamp() * 1000)}
+        for doc in [dict(d) for d in documents]
+    ]
+    a = ForecastSeries.from_documents(documents)
+    b = ForecastSeries.from_documents(projected)
+    assert (a.result_dates == b.result_dates).all()
+    assert compute_analytics(a, as_of=AS_OF) == compute_analytics(b, as_of=AS_OF)
+
+def test_empty_history():
+    result = compute_analytics(ForecastSeries.from_documents([]), as_of=AS_OF)
+    assert result["global"] is None
+    assert result["markets"] == {}
+    assert result["instruments"] == []
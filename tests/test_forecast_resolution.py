@@ -0,0 +1,142 @@
+import asyncio
+import io
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from forecast_resolution import (
+    apply_forecast_results, compute_forecast_result, compute_forecast_results, iter_result_rows, iterate_in_threadpool,
+    parse_datetime, parse_price_file, resolve_pending_forecasts, validate_result_row
+)
+
+def test_vectorized_results_match_scalar_rules():
+    rows = [
+        ("Bullish", 145.0, 160.0, 165.5),
+        ("Bullish", 2700.0, 2900.0, 2850.0),
+        ("Bearish", 100.0, 90.0, 88.0),
+        ("Bearish", 100.0, 90.0, 104.0),
+    ]
+    pl, success = compute_forecast_results(
+        np.array([r[0] == "Bullish" for r in rows]),
+        np.array([r[1] for r in rows]),
+        np.array([r[2] for r in rows]),
+        np.array([r[3] for r in rows]),
+    )
+    for i, row in enumerate(rows):
+        expected_pl, expected_status = compute_forecast_result(*row)
+        assert pl[i] == expected_pl
+        assert ("success" if success[i] else "failed") == expected_status
+    assert compute_forecast_result(*rows[0]) == (14.14, "success")
+
+def test_price_file_keeps_latest_row_per_instrument():
+    content = (
+        b"market,instrument_code,price,price_date\n"
+        b"GCC,AAPL,150.5,2026-01-02T00:00:00+00:00\n"
+        b"GCC,AAPL,\"1,160.0\",2026-01-03T00:00:00+00:00\n"
+        b"GCC,AAPL,155.0,2026-01-01T00:00:00+00:00\n"
+    )
+    assert parse_price_file(content) == {("GCC", "AAPL"): (1160.0, "2026-01-03T00:00:00+00:00")}
+
+    with pytest.raises(ValueError):
+        parse_price_file(b"market,price\nGCC,1\n")
+
+def test_resolution_resolves_hits_and_expired_forecasts():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+    forecasts = [
+        # target hit -> success
+        {"record_id": "f1", "market": "GCC", "instrument_code": "AAPL", "forecast_date": "2026-01-01T00:00:00+00:00",
+         "forecast_direction": "Bullish", "entry_price": 100.0, "forecast_target_price": 110.0, "status": "pending"},
+        # target missed, still inside the horizon -> stays pending
+        {"record_id": "f2", "market": "GCC", "instrument_code": "MSFT", "forecast_date": "2026-01-09T00:00:00+00:00",
+         "forecast_direction": "Bullish", "entry_price": 100.0, "forecast_target_price": 130.0, "status": "pending"},
+        # target missed, past the horizon -> failed
+        {"record_id": "f3", "market": "GCC", "instrument_code": "MSFT", "forecast_date": "2025-12-01T00:00:00+00:00",
+         "forecast_direction": "Bearish", "entry_price": 100.0, "forecast_target_price": 90.0, "status": "pending"},
+        # no price observed after the forecast -> unmatched
+        {"record_id": "f4", "market": "GCC", "instrument_code": "TSLA", "forecast_date": "2026-01-09T00:00:00+00:00",
+         "forecast_direction": "Bullish", "entry_price": 100.0, "forecast_target_price": 110.0, "status": "pending"},
+    ]
+    prices = {
+        ("GCC", "AAPL"): (112.0, "2026-01-10T00:00:00+00:00"),
+        ("GCC", "MSFT"): (105.0, "2026-01-10T00:00:00+00:00"),
+        ("GCC", "TSLA"): (120.0, "2026-01-05T00:00:00+00:00"),
+    }
+    now = datetime(2026, 1, 10, tzinfo=timezone.utc)
+
+    async def scenario():
+        await db.forecast_history.insert_many(forecasts)
+        dry = await resolve_pending_forecasts(db, prices, horizon_days=30, dry_run=True, now=now)
+        assert await db.forecast_history.count_documents({"status": "pending"}) == 4
+        report = await resolve_pending_forecasts(db, prices, horizon_days=30, now=now)
+        return dry, report, {f["record_id"]: f async for f in db.forecast_history.find({}, {"_id": 0})}
+
+    dry, report, stored = asyncio.run(scenario())
+
+    assert (dry["resolved"], dry["success"], dry["failed"]) == (2, 1, 1)
+    assert (report["matched"], report["unmatched"], report["still_pending"]) == (3, 1, 2)
+    assert stored["f1"]["status"] == "success" and stored["f1"]["calculated_pl_percent"] == 12.0
+    assert stored["f3"]["status"] == "failed" and stored["f3"]["calculated_pl_percent"] == -5.0
+    assert stored["f2"]["status"] == "pending" and stored["f4"]["status"] == "pending"
+
+def test_bulk_results_import_reports_errors_per_row():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+    upload = io.BytesIO(
+        b"record_id,actual_result_price,result_date,notes\n"
+        b"f1,165.5,2025-12-23,closed early\n"
+        b"missing,10,2025-12-23,\n"
+        b"f2,abc,2025-12-23,\n"
+        b"f2,88,2025-12-24,\n"
+        b"f1,170,2025-12-24,\n"
+    )
+
+    async def scenario():
+        await db.forecast_history.insert_many([
+            {"record_id": "f1", "forecast_direction": "Bullish", "entry_price": 145.0,
+             "forecast_target_price": 160.0, "status": "pending", "notes": "original"},
+            {"record_id": "f2", "forecast_direction": "Bearish", "entry_price": 100.0,
+             "forecast_target_price": 90.0, "status": "pending", "notes": "keep me"},
+        ])
+        report = await apply_forecast_results(db, iter_result_rows(upload, "csv"), batch_size=2)
+        return report, {f["record_id"]: f async for f in db.forecast_history.find({}, {"_id": 0})}
+
+    report, stored = asyncio.run(scenario())
+
+    assert (report["total_rows"], report["updated"], report["success"]) == (5, 2, 2)
+    assert [(e["row"], e["error"].split(" (")[0].split(":")[0]) for e in report["errors"]] == [
+        (3, "Forecast not found"),
+        (4, "Invalid actual_result_price"),
+        (6, "Duplicate record_id"),
+    ]
+    assert stored["f1"]["calculated_pl_percent"] == 14.14 and stored["f1"]["notes"] == "closed early"
+    assert stored["f2"]["calculated_pl_percent"] == 12.0 and stored["f2"]["notes"] == "keep me"
+
+def test_ndjson_rows_with_bad_json_are_reported():
+    rows = list(iter_result_rows(io.BytesIO(b'{"record_id": "f1"}\n\nnot json\n[1]\n'), "ndjson"))
+    assert [line for line, _ in rows] == [1, 3, 4]
+    assert validate_result_row(rows[1][1]) == (None, "Invalid JSON: Expecting value")
+    assert validate_result_row(rows[0][1]) == (None, "Invalid actual_result_price: None")
+
+def test_uploads_are_parsed_off_the_event_loop():
+    import threading
+
+    threads = []
+
+    def rows():
+        for line in range(5):
+            threads.append(threading.current_thread())
+            yield line
+
+    async def run():
+        return [item async for item in iterate_in_threadpool(rows(), chunk_size=2)]
+
+    assert asyncio.run(run()) == [0, 1, 2, 3, 4]
+    assert threading.main_thread() not in threads
+
+def test_parse_datetime():
+    assert parse_datetime("2026-01-31") == datetime(2026, 1, 31, tzinfo=timezone.utc)
+    assert parse_datetime("2026-01-31T10:00:00Z") == datetime(2026, 1, 31, 10, tzinfo=timezone.utc)
+    assert parse_datetime("31/01/2026") is None
+    assert parse_datetime(None) is None
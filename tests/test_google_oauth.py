@@ -0,0 +1,194 @@
+import asyncio
+import base64
+import json
+import time
+
+import httpx
+import pytest
+
+from google_oauth import GoogleOAuth, IdTokenError, JWKSCache, OAuthError, verify_id_token
+
+CLIENT_ID = "client-123.apps.googleusercontent.com"
+ISSUER = "https://accounts.google.com"
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+class FakeGoogle:
+    """Local OAuth server: token endpoint, userinfo and a JWKS that can rotate keys."""
+
+    def __init__(self):
+        from fastapi import FastAPI, Form, Response
+
+        self.keys = {}
+        self.kid = None
+        self.requests = {"token": 0, "userinfo": 0, "jwks": 0}
+        self.include_id_token = True
+        self.email_verified = True
+        self.name = "Ada"
+        self.malformed_keys = []
+        self.rotate()
+        app = FastAPI()
+
+        @app.post("/token")
+        async def token(code: str = Form(...), client_id: str = Form(...)):
+            self.requests["token"] += 1
+            if code != "good-code":
+                return Response(status_code=400)
+            tokens = {"access_token": "access-1", "token_type": "Bearer"}
+            if self.include_id_token:
+                tokens["id_token"] = self.sign({"sub": "google-42", "email": "Ada@example.com", "name": self.name,
+                                                "email_verified": self.email_verified})
+            return tokens
+
+        @app.get("/userinfo")
+        async def userinfo():
+            self.requests["userinfo"] += 1
+            return {"id": "google-42", "email": "Ada@example.com", "verified_email": self.email_verified,
+                    "name": self.name, "picture": ""}
+
+        @app.get("/certs")
+        async def certs(response: Response):
+            self.requests["jwks"] += 1
+            response.headers["Cache-Control"] = "public, max-age=3600"
+            return {"keys": [self.jwk(kid) for kid in self.keys] + self.malformed_keys}
+
+        self.app = app
+
+    def rotate(self):
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        self.kid = f"key-{len(self.keys) + 1}"
+        self.keys[self.kid] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    def jwk(self, kid):
+        numbers = self.keys[kid].public_key().public_numbers()
+        return {"kty": "RSA", "alg": "RS256", "use": "sig", "kid": kid,
+                "n": _b64(numbers.n.to_bytes((numbers.n.bit_length() + 7) // 8, "big")),
+                "e": _b64(numbers.e.to_bytes(3, "big"))}
+
+    def sign(self, claims, kid=None, **overrides):
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import padding
+
+        kid = kid or self.kid
+        now = int(time.time())
+        payload = {"iss": ISSUER, "aud": CLIENT_ID, "iat": now, "exp": now + 3600, **claims, **overrides}
+        signing_input = f"{_b64(json.dumps({'alg': 'RS256', 'kid': kid}).encode())}.{_b64(json.dumps(payload).encode())}"
+        signature = self.keys[kid].sign(signing_input.encode(), padding.PKCS1v15(), hashes.SHA256())
+        return f"{signing_input}.{_b64(signature)}"
+
+    def oauth(self):
+        http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://google.test")
+        return GoogleOAuth(http_client, CLIENT_ID, "secret", "http://localhost/callback",
+                           token_url="http://google.test/token", userinfo_url="http://google.test/userinfo",
+                           jwks_url="http://google.test/certs")
+
+@pytest.fixture
+def google():
+    pytest.importorskip("cryptography")
+    return FakeGoogle()
+
+def test_sign_in_uses_the_id_token_and_caches_the_keys(google):
+    async def run():
+        oauth = google.oauth()
+        first = await oauth.sign_in("good-code")
+        second = await oauth.sign_in("good-code")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second == {"id": "google-42", "email": "Ada@example.com", "name": "Ada", "picture": ""}
+    assert google.requests == {"token": 2, "userinfo": 0, "jwks": 1}
+
+@pytest.mark.parametrize("include_id_token", [True, False])
+def test_unverified_emails_are_rejected(google, include_id_token):
+    google.include_id_token = include_id_token
+    google.email_verified = False
+    with pytest.raises(IdTokenError if include_id_token else OAuthError, match="not verified"):
+        asyncio.run(google.oauth().sign_in("good-code"))
+
+@pytest.mark.parametrize("include_id_token", [True, False])
+def test_a_missing_name_defaults_to_the_email_local_part(google, include_id_token):
+    google.include_id_token = include_id_token
+    google.name = None
+    assert asyncio.run(google.oauth().sign_in("good-code"))["name"] == "Ada"
+
+def test_malformed_signing_keys_are_skipped(google):
+    google.malformed_keys = [{"kty": "RSA", "kid": "broken", "n": "", "e": _b64(b"\x00")},
+                             {"kty": "RSA", "kid": "missing-n", "e": "AQAB"}]
+
+    async def run():
+        keys = JWKSCache(google.oauth().http_client, "http://google.test/certs")
+        claims = await verify_id_token(google.sign({"sub": "x"}), keys, CLIENT_ID)
+        with pytest.raises(IdTokenError, match="Unknown signing key"):
+            await keys.get_key("broken")
+        return claims
+
+    assert asyncio.run(run())["sub"] == "x"
+
+def test_falls_back_to_userinfo_without_an_id_token(google):
+    google.include_id_token = False
+    info = asyncio.run(google.oauth().sign_in("good-code"))
+    assert info["id"] == "google-42"
+    assert google.requests["userinfo"] == 1
+
+def test_rejected_code_is_an_oauth_error(google):
+    with pytest.raises(OAuthError):
+        asyncio.run(google.oauth().sign_in("bad-code"))
+
+@pytest.mark.parametrize("overrides,message", [
+    ({"aud": "someone-else"}, "another client"),
+    ({"iss": "https://evil.example.com"}, "issuer"),
+    ({"exp": int(time.time()) - 600}, "expired"),
+])
+def test_claims_are_checked(google, overrides, message):
+    async def run():
+        keys = JWKSCache(google.oauth().http_client, "http://google.test/certs")
+        await verify_id_token(google.sign({"sub": "x"}, **overrides), keys, CLIENT_ID)
+
+    with pytest.raises(IdTokenError, match=message):
+        asyncio.run(run())
+
+def test_tampered_token_fails_signature_check(google):
+    async def run():
+        keys = JWKSCache(google.oauth().http_client, "http://google.test/certs")
+        header, payload, signature = google.sign({"sub": "x"}).split(".")
+        forged = _b64(json.dumps({"sub": "admin", "iss": ISSUER, "aud": CLIENT_ID,
+                                  "exp": int(time.time()) + 60}).encode())
+        await verify_id_token(f"{header}.{forged}.{signature}", keys, CLIENT_ID)
+
+    with pytest.raises(IdTokenError, match="signature"):
+        asyncio.run(run())
+
+def test_key_rotation_refetches_once_for_an_unknown_kid(google, monkeypatch):
+    import google_oauth
+
+    monkeypatch.setattr(google_oauth, "JWKS_MIN_REFRESH_SECONDS", 0)
+
+    async def run():
+        keys = JWKSCache(google.oauth().http_client, "http://google.test/certs")
+        await verify_id_token(google.sign({"sub": "x"}), keys, CLIENT_ID)
+        google.rotate()
+        return await verify_id_token(google.sign({"sub": "y"}), keys, CLIENT_ID)
+
+    assert asyncio.run(run())["sub"] == "y"
+    assert google.requests["jwks"] == 2
+
+def test_callback_creates_user_and_session_from_the_id_token(api, google, monkeypatch):
+    client, db, server = api
+    monkeypatch.setattr(server, "google_oauth", google.oauth())
+
+    response = client.get("/api/auth/google/callback", params={"code": "good-code"}, follow_redirects=False)
+    assert response.status_code == 302
+    assert "session_token" in response.cookies
+
+    user = asyncio.run(db.users.find_one({"google_user_id": "google-42"}))
+    assert user["search_email"] == "ada@example.com"
+    assert google.requests["userinfo"] == 0
+
+    response = client.get("/api/auth/google/callback", params={"code": "bad-code"}, follow_redirects=False)
+    assert response.status_code == 400
+
+    google.email_verified = False
+    response = client.get("/api/auth/google/callback", params={"code": "good-code"}, follow_redirects=False)
+    assert response.status_code == 401
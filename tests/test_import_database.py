@@ -0,0 +1,78 @@
+import importlib.util
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+EXPORT_DIR = Path(__file__).resolve().parent.parent / "database_export"
+spec = importlib.util.spec_from_file_location("import_database", EXPORT_DIR / "import_database.py")
+import_database = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(import_database)
+
+def test_json_array_is_streamed_across_chunk_boundaries():
+    documents = [{"record_id": f"r{i}", "notes": "x" * (i * 7), "nested": {"v": [i, None]}} for i in range(50)]
+    text = json.dumps(documents, indent=2)
+
+    parsed = list(import_database.iter_json_array(io.StringIO(text), chunk_size=16))
+
+    assert parsed == documents
+
+def test_truncated_json_array_is_rejected():
+    with pytest.raises(ValueError):
+        list(import_database.iter_json_array(io.StringIO('[{"a": 1}, {"b": '), chunk_size=4))
+
+def test_export_files_parse():
+    for collection in import_database.COLLECTIONS:
+        path = import_database.find_export_file(str(EXPORT_DIR), collection)
+        with open(path, encoding="utf-8") as f:
+            assert list(import_database.iter_documents(path)) == json.load(f)
+
+def test_resume_skips_committed_documents(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient()["tahlil_test"]
+    path = tmp_path / "forecast_history.ndjson"
+    path.write_text("".join(json.dumps({"record_id": f"f{i}", "status": "pending"}) + "\n" for i in range(10)))
+
+    checkpoint = import_database.Checkpoint(str(tmp_path / "checkpoint.json"), "upsert")
+    checkpoint.update("forecast_history", committed=4, done=False)
+
+    stats = import_database.import_collection(db, "forecast_history", str(path), "upsert", 3, checkpoint, resume=True)
+
+    assert stats["documents"] == 10
+    assert stats["resumed_from"] == 4
+    assert db.forecast_history.count_documents({}) == 6
+    assert checkpoint.get("forecast_history") == {"committed": 10, "done": True}
+
+def test_replace_keeps_indexes_and_reports_duplicates(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient()["tahlil_test"]
+    db.forecast_history.insert_one({"record_id": "old"})
+    db.forecast_history.create_index("record_id", name="record_id_unique", unique=True)
+    db.forecast_history.create_index([("status", 1), ("forecast_date", -1)], name="status_date")
+
+    path = tmp_path / "forecast_history.ndjson"
+    rows = [{"record_id": f"f{i % 4}", "status": "pending", "forecast_date": str(i)} for i in range(6)]
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    checkpoint = import_database.Checkpoint(str(tmp_path / "checkpoint.json"), "replace")
+
+    stats = import_database.import_collection(db, "forecast_history", str(path), "replace", 4, checkpoint, resume=False)
+
+    assert stats["documents"] == 6 and stats["duplicates"] == 2 and stats["replaced"]
+    assert sorted(db.forecast_history.distinct("record_id")) == ["f0", "f1", "f2", "f3"]
+    indexes = db.forecast_history.index_information()
+    assert indexes["record_id_unique"]["unique"]
+    assert indexes["status_date"]["key"] == [("status", 1), ("forecast_date", -1)]
+    assert import_database.STAGING_INDEX not in indexes
+
+def test_imported_users_get_search_fields(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient()["tahlil_test"]
+    path = tmp_path / "users.ndjson"
+    path.write_text(json.dumps({"user_id": "user_1", "email": "Ada@Example.com", "name": "Ada L"}) + "\n")
+    checkpoint = import_database.Checkpoint(str(tmp_path / "checkpoint.json"), "replace")
+
+    import_database.import_collection(db, "users", str(path), "replace", 10, checkpoint, resume=False)
+
+    user = db.users.find_one({"user_id": "user_1"})
+    assert (user["search_email"], user["search_name"]) == ("ada@example.com", "ada l")
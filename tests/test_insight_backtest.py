@@ -0,0 +1,118 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import numpy as np
+import pytest
+
+from daily_series import SERIES_COLLECTION, to_series_doc
+from insight_backtest import CRITICAL, OPEN, TARGET, INSTRUMENTS_COLLECTION, backtest_instrument, latest_run, replay_instrument, run_backtest
+
+def test_replay_decides_which_level_is_hit_first():
+    prices = np.array([100.0, 103.0, 96.0, 111.0, 90.0])
+    targets = np.array([110.0, 95.0, 120.0, 80.0, 85.0])
+    criticals = np.array([95.0, 112.0, 90.0, 115.0, 95.0])
+    bullish = np.array([True, False, True, False, False])
+    timestamps = np.arange(5, dtype=np.float64) * 86400
+
+    outcome, resolved = replay_instrument(timestamps, prices, targets, criticals, bullish)
+
+    # 0: bullish 110/95 -> 96 holds, 111 hits target on day 3
+    # 1: bearish 95/112 -> 96 no, 111 no, 90 hits target on day 4
+    # 2: bullish 120/90 -> 90 hits critical on day 4
+    # 3: bearish 80/115 -> 90 neither; 4: nothing after it
+    assert outcome.tolist() == [TARGET, TARGET, CRITICAL, OPEN, OPEN]
+    assert resolved.tolist() == [3, 4, 4, -1, -1]
+
+    outcome, _ = replay_instrument(timestamps, prices, targets, criticals, bullish, horizon_seconds=2 * 86400)
+    assert outcome.tolist() == [OPEN, OPEN, CRITICAL, OPEN, OPEN]
+
+def test_same_point_hitting_both_levels_counts_as_critical():
+    outcome, _ = replay_instrument(
+        np.array([0.0, 1.0]), np.array([100.0, 100.0]), np.array([100.0, np.nan]),
+        np.array([100.0, np.nan]), np.array([True, True])
+    )
+    assert outcome.tolist() == [CRITICAL, OPEN]
+
+def test_backtest_instrument_groups_by_insight_type():
+    stats = backtest_instrument({
+        "ts": [0, 86400, 2 * 86400, 3 * 86400],
+        "insight_type": ["Bullish Strong", "Neutral", "Bullish Strong", "Bearish Weak"],
+        "analysis_price": [100.0, 104.0, 106.0, 111.0],
+        "target_price": [105.0, 110.0, 110.0, 100.0],
+        "critical_level": [95.0, 100.0, 100.0, 115.0],
+    })
+    # No direction: counted, but not scored
+    assert stats["Neutral"]["insights"] == 0 and stats["Neutral"]["unscored"] == 1
+    assert stats["Bullish Strong"]["unscored"] == 0
+    assert stats["Bullish Strong"]["insights"] == 2
+    assert stats["Bullish Strong"]["target_hits"] == 2
+    assert stats["Bullish Strong"]["target_days_total"] == 3.0
+    assert stats["Bearish Weak"]["open"] == 1
+
+def test_run_backtest_persists_latest_run():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def point(market, instrument, day, insight, price, target, critical):
+        return to_series_doc({
+            "market": market, "instrument_code": instrument, "insight_type": insight,
+            "analysis_datetime": (start + timedelta(days=day)).isoformat(),
+            "analysis_price": price, "target_price": target, "critical_level": critical,
+        })
+
+    async def run():
+        await db[SERIES_COLLECTION].insert_many([
+            point("GCC", "AAPL", 0, "Bullish Strong", 100, 105, 95),
+            point("GCC", "AAPL", 1, "Bullish Strong", 106, 115, 100),
+            point("GCC", "AAPL", 2, "Bearish Weak", 99, 90, 110),
+            point("US", "SPY", 0, "Bearish Weak", 50, 45, 55),
+            point("US", "SPY", 1, "Bearish Weak", 44, 40, 48),
+            point("US", "SPY", 2, "Neutral", 45, 50, 40),
+        ])
+        await db[INSTRUMENTS_COLLECTION].insert_one({"run_id": "old", "market": "GCC"})
+        report = await run_backtest(db, workers=2, shard_size=1)
+        return report, await latest_run(db), await db[INSTRUMENTS_COLLECTION].find({}, {"_id": 0}).to_list(None)
+
+    report, stored, instruments = asyncio.run(run())
+
+    assert report["instruments"] == 2
+    assert report["insights"] == 5
+    assert report["unscored"] == 1
+    assert {(row["market"], row["insight_type"]): row["unscored"] for row in report["by_market"]}[("US", "Neutral")] == 1
+    by_type = {row["insight_type"]: row for row in report["by_insight_type"]}
+    assert by_type["Bullish Strong"]["target_hits"] == 1
+    assert by_type["Bullish Strong"]["critical_hits"] == 1
+    assert by_type["Bullish Strong"]["hit_rate"] == 50.0
+    assert by_type["Bearish Weak"]["target_hits"] == 1
+    assert by_type["Bearish Weak"]["open"] == 2
+
+    assert stored["run_id"] == report["run_id"]
+    assert {row["run_id"] for row in instruments} == {report["run_id"]}
+    assert len(instruments) == 4
+
+def test_run_backtest_backfills_the_series_and_uses_the_given_pool():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from concurrent.futures import ThreadPoolExecutor
+
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+    rows = [
+        {"market": "GCC", "instrument_code": "AAPL", "insight_type": "Bullish Strong",
+         "analysis_datetime": f"2026-01-0{day}T10:00:00+00:00", "analysis_price": price,
+         "target_price": "1,105.00", "critical_level": "95.00"}
+        for day, price in ((1, "100.00"), (2, "1,106.00"))
+    ]
+
+    async def run(pool):
+        await db.daily_analysis.insert_many([dict(row) for row in rows] + [{"market": "GCC"}])
+        first = await run_backtest(db, workers=1, pool=pool, persist=False)
+        second = await run_backtest(db, workers=1, pool=pool, persist=False)
+        return first, second, await db[SERIES_COLLECTION].count_documents({})
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        first, second, points = asyncio.run(run(pool))
+
+    assert first["series_backfilled"] == 2 and points == 2
+    assert second["series_backfilled"] == 0
+    assert first["insights"] == 2
+    assert first["by_insight_type"][0]["target_hits"] == 1
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from rate_limit import (
+    DEFAULT_CLASSES, AdmissionControlMiddleware, RateLimiter, RouteClass, TokenBuckets, VerifiedSessions, classify,
+    client_key, parse_classes
+)
+
+def test_token_bucket_allows_bursts_then_refills_at_the_rate():
+    buckets = TokenBuckets()
+    key = ("ip:1", "poll")
+    assert [buckets.take(key, rate=0.5, burst=3, now=0) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take(key, rate=0.5, burst=3, now=0) == pytest.approx(2.0)
+    assert buckets.take(key, rate=0.5, burst=3, now=2.0) == 0
+    # Another client has its own bucket
+    assert buckets.take(("ip:2", "poll"), rate=0.5, burst=3, now=0) == 0
+
+def test_token_buckets_evict_the_least_recently_used():
+    buckets = TokenBuckets(max_buckets=2)
+    buckets.take(("ip:1", "poll"), rate=1, burst=1, now=0)
+    buckets.take(("ip:2", "poll"), rate=1, burst=1, now=0)
+    buckets.take(("ip:1", "poll"), rate=1, burst=1, now=0.5)
+    buckets.take(("ip:3", "poll"), rate=1, burst=1, now=0.5)
+    assert len(buckets) == 2
+    # ip:1 was used more recently than ip:2, so it kept its (empty) bucket
+    assert buckets.take(("ip:1", "poll"), rate=1, burst=1, now=0.5) > 0
+    assert buckets.take(("ip:2", "poll"), rate=1, burst=1, now=0.5) == 0
+
+def test_classify_and_parse_classes():
+    assert classify("/api/admin/users") == "admin"
+    assert classify("/api/auth/google/callback") == "auth"
+    assert classify("/api/daily-analysis/last-sync") == "poll"
+    assert classify("/api/history/analytics") == "aggregate"
+    assert classify("/api/markets") == "default"
+
+    classes = parse_classes("poll=0.1/2,aggregate=1/5:3")
+    assert classes["poll"] == RouteClass("poll", 0.1, 2.0, DEFAULT_CLASSES["poll"].priority, None)
+    assert classes["aggregate"].max_concurrent == 3
+    with pytest.raises(ValueError):
+        parse_classes("bogus=1/2")
+
+def test_client_key_uses_the_session_only_once_verified():
+    sessions = VerifiedSessions(ttl_seconds=60)
+    scope = {"headers": [(b"cookie", b"theme=dark; session_token=abc")], "client": ("10.0.0.1", 1234)}
+    assert client_key(scope, sessions) == ("ip:10.0.0.1", None)
+    assert client_key({"headers": [], "client": ("10.0.0.1", 1234)}, sessions) == ("ip:10.0.0.1", None)
+
+    sessions.remember("abc", "admin")
+    key, access_level = client_key(scope, sessions)
+    assert key.startswith("s:") and access_level == "admin"
+    assert client_key({"headers": [(b"authorization", b"Bearer abc")]}, sessions) == (key, "admin")
+    assert client_key({"headers": [(b"authorization", b"Bearer made-up")], "client": ("10.0.0.2", 1)},
+                      sessions) == ("ip:10.0.0.2", None)
+
+    sessions.forget("abc")
+    assert client_key(scope, sessions) == ("ip:10.0.0.1", None)
+    sessions.remember("abc", "Limited", now=0)
+    assert sessions.access_level(key[2:], now=61) is None
+
+def test_admission_sheds_background_first_and_never_admin():
+    limiter = RateLimiter(max_in_flight=4)
+
+    async def run():
+        for i in range(2):
+            assert await limiter.admit(f"c{i}", "default") is None
+        shed = await limiter.admit("c9", "default", background=True)
+        normal = await limiter.admit("c2", "default")
+        await limiter.admit("c3", "default")
+        full = await limiter.admit("c4", "default")
+        anonymous_admin_route = await limiter.admit("c6", "admin")
+        admin = await limiter.admit("c5", "default", background=True, access_level="admin")
+        return shed, normal, full, anonymous_admin_route, admin
+
+    shed, normal, full, anonymous_admin_route, admin = asyncio.run(run())
+    assert shed == ("overloaded", 1.0)
+    assert normal is None
+    assert full[0] == "overloaded"
+    # Priority comes from the verified role, not the path
+    assert anonymous_admin_route[0] == "overloaded"
+    assert admin is None
+    assert limiter.in_flight == 5
+
+def test_concurrency_cap_per_class():
+    limiter = RateLimiter(classes={**DEFAULT_CLASSES, "aggregate": RouteClass("aggregate", 100, 100, max_concurrent=2)})
+
+    async def run():
+        results = [await limiter.admit(f"c{i}", "aggregate") for i in range(3)]
+        limiter.release("aggregate")
+        results.append(await limiter.admit("c3", "aggregate"))
+        return results
+
+    assert asyncio.run(run()) == [None, None, ("concurrency", 1.0), None]
+
+def test_middleware_returns_429_with_retry_after():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+
+    @app.get("/api/daily-analysis/last-sync")
+    async def last_sync():
+        return {"last_sync": None}
+
+    @app.get("/api/admin/cache/stats")
+    async def stats():
+        return {}
+
+    limiter = RateLimiter(classes={**DEFAULT_CLASSES, "poll": RouteClass("poll", 0.01, 2, priority=2)})
+    app.add_middleware(AdmissionControlMiddleware, limiter=limiter)
+    client = TestClient(app)
+
+    for token in ("tab-1", "tab-2"):
+        limiter.sessions.remember(token, "Limited")
+    headers = {"Authorization": "Bearer tab-1"}
+    assert [client.get("/api/daily-analysis/last-sync", headers=headers).status_code for _ in range(2)] == [200, 200]
+    response = client.get("/api/daily-analysis/last-sync", headers=headers)
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    # Other clients and admin routes are unaffected
+    assert client.get("/api/daily-analysis/last-sync", headers={"Authorization": "Bearer tab-2"}).status_code == 200
+    assert client.get("/api/admin/cache/stats", headers=headers).status_code == 200
+    # Unverified tokens share their IP's bucket
+    unverified = [client.get("/api/daily-analysis/last-sync", headers={"Authorization": f"Bearer fake-{i}"})
+                  for i in range(3)]
+    assert [response.status_code for response in unverified] == [200, 200, 429]
+    assert limiter.in_flight == 0
+    assert limiter.rejected["rate_limited"] == 2
+
+def test_mongo_store_is_a_shared_token_bucket():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from rate_limit import MongoRateLimitStore
+
+    store = MongoRateLimitStore(mongomock_motor.AsyncMongoMockClient()["tahlil_test"])
+
+    async def run():
+        take = lambda now: store.take(("s:1", "poll"), rate=1, burst=2, now=now)
+        # The burst is spent just before a second boundary; the next second adds one token, not a new burst
+        return [await take(100.9), await take(100.9), await take(100.95), await take(101.1), await take(101.95),
+                await take(102.0)]
+
+    assert asyncio.run(run()) == [0, 0, pytest.approx(0.95), pytest.approx(0.8), 0, pytest.approx(0.9)]
@@ -0,0 +1,65 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+import serialization
+from serialization import dumps, project, record_type
+
+def test_records_match_the_pydantic_model_dump():
+    import server
+
+    doc = {
+        "user_id": "u1", "google_user_id": "g1", "email": "u1@example.com", "name": "U", "picture": "",
+        "created_at": "2026-01-01T00:00:00+00:00", "search_email": "u1@example.com", "_id": "x",
+    }
+    record = server.UserRecord.from_doc(doc)
+    assert record.model_dump() == server.User(**doc).model_dump()
+    assert record.access_level == "Limited" and record.subscription_type is None
+    assert record == server.UserRecord.from_doc(dict(doc))
+
+    record.access_level = "admin"
+    assert record.model_dump()["access_level"] == "admin"
+
+    forecast = {"record_id": "f1", "instrument_code": "X", "market": "M", "forecast_date": "2026-01-01",
+                "forecast_direction": "Bullish", "entry_price": 10.0, "forecast_target_price": 11.0,
+                "created_at": "c", "updated_at": "u", "internal": 1}
+    assert project(server.ForecastHistory, forecast) == server.ForecastHistory(**forecast).model_dump()
+
+def test_dumps_matches_the_json_module(monkeypatch):
+    content = [{"a": 1, "b": "تحليل", "c": None, "d": [1.5, True]}]
+    assert json.loads(dumps(content)) == content
+
+    when = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    extra = {"when": when, "price": Decimal("1.50"), "tags": {"x"}}
+    expected = {"when": when.isoformat(), "price": 1.5, "tags": ["x"]}
+    assert json.loads(dumps(extra)) == expected
+
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert json.loads(dumps(content)) == content
+    assert json.loads(dumps(extra)) == expected
+
+def test_endpoints_return_the_same_json(api, login):
+    client, db, server = api
+    admin = login("admin", access_level="admin")
+
+    me = client.get("/api/auth/me", headers=admin)
+    assert me.status_code == 200
+    user = asyncio.run(db.users.find_one({"user_id": "admin"}, {"_id": 0}))
+    assert me.json() == jsonable_encoder(server.User(**user))
+
+    response = client.post("/api/admin/history/forecast", headers=admin, json={
+        "instrument_code": "AAPL", "market": "US", "forecast_date": "2026-01-01T00:00:00+00:00",
+        "forecast_direction": "Bullish", "entry_price": 100, "forecast_target_price": 110,
+    })
+    assert response.status_code == 200
+    created = response.json()
+    assert set(created) == set(server.ForecastHistory.model_fields)
+
+    first = client.get("/api/history/forecasts", headers=admin)
+    second = client.get("/api/history/forecasts", headers=admin)
+    assert first.headers["content-type"] == "application/json"
+    assert first.content == second.content
+    assert first.json() == [created]
@@ -0,0 +1,167 @@
+import asyncio
+import base64
+import time
+
+import pytest
+
+from sessions import RevocationList, SessionError, SessionExpired, SessionSigner, user_fields
+
+KEY_1 = ("k1", b"1" * 32)
+KEY_2 = ("k2", b"2" * 32)
+
+USER = {
+    "user_id": "user_1",
+    "access_level": "Limited",
+    "subscription_type": "Premium",
+    "subscription_status": "active",
+    "subscription_end_date": "2030-01-01T00:00:00+00:00",
+}
+
+def test_token_round_trip_carries_the_authorization_fields():
+    token, claims = SessionSigner([KEY_1]).issue(USER)
+    assert SessionSigner([KEY_1]).verify(token) == claims
+    assert user_fields(claims) == USER
+
+def test_tampering_expiry_and_unknown_keys_are_rejected():
+    signer = SessionSigner([KEY_1])
+    token, _ = signer.issue(USER)
+    version, kid, payload, signature = token.split(".")
+
+    forged = base64.urlsafe_b64encode(b'{"uid":"admin"}').rstrip(b"=").decode()
+    with pytest.raises(SessionError):
+        signer.verify(f"{version}.{kid}.{forged}.{signature}")
+    with pytest.raises(SessionError):
+        SessionSigner([("k1", b"x" * 32)]).verify(token)
+    with pytest.raises(SessionExpired):
+        signer.verify(token, now=time.time() + 8 * 86400)
+    with pytest.raises(ValueError):
+        SessionSigner([("k1", b"short")])
+
+def test_key_rotation_signs_with_the_first_key_and_verifies_with_all():
+    old_token, _ = SessionSigner([KEY_1]).issue(USER)
+    rotated = SessionSigner([KEY_2, KEY_1])
+    new_token, _ = rotated.issue(USER)
+
+    assert new_token.split(".")[1] == "k2"
+    assert rotated.verify(old_token)["uid"] == "user_1"
+    with pytest.raises(SessionError):
+        SessionSigner([KEY_2]).verify(old_token)
+
+def test_signer_from_env(monkeypatch):
+    secret = base64.urlsafe_b64encode(b"s" * 32).decode()
+    monkeypatch.setenv("SESSION_KEYS", f"new:{secret},old:{secret}")
+    assert SessionSigner.from_env().active_kid == "new"
+    monkeypatch.setenv("SESSION_KEYS", "")
+    with pytest.raises(ValueError):
+        SessionSigner.from_env()
+
+def test_revocations_sync_between_processes():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+    signer = SessionSigner([KEY_1])
+    _, claims = signer.issue(USER, now=time.time() - 10)
+    _, other = signer.issue(USER, now=time.time() - 10)
+
+    async def run():
+        writer, reader = RevocationList(), RevocationList(sync_seconds=3600)
+        await reader.maybe_sync(db)
+        await writer.add(db, "session", "user_1", claims["sid"], expires_at=claims["exp"])
+        # Applied locally at once; elsewhere only after the next sync
+        assert writer.is_revoked(claims) and not reader.is_revoked(claims)
+        await reader.maybe_sync(db)
+        assert not reader.is_revoked(claims)
+        reader.invalidate("sessions")
+        await reader.maybe_sync(db)
+        assert reader.is_revoked(claims) and not reader.is_revoked(other)
+
+        await writer.add(db, "revoke", "user_1")
+        await writer.add_many(db, "refresh", ["user_1", "user_2"])
+        reader.invalidate("sessions")
+        await reader.maybe_sync(db)
+        _, fresh = signer.issue(USER, now=time.time() + 1)
+        return reader.is_revoked(other), reader.is_revoked(fresh), reader.needs_refresh(other), len(reader)
+
+    assert asyncio.run(run()) == (True, False, True, 4)
+
+@pytest.fixture
+def signed_api(api, login, monkeypatch):
+    client, db, server = api
+    signer = SessionSigner([KEY_1])
+    monkeypatch.setattr(server, "session_signer", signer)
+    monkeypatch.setattr(server, "session_revocations", RevocationList())
+    admin = login("admin_1", access_level="admin")
+    login("member_1", subscription_status="none")
+    member_doc = asyncio.run(db.users.find_one({"user_id": "member_1"}, {"_id": 0}))
+    member_token, _ = signer.issue(member_doc, now=time.time() - 5)
+    return client, db, admin, {"Authorization": f"Bearer {member_token}"}
+
+def test_signed_session_needs_no_session_document(signed_api):
+    client, db, _, member = signed_api
+    asyncio.run(db.user_sessions.delete_many({"user_id": "member_1"}))
+
+    response = client.get("/api/subscriptions/status", headers=member)
+    assert response.status_code == 200
+    assert response.json()["has_access"] is False
+
+    me = client.get("/api/auth/me", headers=member).json()
+    assert me["email"] == "member_1@example.com"
+
+def test_subscription_change_reissues_the_token(signed_api):
+    client, db, admin, member = signed_api
+    response = client.post("/api/admin/users/subscription", json={
+        "user_email": "member_1@example.com", "subscription_type": "Premium", "duration_days": 30, "action": "gift"
+    }, headers=admin)
+    assert response.status_code == 200
+
+    response = client.get("/api/subscriptions/status", headers=member)
+    assert response.json()["has_access"] is True
+    new_token = response.cookies.get("session_token")
+    assert new_token and new_token != member["Authorization"].split(" ")[1]
+
+    # The re-issued token carries the new tier and needs no refresh
+    response = client.get("/api/subscriptions/status", headers={"Authorization": f"Bearer {new_token}"})
+    assert response.json()["has_access"] is True
+    assert "session_token" not in response.cookies
+
+def test_logout_and_admin_revocation(signed_api):
+    client, db, admin, member = signed_api
+    token = member["Authorization"].split(" ")[1]
+
+    client.cookies.set("session_token", token)
+    assert client.post("/api/auth/logout").status_code == 200
+    client.cookies.clear()
+    assert client.get("/api/subscriptions/status", headers=member).json()["detail"] == "Session revoked"
+
+    signer = SessionSigner([KEY_1])
+    doc = asyncio.run(db.users.find_one({"user_id": "member_1"}, {"_id": 0}))
+    other, _ = signer.issue(doc, now=time.time() - 5)
+    headers = {"Authorization": f"Bearer {other}"}
+    assert client.get("/api/subscriptions/status", headers=headers).status_code == 200
+    assert client.post("/api/admin/users/member_1/sessions/revoke", headers=admin).status_code == 200
+    assert client.get("/api/subscriptions/status", headers=headers).status_code == 401
+
+def test_deleted_user_gets_401_from_me(signed_api):
+    client, db, _, member = signed_api
+    asyncio.run(db.users.delete_one({"user_id": "member_1"}))
+
+    response = client.get("/api/auth/me", headers=member)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "User not found"
+
+def test_admin_role_is_rechecked_against_the_database(signed_api):
+    client, db, _, _ = signed_api
+    signer = SessionSigner([KEY_1])
+    doc = asyncio.run(db.users.find_one({"user_id": "admin_1"}, {"_id": 0}))
+    token, _ = signer.issue(doc, now=time.time() - 5)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.get("/api/admin/cache/stats", headers=headers)
+    assert response.status_code == 200
+    assert "session_token" not in response.cookies
+
+    # Demoted in the database, without anything on the revocation list
+    asyncio.run(db.users.update_one({"user_id": "admin_1"}, {"$set": {"access_level": "Limited"}}))
+    response = client.get("/api/admin/cache/stats", headers=headers)
+    assert response.status_code == 403
+    reissued = response.cookies.get("session_token")
+    assert signer.verify(reissued)["lvl"] == "Limited"
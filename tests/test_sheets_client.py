@@ -0,0 +1,233 @@
+import asyncio
+import json
+from urllib.parse import unquote
+
+import httpx
+import pytest
+
+from sheets_client import (
+    CircuitBreaker, QuotaBudget, RetryPolicy, ServiceAccountTokens, SheetsClient, SheetsError, SheetsUnavailable,
+    parse_a1_range
+)
+
+class FakeSheets:
+    """Local Sheets API with a token endpoint; `faults` is a queue of statuses served before real answers."""
+
+    def __init__(self, rows, row_count=None):
+        from fastapi import FastAPI, Form, Response
+
+        self.rows = rows
+        self.row_count = row_count or len(rows) + 1
+        self.faults = []
+        self.requests = []
+        self.tokens_issued = 0
+        app = FastAPI()
+
+        @app.post("/token")
+        async def token(grant_type: str = Form(...), assertion: str = Form(...)):
+            self.tokens_issued += 1
+            assert assertion.count(".") == 2
+            return {"access_token": f"access-{self.tokens_issued}", "expires_in": 3600}
+
+        @app.get("/v4/spreadsheets/{spreadsheet_id}/values/{range_name:path}")
+        async def values(spreadsheet_id: str, range_name: str):
+            self.requests.append(unquote(range_name))
+            fault = self.fault()
+            if fault:
+                return fault
+            parts = parse_a1_range(unquote(range_name))
+            start = parts["start_row"]
+            end = parts["end_row"] or self.row_count
+            block = self.rows[start - 2:end - 1]
+            while block and not block[-1]:
+                block.pop()
+            return {"range": range_name, "values": block} if block else {"range": range_name}
+
+        @app.get("/v4/spreadsheets/{spreadsheet_id}")
+        async def spreadsheet(spreadsheet_id: str):
+            self.requests.append("metadata")
+            return {"sheets": [{"properties": {"title": "Sheet1", "gridProperties": {"rowCount": self.row_count}}}]}
+
+        @app.get("/drive/v3/files/{file_id}")
+        async def drive_file(file_id: str):
+            self.requests.append("drive")
+            return self.fault() or {"version": "7", "modifiedTime": "2026-01-05T10:00:00Z"}
+
+        self._response = Response
+        self.app = app
+
+    def fault(self):
+        if not self.faults:
+            return None
+        status = self.faults.pop(0)
+        headers = {"Retry-After": "3"} if status == 429 else {}
+        return self._response(status_code=status, content=json.dumps({"error": {"code": status}}), headers=headers)
+
+def _credentials():
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode()
+    return json.dumps({"client_email": "sync@project.iam.gserviceaccount.com", "private_key": pem,
+                       "token_uri": "http://sheets.test/token"})
+
+CREDENTIALS = _credentials()
+
+def make_client(fake, breaker=None, quota=None, max_attempts=4):
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app), base_url="http://sheets.test")
+    delays = []
+
+    async def sleep(seconds):
+        delays.append(seconds)
+
+    client = SheetsClient(
+        http_client, ServiceAccountTokens(http_client, CREDENTIALS), api_url="http://sheets.test/v4",
+        drive_url="http://sheets.test/drive/v3",
+        retry=RetryPolicy(max_attempts=max_attempts, base_delay=1, max_delay=8), quota=quota,
+        breaker=breaker, sleep=sleep, rng=lambda: 0.5
+    )
+    return client, delays
+
+ROWS = [["GCC", f"I{i}", "Bullish", "05.01.2026", "1", "2", "3"] for i in range(10)]
+
+def test_retries_transient_errors_with_backoff_and_retry_after():
+    fake = FakeSheets(ROWS)
+    fake.faults = [503, 429, 500]
+    client, delays = make_client(fake)
+
+    values = asyncio.run(client.get_values("s1", "Sheet1!A2:G"))
+    assert values == ROWS
+    # Full jitter at rng=0.5: 0.5 * 1, then Retry-After 3 wins over 0.5 * 2, then 0.5 * 4
+    assert delays == [0.5, 3.0, 2.0]
+    assert client.stats()["retries"] == 3
+    assert fake.tokens_issued == 1
+
+def test_non_retryable_errors_fail_at_once_and_exhausted_retries_are_unavailable():
+    fake = FakeSheets(ROWS)
+    fake.faults = [404]
+    client, delays = make_client(fake)
+    with pytest.raises(SheetsError) as error:
+        asyncio.run(client.get_values("s1", "Sheet1!A2:G"))
+    assert error.value.status == 404 and not isinstance(error.value, SheetsUnavailable)
+    assert delays == []
+
+    fake.faults = [503] * 4
+    with pytest.raises(SheetsUnavailable):
+        asyncio.run(client.get_values("s1", "Sheet1!A2:G"))
+    assert len(delays) == 3
+
+def test_expired_token_is_refreshed_once():
+    fake = FakeSheets(ROWS)
+    client, _ = make_client(fake)
+    asyncio.run(client.get_values("s1", "Sheet1!A2:G"))
+    fake.faults = [401]
+    assert asyncio.run(client.get_values("s1", "Sheet1!A2:G")) == ROWS
+    assert fake.tokens_issued == 2
+
+def test_circuit_breaker_fails_fast_then_probes():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30, clock=lambda: now[0])
+    fake = FakeSheets(ROWS)
+    fake.faults = [503] * 3
+    client, _ = make_client(fake, breaker=breaker, max_attempts=5)
+
+    with pytest.raises(SheetsUnavailable) as error:
+        asyncio.run(client.get_values("s1", "Sheet1!A2:G"))
+    assert "circuit open" in str(error.value)
+    assert breaker.state == "open" and len(fake.requests) == 3
+
+    with pytest.raises(SheetsUnavailable):
+        asyncio.run(client.get_values("s1", "Sheet1!A2:G"))
+    assert len(fake.requests) == 3  # no request while open
+
+    now[0] = 31.0
+    assert breaker.state == "half_open"
+    assert asyncio.run(client.get_values("s1", "Sheet1!A2:G")) == ROWS
+    assert breaker.state == "closed"
+
+def test_a_failed_token_fetch_ends_the_half_open_trial():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30, clock=lambda: now[0])
+    fake = FakeSheets(ROWS)
+    fake.faults = [503]
+    client, _ = make_client(fake, breaker=breaker, max_attempts=1)
+    with pytest.raises(SheetsUnavailable):
+        asyncio.run(client.get_values("s1", "Sheet1!A2:G"))
+
+    now[0] = 31.0
+    token = client.tokens.token
+
+    async def token_endpoint_down():
+        raise SheetsError("Service account token request failed: backend error", 500)
+
+    client.tokens.token = token_endpoint_down
+    with pytest.raises(SheetsError):
+        asyncio.run(client.get_values("s1", "Sheet1!A2:G"))
+    assert breaker.state == "open"
+
+    # The next trial goes through once the reset time has passed again
+    client.tokens.token = token
+    now[0] = 62.0
+    assert asyncio.run(client.get_values("s1", "Sheet1!A2:G")) == ROWS
+    assert breaker.stats()["state"] == "closed"
+
+def test_quota_budget_waits_for_a_slot():
+    now = [0.0]
+    waits = []
+
+    async def sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    quota = QuotaBudget(requests_per_minute=2, clock=lambda: now[0], sleep=sleep)
+
+    async def run():
+        for _ in range(3):
+            await quota.acquire()
+            now[0] += 1
+
+    asyncio.run(run())
+    assert waits == [58.0]
+
+def test_chunked_fetch_keeps_row_positions_and_retries_each_block():
+    rows = ROWS[:3] + [[]] * 4 + ROWS[3:6] + [[]] * 5
+    fake = FakeSheets(rows, row_count=25)
+    client, delays = make_client(fake)
+    fake.faults = []
+
+    async def run():
+        first = await client.fetch_range("s1", "Sheet1!A2:G", chunk_rows=4)
+        fake.requests.clear()
+        fake.faults = [503]
+        second = await client.fetch_range("s1", "Sheet1!A2:G", chunk_rows=4)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == rows[:10] == second
+    assert fake.requests[:3] == ["metadata", "Sheet1!A2:G5", "Sheet1!A2:G5"]
+    assert fake.requests[-1] == "Sheet1!A22:G25"
+    assert parse_a1_range("'My Sheet'!B3:H100") == {
+        "sheet": "'My Sheet'", "start_col": "B", "start_row": 3, "end_col": "H", "end_row": 100
+    }
+
+def test_sync_maps_an_unavailable_api_to_503(api, login, monkeypatch):
+    client, _, server = api
+    admin = login("admin_1", access_level="admin")
+    fake = FakeSheets(ROWS)
+    fake.faults = [503] * 10
+    sheets_client, _ = make_client(fake, max_attempts=2)
+    monkeypatch.setattr(server, "sheets_client", sheets_client)
+
+    response = client.post("/api/admin/sheets/sync", json={"spreadsheet_id": "s1"}, headers=admin)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+def test_drive_probe_is_retried_like_sheets_reads():
+    fake = FakeSheets(ROWS)
+    fake.faults = [503]
+    client, delays = make_client(fake)
+    meta = asyncio.run(client.file_metadata("s1"))
+    assert meta["version"] == "7"
+    assert fake.requests == ["drive", "drive"] and delays == [0.5]
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+def run_in_backend(code):
+    env = {k: v for k, v in os.environ.items() if k not in ("MONGO_URL", "DB_NAME")}
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+def test_import_has_no_mongo_or_env_dependency():
+    result = run_in_backend("import server; print(server.client is None)")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "True"
+
+def test_google_auth_is_imported_lazily():
+    result = run_in_backend(
+        "import sys, server; "
+        "print(any(m.startswith('google.auth') for m in sys.modules))"
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,169 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import subscriptions
+from subscriptions import apply_bulk, parse_email_file, start_bulk_job, subscription_changes
+
+NOW = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+def _user(i, end_date=None):
+    email = f"User{i}@example.com"
+    return {
+        "user_id": f"user_{i:04d}",
+        "google_user_id": f"google_{i}",
+        "email": email,
+        "name": f"User {i}",
+        "picture": "",
+        "created_at": NOW.isoformat(),
+        "search_email": email.lower(),
+        "subscription_type": "Beginner",
+        "subscription_status": "active" if end_date else "none",
+        "subscription_end_date": end_date,
+    }
+
+@pytest.fixture
+def users_db():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+    users = [_user(i) for i in range(20)]
+    # One user still active for 10 days, one whose subscription already ended
+    users[1]["subscription_end_date"] = (NOW + timedelta(days=10)).isoformat()
+    users[2]["subscription_end_date"] = (NOW - timedelta(days=5)).isoformat()
+    asyncio.run(db.users.insert_many(users))
+    return db
+
+def _find(db, user_id):
+    return asyncio.run(db.users.find_one({"user_id": user_id}, {"_id": 0}))
+
+def test_extend_computes_each_end_date_from_the_later_of_now_and_the_current_end(users_db):
+    emails = ["user1@example.com", "USER2@example.com", "user3@example.com"]
+    result = asyncio.run(apply_bulk(users_db, emails, "extend", "Premium", 30, now=NOW, chunk_size=2))
+
+    assert result["counts"] == {"updated": 3}
+    assert _find(users_db, "user_0001")["subscription_end_date"] == (NOW + timedelta(days=40)).isoformat()
+    assert _find(users_db, "user_0002")["subscription_end_date"] == (NOW + timedelta(days=30)).isoformat()
+    assert _find(users_db, "user_0003")["subscription_end_date"] == (NOW + timedelta(days=30)).isoformat()
+    assert _find(users_db, "user_0001")["subscription_type"] == "Premium"
+
+def test_outcomes_cover_every_email(users_db):
+    emails = ["user4@example.com", "nobody@example.com", "not-an-email", "User4@Example.com", " ", "user5@example.com"]
+    result = asyncio.run(apply_bulk(users_db, emails, "gift", "Advanced", 7, now=NOW))
+
+    outcomes = {row["email"]: row["outcome"] for row in result["outcomes"]}
+    assert outcomes == {
+        "user4@example.com": "updated",
+        "nobody@example.com": "not_found",
+        "not-an-email": "invalid",
+        "User4@Example.com": "duplicate",
+        "user5@example.com": "updated",
+    }
+    assert result["counts"] == {"updated": 2, "not_found": 1, "invalid": 1, "duplicate": 1}
+    user = _find(users_db, "user_0004")
+    assert user["subscription_status"] == "active"
+    assert user["subscription_start_date"] == NOW.isoformat()
+    # Users not in the list are untouched
+    assert _find(users_db, "user_0006")["subscription_status"] == "none"
+
+def test_users_written_without_search_fields_are_matched(users_db):
+    # As restored by an import or written by hand after startup
+    imported = _user(50)
+    del imported["search_email"]
+    asyncio.run(users_db.users.insert_one(imported))
+
+    result = asyncio.run(apply_bulk(users_db, ["user50@example.com"], "gift", "Advanced", 7, now=NOW))
+
+    assert result["counts"] == {"updated": 1}
+    user = _find(users_db, "user_0050")
+    assert user["subscription_status"] == "active"
+    assert user["search_email"] == "user50@example.com"
+
+def test_deactivate_needs_no_type_and_bad_requests_are_rejected(users_db):
+    result = asyncio.run(apply_bulk(users_db, ["user1@example.com"], "deactivate", "", 0, now=NOW))
+    assert result["counts"] == {"updated": 1}
+    assert _find(users_db, "user_0001")["subscription_status"] == "expired"
+
+    for action, subscription_type, days in (("renew", "Premium", 30), ("gift", "Gold", 30), ("gift", "Premium", 0)):
+        with pytest.raises(ValueError):
+            asyncio.run(apply_bulk(users_db, ["user1@example.com"], action, subscription_type, days))
+
+def test_subscription_changes_treats_naive_end_dates_as_utc():
+    changes = subscription_changes("extend", "Premium", 1, "2026-03-05T00:00:00", NOW)
+    assert changes["subscription_end_date"] == "2026-03-06T00:00:00+00:00"
+
+def test_parse_email_file_reads_plain_lists_and_csv_columns():
+    assert parse_email_file(b"a@example.com\r\nb@example.com\n") == ["a@example.com", "b@example.com"]
+    assert parse_email_file(b"\xef\xbb\xbfname,Email\nAlice,a@example.com\nBob,b@example.com\n") == \
+        ["a@example.com", "b@example.com"]
+
+def test_background_job_records_progress_and_result(users_db):
+    async def run():
+        job = await start_bulk_job(users_db, [f"user{i}@example.com" for i in range(10)], "activate",
+                                   "Beginner", 30, created_by="admin")
+        await asyncio.gather(*subscriptions._running_jobs)
+        return job, await subscriptions.get_job(users_db, job["job_id"])
+
+    job, stored = asyncio.run(run())
+    assert job["status"] == "running"
+    assert stored["status"] == "completed"
+    assert stored["processed"] == 10
+    assert stored["result"]["counts"] == {"updated": 10}
+
+def test_bulk_endpoints(api, login):
+    client, db, server = api
+    admin = login("admin_1", access_level="admin")
+    member = login("member_1")
+    asyncio.run(db.users.insert_many([_user(i) for i in range(3)]))
+
+    body = {"user_emails": ["user0@example.com", "user1@example.com", "missing@example.com"],
+            "action": "gift", "subscription_type": "Premium", "duration_days": 30}
+    assert client.post("/api/admin/users/subscription/bulk", json=body, headers=member).status_code == 403
+
+    response = client.post("/api/admin/users/subscription/bulk", json=body, headers=admin)
+    assert response.status_code == 200
+    assert response.json()["counts"] == {"updated": 2, "not_found": 1}
+
+    response = client.post(
+        "/api/admin/users/subscription/bulk/upload",
+        params={"action": "deactivate"},
+        files={"file": ("emails.csv", b"email\nuser2@example.com\n", "text/csv")},
+        headers=admin
+    )
+    assert response.status_code == 200
+    assert response.json()["counts"] == {"updated": 1}
+    assert _find(db, "user_0002")["subscription_status"] == "expired"
+
+    body["action"] = "renew"
+    assert client.post("/api/admin/users/subscription/bulk", json=body, headers=admin).status_code == 400
+    assert client.get("/api/admin/users/subscription/bulk/subjob_missing", headers=admin).status_code == 404
+
+def test_single_user_endpoint_uses_the_same_rules(api, login):
+    client, db, server = api
+    admin = login("admin_1", access_level="admin")
+    asyncio.run(db.users.insert_one(_user(1, end_date=(datetime.now(timezone.utc) + timedelta(days=10)).isoformat())))
+
+    response = client.post("/api/admin/users/subscription", json={
+        "user_email": "User1@example.com", "subscription_type": "Advanced", "duration_days": 5, "action": "extend"
+    }, headers=admin)
+    assert response.status_code == 200
+    end_date = datetime.fromisoformat(response.json()["subscription_end_date"])
+    assert timedelta(days=14) < end_date - datetime.now(timezone.utc) <= timedelta(days=15)
+
+    response = client.post("/api/admin/users/subscription", json={
+        "user_email": "User1@example.com", "subscription_type": "Advanced", "duration_days": 5, "action": "renew"
+    }, headers=admin)
+    assert response.status_code == 400
+
+def test_single_user_endpoint_finds_users_without_an_end_date(api, login):
+    client, db, server = api
+    admin = login("admin_1", access_level="admin")
+    user = _user(1)
+    del user["subscription_end_date"]
+    asyncio.run(db.users.insert_one(user))
+
+    response = client.post("/api/admin/users/subscription", json={
+        "user_email": "User1@example.com", "subscription_type": "Premium", "duration_days": 30, "action": "gift"
+    }, headers=admin)
+    assert response.status_code == 200
+    assert response.json()["subscription_status"] == "active"
@@ -0,0 +1,87 @@
+import asyncio
+
+from sync_state import drive_fingerprint, is_unchanged
+
+ROWS = [["GCC", "2222", "Bullish", "05.01.2026 10:30:00", "32.10", "34.00", "31.00"]]
+
+class FakeSheetsClient:
+    def __init__(self, meta, rows):
+        self.meta = meta
+        self.rows = rows
+        self.fetches = 0
+
+    async def file_metadata(self, file_id):
+        if isinstance(self.meta, Exception):
+            raise self.meta
+        return self.meta
+
+    async def fetch_range(self, spreadsheet_id, range_name, chunk_rows=None):
+        self.fetches += 1
+        return self.rows
+
+def test_fingerprint_and_comparison():
+    client = FakeSheetsClient({"version": "12", "modifiedTime": "2026-01-05T10:00:00Z"}, ROWS)
+    assert asyncio.run(drive_fingerprint(client, "s1")) == "12:2026-01-05T10:00:00Z"
+    client.meta = RuntimeError("Drive API disabled")
+    assert asyncio.run(drive_fingerprint(client, "s1")) is None
+    assert is_unchanged({"fingerprint": "12:x"}, "12:x")
+    assert not is_unchanged({"fingerprint": None}, None)
+    assert not is_unchanged(None, "12:x")
+
+def test_sync_skips_an_unchanged_sheet(api, login, monkeypatch):
+    client, db, server = api
+    admin = login("admin_1", access_level="admin")
+    sheets = FakeSheetsClient({"version": "1", "modifiedTime": "2026-01-05T10:00:00Z"}, ROWS)
+    monkeypatch.setattr(server, "sheets_client", sheets)
+
+    def sync(**extra):
+        response = client.post("/api/admin/sheets/sync", json={"spreadsheet_id": "s1", **extra}, headers=admin)
+        assert response.status_code == 200
+        return response.json()
+
+    first = sync()
+    assert (first["inserted"], first["unchanged"], first["skipped_syncs"]) == (1, False, 0)
+
+    second = sync()
+    assert (second["total_rows"], second["unchanged"], second["skipped_syncs"]) == (0, True, 1)
+    assert sheets.fetches == 1
+
+    forced = sync(force=True)
+    assert (forced["updated"], forced["unchanged"], forced["skipped_syncs"]) == (1, False, 1)
+
+    sheets.meta = {"version": "2", "modifiedTime": "2026-01-05T11:00:00Z"}
+    assert sync()["unchanged"] is False
+    assert sheets.fetches == 3
+
+    # Without a probe every sync runs
+    sheets.meta = RuntimeError("Drive API disabled")
+    assert sync()["unchanged"] is False
+    assert sync()["unchanged"] is False
+    assert sheets.fetches == 5
+
+def test_a_sync_with_failed_writes_is_not_recorded(api, login, monkeypatch):
+    import daily_ingest
+
+    client, db, server = api
+    admin = login("admin_1", access_level="admin")
+    sheets = FakeSheetsClient({"version": "1", "modifiedTime": "2026-01-05T10:00:00Z"}, ROWS)
+    monkeypatch.setattr(server, "sheets_client", sheets)
+
+    async def series_down(db, records):
+        raise RuntimeError("series collection unavailable")
+
+    def sync():
+        response = client.post("/api/admin/sheets/sync", json={"spreadsheet_id": "s1"}, headers=admin)
+        assert response.status_code == 200
+        return response.json()
+
+    with monkeypatch.context() as patch:
+        patch.setattr(daily_ingest, "write_series_points", series_down)
+        failed = sync()
+    assert failed["write_failures"] == 1 and failed["unchanged"] is False
+
+    # The sheet didn't change, but the failed rows are retried
+    retried = sync()
+    assert (retried["unchanged"], retried["write_failures"]) == (False, 0)
+    assert sync()["unchanged"] is True
+    assert sheets.fetches == 2
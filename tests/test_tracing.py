@@ -0,0 +1,118 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import tracing
+from tracing import MongoCommandTracer, TracingSettings, TracingTransport
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+TRACEPARENT = f"00-{TRACE_ID}-00f067aa0ba902b7-01"
+
+@pytest.fixture
+def spans():
+    """Tracing on, recording finished spans in memory; yields the exporter."""
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    tracing.configure(TracingSettings(), exporter=exporter, batch=False)
+    yield exporter
+    tracing.shutdown()
+
+def test_settings_from_env(monkeypatch):
+    assert not TracingSettings.from_env().enabled
+    monkeypatch.setenv("TRACING_EXPORTER", "file")
+    monkeypatch.setenv("TRACING_SAMPLE_RATIO", "0.1")
+    settings = TracingSettings.from_env()
+    assert settings.enabled and settings.sample_ratio == 0.1
+
+    monkeypatch.setenv("TRACING_SAMPLE_RATIO", "2")
+    with pytest.raises(ValueError, match="TRACING_SAMPLE_RATIO"):
+        TracingSettings.from_env()
+    monkeypatch.setenv("TRACING_EXPORTER", "jaeger")
+    with pytest.raises(ValueError, match="TRACING_EXPORTER"):
+        TracingSettings.from_env()
+
+def test_disabled_tracing_is_a_no_op():
+    assert not tracing.enabled()
+    with tracing.span("anything") as span:
+        span.set_attribute("key", "value")
+    assert span is tracing.NOOP_SPAN
+
+    seen = []
+    transport = TracingTransport(httpx.MockTransport(lambda request: seen.append(request) or httpx.Response(204)))
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get("https://example.com/x")
+
+    asyncio.run(run())
+    assert "traceparent" not in seen[0].headers
+
+def test_request_spans_continue_the_callers_trace(api, login, spans):
+    client, _, _ = api
+    headers = {**login("u1"), "traceparent": TRACEPARENT}
+
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+    finished = {span.name: span for span in spans.get_finished_spans()}
+    server_span = finished["GET /api/auth/me"]
+    assert format(server_span.context.trace_id, "032x") == TRACE_ID
+    assert server_span.attributes["http.route"] == "/api/auth/me"
+    assert server_span.attributes["http.response.status_code"] == 200
+    assert finished["get_current_user"].parent.span_id == server_span.context.span_id
+
+def test_outbound_requests_carry_traceparent(spans):
+    seen = []
+    transport = TracingTransport(httpx.MockTransport(lambda request: seen.append(request) or httpx.Response(503)))
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            with tracing.span("parent"):
+                await client.get("https://sheets.example.com/v4/values?access_token=secret")
+
+    asyncio.run(run())
+    client_span, parent = spans.get_finished_spans()
+    assert client_span.parent.span_id == parent.context.span_id
+    assert seen[0].headers["traceparent"].split("-")[2] == format(client_span.context.span_id, "016x")
+    assert client_span.attributes["url.full"] == "https://sheets.example.com/v4/values"
+    assert client_span.attributes["http.response.status_code"] == 503
+    assert not client_span.status.is_ok
+
+def test_mongo_commands_become_client_spans(spans):
+    listener = MongoCommandTracer()
+    connection = ("localhost", 27017)
+
+    def started(request_id, name, command):
+        return SimpleNamespace(request_id=request_id, connection_id=connection, command_name=name,
+                               command=command, database_name="tahlil")
+
+    with tracing.span("request"):
+        listener.started(started(1, "find", {"find": "users", "filter": {"email": "x@example.com"}}))
+        listener.started(started(2, "aggregate", {"aggregate": 1}))
+    listener.succeeded(SimpleNamespace(request_id=1, connection_id=connection))
+    listener.failed(SimpleNamespace(request_id=2, connection_id=connection, failure={"errmsg": "boom"}))
+
+    finished = {span.name: span for span in spans.get_finished_spans()}
+    find = finished["find users"]
+    assert find.parent.span_id == finished["request"].context.span_id
+    assert find.attributes["db.collection.name"] == "users"
+    assert "filter" not in json.dumps(dict(find.attributes))
+    assert finished["aggregate"].status.description == "boom"
+
+def test_file_exporter_writes_json_lines(tmp_path):
+    pytest.importorskip("opentelemetry.sdk")
+    path = tmp_path / "traces.jsonl"
+    tracing.configure(TracingSettings(exporter="file", file_path=str(path)))
+    try:
+        with tracing.span("sync.fetch", {"sync.rows": 3}):
+            pass
+    finally:
+        tracing.shutdown()
+
+    (line,) = path.read_text().splitlines()
+    span = json.loads(line)
+    assert span["name"] == "sync.fetch" and span["attributes"] == {"sync.rows": 3}
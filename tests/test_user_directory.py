@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from user_directory import build_filter, count_users, ensure_user_directory, list_users
+
+NOW = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+def _users(count):
+    users = []
+    for i in range(count):
+        status = ["active", "expired", "none"][i % 3]
+        users.append({
+            "user_id": f"user_{i:04d}",
+            "email": f"{'Alice' if i % 10 == 0 else 'user'}{i}@example.com",
+            "name": f"Name {i % 7}",
+            "access_level": "Limited",
+            "subscription_type": ["Beginner", "Advanced", "Premium"][(i // 3) % 3] if status != "none" else None,
+            "subscription_status": status,
+            # Every fourth user has no end date, so null ordering is exercised
+            "subscription_end_date": None if i % 4 == 0 else (NOW + timedelta(days=i - 40)).isoformat(),
+            "created_at": (NOW - timedelta(hours=i % 50)).isoformat(),
+        })
+    return users
+
+@pytest.fixture
+def users_db():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["tahlil_test"]
+
+    async def seed():
+        await db.users.insert_many(_users(230))
+        await ensure_user_directory(db)
+
+    asyncio.run(seed())
+    return db
+
+@pytest.mark.parametrize("sort,order", [
+    ("created_at", "desc"), ("email", "asc"), ("name", "desc"),
+    ("subscription_end_date", "asc"), ("subscription_end_date", "desc"),
+])
+def test_cursor_pages_cover_every_user_once(users_db, sort, order):
+    async def walk():
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = await list_users(users_db.users, {}, sort, order, limit=40, cursor=cursor)
+            seen += [row["user_id"] for row in page["users"]]
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return seen, pages
+
+    seen, pages = asyncio.run(walk())
+    assert len(seen) == 230 and len(set(seen)) == 230
+    assert pages == 6
+
+def test_prefix_search_is_case_insensitive_and_hides_search_fields(users_db):
+    page = asyncio.run(list_users(users_db.users, build_filter(q="ALICE1"), "email", "asc", limit=50))
+    emails = [row["email"] for row in page["users"]]
+    assert emails and all(email.startswith("Alice1") for email in emails)
+    assert "search_email" not in page["users"][0]
+
+    page = asyncio.run(list_users(users_db.users, build_filter(q="name 3"), limit=200))
+    assert {row["name"] for row in page["users"]} == {"Name 3"}
+
+def test_filters_and_facet_counts(users_db):
+    query = build_filter(subscription_status="active,expired", subscription_type="Premium")
+    counts = asyncio.run(count_users(users_db.users, query, now=NOW))
+    assert counts["total"] > 0
+    assert counts["by_type"] == {"Premium": counts["total"]}
+    assert set(counts["by_status"]) <= {"active", "expired"}
+
+    everyone = asyncio.run(count_users(users_db.users, {}, now=NOW))
+    assert everyone["total"] == 230
+    assert everyone["by_status"] == {"active": 77, "expired": 77, "none": 76}
+    assert everyone["by_type"]["none"] == 76
+
+    expiring = build_filter(subscription_status="active", expires_within_days=7, now=NOW)
+    page = asyncio.run(list_users(users_db.users, expiring, limit=200))
+    assert page["users"]
+    for row in page["users"]:
+        end = datetime.fromisoformat(row["subscription_end_date"])
+        assert NOW <= end < NOW + timedelta(days=7)
+    assert everyone["expiring_7d"] == len(page["users"])
+
+def test_directory_endpoint(api, login):
+    client, db, _ = api
+    admin = login("admin", access_level="admin")
+    asyncio.run(db.users.insert_many(_users(30)))
+
+    params = {"limit": 6, "subscription_status": "active"}
+    first = client.get("/api/admin/users/directory", params=params, headers=admin).json()
+    assert len(first["users"]) == 6 and first["counts"]["total"] == 10
+    second = client.get("/api/admin/users/directory", params={**params, "cursor": first["next_cursor"]}, headers=admin).json()
+    assert len(second["users"]) == 4 and second["next_cursor"] is None
+    assert "counts" not in second
+
+    assert client.get("/api/admin/users/directory", params={"sort": "password"}, headers=admin).status_code == 400
+    assert client.get("/api/admin/users/directory", params={"cursor": "!!"}, headers=admin).status_code == 400
+    assert client.get("/api/admin/users/directory", headers=login("someone")).status_code == 403